@@ -35,6 +35,14 @@ Grid轨迹聚类分析示例脚本
         --city A72 \\
         --top-n 1 \\
         --export-geojson results.geojson
+    
+    # 5. 多进程并行处理整个城市，中断后可续跑
+    python examples/dataset/bbox_examples/grid_clustering_analysis.py \\
+        --city A72 \\
+        --workers 8 \\
+        --bulk-query \\
+        --save-to-database \\
+        --resume
 
 输出结果：
     1. 数据库表：grid_trajectory_segments, grid_clustering_summary
@@ -289,6 +297,12 @@ def main():
   
   # 导出结果到GeoJSON
   python grid_clustering_analysis.py --city A72 --top-n 1 --export-geojson results.geojson
+  
+  # 8进程并行，跳过已保存的grid
+  python grid_clustering_analysis.py --city A72 --workers 8 --save-to-database --resume
+  
+  # 使用特征库调整聚类参数（第二次起不再查询轨迹点）
+  python grid_clustering_analysis.py --city A72 --feature-store-dir ./segment_features --eps 0.6
         """
     )
     
@@ -330,6 +344,19 @@ def main():
     cluster_group.add_argument('--min-samples', type=int, default=5,
                               help='DBSCAN最小样本数，默认5（更稳定的簇）')
     
+    # 性能参数
+    perf_group = parser.add_argument_group('性能参数')
+    perf_group.add_argument('--workers', type=int, default=1,
+                           help='并行处理grid的进程数，默认1（串行）')
+    perf_group.add_argument('--bulk-query', action='store_true',
+                           help='按城市一次空间连接查询多个grid的轨迹点（减少Hive往返）')
+    perf_group.add_argument('--bulk-query-grids', type=int, default=200,
+                           help='每次批量查询的grid数量，默认200')
+    perf_group.add_argument('--feature-store-dir', metavar='DIR',
+                           help='轨迹段特征库目录：首次运行写入，调整聚类参数重跑时跳过查询和切分')
+    perf_group.add_argument('--resume', action='store_true',
+                           help='跳过当前分析中已完成（有完成标记或已保存聚类统计）的grid（需配合--save-to-database）')
+    
     # 输出参数
     output_group = parser.add_argument_group('输出参数')
     output_group.add_argument('--save-to-database', action='store_true',
@@ -361,6 +388,8 @@ def main():
     print(f"   质量过滤: 移动>{args.min_movement}m, 跳点<{args.max_jump}m, 速度<{args.max_speed}m/s")
     print(f"   聚类参数: eps={args.eps}, min_samples={args.min_samples}")
     print(f"   数据库保存: {'✅ 开启' if args.save_to_database else '❌ 关闭（仅内存统计）'}")
+    print(f"   并行进程: {args.workers}{'（断点续跑）' if args.resume else ''}")
+    print(f"   轨迹点查询: {f'按城市批量（{args.bulk_query_grids}个grid/次）' if args.bulk_query else '逐grid'}")
     
     # 创建配置
     config = ClusterConfig(
@@ -374,7 +403,12 @@ def main():
         max_speed=args.max_speed,
         eps=args.eps,
         min_samples=args.min_samples,
-        save_to_database=args.save_to_database
+        save_to_database=args.save_to_database,
+        num_workers=args.workers,
+        bulk_query=args.bulk_query,
+        bulk_query_grids=args.bulk_query_grids,
+        feature_store_dir=args.feature_store_dir,
+        resume=args.resume
     )
     
     # 创建聚类器
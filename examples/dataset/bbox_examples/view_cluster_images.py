@@ -32,7 +32,7 @@
         --frames-per-scene 3
 
 输出结果：
-    - HTML报告文件（包含base64编码的图片）
+    - HTML报告文件（包含base64编码的图片；--output-mode assets 时为分页HTML + 资源目录）
     - 终端统计信息
 
 作者：spdatalab
@@ -269,6 +269,18 @@ def main():
         default='CAM_FRONT_WIDE_ANGLE',
         help='相机类型（默认: CAM_FRONT_WIDE_ANGLE）'
     )
+    parser.add_argument(
+        '--workers',
+        type=int,
+        default=8,
+        help='并发加载的场景数（默认: 8）'
+    )
+    parser.add_argument(
+        '--max-inflight-mb',
+        type=int,
+        default=512,
+        help='加载中图片数据的内存上限MB（默认: 512）'
+    )
     
     # 输出参数
     parser.add_argument(
@@ -287,6 +299,18 @@ def main():
         default=200,
         help='缩略图大小（默认: 200）'
     )
+    parser.add_argument(
+        '--output-mode',
+        choices=['embed', 'assets'],
+        default='embed',
+        help='输出模式：embed 单文件内嵌图片，assets 图片写入资源目录并分页（大量图片时使用，默认: embed）'
+    )
+    parser.add_argument(
+        '--frames-per-page',
+        type=int,
+        default=500,
+        help='assets模式每页帧数（默认: 500）'
+    )
     
     args = parser.parse_args()
     
@@ -322,6 +346,7 @@ def main():
     print(f"\n📋 待处理场景数: {len(scene_ids)}")
     print(f"🎬 每场景帧数: {args.frames_per_scene}")
     print(f"📷 相机类型: {args.camera_type}")
+    print(f"⚡ 并发场景数: {args.workers}")
     
     # 2. 加载图片
     print(f"\n{'=' * 70}")
@@ -333,7 +358,9 @@ def main():
     try:
         images_dict = retriever.batch_load_images(
             scene_ids,
-            frames_per_scene=args.frames_per_scene
+            frames_per_scene=args.frames_per_scene,
+            max_workers=args.workers,
+            max_inflight_bytes=args.max_inflight_mb * 1024 * 1024
         )
     except Exception as e:
         logger.error(f"❌ 加载图片失败: {e}")
@@ -386,7 +413,10 @@ def main():
             images_dict,
             output_path,
             title=title,
-            thumbnail_size=args.thumbnail_size
+            thumbnail_size=args.thumbnail_size,
+            output_mode=args.output_mode,
+            frames_per_page=args.frames_per_page,
+            max_workers=args.workers
         )
     except Exception as e:
         logger.error(f"❌ 生成HTML报告失败: {e}")
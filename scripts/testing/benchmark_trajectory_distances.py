@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+"""
+轨迹距离度量性能基准
+
+对比逐点Python循环实现与向量化实现（KD树Hausdorff、广播段距离），
+默认使用500点轨迹，并校验两者结果一致。
+
+用法：
+    python scripts/testing/benchmark_trajectory_distances.py --points 500 --pairs 5
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+
+# 添加项目src目录到Python路径
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root / "src"))
+
+from spdatalab.dataset.improved_trajectory_clustering import (
+    angle_difference,
+    frechet_distance,
+    haversine_distance,
+    hausdorff_distance_trajectory,
+    segment_distance,
+    segment_distance_matrix
+)
+
+
+def random_walk(rng, n_points: int) -> np.ndarray:
+    """生成模拟轨迹（随机游走坐标）"""
+    return np.column_stack([
+        116.3 + np.cumsum(rng.normal(0, 1e-4, n_points)),
+        39.9 + np.cumsum(rng.normal(0, 1e-4, n_points))
+    ])
+
+
+def hausdorff_loop(traj1: np.ndarray, traj2: np.ndarray) -> float:
+    """逐点Hausdorff距离（原实现）"""
+    max_dist_12 = max(
+        min(haversine_distance(p1[1], p1[0], p2[1], p2[0]) for p2 in traj2) for p1 in traj1
+    )
+    max_dist_21 = max(
+        min(haversine_distance(p2[1], p2[0], p1[1], p1[0]) for p1 in traj1) for p2 in traj2
+    )
+    return max(max_dist_12, max_dist_21)
+
+
+def _point_line_loop(point, line_start, line_end):
+    """逐点垂直/平行距离（原实现）"""
+    line_vec = line_end - line_start
+    line_len = np.linalg.norm(line_vec)
+    if line_len < 1e-10:
+        return haversine_distance(point[1], point[0], line_start[1], line_start[0]), 0.0
+    line_unitvec = line_vec / line_len
+    proj_len = np.dot(point - line_start, line_unitvec)
+    if proj_len < 0:
+        closest, para = line_start, abs(proj_len)
+    elif proj_len > line_len:
+        closest, para = line_end, proj_len - line_len
+    else:
+        closest, para = line_start + proj_len * line_unitvec, 0.0
+    return haversine_distance(point[1], point[0], closest[1], closest[0]), para
+
+
+def segment_loop(seg1: np.ndarray, seg2: np.ndarray) -> float:
+    """逐点段距离（原实现）"""
+    pairs = [_point_line_loop(p, seg2[0], seg2[-1]) for p in seg1]
+    pairs += [_point_line_loop(p, seg1[0], seg1[-1]) for p in seg2]
+    perp, para = np.array(pairs).T
+    return 0.6 * perp.mean() + 0.3 * para.mean() + 0.1 * angle_difference(seg1, seg2)
+
+
+def time_pairs(func, pairs):
+    start = time.perf_counter()
+    values = np.array([func(a, b) for a, b in pairs])
+    return values, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description='轨迹距离度量性能基准')
+    parser.add_argument('--points', type=int, default=500, help='每条轨迹点数')
+    parser.add_argument('--pairs', type=int, default=5, help='轨迹对数量')
+    parser.add_argument('--matrix-segments', type=int, default=200,
+                        help='段距离矩阵的轨迹段数量')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    pairs = [(random_walk(rng, args.points), random_walk(rng, args.points)) for _ in range(args.pairs)]
+    print(f"📊 模拟数据: {args.pairs} 对轨迹, 每条 {args.points} 点")
+
+    for name, loop_func, fast_func in [
+        ('Hausdorff距离', hausdorff_loop, hausdorff_distance_trajectory),
+        ('段距离(TRACLUS)', segment_loop, segment_distance),
+    ]:
+        expected, loop_time = time_pairs(loop_func, pairs)
+        values, fast_time = time_pairs(fast_func, pairs)
+        consistent = np.allclose(values, expected, rtol=1e-9)
+        print(f"\n{name}")
+        print(f"   逐点循环: {loop_time / args.pairs * 1000:.1f}ms/对")
+        print(f"   向量化: {fast_time / args.pairs * 1000:.2f}ms/对 "
+              f"(加速 {loop_time / max(fast_time, 1e-9):.1f}x)")
+        print(f"   结果一致: {'✅' if consistent else '❌'}")
+
+    _, frechet_time = time_pairs(frechet_distance, pairs)
+    print(f"\nFréchet距离（参考）: {frechet_time / args.pairs * 1000:.2f}ms/对")
+
+    # 段距离矩阵：逐对调用 vs 整体广播
+    segments = [random_walk(rng, int(n)) for n in rng.integers(5, 40, args.matrix_segments)]
+    k = len(segments)
+    start = time.perf_counter()
+    expected = np.zeros((k, k))
+    for i in range(k):
+        for j in range(k):
+            if i != j:
+                expected[i, j] = segment_distance(segments[i], segments[j])
+    pairwise_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matrix = segment_distance_matrix(segments)
+    matrix_time = time.perf_counter() - start
+
+    print(f"\n段距离矩阵 ({k}×{k})")
+    print(f"   逐对向量化调用: {pairwise_time:.2f}秒")
+    print(f"   整体广播: {matrix_time:.3f}秒 (加速 {pairwise_time / max(matrix_time, 1e-9):.1f}x)")
+    print(f"   结果一致: {'✅' if np.allclose(matrix, expected, rtol=1e-9) else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,125 @@
+#!/usr/bin/env python3
+"""
+轨迹段特征提取性能基准
+
+对比逐段特征提取（extract_features / extract_enhanced_features）与按偏移数组的
+批量特征提取（trajectory_features），并校验两者结果一致。
+
+用法：
+    python scripts/testing/benchmark_trajectory_features.py --segments 100000
+"""
+
+import argparse
+import sys
+import time
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+# 添加项目src目录到Python路径
+project_root = Path(__file__).resolve().parents[2]
+sys.path.insert(0, str(project_root / "src"))
+
+from spdatalab.dataset.grid_trajectory_clustering import GridTrajectoryClusterer, TrajectorySegment
+from spdatalab.dataset.improved_trajectory_clustering import extract_enhanced_features
+from spdatalab.dataset.trajectory_features import (
+    SegmentBatch,
+    extract_basic_features_batch,
+    extract_enhanced_features_batch
+)
+
+
+def generate_segments(n_segments: int, min_points: int, max_points: int, seed: int):
+    """生成模拟轨迹段（随机游走坐标、速度、航向角）"""
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(min_points, max_points + 1, n_segments)
+    total = int(lengths.sum())
+
+    lon = 116.3 + np.cumsum(rng.normal(0, 1e-4, total))
+    lat = 39.9 + np.cumsum(rng.normal(0, 1e-4, total))
+    timestamp = np.cumsum(rng.choice([0.05, 0.1, 0.5, 1.0], total))
+    speed = np.abs(rng.normal(8, 4, total))
+    yaw = rng.uniform(-np.pi, np.pi, total)
+
+    batch = SegmentBatch.from_lengths(lengths, lon, lat, timestamp, speed, yaw)
+    return batch
+
+
+def to_segments(batch: SegmentBatch, count: int):
+    """将前count段转换为TrajectorySegment（逐段提取的输入）"""
+    segments = []
+    offsets = batch.offsets
+    for j in range(count):
+        start, end = offsets[j], offsets[j + 1]
+        points = pd.DataFrame({
+            'lon': batch.lon[start:end],
+            'lat': batch.lat[start:end],
+            'timestamp': batch.timestamp[start:end],
+            'twist_linear': batch.speed[start:end],
+            'yaw': batch.yaw[start:end]
+        })
+        segments.append(TrajectorySegment(
+            dataset_name=f"sim_{j}", segment_index=0, points=points,
+            start_time=int(points['timestamp'].iloc[0]), end_time=int(points['timestamp'].iloc[-1]),
+            duration=float(points['timestamp'].iloc[-1] - points['timestamp'].iloc[0]),
+            point_count=len(points)
+        ))
+    return segments
+
+
+def enhanced_reference(segment: TrajectorySegment) -> np.ndarray:
+    """逐段增强特征（按extract_enhanced_features的输入约定构建属性）"""
+    points = segment.points
+    speeds = points['twist_linear'].values
+    yaws = points['yaw'].values
+    time_diffs = np.maximum(np.diff(points['timestamp'].values), 0.1)
+    attrs = {
+        'speeds': speeds,
+        'accelerations': np.diff(speeds) / time_diffs,
+        'yaw_changes': np.diff(yaws) / time_diffs,
+        'yaws': yaws
+    }
+    return extract_enhanced_features(points[['lon', 'lat']].values, attrs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='轨迹段特征提取性能基准')
+    parser.add_argument('--segments', type=int, default=100000, help='模拟轨迹段数量')
+    parser.add_argument('--min-points', type=int, default=5, help='每段最少点数')
+    parser.add_argument('--max-points', type=int, default=40, help='每段最多点数')
+    parser.add_argument('--reference-sample', type=int, default=5000,
+                        help='逐段提取的抽样段数（耗时按比例外推）')
+    parser.add_argument('--seed', type=int, default=42, help='随机种子')
+    args = parser.parse_args()
+
+    batch = generate_segments(args.segments, args.min_points, args.max_points, args.seed)
+    sample = min(args.reference_sample, args.segments)
+    print(f"📊 模拟数据: {batch.n_segments} 段, {len(batch.lon)} 点 (逐段抽样 {sample} 段)")
+
+    segments = to_segments(batch, sample)
+    # extract_features不依赖数据库连接，跳过__init__
+    clusterer = GridTrajectoryClusterer.__new__(GridTrajectoryClusterer)
+    scale = args.segments / max(sample, 1)
+
+    for name, reference, batch_func, dims in [
+        ('基础特征(10维)', clusterer.extract_features, extract_basic_features_batch, 10),
+        ('增强特征(17维)', enhanced_reference, extract_enhanced_features_batch, 17),
+    ]:
+        start = time.perf_counter()
+        expected = np.array([reference(segment) for segment in segments]).reshape(-1, dims)
+        loop_time = (time.perf_counter() - start) * scale
+
+        start = time.perf_counter()
+        features = batch_func(batch)
+        batch_time = time.perf_counter() - start
+
+        consistent = np.allclose(features[:sample], expected, rtol=1e-9, atol=1e-9)
+        print(f"\n{name}")
+        print(f"   逐段提取(外推): {loop_time:.2f}秒")
+        print(f"   批量提取: {batch_time:.2f}秒 (加速 {loop_time / max(batch_time, 1e-9):.1f}x)")
+        print(f"   结果一致: {'✅' if consistent else '❌'}")
+
+
+if __name__ == "__main__":
+    main()
@@ -128,7 +128,38 @@ COMMENT ON COLUMN grid_clustering_summary.behavior_label IS '行为标签：直
 
 
 -- ============================================
--- 3. 创建视图：便于查询
+-- 3. Grid处理进度表（断点续跑）
+-- ============================================
+DROP TABLE IF EXISTS grid_clustering_progress CASCADE;
+
+CREATE TABLE grid_clustering_progress (
+    grid_id INTEGER NOT NULL,
+    city_id TEXT NOT NULL,
+    analysis_id TEXT NOT NULL,
+    
+    -- 处理结果
+    status TEXT NOT NULL,  -- clustered, no_points, no_segments, no_valid_segments
+    valid_segments INTEGER NOT NULL DEFAULT 0,
+    
+    -- 元数据
+    completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    
+    -- 不同分析的完成标记互不覆盖
+    PRIMARY KEY (analysis_id, grid_id)
+);
+
+-- 已有以grid_id为主键的旧表时迁移：
+-- ALTER TABLE grid_clustering_progress DROP CONSTRAINT grid_clustering_progress_pkey,
+--     ADD PRIMARY KEY (analysis_id, grid_id);
+
+CREATE INDEX idx_grid_clust_progress_city_id ON grid_clustering_progress(city_id);
+
+COMMENT ON TABLE grid_clustering_progress IS 'Grid处理完成标记（按analysis_id区分），在轨迹段和聚类统计之后写入，resume据此跳过已完成的grid';
+COMMENT ON COLUMN grid_clustering_progress.status IS '处理结果：clustered（已聚类）、no_points、no_segments、no_valid_segments';
+
+
+-- ============================================
+-- 4. 创建视图：便于查询
 -- ============================================
 
 -- 有效轨迹段视图（过滤掉质量不合格的）
@@ -169,7 +200,7 @@ COMMENT ON VIEW grid_clustering_details IS '轨迹段与聚类标签的关联详
 
 
 -- ============================================
--- 4. 统计查询示例
+-- 5. 统计查询示例
 -- ============================================
 
 -- 查询某个城市的聚类统计
@@ -0,0 +1,318 @@
+"""流式地理要素写出工具模块，提供恒定内存的GeoJSON/GeoParquet导出。
+
+- StreamingGeoJSONWriter：逐个要素追加写出FeatureCollection，不在内存中构建完整集合
+- GeoParquetWriter：按行组缓冲写出，几何以WKB存储并写入GeoParquet元数据
+- write_features：根据文件后缀选择写出器，消费(properties, geometry)生成器
+- properties_schema：由完整的属性列推断GeoParquet属性schema
+
+两种写出器都先写入同目录的临时文件，正常结束时原子替换目标文件，
+写出过程中出错不会留下截断的输出文件。
+"""
+
+import json
+import logging
+import math
+import os
+import uuid
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Mapping, Optional, Tuple, Union
+
+import numpy as np
+import pandas as pd
+import shapely
+from shapely.geometry import mapping
+
+# 检查是否有parquet支持
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
+
+logger = logging.getLogger(__name__)
+
+GEOPARQUET_SUFFIXES = ('.parquet', '.geoparquet')
+
+Feature = Tuple[Dict[str, Any], Any]
+
+
+def _to_json_value(value):
+    """将numpy/pandas标量转换为JSON可序列化的值（NaN、pd.NA、NaT转为null）"""
+    if value is None or value is pd.NA or value is pd.NaT:
+        return None
+    if isinstance(value, np.datetime64) and np.isnat(value):
+        return None
+    if isinstance(value, (np.integer,)):
+        return int(value)
+    if isinstance(value, (np.floating, float)):
+        value = float(value)
+        return None if math.isnan(value) or math.isinf(value) else value
+    if isinstance(value, np.bool_):
+        return bool(value)
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [_to_json_value(v) for v in value]
+    if isinstance(value, (pd.Timestamp, np.datetime64)):
+        return str(value)
+    return value
+
+
+def _temp_path(output_file: Path) -> Path:
+    """与目标文件同目录的临时文件路径（保证os.replace为原子操作）"""
+    return output_file.with_name(f".{output_file.name}.{uuid.uuid4().hex}.tmp")
+
+
+def properties_schema(columns: Mapping[str, Iterable],
+                      overrides: Optional[Mapping[str, 'pa.DataType']] = None) -> 'pa.Schema':
+    """由完整的属性列值推断GeoParquet属性schema
+
+    与GeoParquetWriter按第一个行组推断不同，这里检查每列的全部值，
+    后续行组才出现的非空值也能确定列类型；全为空的列按字符串处理。
+
+    Args:
+        columns: {列名: 全部值}，numpy/pandas列直接按dtype映射
+        overrides: 指定列类型（如写出前会转换为字符串的列）
+
+    Returns:
+        不含几何列的schema，可直接传给GeoParquetWriter
+    """
+    if not PARQUET_AVAILABLE:
+        raise ImportError("需要安装 pyarrow 才能导出 GeoParquet: pip install pyarrow")
+    overrides = overrides or {}
+    fields = []
+    for name, values in columns.items():
+        if name in overrides:
+            fields.append(pa.field(name, overrides[name]))
+            continue
+        dtype = getattr(values, 'dtype', None)
+        try:
+            value_type = pa.from_numpy_dtype(dtype) if dtype is not None and dtype != object else None
+        except (TypeError, NotImplementedError, pa.ArrowNotImplementedError):
+            value_type = None
+        if value_type is None:
+            value_type = pa.infer_type(values if dtype is not None else list(values), from_pandas=True)
+        if pa.types.is_null(value_type):
+            value_type = pa.string()
+        fields.append(pa.field(name, value_type))
+    return pa.schema(fields)
+
+
+class StreamingGeoJSONWriter:
+    """流式GeoJSON写出器
+
+    Example
+    -------
+    >>> with StreamingGeoJSONWriter("out.geojson") as writer:
+    ...     for props, geom in features:
+    ...         writer.write_feature(props, geom)
+    """
+
+    def __init__(self, output_file: Union[str, Path]):
+        self.output_file = Path(output_file)
+        self.feature_count = 0
+        self._file = None
+        self._tmp_path = None
+
+    def __enter__(self):
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        self._tmp_path = _temp_path(self.output_file)
+        self._file = open(self._tmp_path, 'w', encoding='utf-8')
+        self._file.write('{"type": "FeatureCollection", "features": [\n')
+        return self
+
+    def write_feature(self, properties: Dict[str, Any], geometry) -> None:
+        """追加一个要素"""
+        feature = {
+            'type': 'Feature',
+            'properties': {k: _to_json_value(v) for k, v in properties.items()},
+            'geometry': mapping(geometry) if geometry is not None else None
+        }
+        if self.feature_count:
+            self._file.write(',\n')
+        self._file.write(json.dumps(feature, ensure_ascii=False))
+        self.feature_count += 1
+
+    def write_features(self, features: Iterable[Feature]) -> int:
+        """追加多个要素，返回写出数量"""
+        before = self.feature_count
+        for properties, geometry in features:
+            self.write_feature(properties, geometry)
+        return self.feature_count - before
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._file is None:
+            return False
+        try:
+            if exc_type is None:
+                self._file.write('\n]}\n')
+            self._file.close()
+            if exc_type is None:
+                os.replace(self._tmp_path, self.output_file)
+        finally:
+            self._file.close()
+            self._file = None
+            # 替换成功后临时文件已不存在；出错时丢弃临时文件，保留原有的目标文件
+            self._tmp_path.unlink(missing_ok=True)
+        return False
+
+
+class GeoParquetWriter:
+    """按行组写出的GeoParquet写出器
+
+    几何列以WKB编码存储，文件元数据包含GeoParquet 1.0的``geo``描述。
+    schema（可不含几何列，见properties_schema）由调用方指定；未指定时由第一个行组推断，
+    其中全为空的列按字符串处理。后续行组按schema对齐（缺失列补空、类型转换），
+    出现schema之外的列时抛出ValueError。
+    没有要素时同样写出文件：按指定schema（未指定时只有几何列）写出空表。
+    """
+
+    def __init__(self, output_file: Union[str, Path], row_group_size: int = 10000,
+                 schema: Optional['pa.Schema'] = None, geometry_column: str = 'geometry',
+                 compression: str = 'snappy'):
+        if not PARQUET_AVAILABLE:
+            raise ImportError("需要安装 pyarrow 才能导出 GeoParquet: pip install pyarrow")
+        self.output_file = Path(output_file)
+        self.row_group_size = max(1, row_group_size)
+        self.geometry_column = geometry_column
+        self.compression = compression
+        self.feature_count = 0
+        self._schema = schema
+        self._writer = None
+        self._tmp_path = None
+        self._rows: List[Dict[str, Any]] = []
+        self._geometries: List[Any] = []
+
+    def __enter__(self):
+        self.output_file.parent.mkdir(parents=True, exist_ok=True)
+        return self
+
+    def _geo_metadata(self) -> bytes:
+        return json.dumps({
+            'version': '1.0.0',
+            'primary_column': self.geometry_column,
+            'columns': {
+                self.geometry_column: {
+                    'encoding': 'WKB',
+                    'geometry_types': []
+                }
+            }
+        }).encode('utf-8')
+
+    def _init_schema(self, table: 'pa.Table') -> 'pa.Schema':
+        fields = []
+        for field in table.schema:
+            # 第一个行组中全为空的列无法推断类型，按字符串处理
+            if pa.types.is_null(field.type):
+                field = pa.field(field.name, pa.string())
+            fields.append(field)
+        metadata = {b'geo': self._geo_metadata()}
+        return pa.schema(fields, metadata=metadata)
+
+    def _complete_schema(self, schema: 'pa.Schema') -> 'pa.Schema':
+        """为指定的schema补充WKB几何列和geo元数据"""
+        if self.geometry_column not in schema.names:
+            schema = schema.append(pa.field(self.geometry_column, pa.binary()))
+        metadata = dict(schema.metadata or {})
+        metadata.setdefault(b'geo', self._geo_metadata())
+        return schema.with_metadata(metadata)
+
+    def _align(self, table: 'pa.Table') -> 'pa.Table':
+        unknown = [name for name in table.column_names if name not in self._schema.names]
+        if unknown:
+            raise ValueError(f"GeoParquet行组包含schema之外的列: {unknown}，"
+                             f"请在schema中声明全部属性列")
+        columns = []
+        for field in self._schema:
+            if field.name in table.column_names:
+                column = table.column(field.name)
+                if column.type != field.type:
+                    column = column.cast(field.type, safe=False)
+            else:
+                column = pa.nulls(table.num_rows, type=field.type)
+            columns.append(column)
+        return pa.Table.from_arrays(columns, schema=self._schema)
+
+    def _open_writer(self, inferred_schema: Optional['pa.Schema'] = None) -> None:
+        """打开临时文件写出器；schema优先使用指定的，其次为推断的，都没有时只含几何列"""
+        if inferred_schema is not None:
+            self._schema = inferred_schema
+        else:
+            self._schema = self._complete_schema(self._schema if self._schema is not None else pa.schema([]))
+        self._tmp_path = _temp_path(self.output_file)
+        self._writer = pq.ParquetWriter(self._tmp_path, self._schema, compression=self.compression)
+
+    def _flush(self) -> None:
+        if not self._rows:
+            return
+
+        df = pd.DataFrame(self._rows)
+        df[self.geometry_column] = shapely.to_wkb(np.array(self._geometries, dtype=object))
+        table = pa.Table.from_pandas(df, preserve_index=False)
+
+        if self._writer is None:
+            self._open_writer(self._init_schema(table) if self._schema is None else None)
+
+        self._writer.write_table(self._align(table), row_group_size=self.row_group_size)
+        self._rows = []
+        self._geometries = []
+
+    def write_feature(self, properties: Dict[str, Any], geometry) -> None:
+        """追加一个要素，缓冲满一个行组时写出"""
+        self._rows.append(properties)
+        self._geometries.append(geometry)
+        self.feature_count += 1
+        if len(self._rows) >= self.row_group_size:
+            self._flush()
+
+    def write_features(self, features: Iterable[Feature]) -> int:
+        """追加多个要素，返回写出数量"""
+        before = self.feature_count
+        for properties, geometry in features:
+            self.write_feature(properties, geometry)
+        return self.feature_count - before
+
+    def __exit__(self, exc_type, exc, tb):
+        try:
+            if exc_type is None:
+                self._flush()
+                if self._writer is None:
+                    # 没有要素：写出空表，调用方报告的输出路径始终存在
+                    self._open_writer()
+                self._writer.close()
+                os.replace(self._tmp_path, self.output_file)
+        finally:
+            if self._writer is not None:
+                self._writer.close()
+                self._writer = None
+                # 替换成功后临时文件已不存在；出错时丢弃临时文件，保留原有的目标文件
+                self._tmp_path.unlink(missing_ok=True)
+        return False
+
+
+def is_geoparquet_path(output_file: Union[str, Path]) -> bool:
+    """判断输出路径是否为GeoParquet文件"""
+    return str(output_file).lower().endswith(GEOPARQUET_SUFFIXES)
+
+
+def write_features(features: Iterable[Feature], output_file: Union[str, Path],
+                   row_group_size: int = 10000, schema: Optional['pa.Schema'] = None) -> int:
+    """将要素生成器流式写出到文件
+
+    根据后缀选择格式：``.parquet``/``.geoparquet``写GeoParquet，其余写GeoJSON。
+
+    Args:
+        features: (properties, geometry)生成器
+        output_file: 输出文件路径
+        row_group_size: GeoParquet行组大小
+        schema: GeoParquet属性schema（可选，GeoJSON忽略）
+
+    Returns:
+        写出的要素数量
+    """
+    if is_geoparquet_path(output_file):
+        writer = GeoParquetWriter(output_file, row_group_size=row_group_size, schema=schema)
+    else:
+        writer = StreamingGeoJSONWriter(output_file)
+
+    with writer:
+        return writer.write_features(features)
@@ -1,11 +1,26 @@
 import os
 import logging
+import threading
 from pathlib import Path
 from spdatalab.common.config import getenv
 
 logger = logging.getLogger(__name__)
 
-def init_moxing():
+_moxing_lock = threading.Lock()
+_moxing_initialized = False
+
+def init_moxing(force: bool = False):
+    """初始化 moxing 环境（每个进程只执行一次，force=True 时重新初始化）"""
+    global _moxing_initialized
+    if _moxing_initialized and not force:
+        return
+    with _moxing_lock:
+        if _moxing_initialized and not force:
+            return
+        _init_moxing()
+        _moxing_initialized = True
+
+def _init_moxing():
     # 先设置环境变量和取消代理
     s3_endpoint = getenv('S3_ENDPOINT', required=True)
     s3_use_https = getenv('S3_USE_HTTPS', default='0')
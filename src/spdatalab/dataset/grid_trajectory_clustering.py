@@ -9,15 +9,25 @@
 4. 提取10维特征向量（速度、加速度、航向、形态）
 5. DBSCAN聚类分析
 6. 保存结果到数据库
+7. 轨迹段特征库（可选）：调整聚类参数时跳过查询、切分和特征提取
 
 使用示例：
     clusterer = GridTrajectoryClusterer()
     results = clusterer.process_all_grids(city_id='A72', max_grids=5)
+    
+    # 多进程并行，按城市批量查询轨迹点，并跳过已保存的grid
+    results = clusterer.process_all_grids(city_id='A72', num_workers=8, bulk_query=True, resume=True)
+    
+    # 特征库：首次运行写入，之后只调整聚类参数
+    clusterer = GridTrajectoryClusterer(ClusterConfig(feature_store_dir='./segment_features'))
+    clusterer.process_all_grids(city_id='A72')
+    stats = clusterer.cluster_from_feature_store(city_id='A72', eps=0.6, min_samples=8)
 """
 
 from __future__ import annotations
 import logging
 import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from dataclasses import dataclass
 from datetime import datetime
 from pathlib import Path
@@ -28,8 +38,8 @@ import numpy as np
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import LineString, Point
-from shapely import wkt
-from sqlalchemy import create_engine, text
+from shapely import from_wkb, wkt
+from sqlalchemy import bindparam, create_engine, text
 from sklearn.cluster import DBSCAN
 from sklearn.preprocessing import StandardScaler
 
@@ -38,6 +48,9 @@ from spdatalab.dataset.polygon_trajectory_query import (
     HighPerformancePolygonTrajectoryQuery,
     PolygonTrajectoryConfig
 )
+from spdatalab.dataset.trajectory_features import SegmentBatch, extract_basic_features_batch
+from spdatalab.dataset.segment_feature_store import SegmentFeatureStore
+from spdatalab.dataset.dbscan_sweep import dbscan_sweep
 
 # 抑制警告
 warnings.filterwarnings('ignore', category=UserWarning)
@@ -79,9 +92,18 @@ class ClusterConfig:
     
     # 性能配置
     batch_size: int = 100             # 批量保存大小
+    num_workers: int = 1              # 并行处理grid的进程数（1为串行）
+    bulk_query: bool = False          # 按城市批量空间连接查询轨迹点（一次查询多个grid）
+    bulk_query_grids: int = 200       # 每次批量查询的grid数量（限制SQL长度和内存）
+    
+    # 断点续跑配置
+    resume: bool = False              # 跳过当前分析中已完成的grid（需save_to_database）
     
     # 结果保存配置
     save_to_database: bool = False    # 是否保存到数据库（需要表存在）
+    
+    # 特征库配置（按切分配置哈希持久化轨迹段和特征，调整聚类参数时复用）
+    feature_store_dir: Optional[str] = None  # 特征库根目录，None为不启用
 
 
 @dataclass
@@ -141,6 +163,12 @@ class GridTrajectoryClusterer:
         )
         self.trajectory_query = HighPerformancePolygonTrajectoryQuery(query_config)
         
+        # 轨迹段特征库（可选）
+        self.feature_store = None
+        if self.config.feature_store_dir:
+            self.feature_store = SegmentFeatureStore(self.config.feature_store_dir, config=self.config)
+            logger.info(f"   特征库: {self.feature_store.store_dir}")
+        
         logger.info("🚀 GridTrajectoryClusterer 初始化完成")
         logger.info(f"   查询限制: {self.config.query_limit}点/grid")
         logger.info(f"   切分策略: {self.config.min_distance}米/{self.config.max_duration}秒")
@@ -212,12 +240,14 @@ class GridTrajectoryClusterer:
         
         return grids_df
     
-    def query_trajectory_points(self, grid_geometry, grid_id: int = 0) -> pd.DataFrame:
+    def query_trajectory_points(self, grid_geometry, grid_id: int = 0,
+                                raise_on_error: bool = False) -> pd.DataFrame:
         """查询grid内的高质量轨迹点（使用高性能查询器）
         
         Args:
             grid_geometry: Grid的几何对象（Polygon）
             grid_id: Grid ID（用于标识）
+            raise_on_error: 查询失败时抛出异常（默认返回空DataFrame，与无轨迹点无法区分）
             
         Returns:
             轨迹点DataFrame
@@ -234,6 +264,8 @@ class GridTrajectoryClusterer:
         try:
             # 使用高性能查询器（复用所有优化策略）
             points_df, stats = self.trajectory_query.query_intersecting_trajectory_points(polygon_data)
+            if stats.get('failed_polygon_ids'):
+                raise RuntimeError(f"grid {grid_id} 轨迹点查询失败")
             
             if not points_df.empty:
                 # 重命名列以匹配后续处理
@@ -257,10 +289,51 @@ class GridTrajectoryClusterer:
             
         except Exception as e:
             logger.error(f"❌ 查询轨迹点失败: {e}")
+            if raise_on_error:
+                raise
             import traceback
             traceback.print_exc()
             return pd.DataFrame()
     
+    def query_trajectory_points_bulk(self, grids_df: pd.DataFrame) -> Dict[int, pd.DataFrame]:
+        """一次空间连接查询多个grid的轨迹点，并按grid_id拆分
+        
+        Args:
+            grids_df: grid DataFrame（需包含grid_id和geometry列）
+            
+        Returns:
+            {grid_id: 轨迹点DataFrame}，无点的grid为空DataFrame；查询失败返回空字典
+        """
+        polygon_data = [{
+            'id': f'grid_{grid_id}',
+            'geometry': geometry,
+            'properties': {'grid_id': grid_id}
+        } for grid_id, geometry in zip(grids_df['grid_id'], grids_df['geometry'])]
+        
+        try:
+            points_df, stats = self.trajectory_query.query_points_spatial_join(polygon_data)
+        except Exception as e:
+            logger.error(f"❌ 批量查询轨迹点失败，回退为逐grid查询: {e}")
+            return {}
+        
+        points_df = points_df.rename(columns={'longitude': 'lon', 'latitude': 'lat'})
+        if 'vehicle_id' not in points_df.columns:
+            points_df['vehicle_id'] = None
+        
+        # 结果已按polygon_id, dataset_name, timestamp排序，分组保持组内顺序
+        groups = {
+            polygon_id: group.reset_index(drop=True)
+            for polygon_id, group in points_df.groupby('polygon_id', sort=False)
+        }
+        empty_df = points_df.iloc[0:0]
+        
+        logger.info(f"📦 批量查询 {len(polygon_data)} 个grid: {len(points_df)} 个点, "
+                   f"{len(groups)} 个grid有数据, 用时: {stats['query_time']:.2f}s")
+        return {
+            grid_id: groups.get(f'grid_{grid_id}', empty_df)
+            for grid_id in grids_df['grid_id']
+        }
+    
     def segment_trajectories(
         self, 
         points_df: pd.DataFrame
@@ -345,96 +418,117 @@ class GridTrajectoryClusterer:
         2. 时长超过max_duration → 强制切分
         3. 时间间隔>time_gap_threshold → 断开
         """
-        segments = []
-        current_segment_points = []
-        cumulative_distance = 0.0
-        segment_index = 0
+        ranges = [
+            (start, end) for start, end in self._split_trajectory_ranges(points)
+            if end - start >= self.config.min_points
+        ]
+        if not ranges:
+            return []
         
-        for i in range(len(points)):
-            current_point = points.iloc[i]
-            current_segment_points.append(current_point)
-            
-            if i == 0:
-                segment_start_time = current_point['timestamp']
-                continue
-            
-            prev_point = points.iloc[i - 1]
-            
-            # 计算与上一点的距离
-            dist = self._haversine_distance(
-                prev_point['lat'], prev_point['lon'],
-                current_point['lat'], current_point['lon']
-            )
-            cumulative_distance += dist
-            
-            # 计算时长
-            duration = current_point['timestamp'] - segment_start_time
-            
-            # 计算时间间隔
-            time_gap = current_point['timestamp'] - prev_point['timestamp']
-            
-            # 判断切分条件
-            should_split = False
-            
-            # 条件1：时间间隔过大（轨迹断开）
-            if time_gap > self.config.time_gap_threshold:
-                should_split = True
-                logger.debug(f"   时间间隔断开: {time_gap:.1f}秒")
+        # 各段共享整条轨迹的坐标和时间数组，按区间切片
+        coords = np.column_stack((points['lon'].to_numpy(), points['lat'].to_numpy()))
+        timestamps = points['timestamp'].to_numpy()
+        
+        return [
+            self._create_segment(dataset_name, segment_index, points, start, end, coords, timestamps)
+            for segment_index, (start, end) in enumerate(ranges)
+        ]
+    
+    def _split_trajectory_ranges(self, points: pd.DataFrame) -> List[Tuple[int, int]]:
+        """计算单条轨迹的切分区间
+        
+        一次性计算全部相邻点距离和时间间隔，再从每段起点向后在有限窗口内
+        用累计和定位第一个满足切分条件的点（触发点作为下一段的起点）。
+        累计距离按段内顺序累加，与逐点累加的结果一致。
+        
+        Args:
+            points: 按timestamp排序、单位为秒的轨迹点
             
-            # 条件2：距离达标（主切分）
-            elif cumulative_distance >= self.config.min_distance:
-                should_split = True
-                logger.debug(f"   距离达标切分: {cumulative_distance:.1f}米")
+        Returns:
+            [(start, end), ...] 左闭右开的位置区间，覆盖全部点
+        """
+        n = len(points)
+        if n == 0:
+            return []
+        
+        timestamps = points['timestamp'].to_numpy(dtype=float)
+        lats = points['lat'].to_numpy(dtype=float)
+        lons = points['lon'].to_numpy(dtype=float)
+        step_distances = np.zeros(n)
+        step_distances[1:] = self._haversine_distance(lats[:-1], lons[:-1], lats[1:], lons[1:])
+        gap_split = np.zeros(n, dtype=bool)
+        gap_split[1:] = np.diff(timestamps) > self.config.time_gap_threshold
+        
+        min_distance = self.config.min_distance
+        max_duration = self.config.max_duration
+        # 全局累计距离只用于估计搜索窗口，切分判断使用段内累加
+        global_cumulative = np.cumsum(step_distances)
+        gap_positions = np.flatnonzero(gap_split)
+        
+        ranges = []
+        start = 0
+        while start < n - 1:
+            first = start + 1
+            # 估计窗口上界：下一个断开点、距离达标点、时长超限点中最早者
+            gap_pos = np.searchsorted(gap_positions, first)
+            next_gap = gap_positions[gap_pos] if gap_pos < len(gap_positions) else n - 1
+            dist_idx = np.searchsorted(global_cumulative, global_cumulative[start] + min_distance)
+            time_idx = np.searchsorted(timestamps, timestamps[start] + max_duration)
+            stop = min(n, max(first, min(next_gap, dist_idx, time_idx)) + 2)
             
-            # 条件3：时长超限（强制切分）
-            elif duration >= self.config.max_duration:
-                should_split = True
-                logger.debug(f"   时长超限切分: {duration:.1f}秒")
+            split_at = None
+            while True:
+                cumulative = np.cumsum(step_distances[first:stop])
+                duration = timestamps[first:stop] - timestamps[start]
+                should_split = (
+                    gap_split[first:stop] |
+                    (cumulative >= min_distance) |
+                    (duration >= max_duration)
+                )
+                if should_split.any():
+                    split_at = first + int(np.argmax(should_split))
+                    break
+                if stop >= n:
+                    break
+                # 浮点误差导致估计偏早时扩大窗口
+                stop = min(n, stop + max(64, stop - first))
             
-            if should_split:
-                # 保存当前段（不包括触发点）
-                segment_points = current_segment_points[:-1]
-                if len(segment_points) >= self.config.min_points:
-                    segment = self._create_segment(
-                        dataset_name, 
-                        segment_index, 
-                        segment_points
-                    )
-                    segments.append(segment)
-                    segment_index += 1
-                
-                # 开始新段
-                current_segment_points = [current_point]
-                cumulative_distance = 0.0
-                segment_start_time = current_point['timestamp']
-        
-        # 处理最后一段
-        if len(current_segment_points) >= self.config.min_points:
-            segment = self._create_segment(
-                dataset_name,
-                segment_index,
-                current_segment_points
-            )
-            segments.append(segment)
+            if split_at is None:
+                break
+            ranges.append((start, split_at))
+            start = split_at
         
-        return segments
+        ranges.append((start, n))
+        return ranges
     
     def _create_segment(
         self, 
         dataset_name: str, 
         segment_index: int, 
-        points_list: List
+        points: pd.DataFrame,
+        start: int,
+        end: int,
+        coords: np.ndarray,
+        timestamps: np.ndarray
     ) -> TrajectorySegment:
-        """创建轨迹段对象"""
-        points_df = pd.DataFrame(points_list)
+        """由轨迹点区间[start, end)创建轨迹段对象
+        
+        Args:
+            points: 整条轨迹点DataFrame
+            start, end: 段在轨迹中的位置区间（左闭右开）
+            coords: 整条轨迹的(lon, lat)坐标数组
+            timestamps: 整条轨迹的时间戳数组（秒）
+        """
+        points_df = points.iloc[start:end]
         
-        start_time = int(points_df['timestamp'].min())
-        end_time = int(points_df['timestamp'].max())
+        segment_times = timestamps[start:end]
+        start_time = int(segment_times.min())
+        end_time = int(segment_times.max())
         duration = (end_time - start_time) / 1.0  # 秒
         
         # 创建LineString几何
-        coords = list(zip(points_df['lon'], points_df['lat']))
-        geometry = LineString(coords) if len(coords) >= 2 else None
+        segment_coords = coords[start:end]
+        geometry = LineString(segment_coords) if len(segment_coords) >= 2 else None
         
         return TrajectorySegment(
             dataset_name=dataset_name,
@@ -554,14 +648,30 @@ class GridTrajectoryClusterer:
         
         return features
     
+    def extract_features_batch(self, segments: List[TrajectorySegment]) -> np.ndarray:
+        """批量提取10维特征向量
+        
+        将所有轨迹段拼接为逐点数组后按段归约，结果与逐段调用extract_features一致。
+        
+        Returns:
+            (n_segments, 10) 特征矩阵
+        """
+        if not segments:
+            return np.zeros((0, 10))
+        return extract_basic_features_batch(SegmentBatch.from_segments(segments))
+    
     def perform_clustering(
         self, 
-        segments: List[TrajectorySegment]
+        segments: List[TrajectorySegment],
+        eps: Optional[float] = None,
+        min_samples: Optional[int] = None
     ) -> np.ndarray:
         """DBSCAN聚类
         
         Args:
             segments: 轨迹段列表（已提取特征）
+            eps: DBSCAN距离阈值，默认使用config.eps
+            min_samples: DBSCAN最小样本数，默认使用config.min_samples
             
         Returns:
             聚类标签数组
@@ -587,8 +697,8 @@ class GridTrajectoryClusterer:
         
         # DBSCAN聚类
         dbscan = DBSCAN(
-            eps=self.config.eps,
-            min_samples=self.config.min_samples,
+            eps=self.config.eps if eps is None else eps,
+            min_samples=self.config.min_samples if min_samples is None else min_samples,
             metric='euclidean'
         )
         
@@ -604,6 +714,35 @@ class GridTrajectoryClusterer:
         
         return labels
     
+    def sweep_clustering(
+        self,
+        segments: List[TrajectorySegment],
+        eps_values: List[float],
+        min_samples_values: Optional[List[int]] = None
+    ) -> pd.DataFrame:
+        """DBSCAN参数扫描：在最大eps处构建一次邻居图，推导所有参数组合的聚类结果
+        
+        标签与逐个参数调用perform_clustering一致。
+        
+        Args:
+            segments: 轨迹段列表（已提取特征）
+            eps_values: eps候选值
+            min_samples_values: min_samples候选值，默认[config.min_samples]
+            
+        Returns:
+            每组参数一行：eps, min_samples, n_clusters, n_noise, noise_ratio, labels
+        """
+        features_list = [seg.features for seg in segments if seg.features is not None]
+        if not features_list:
+            logger.warning("⚠️ 没有有效特征，跳过参数扫描")
+            return pd.DataFrame(columns=['eps', 'min_samples', 'n_clusters', 'n_noise', 'noise_ratio', 'labels'])
+        
+        features_scaled = self.scaler.fit_transform(np.vstack(features_list))
+        if min_samples_values is None:
+            min_samples_values = [self.config.min_samples]
+        
+        return dbscan_sweep(features_scaled, eps_values, min_samples_values)
+    
     def generate_behavior_labels(
         self, 
         segments: List[TrajectorySegment],
@@ -825,16 +964,181 @@ class GridTrajectoryClusterer:
             conn.execute(sql, summary_data)
             conn.commit()
     
-    def process_single_grid(self, grid_row: pd.Series) -> Dict:
+    def load_segments_from_store(
+        self,
+        city_id: str,
+        grid_id: int,
+        with_points: Optional[bool] = None
+    ) -> Optional[List[TrajectorySegment]]:
+        """从特征库读取grid的有效轨迹段
+        
+        Args:
+            with_points: 是否还原轨迹点（保存数据库时需要），默认与save_to_database一致
+            
+        Returns:
+            轨迹段列表（已含特征和几何），未启用特征库或未命中时返回None
+        """
+        if self.feature_store is None:
+            return None
+        
+        with_points = self.config.save_to_database if with_points is None else with_points
+        segments_df = self.feature_store.load_grid(city_id, grid_id, with_points=with_points)
+        if segments_df is None:
+            return None
+        
+        features = SegmentFeatureStore.feature_matrix(segments_df)
+        geometries = from_wkb(segments_df['geometry'].to_numpy())
+        
+        segments = []
+        for i, row in enumerate(segments_df.to_dict('records')):
+            points = SegmentFeatureStore.segment_points(row) if with_points else pd.DataFrame()
+            segments.append(TrajectorySegment(
+                dataset_name=row['dataset_name'],
+                segment_index=row['segment_index'],
+                points=points,
+                start_time=row['start_time'],
+                end_time=row['end_time'],
+                duration=row['duration'],
+                point_count=row['point_count'],
+                features=features[i],
+                quality_flag=row['quality_flag'],
+                geometry=geometries[i]
+            ))
+        return segments
+    
+    def cluster_from_feature_store(
+        self,
+        city_id: Optional[str] = None,
+        grid_ids: Optional[List[int]] = None,
+        eps: Optional[float] = None,
+        min_samples: Optional[int] = None
+    ) -> pd.DataFrame:
+        """直接基于特征库中的特征聚类（用于聚类参数探索，不查询轨迹点、不写数据库）
+        
+        Args:
+            city_id: 城市ID过滤
+            grid_ids: 指定grid ID列表
+            eps: DBSCAN距离阈值，默认使用config.eps
+            min_samples: DBSCAN最小样本数，默认使用config.min_samples
+            
+        Returns:
+            每个grid的聚类统计DataFrame（grid_id, city_id, valid_segments, n_clusters, noise_ratio, cluster_labels）
+        """
+        if self.feature_store is None:
+            raise ValueError("未启用特征库，请设置config.feature_store_dir")
+        
+        grids = self.feature_store.list_grids(city_id)
+        if grid_ids:
+            grids = grids[grids['grid_id'].isin(grid_ids)]
+        
+        all_stats = []
+        for grid_city, grid_id in zip(grids['city_id'], grids['grid_id']):
+            segments = self.load_segments_from_store(grid_city, grid_id, with_points=False)
+            stats = {
+                'grid_id': grid_id,
+                'city_id': grid_city,
+                'valid_segments': len(segments),
+                'n_clusters': 0,
+                'noise_ratio': None,
+                'cluster_labels': []
+            }
+            if segments:
+                labels = self.perform_clustering(segments, eps=eps, min_samples=min_samples)
+                stats['n_clusters'] = len(set(labels)) - (1 if -1 in labels else 0)
+                stats['noise_ratio'] = float(np.mean(labels == -1))
+                stats['cluster_labels'] = labels.tolist()
+            all_stats.append(stats)
+        
+        logger.info(f"📦 特征库聚类完成: {len(all_stats)} 个grid")
+        return pd.DataFrame(all_stats)
+    
+    def _prepare_grid_segments(
+        self,
+        grid_row: pd.Series,
+        points_df: Optional[pd.DataFrame],
+        stats: Dict
+    ) -> List[TrajectorySegment]:
+        """查询轨迹点、切分轨迹段、质量过滤并提取特征
+        
+        Returns:
+            有效轨迹段列表（已提取特征），为空时stats['error']记录原因
+        """
+        grid_id = grid_row['grid_id']
+        city_id = grid_row['city_id']
+        analysis_id = grid_row['analysis_id']
+        geometry = grid_row['geometry']
+        
+        # 1. 查询轨迹点（使用高性能查询器），查询失败抛出异常，避免被当作无轨迹点的grid标记完成
+        if points_df is None:
+            points_df = self.query_trajectory_points(geometry, grid_id, raise_on_error=True)
+        stats['total_points'] = len(points_df)
+        stats['trajectory_count'] = points_df['dataset_name'].nunique() if not points_df.empty else 0
+        
+        if points_df.empty:
+            logger.warning("⚠️ 没有轨迹点，跳过")
+            stats['error'] = 'no_points'
+            return []
+        
+        logger.info(f"📊 轨迹点统计: {len(points_df)} 个点, {stats['trajectory_count']} 条轨迹")
+        
+        # 2. 切分轨迹段
+        segments = self.segment_trajectories(points_df)
+        stats['total_segments'] = len(segments)
+        
+        if not segments:
+            logger.warning("⚠️ 没有有效轨迹段")
+            stats['error'] = 'no_segments'
+            return []
+        
+        logger.info(f"✂️ 切分结果: {len(segments)} 个轨迹段")
+        
+        # 3. 质量过滤和特征提取
+        valid_segments = []
+        quality_stats = {}
+        
+        for segment in segments:
+            is_valid, reason = self.filter_segment_quality(segment)
+            segment.quality_flag = reason
+            
+            quality_stats[reason] = quality_stats.get(reason, 0) + 1
+            
+            if is_valid:
+                valid_segments.append(segment)
+        
+        # 批量提取特征
+        features = self.extract_features_batch(valid_segments)
+        for segment, segment_features in zip(valid_segments, features):
+            segment.features = segment_features
+        
+        stats['valid_segments'] = len(valid_segments)
+        stats['quality_stats'] = quality_stats
+        
+        logger.info(f"✅ 有效轨迹段: {len(valid_segments)} ({len(valid_segments)/len(segments)*100:.1f}%)")
+        logger.info(f"📋 质量统计: {quality_stats}")
+        
+        # 写入特征库（含无有效段的grid，避免重复查询）
+        if self.feature_store is not None:
+            self.feature_store.save_grid(city_id, grid_id, analysis_id, valid_segments)
+        
+        if not valid_segments:
+            logger.warning("⚠️ 没有通过质量过滤的轨迹段")
+            stats['error'] = 'no_valid_segments'
+        
+        return valid_segments
+    
+    def process_single_grid(self, grid_row: pd.Series, points_df: Optional[pd.DataFrame] = None) -> Dict:
         """处理单个grid的完整流程
         
+        Args:
+            grid_row: grid信息
+            points_df: 已批量查询的grid轨迹点（可选，为None时单独查询）
+        
         Returns:
             处理统计信息
         """
         grid_id = grid_row['grid_id']
         city_id = grid_row['city_id']
         analysis_id = grid_row['analysis_id']
-        geometry = grid_row['geometry']
         
         logger.info(f"\n{'='*60}")
         logger.info(f"🎯 处理Grid #{grid_id} (城市: {city_id})")
@@ -849,53 +1153,20 @@ class GridTrajectoryClusterer:
         }
         
         try:
-            # 1. 查询轨迹点（使用高性能查询器）
-            points_df = self.query_trajectory_points(geometry, grid_id)
-            stats['total_points'] = len(points_df)
-            stats['trajectory_count'] = points_df['dataset_name'].nunique() if not points_df.empty else 0
-            
-            if points_df.empty:
-                logger.warning("⚠️ 没有轨迹点，跳过")
-                stats['error'] = 'no_points'
-                return stats
-            
-            logger.info(f"📊 轨迹点统计: {len(points_df)} 个点, {stats['trajectory_count']} 条轨迹")
-            
-            # 2. 切分轨迹段
-            segments = self.segment_trajectories(points_df)
-            stats['total_segments'] = len(segments)
-            
-            if not segments:
-                logger.warning("⚠️ 没有有效轨迹段")
-                stats['error'] = 'no_segments'
-                return stats
-            
-            logger.info(f"✂️ 切分结果: {len(segments)} 个轨迹段")
-            
-            # 3. 质量过滤和特征提取
-            valid_segments = []
-            quality_stats = {}
-            
-            for segment in segments:
-                is_valid, reason = self.filter_segment_quality(segment)
-                segment.quality_flag = reason
-                
-                quality_stats[reason] = quality_stats.get(reason, 0) + 1
-                
-                if is_valid:
-                    # 提取特征
-                    segment.features = self.extract_features(segment)
-                    valid_segments.append(segment)
-            
-            stats['valid_segments'] = len(valid_segments)
-            stats['quality_stats'] = quality_stats
-            
-            logger.info(f"✅ 有效轨迹段: {len(valid_segments)} ({len(valid_segments)/len(segments)*100:.1f}%)")
-            logger.info(f"📋 质量统计: {quality_stats}")
+            # 1-3. 特征库命中时直接读取有效轨迹段，否则查询、切分并提取特征
+            valid_segments = self.load_segments_from_store(city_id, grid_id)
+            if valid_segments is not None:
+                stats['from_feature_store'] = True
+                stats['valid_segments'] = len(valid_segments)
+                logger.info(f"📦 从特征库读取: {len(valid_segments)} 个有效轨迹段")
+            else:
+                valid_segments = self._prepare_grid_segments(grid_row, points_df, stats)
             
             if not valid_segments:
-                logger.warning("⚠️ 没有通过质量过滤的轨迹段")
-                stats['error'] = 'no_valid_segments'
+                stats['error'] = stats['error'] or 'no_valid_segments'
+                # 空grid同样记录完成标记，断点续跑时不再重复查询
+                if self.config.save_to_database:
+                    self.mark_grid_completed(grid_id, city_id, analysis_id, stats['error'])
                 return stats
             
             # 4. 聚类
@@ -920,6 +1191,7 @@ class GridTrajectoryClusterer:
                     grid_id, city_id, analysis_id,
                     valid_segments, labels, cluster_info
                 )
+                self.mark_grid_completed(grid_id, city_id, analysis_id, 'clustered', len(valid_segments))
             else:
                 logger.debug(f"⏭️  跳过数据库保存（save_to_database=False）")
             
@@ -936,17 +1208,137 @@ class GridTrajectoryClusterer:
         
         return stats
     
+    def mark_grid_completed(
+        self,
+        grid_id: int,
+        city_id: str,
+        analysis_id: str,
+        status: str,
+        valid_segments: int = 0
+    ):
+        """写入grid完成标记（断点续跑）
+        
+        在轨迹段和聚类统计之后写入；无轨迹点、无有效轨迹段的grid也写入，
+        status记录处理结果（clustered / no_points / no_segments / no_valid_segments）。
+        标记按(analysis_id, grid_id)区分，不同分析互不影响。
+        """
+        sql = text("""
+            INSERT INTO grid_clustering_progress (
+                grid_id, city_id, analysis_id, status, valid_segments
+            ) VALUES (
+                :grid_id, :city_id, :analysis_id, :status, :valid_segments
+            )
+            ON CONFLICT (analysis_id, grid_id) DO UPDATE SET
+                city_id = EXCLUDED.city_id,
+                status = EXCLUDED.status,
+                valid_segments = EXCLUDED.valid_segments,
+                completed_at = CURRENT_TIMESTAMP;
+        """)
+        
+        with self.engine.connect() as conn:
+            conn.execute(sql, {
+                'grid_id': int(grid_id),
+                'city_id': city_id,
+                'analysis_id': analysis_id,
+                'status': status,
+                'valid_segments': int(valid_segments)
+            })
+            conn.commit()
+    
+    def load_completed_grid_ids(self, grid_ids: List[int], analysis_id: str) -> set:
+        """查询某个分析中已完成的grid（断点续跑）
+        
+        grid_clustering_progress中存在完成标记即视为已完成（含没有有效轨迹段的grid）；
+        完成标记表引入前保存的结果没有标记，已有聚类统计（最后写入）的grid同样视为已完成。
+        
+        Raises:
+            查询失败时抛出数据库异常（不能据此判断哪些grid未完成）
+        """
+        if not grid_ids:
+            return set()
+        
+        sql = text("""
+            SELECT grid_id
+            FROM grid_clustering_progress
+            WHERE analysis_id = :analysis_id AND grid_id IN :grid_ids
+            UNION
+            SELECT grid_id
+            FROM grid_clustering_summary
+            WHERE analysis_id = :analysis_id AND grid_id IN :grid_ids;
+        """).bindparams(bindparam('grid_ids', expanding=True))
+        
+        with self.engine.connect() as conn:
+            rows = conn.execute(sql, {
+                'analysis_id': analysis_id,
+                'grid_ids': [int(g) for g in grid_ids]
+            }).fetchall()
+        return {row[0] for row in rows}
+    
+    def clear_partial_results(self, grid_ids: List[int], analysis_id: str):
+        """删除某个分析中未完成grid残留的轨迹段和聚类统计（上次运行在写入完成标记前中断）
+        
+        Raises:
+            删除失败时抛出数据库异常（避免重新处理后结果重复）
+        """
+        if not grid_ids:
+            return
+        
+        params = {'analysis_id': analysis_id, 'grid_ids': [int(g) for g in grid_ids]}
+        deleted = 0
+        with self.engine.connect() as conn:
+            for table in ['grid_trajectory_segments', 'grid_clustering_summary']:
+                sql = text(f"""
+                    DELETE FROM {table}
+                    WHERE analysis_id = :analysis_id AND grid_id IN :grid_ids;
+                """).bindparams(bindparam('grid_ids', expanding=True))
+                deleted += conn.execute(sql, params).rowcount
+            conn.commit()
+        if deleted:
+            logger.info(f"🧹 清理未完成grid的残留结果: {deleted} 条")
+    
+    def _skip_completed_grids(self, grids_df: pd.DataFrame) -> pd.DataFrame:
+        """断点续跑：按analysis_id过滤已完成的grid，并清理其余grid的残留结果
+        
+        完成标记查询失败时异常直接抛出，不会进入清理步骤。
+        """
+        grids_df = grids_df.reset_index(drop=True)
+        completed_mask = np.zeros(len(grids_df), dtype=bool)
+        for analysis_id, analysis_grids in grids_df.groupby('analysis_id', sort=False):
+            completed = self.load_completed_grid_ids(analysis_grids['grid_id'].tolist(), analysis_id)
+            is_completed = analysis_grids['grid_id'].isin(completed)
+            completed_mask[analysis_grids.index[is_completed]] = True
+            self.clear_partial_results(analysis_grids.loc[~is_completed, 'grid_id'].tolist(), analysis_id)
+        
+        if completed_mask.any():
+            logger.info(f"⏭️  跳过已完成的grid: {int(completed_mask.sum())} 个")
+        return grids_df[~completed_mask].reset_index(drop=True)
+    
     def process_all_grids(
         self,
         city_id: Optional[str] = None,
         max_grids: Optional[int] = None,
-        grid_ids: Optional[List[int]] = None
+        grid_ids: Optional[List[int]] = None,
+        num_workers: Optional[int] = None,
+        resume: Optional[bool] = None,
+        bulk_query: Optional[bool] = None
     ) -> pd.DataFrame:
         """批量处理多个grid
         
+        Args:
+            city_id: 城市ID过滤
+            max_grids: 最大grid数量
+            grid_ids: 指定grid ID列表
+            num_workers: 并行进程数，默认使用config.num_workers
+            resume: 是否跳过已保存的grid，默认使用config.resume
+            bulk_query: 是否按城市批量查询轨迹点，默认使用config.bulk_query
+        
         Returns:
-            处理统计DataFrame
+            处理统计DataFrame（按完成顺序）
         """
+        num_workers = self.config.num_workers if num_workers is None else num_workers
+        resume = self.config.resume if resume is None else resume
+        bulk_query = self.config.bulk_query if bulk_query is None else bulk_query
+        
         logger.info("\n" + "="*70)
         logger.info("🚀 批量Grid轨迹聚类分析")
         logger.info("="*70)
@@ -958,17 +1350,32 @@ class GridTrajectoryClusterer:
             logger.error("❌ 没有可处理的grid")
             return pd.DataFrame()
         
+        # 断点续跑：跳过已保存的grid
+        if resume:
+            if not self.config.save_to_database:
+                logger.warning("⚠️ resume需要save_to_database，忽略")
+            else:
+                grids_df = self._skip_completed_grids(grids_df)
+                
+                if grids_df.empty:
+                    logger.info("✅ 所有grid均已完成")
+                    return pd.DataFrame()
+        
         logger.info(f"\n📋 准备处理 {len(grids_df)} 个grid")
         
         # 批量处理
-        all_stats = []
         start_time = time.time()
-        
-        for idx, grid_row in grids_df.iterrows():
-            logger.info(f"\n[{idx+1}/{len(grids_df)}] 开始处理...")
-            
-            stats = self.process_single_grid(grid_row)
-            all_stats.append(stats)
+        grid_batches = self._iter_grid_batches(grids_df, bulk_query)
+        if num_workers > 1 and len(grids_df) > 1:
+            all_stats = self._process_grids_parallel(grid_batches, len(grids_df), num_workers)
+        else:
+            all_stats = []
+            for batch in grid_batches:
+                for grid_row, points_df in batch:
+                    logger.info(f"\n[{len(all_stats)+1}/{len(grids_df)}] 开始处理...")
+                    
+                    stats = self.process_single_grid(grid_row, points_df)
+                    all_stats.append(stats)
         
         # 汇总统计
         total_time = time.time() - start_time
@@ -986,12 +1393,81 @@ class GridTrajectoryClusterer:
         if success_count > 0:
             successful_stats = stats_df[stats_df['success'] == True]
             logger.info(f"\n成功grid统计:")
-            logger.info(f"  平均轨迹点数: {successful_stats['total_points'].mean():.0f}")
-            logger.info(f"  平均轨迹段数: {successful_stats['total_segments'].mean():.0f}")
-            logger.info(f"  平均有效段数: {successful_stats['valid_segments'].mean():.0f}")
+            # 从特征库读取的grid没有轨迹点和切分统计
+            for column, label in [('total_points', '平均轨迹点数'),
+                                  ('total_segments', '平均轨迹段数'),
+                                  ('valid_segments', '平均有效段数')]:
+                if column in successful_stats and successful_stats[column].notna().any():
+                    logger.info(f"  {label}: {successful_stats[column].mean():.0f}")
         
         return stats_df
     
+    def _iter_grid_batches(self, grids_df: pd.DataFrame, bulk_query: bool):
+        """生成待处理的grid批次 [(grid_row, points_df)]
+        
+        批量查询模式下按城市分组，每bulk_query_grids个grid一次空间连接查询，
+        处理完一批再查询下一批；否则points_df为None，由process_single_grid逐grid查询。
+        """
+        if not bulk_query:
+            yield [(grid_row, None) for _, grid_row in grids_df.iterrows()]
+            return
+        
+        batch_size = max(1, self.config.bulk_query_grids)
+        for city_id, city_grids in grids_df.groupby('city_id', sort=False):
+            for start in range(0, len(city_grids), batch_size):
+                batch = city_grids.iloc[start:start + batch_size]
+                to_query = batch
+                if self.feature_store is not None:
+                    # 特征库已有的grid不需要查询轨迹点
+                    stored = batch['grid_id'].map(lambda grid_id: self.feature_store.has_grid(city_id, grid_id))
+                    to_query = batch[~stored.astype(bool)]
+                
+                points_by_grid = {}
+                if not to_query.empty:
+                    logger.info(f"\n📦 城市 {city_id}: 批量查询第 {start + 1}-{start + len(batch)} 个grid")
+                    points_by_grid = self.query_trajectory_points_bulk(to_query)
+                yield [(grid_row, points_by_grid.get(grid_row['grid_id']))
+                       for _, grid_row in batch.iterrows()]
+    
+    def _process_grids_parallel(self, grid_batches, total: int, num_workers: int) -> List[Dict]:
+        """多进程处理grid，每个worker进程持有独立的数据库引擎和Hive查询器
+        
+        单个grid失败（包括worker进程异常）只记录在该grid的统计中，不影响其他grid。
+        """
+        num_workers = min(num_workers, total)
+        logger.info(f"⚡ 并行处理: {num_workers} 个进程")
+        
+        all_stats = []
+        with ProcessPoolExecutor(
+            max_workers=num_workers,
+            initializer=_init_grid_worker,
+            initargs=(self.config,)
+        ) as executor:
+            for batch in grid_batches:
+                futures = {
+                    executor.submit(_process_grid_worker, grid_row, points_df): grid_row
+                    for grid_row, points_df in batch
+                }
+                
+                for future in as_completed(futures):
+                    grid_row = futures[future]
+                    try:
+                        stats = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ Grid #{grid_row['grid_id']} 处理进程异常: {e}")
+                        stats = {
+                            'grid_id': grid_row['grid_id'],
+                            'city_id': grid_row['city_id'],
+                            'success': False,
+                            'error': str(e)
+                        }
+                    all_stats.append(stats)
+                    
+                    status = '✅' if stats.get('success') else f"❌ {stats.get('error')}"
+                    logger.info(f"[{len(all_stats)}/{total}] Grid #{stats['grid_id']} {status}")
+        
+        return all_stats
+    
     # ==================== 辅助函数 ====================
     
     @staticmethod
@@ -1008,39 +1484,41 @@ class GridTrajectoryClusterer:
         
         return R * c
     
+    def _step_distances(self, points: pd.DataFrame) -> np.ndarray:
+        """计算相邻点间距（米）"""
+        lats = points['lat'].to_numpy(dtype=float)
+        lons = points['lon'].to_numpy(dtype=float)
+        return self._haversine_distance(lats[:-1], lons[:-1], lats[1:], lons[1:])
+    
     def _calculate_total_distance(self, points: pd.DataFrame) -> float:
         """计算轨迹总距离（米）"""
         if len(points) < 2:
             return 0.0
         
-        total_dist = 0.0
-        for i in range(1, len(points)):
-            dist = self._haversine_distance(
-                points.iloc[i-1]['lat'], points.iloc[i-1]['lon'],
-                points.iloc[i]['lat'], points.iloc[i]['lon']
-            )
-            total_dist += dist
-        
-        return total_dist
+        # cumsum按顺序累加，与逐点求和结果一致
+        return float(np.cumsum(self._step_distances(points))[-1])
     
     def _calculate_max_consecutive_distance(self, points: pd.DataFrame) -> float:
         """计算最大连续点间距（米）"""
         if len(points) < 2:
             return 0.0
         
-        max_dist = 0.0
-        for i in range(1, len(points)):
-            dist = self._haversine_distance(
-                points.iloc[i-1]['lat'], points.iloc[i-1]['lon'],
-                points.iloc[i]['lat'], points.iloc[i]['lon']
-            )
-            max_dist = max(max_dist, dist)
-        
-        return max_dist
+        distances = self._step_distances(points)
+        distances = distances[~np.isnan(distances)]
+        return float(max(0.0, distances.max())) if len(distances) else 0.0
 
 
+# ==================== 多进程worker ====================
 
+_worker_clusterer: Optional[GridTrajectoryClusterer] = None
 
 
+def _init_grid_worker(config: ClusterConfig):
+    """worker进程初始化：创建进程独立的聚类器（数据库引擎、Hive查询器）"""
+    global _worker_clusterer
+    _worker_clusterer = GridTrajectoryClusterer(config)
 
 
+def _process_grid_worker(grid_row: pd.Series, points_df: Optional[pd.DataFrame] = None) -> Dict:
+    """在worker进程中处理单个grid"""
+    return _worker_clusterer.process_single_grid(grid_row, points_df)
@@ -20,70 +20,176 @@ import pandas as pd
 from typing import List, Tuple, Optional
 from dataclasses import dataclass
 from shapely.geometry import LineString, Point
-from scipy.spatial.distance import directed_hausdorff, euclidean
+from scipy.spatial import cKDTree
+from scipy.spatial.distance import directed_hausdorff, euclidean, squareform
 from sklearn.cluster import DBSCAN, AgglomerativeClustering
 from sklearn.preprocessing import StandardScaler
 from sklearn.metrics import silhouette_score, davies_bouldin_score
 
+from spdatalab.dataset.dbscan_sweep import dbscan_sweep
+from spdatalab.dataset.trajectory_distance_matrix import (
+    compute_condensed_distances,
+    compute_distance_graph
+)
+from spdatalab.dataset.trajectory_simplification import SimplificationConfig, simplify_coords_batch
+
+# 可选的编译加速
+try:
+    from numba import njit
+    NUMBA_AVAILABLE = True
+except ImportError:
+    NUMBA_AVAILABLE = False
+
 logger = logging.getLogger(__name__)
 
 
 # ==================== 相似度度量函数 ====================
 
-def frechet_distance(traj1: np.ndarray, traj2: np.ndarray) -> float:
+def pairwise_haversine(traj1: np.ndarray, traj2: np.ndarray) -> np.ndarray:
+    """
+    计算两条轨迹所有点对的Haversine距离矩阵（向量化）
+    
+    Args:
+        traj1: 轨迹1的坐标数组 (N, 2) [lon, lat]
+        traj2: 轨迹2的坐标数组 (M, 2) [lon, lat]
+        
+    Returns:
+        距离矩阵 (N, M)（米）
+    """
+    traj1 = np.asarray(traj1, dtype=float)
+    traj2 = np.asarray(traj2, dtype=float)
+    return haversine_distance(
+        traj1[:, 1][:, None], traj1[:, 0][:, None],
+        traj2[:, 1][None, :], traj2[:, 0][None, :]
+    )
+
+
+def _frechet_coupling_rows(dist: np.ndarray, threshold: float) -> float:
+    """
+    逐行填充耦合矩阵（供numba编译）
+    
+    每条耦合路径经过每一行，某一行的最小耦合值超过阈值即可提前放弃。
+    """
+    n, m = dist.shape
+    prev = np.empty(m)
+    cur = np.empty(m)
+    
+    prev[0] = dist[0, 0]
+    row_min = prev[0]
+    for j in range(1, m):
+        prev[j] = max(prev[j - 1], dist[0, j])
+        row_min = min(row_min, prev[j])
+    if row_min > threshold:
+        return np.inf
+    
+    for i in range(1, n):
+        cur[0] = max(prev[0], dist[i, 0])
+        row_min = cur[0]
+        for j in range(1, m):
+            cur[j] = max(min(prev[j], prev[j - 1], cur[j - 1]), dist[i, j])
+            row_min = min(row_min, cur[j])
+        if row_min > threshold:
+            return np.inf
+        prev, cur = cur, prev
+    
+    return prev[m - 1]
+
+
+if NUMBA_AVAILABLE:
+    _frechet_coupling_compiled = njit(cache=True)(_frechet_coupling_rows)
+else:
+    _frechet_coupling_compiled = None
+
+
+def _frechet_coupling_diagonals(dist: np.ndarray, threshold: float) -> float:
+    """
+    按反对角线向量化填充耦合矩阵
+    
+    反对角线k上的单元只依赖k-1和k-2两条反对角线，整条反对角线可一次计算。
+    耦合路径的对角步会跳过一条反对角线，因此相邻两条反对角线的最小值都超过阈值时才提前放弃。
+    """
+    n, m = dist.shape
+    # 左上各补一行/列inf，补位角点为0，使边界单元与内部单元使用同一递推式
+    coupling = np.full((n + 1, m + 1), np.inf)
+    coupling[0, 0] = 0.0
+    
+    prev_min = np.inf
+    for k in range(n + m - 1):
+        i = np.arange(max(0, k - m + 1), min(k, n - 1) + 1)
+        j = k - i
+        reachable = np.minimum(
+            np.minimum(coupling[i, j + 1], coupling[i, j]),
+            coupling[i + 1, j]
+        )
+        values = np.maximum(reachable, dist[i, j])
+        coupling[i + 1, j + 1] = values
+        
+        cur_min = values.min()
+        if cur_min > threshold and prev_min > threshold:
+            return np.inf
+        prev_min = cur_min
+    
+    return coupling[n, m]
+
+
+def frechet_distance(traj1: np.ndarray, traj2: np.ndarray, threshold: Optional[float] = None) -> float:
     """
     计算两条轨迹的Fréchet距离（离散版本）
     
     Fréchet距离考虑了轨迹的顺序和连续性，比Hausdorff更适合轨迹相似度。
-    使用动态规划算法计算。
+    先向量化计算全部点对的Haversine距离，再迭代填充耦合矩阵
+    （安装numba时逐行编译执行，否则按反对角线向量化）。
     
     Args:
         traj1: 轨迹1的坐标数组 (N, 2)
         traj2: 轨迹2的坐标数组 (M, 2)
+        threshold: 提前放弃阈值（米），可确定距离超过阈值时停止计算并返回inf
         
     Returns:
-        Fréchet距离（米）
+        Fréchet距离（米）；超过threshold时返回inf
         
     参考：
         Eiter & Mannila, "Computing discrete Fréchet distance" (1994)
     """
-    n, m = len(traj1), len(traj2)
+    threshold = np.inf if threshold is None else float(threshold)
+    dist = pairwise_haversine(traj1, traj2)
     
-    # 距离矩阵
-    ca = np.full((n, m), -1.0)
+    # 起终点必须耦合，任一超过阈值即可放弃
+    if dist[0, 0] > threshold or dist[-1, -1] > threshold:
+        return np.inf
     
-    def c(i: int, j: int) -> float:
-        """递归计算耦合距离"""
-        if ca[i, j] > -1:
-            return ca[i, j]
-        
-        # 点之间的欧氏距离（米）
-        d = haversine_distance(
-            traj1[i][1], traj1[i][0],
-            traj2[j][1], traj2[j][0]
-        )
-        
-        if i == 0 and j == 0:
-            ca[i, j] = d
-        elif i > 0 and j == 0:
-            ca[i, j] = max(c(i-1, 0), d)
-        elif i == 0 and j > 0:
-            ca[i, j] = max(c(0, j-1), d)
-        else:
-            ca[i, j] = max(
-                min(c(i-1, j), c(i-1, j-1), c(i, j-1)),
-                d
-            )
-        
-        return ca[i, j]
+    if _frechet_coupling_compiled is not None:
+        result = float(_frechet_coupling_compiled(dist, threshold))
+    else:
+        result = float(_frechet_coupling_diagonals(dist, threshold))
+    return np.inf if result > threshold else result
+
+
+def local_projection(*trajectories: np.ndarray) -> List[np.ndarray]:
+    """
+    将轨迹投影到局部平面坐标（米，等距圆柱投影，以所有点的中心为原点）
     
-    return c(n-1, m-1)
+    Args:
+        *trajectories: 坐标数组 (N, 2) [lon, lat]
+        
+    Returns:
+        对应的平面坐标数组列表 (N, 2) [x, y]
+    """
+    arrays = [np.asarray(traj, dtype=float) for traj in trajectories]
+    stacked = np.vstack(arrays)
+    lon0, lat0 = stacked.mean(axis=0)
+    meters_per_degree = 6371000 * np.pi / 180
+    scale = np.array([np.cos(np.radians(lat0)), 1.0]) * meters_per_degree
+    return [(arr - [lon0, lat0]) * scale for arr in arrays]
 
 
 def hausdorff_distance_trajectory(traj1: np.ndarray, traj2: np.ndarray) -> float:
     """
     计算两条轨迹的Hausdorff距离
     
+    在局部投影坐标上用KD树查询每个点的最近点，再以Haversine计算匹配点对的距离，
+    复杂度O((N+M)log(N+M))。
+    
     Args:
         traj1: 轨迹1的坐标数组 (N, 2) [lon, lat]
         traj2: 轨迹2的坐标数组 (M, 2) [lon, lat]
@@ -91,99 +197,94 @@ def hausdorff_distance_trajectory(traj1: np.ndarray, traj2: np.ndarray) -> float
     Returns:
         Hausdorff距离（米）
     """
-    # 使用scipy的directed_hausdorff（返回像素距离）
-    # 这里我们需要转换为实际距离
+    traj1 = np.asarray(traj1, dtype=float)
+    traj2 = np.asarray(traj2, dtype=float)
+    xy1, xy2 = local_projection(traj1, traj2)
     
-    max_dist_12 = 0.0
-    for p1 in traj1:
-        min_dist = min(
-            haversine_distance(p1[1], p1[0], p2[1], p2[0]) 
-            for p2 in traj2
-        )
-        max_dist_12 = max(max_dist_12, min_dist)
+    _, nearest_in_2 = cKDTree(xy2).query(xy1)
+    _, nearest_in_1 = cKDTree(xy1).query(xy2)
     
-    max_dist_21 = 0.0
-    for p2 in traj2:
-        min_dist = min(
-            haversine_distance(p2[1], p2[0], p1[1], p1[0]) 
-            for p1 in traj1
-        )
-        max_dist_21 = max(max_dist_21, min_dist)
+    max_dist_12 = haversine_distance(
+        traj1[:, 1], traj1[:, 0], traj2[nearest_in_2, 1], traj2[nearest_in_2, 0]
+    ).max()
+    max_dist_21 = haversine_distance(
+        traj2[:, 1], traj2[:, 0], traj1[nearest_in_1, 1], traj1[nearest_in_1, 0]
+    ).max()
     
-    return max(max_dist_12, max_dist_21)
+    return float(max(max_dist_12, max_dist_21))
 
 
-def perpendicular_distance(point: np.ndarray, line_start: np.ndarray, line_end: np.ndarray) -> float:
+def _point_line_distances(
+    points: np.ndarray,
+    line_start: np.ndarray,
+    line_end: np.ndarray
+) -> Tuple[np.ndarray, np.ndarray]:
     """
-    计算点到线段的垂直距离（TRACLUS中使用）
+    点到线段的垂直距离和平行距离（广播）
+    
+    投影在经纬度坐标中进行；垂直距离为点到线段最近点的Haversine距离（米），
+    平行距离为投影超出线段两端的长度（经纬度单位）。
     
     Args:
-        point: 点坐标 [lon, lat]
-        line_start: 线段起点 [lon, lat]
-        line_end: 线段终点 [lon, lat]
+        points: 点坐标 (..., 2) [lon, lat]
+        line_start: 线段起点 (..., 2)
+        line_end: 线段终点 (..., 2)
         
     Returns:
-        垂直距离（米）
+        (垂直距离, 平行距离)，形状为三者广播后去掉最后一维
     """
-    # 向量
-    line_vec = line_end - line_start
-    point_vec = point - line_start
+    points = np.asarray(points, dtype=float)
+    line_start = np.asarray(line_start, dtype=float)
+    line_end = np.asarray(line_end, dtype=float)
     
-    # 线段长度
-    line_len = np.linalg.norm(line_vec)
+    line_vec = line_end - line_start
+    line_len = np.linalg.norm(line_vec, axis=-1)
+    degenerate = line_len < 1e-10  # 退化为点
     
-    if line_len < 1e-10:  # 退化为点
-        return haversine_distance(point[1], point[0], line_start[1], line_start[0])
+    with np.errstate(divide='ignore', invalid='ignore'):
+        line_unitvec = line_vec / line_len[..., None]
+    line_unitvec = np.where(degenerate[..., None], 0.0, line_unitvec)
     
-    # 投影长度
-    line_unitvec = line_vec / line_len
-    proj_len = np.dot(point_vec, line_unitvec)
+    # 投影长度，截断到线段上得到最近点
+    proj_len = np.sum((points - line_start) * line_unitvec, axis=-1)
+    clipped = np.clip(proj_len, 0.0, line_len)
+    closest = line_start + clipped[..., None] * line_unitvec
     
-    # 投影点
-    if proj_len < 0:
-        # 投影在起点之前
-        closest = line_start
-    elif proj_len > line_len:
-        # 投影在终点之后
-        closest = line_end
-    else:
-        # 投影在线段上
-        closest = line_start + proj_len * line_unitvec
+    perp = haversine_distance(points[..., 1], points[..., 0], closest[..., 1], closest[..., 0])
+    para = np.where(degenerate, 0.0, np.abs(proj_len - clipped))
+    return perp, para
+
+
+def perpendicular_distance(point: np.ndarray, line_start: np.ndarray, line_end: np.ndarray):
+    """
+    计算点到线段的垂直距离（TRACLUS中使用）
     
-    return haversine_distance(point[1], point[0], closest[1], closest[0])
+    Args:
+        point: 点坐标 [lon, lat]，或多个点 (N, 2)
+        line_start: 线段起点 [lon, lat]
+        line_end: 线段终点 [lon, lat]
+        
+    Returns:
+        垂直距离（米），多个点时为数组 (N,)
+    """
+    perp, _ = _point_line_distances(point, line_start, line_end)
+    return float(perp) if np.ndim(perp) == 0 else perp
 
 
-def parallel_distance(point: np.ndarray, line_start: np.ndarray, line_end: np.ndarray) -> float:
+def parallel_distance(point: np.ndarray, line_start: np.ndarray, line_end: np.ndarray):
     """
     计算点到线段的平行距离（TRACLUS中使用）
     
     Args:
-        point: 点坐标 [lon, lat]
+        point: 点坐标 [lon, lat]，或多个点 (N, 2)
         line_start: 线段起点 [lon, lat]
         line_end: 线段终点 [lon, lat]
         
     Returns:
-        平行距离（米）
+        平行距离，多个点时为数组 (N,)
     """
-    line_vec = line_end - line_start
-    point_vec = point - line_start
-    
-    line_len = np.linalg.norm(line_vec)
-    
-    if line_len < 1e-10:
-        return 0.0
-    
-    # 投影长度
-    line_unitvec = line_vec / line_len
-    proj_len = np.dot(point_vec, line_unitvec)
-    
-    # 平行距离
-    if proj_len < 0:
-        return abs(proj_len)
-    elif proj_len > line_len:
-        return proj_len - line_len
-    else:
-        return 0.0
+    _, para = _point_line_distances(point, line_start, line_end)
+    return float(para) if np.ndim(para) == 0 else para
 
 
 def segment_distance(seg1_coords: np.ndarray, seg2_coords: np.ndarray) -> float:
@@ -205,32 +306,17 @@ def segment_distance(seg1_coords: np.ndarray, seg2_coords: np.ndarray) -> float:
     if len(seg1_coords) < 2 or len(seg2_coords) < 2:
         return float('inf')
     
-    # 计算seg1每个点到seg2的垂直和平行距离
-    perp_dists = []
-    para_dists = []
-    
-    seg2_start = seg2_coords[0]
-    seg2_end = seg2_coords[-1]
-    
-    for point in seg1_coords:
-        perp_dist = perpendicular_distance(point, seg2_start, seg2_end)
-        para_dist = parallel_distance(point, seg2_start, seg2_end)
-        perp_dists.append(perp_dist)
-        para_dists.append(para_dist)
+    seg1_coords = np.asarray(seg1_coords, dtype=float)
+    seg2_coords = np.asarray(seg2_coords, dtype=float)
     
-    # 反向计算seg2每个点到seg1的距离
-    seg1_start = seg1_coords[0]
-    seg1_end = seg1_coords[-1]
-    
-    for point in seg2_coords:
-        perp_dist = perpendicular_distance(point, seg1_start, seg1_end)
-        para_dist = parallel_distance(point, seg1_start, seg1_end)
-        perp_dists.append(perp_dist)
-        para_dists.append(para_dist)
+    # seg1每个点到seg2，以及seg2每个点到seg1的垂直和平行距离
+    perp_12, para_12 = _point_line_distances(seg1_coords, seg2_coords[0], seg2_coords[-1])
+    perp_21, para_21 = _point_line_distances(seg2_coords, seg1_coords[0], seg1_coords[-1])
     
     # 平均距离
-    avg_perp = np.mean(perp_dists)
-    avg_para = np.mean(para_dists)
+    n_points = len(seg1_coords) + len(seg2_coords)
+    avg_perp = (perp_12.sum() + perp_21.sum()) / n_points
+    avg_para = (para_12.sum() + para_21.sum()) / n_points
     
     # 角度距离
     angle_dist = angle_difference(seg1_coords, seg2_coords)
@@ -239,6 +325,75 @@ def segment_distance(seg1_coords: np.ndarray, seg2_coords: np.ndarray) -> float:
     return 0.6 * avg_perp + 0.3 * avg_para + 0.1 * angle_dist
 
 
+def segment_distance_matrix(segments_coords: List[np.ndarray], chunk_points: int = 200000) -> np.ndarray:
+    """
+    计算多个轨迹段两两之间的段距离矩阵（与segment_distance逐对计算一致）
+    
+    所有点对所有段端点连线一次广播计算垂直/平行距离，按段归约求和；
+    按段边界分块，每块最多约chunk_points个点（内存约 chunk_points × 段数 × 8字节 × 若干）。
+    
+    Args:
+        segments_coords: 轨迹段坐标数组列表，每个 (N, 2) [lon, lat]
+        chunk_points: 每块的点数上限
+        
+    Returns:
+        段距离矩阵 (K, K)，对角线为0，点数少于2的段所在行列为inf
+    """
+    k = len(segments_coords)
+    if k == 0:
+        return np.zeros((0, 0))
+    
+    coords_list = [np.asarray(coords, dtype=float).reshape(-1, 2) for coords in segments_coords]
+    lengths = np.array([len(coords) for coords in coords_list])
+    offsets = np.concatenate([[0], np.cumsum(lengths)])
+    points = np.vstack(coords_list)
+    valid = lengths >= 2
+    
+    starts = np.array([coords[0] if len(coords) else [np.nan, np.nan] for coords in coords_list])
+    ends = np.array([coords[-1] if len(coords) else [np.nan, np.nan] for coords in coords_list])
+    
+    # perp_sum[a, b]: 段a所有点到段b端点连线的垂直距离之和
+    perp_sum = np.zeros((k, k))
+    para_sum = np.zeros((k, k))
+    
+    first = 0
+    while first < k:
+        last = first + 1
+        while last < k and offsets[last + 1] - offsets[first] <= chunk_points:
+            last += 1
+        chunk = points[offsets[first]:offsets[last]]
+        if len(chunk):
+            perp, para = _point_line_distances(chunk[:, None, :], starts[None, :, :], ends[None, :, :])
+            # 按段归约（跳过空段）
+            local = offsets[first:last] - offsets[first]
+            nonempty = lengths[first:last] > 0
+            rows = np.arange(first, last)[nonempty]
+            perp_sum[rows] = np.add.reduceat(perp, local[nonempty], axis=0)
+            para_sum[rows] = np.add.reduceat(para, local[nonempty], axis=0)
+        first = last
+    
+    n_points = lengths[:, None] + lengths[None, :]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        avg_perp = (perp_sum + perp_sum.T) / n_points
+        avg_para = (para_sum + para_sum.T) / n_points
+    
+    # 角度距离（与angle_difference一致）
+    vec = ends - starts
+    norms = np.linalg.norm(vec, axis=1)
+    usable = valid & (norms >= 1e-10)
+    unit = np.zeros_like(vec)
+    unit[usable] = vec[usable] / norms[usable, None]
+    cos_sim = np.clip(unit @ unit.T, -1.0, 1.0)
+    angle_dist = np.arccos(cos_sim) * (norms[:, None] + norms[None, :]) / 2 * 10
+    angle_dist[~(usable[:, None] & usable[None, :])] = 0.0
+    
+    matrix = 0.6 * avg_perp + 0.3 * avg_para + 0.1 * angle_dist
+    matrix[~valid, :] = np.inf
+    matrix[:, ~valid] = np.inf
+    np.fill_diagonal(matrix, 0.0)
+    return matrix
+
+
 def angle_difference(seg1_coords: np.ndarray, seg2_coords: np.ndarray) -> float:
     """
     计算两个轨迹段的角度差异
@@ -699,7 +854,8 @@ class ImprovedTrajectoryClusterer:
         distance_metric: str = 'frechet',  # 'frechet', 'hausdorff', 'segment'
         clustering_method: str = 'dbscan',  # 'dbscan', 'hierarchical'
         use_enhanced_features: bool = True,
-        use_adaptive_segmentation: bool = False
+        use_adaptive_segmentation: bool = False,
+        simplification: Optional[SimplificationConfig] = None
     ):
         """
         初始化改进聚类器
@@ -709,11 +865,13 @@ class ImprovedTrajectoryClusterer:
             clustering_method: 聚类算法
             use_enhanced_features: 是否使用增强特征
             use_adaptive_segmentation: 是否使用自适应分段
+            simplification: 计算轨迹距离前的简化/重采样配置（可选，限制每段点数）
         """
         self.distance_metric = distance_metric
         self.clustering_method = clustering_method
         self.use_enhanced_features = use_enhanced_features
         self.use_adaptive_segmentation = use_adaptive_segmentation
+        self.simplification = simplification
         self.scaler = StandardScaler()
         
         logger.info(f"🚀 改进聚类器初始化:")
@@ -721,42 +879,112 @@ class ImprovedTrajectoryClusterer:
         logger.info(f"   聚类方法: {clustering_method}")
         logger.info(f"   增强特征: {use_enhanced_features}")
         logger.info(f"   自适应分段: {use_adaptive_segmentation}")
+        if simplification is not None:
+            logger.info(f"   轨迹简化: {simplification.strategy}")
     
-    def compute_distance_matrix(self, segments: List[dict]) -> np.ndarray:
+    def _distance_coords(self, segments: List[dict]) -> List[np.ndarray]:
+        """计算轨迹距离使用的坐标（配置了简化时整批简化）"""
+        coords = [seg['coords'] for seg in segments]
+        if self.simplification is None:
+            return coords
+        return simplify_coords_batch(coords, self.simplification)
+    
+    def compute_distance_matrix(
+        self,
+        segments: List[dict],
+        output: str = 'dense',
+        radius: Optional[float] = None,
+        n_jobs: int = 1,
+        memmap_path: Optional[str] = None
+    ):
         """
         计算轨迹段之间的距离矩阵
         
+        轨迹距离（frechet/hausdorff/segment）由trajectory_distance_matrix引擎计算：
+        给定radius时用外包框/端点下界跳过远距离点对，行块分发到n_jobs个进程。
+        配置了simplification时先对轨迹段坐标做简化/重采样。
+        
         Args:
             segments: 轨迹段列表，每个包含coords和attrs
+            output: 'dense' 稠密方阵 / 'sparse' 半径内稀疏图 / 'condensed' float32压缩数组
+            radius: 距离半径（米），output='sparse'时必需
+            n_jobs: 进程数
+            memmap_path: output='condensed'时的memmap文件路径（可选）
             
         Returns:
-            距离矩阵 (N, N)
+            dense: 距离矩阵 (N, N)；sparse: CSR稀疏矩阵；condensed: 长度N*(N-1)/2的数组
         """
-        n = len(segments)
-        dist_matrix = np.zeros((n, n))
-        
-        for i in range(n):
-            for j in range(i+1, n):
-                coords_i = segments[i]['coords']
-                coords_j = segments[j]['coords']
-                
-                if self.distance_metric == 'frechet':
-                    dist = frechet_distance(coords_i, coords_j)
-                elif self.distance_metric == 'hausdorff':
-                    dist = hausdorff_distance_trajectory(coords_i, coords_j)
-                elif self.distance_metric == 'segment':
-                    dist = segment_distance(coords_i, coords_j)
-                else:
-                    # 默认使用欧氏距离（在特征空间）
-                    dist = euclidean(
-                        segments[i]['features'],
-                        segments[j]['features']
-                    )
-                
-                dist_matrix[i, j] = dist
-                dist_matrix[j, i] = dist
-        
-        return dist_matrix
+        if self.distance_metric not in ('frechet', 'hausdorff', 'segment'):
+            # 默认使用欧氏距离（在特征空间）
+            features = [seg['features'] for seg in segments]
+            n = len(features)
+            dist_matrix = np.zeros((n, n))
+            for i in range(n):
+                for j in range(i+1, n):
+                    dist = euclidean(features[i], features[j])
+                    dist_matrix[i, j] = dist
+                    dist_matrix[j, i] = dist
+            return dist_matrix
+        
+        coords = self._distance_coords(segments)
+        
+        if output == 'sparse':
+            if radius is None:
+                raise ValueError("output='sparse'需要指定radius")
+            return compute_distance_graph(coords, self.distance_metric, radius=radius, n_jobs=n_jobs)
+        
+        if output == 'condensed':
+            return compute_condensed_distances(
+                coords, self.distance_metric, output_path=memmap_path, radius=radius, n_jobs=n_jobs
+            )
+        
+        if output != 'dense':
+            raise ValueError(f"未知输出格式: {output}")
+        
+        if self.distance_metric == 'segment':
+            # 段距离整体广播计算
+            return segment_distance_matrix(coords)
+        
+        condensed = compute_condensed_distances(
+            coords, self.distance_metric, radius=radius, n_jobs=n_jobs, dtype=np.float64
+        )
+        if len(coords) < 2:
+            return np.zeros((len(coords), len(coords)))
+        return squareform(condensed, checks=False)
+    
+    def cluster_by_distance(
+        self,
+        segments: List[dict],
+        eps: float,
+        min_samples: int = 5,
+        n_jobs: int = 1
+    ) -> np.ndarray:
+        """
+        基于轨迹距离的DBSCAN聚类
+        
+        以eps（米）为半径构建稀疏距离图，作为precomputed稀疏距离交给DBSCAN，
+        不需要稠密距离矩阵。
+        
+        Args:
+            segments: 轨迹段列表，每个包含coords
+            eps: 邻域半径（米）
+            min_samples: 最小样本数
+            n_jobs: 计算距离的进程数
+            
+        Returns:
+            聚类标签数组
+        """
+        if not segments:
+            return np.array([])
+        
+        graph = self.compute_distance_matrix(segments, output='sparse', radius=eps, n_jobs=n_jobs)
+        labels = DBSCAN(eps=eps, min_samples=min_samples, metric='precomputed').fit_predict(graph)
+        
+        n_clusters_found = len(set(labels)) - (1 if -1 in labels else 0)
+        n_noise = int(np.sum(labels == -1))
+        logger.info(f"✅ 轨迹距离聚类完成（{self.distance_metric}, eps={eps}m）: "
+                   f"{n_clusters_found} 个聚类, 噪声 {n_noise} ({n_noise/len(labels)*100:.1f}%)")
+        return labels
     
     def cluster(
         self,
@@ -832,6 +1060,31 @@ class ImprovedTrajectoryClusterer:
         
         return labels
 
+    
+    def sweep(
+        self,
+        segments: List[dict],
+        eps_values: List[float],
+        min_samples_values: List[int] = (5,)
+    ) -> pd.DataFrame:
+        """
+        DBSCAN参数扫描（特征空间）
+        
+        在最大eps处构建一次半径邻居图，各参数组合只做边过滤和连通分量，
+        标签与逐个参数调用cluster(clustering_method='dbscan')一致。
+        
+        Args:
+            segments: 轨迹段列表
+            eps_values: eps候选值
+            min_samples_values: min_samples候选值
+            
+        Returns:
+            每组参数一行：eps, min_samples, n_clusters, n_noise, noise_ratio, labels
+        """
+        features_matrix = np.vstack([seg['features'] for seg in segments])
+        features_scaled = self.scaler.fit_transform(features_matrix)
+        return dbscan_sweep(features_scaled, eps_values, min_samples_values)
+
 
 # ==================== 使用示例 ====================
 
@@ -0,0 +1,132 @@
+"""OBS目录列表缓存
+
+缓存相机数据目录的文件列表，避免每次加载场景都调用 mox.file.list_directory：
+- 缓存键：规范化的目录路径（以/结尾）
+- 存储：缓存目录下一个JSON文件，跨运行复用
+- 过期：超过TTL的条目在读取或保存时丢弃
+- 并发：进程内线程安全；保存时与磁盘上的条目合并（较新的列表优先），再原子替换
+
+空列表不缓存（数据可能尚未上传）。
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_LISTING_CACHE_DIR = "~/.cache/spdatalab/obs_listing"
+DEFAULT_LISTING_TTL_SECONDS = 24 * 3600
+LISTING_CACHE_FILE = "listings.json"
+
+
+def normalize_obs_dir(obs_dir: str) -> str:
+    """目录路径规范化为以/结尾"""
+    return obs_dir if obs_dir.endswith('/') else obs_dir + '/'
+
+
+class ObsListingCache:
+    """基于JSON文件的OBS目录列表缓存"""
+
+    def __init__(self, cache_dir: Optional[str] = DEFAULT_LISTING_CACHE_DIR,
+                 ttl_seconds: float = DEFAULT_LISTING_TTL_SECONDS):
+        """
+        Args:
+            cache_dir: 缓存目录，None表示只在内存中缓存（不持久化）
+            ttl_seconds: 条目有效期（秒），<=0表示永不过期
+        """
+        self.cache_path = Path(cache_dir).expanduser() / LISTING_CACHE_FILE if cache_dir else None
+        self.ttl_seconds = ttl_seconds
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0}
+        self._lock = threading.Lock()
+        self._dirty = False
+        self._entries: Dict[str, Dict] = self._read_file()
+
+    def _is_expired(self, entry: Dict, now: Optional[float] = None) -> bool:
+        if self.ttl_seconds is None or self.ttl_seconds <= 0:
+            return False
+        now = now or time.time()
+        return now - entry['listed_at'] > self.ttl_seconds
+
+    def _read_file(self) -> Dict[str, Dict]:
+        """读取磁盘上未过期的条目"""
+        if self.cache_path is None or not self.cache_path.exists():
+            return {}
+        try:
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                entries = json.load(f)
+            now = time.time()
+            return {key: entry for key, entry in entries.items() if not self._is_expired(entry, now)}
+        except Exception as e:
+            logger.warning(f"读取OBS目录列表缓存失败 {self.cache_path}: {e}")
+            return {}
+
+    def get(self, obs_dir: str) -> Optional[List[str]]:
+        """读取目录的文件列表，未命中或已过期返回None"""
+        key = normalize_obs_dir(obs_dir)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or self._is_expired(entry):
+                self._entries.pop(key, None)
+                self.stats['misses'] += 1
+                return None
+            self.stats['hits'] += 1
+            return list(entry['files'])
+
+    def put(self, obs_dir: str, files: List[str], persist: bool = True) -> None:
+        """写入目录的文件列表
+
+        Args:
+            obs_dir: 目录路径
+            files: 目录下的文件名列表
+            persist: 是否立即保存到磁盘（批量写入时可在最后统一调用save）
+        """
+        if not files:
+            return
+        with self._lock:
+            self._entries[normalize_obs_dir(obs_dir)] = {'files': list(files), 'listed_at': time.time()}
+            self._dirty = True
+            self.stats['writes'] += 1
+        if persist:
+            self.save()
+
+    def save(self) -> bool:
+        """与磁盘上的条目合并后原子写入，返回是否写入"""
+        if self.cache_path is None:
+            return False
+        with self._lock:
+            if not self._dirty:
+                return False
+            merged = self._read_file()
+            for key, entry in self._entries.items():
+                if key not in merged or merged[key]['listed_at'] < entry['listed_at']:
+                    merged[key] = entry
+            self._entries = merged
+
+            tmp_path = self.cache_path.with_name(f".{LISTING_CACHE_FILE}.{uuid.uuid4().hex}.tmp")
+            try:
+                self.cache_path.parent.mkdir(parents=True, exist_ok=True)
+                with open(tmp_path, 'w', encoding='utf-8') as f:
+                    json.dump(merged, f, ensure_ascii=False)
+                os.replace(tmp_path, self.cache_path)
+                self._dirty = False
+                return True
+            except Exception as e:
+                logger.warning(f"写入OBS目录列表缓存失败 {self.cache_path}: {e}")
+                tmp_path.unlink(missing_ok=True)
+                return False
+
+    def clear(self) -> int:
+        """清空缓存（内存和磁盘），返回删除的条目数"""
+        with self._lock:
+            removed = len(self._entries)
+            self._entries = {}
+            self._dirty = False
+            if self.cache_path is not None:
+                self.cache_path.unlink(missing_ok=True)
+        return removed
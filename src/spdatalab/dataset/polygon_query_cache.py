@@ -0,0 +1,155 @@
+"""Polygon轨迹点查询结果缓存
+
+按polygon缓存相交轨迹点查询结果，避免对同一GeoJSON反复执行Hive空间扫描：
+- 缓存键：规范化polygon的WKB哈希 + 查询参数（点数上限、时间窗口、字段投影等）
+- 存储：每个polygon一个Parquet文件
+- 过期：超过TTL的条目在读取或清理时删除
+- 容量：总大小超过上限时按最近访问时间淘汰
+
+逐polygon判断命中，polygon集合部分变化时只需查询新增或变化的polygon。
+"""
+
+import hashlib
+import json
+import logging
+import os
+import time
+import uuid
+from pathlib import Path
+from typing import Dict, Optional
+
+import pandas as pd
+import shapely
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "~/.cache/spdatalab/polygon_query"
+
+
+def polygon_cache_key(geometry, params: Dict) -> str:
+    """计算polygon查询结果的缓存键
+
+    几何先做规范化（环方向、起点、部件顺序），保证等价polygon得到相同的键。
+
+    Args:
+        geometry: polygon几何
+        params: 影响查询结果的参数（需可JSON序列化）
+
+    Returns:
+        十六进制SHA256字符串
+    """
+    wkb = shapely.to_wkb(shapely.normalize(geometry), output_dimension=2)
+    digest = hashlib.sha256(wkb)
+    digest.update(json.dumps(params, sort_keys=True, default=str).encode('utf-8'))
+    return digest.hexdigest()
+
+
+class PolygonQueryCache:
+    """基于Parquet文件的polygon查询结果缓存"""
+
+    def __init__(self, cache_dir: str = DEFAULT_CACHE_DIR,
+                 ttl_seconds: float = 7 * 24 * 3600,
+                 max_size_bytes: int = 2 * 1024 ** 3):
+        self.cache_dir = Path(cache_dir).expanduser()
+        self.cache_dir.mkdir(parents=True, exist_ok=True)
+        self.ttl_seconds = ttl_seconds
+        self.max_size_bytes = max_size_bytes
+        self.stats = {'hits': 0, 'misses': 0, 'writes': 0, 'evictions': 0}
+
+    def _path(self, key: str) -> Path:
+        return self.cache_dir / f"{key}.parquet"
+
+    def _is_expired(self, path: Path, now: Optional[float] = None) -> bool:
+        if self.ttl_seconds is None or self.ttl_seconds <= 0:
+            return False
+        now = now or time.time()
+        # mtime即写入时间
+        return now - path.stat().st_mtime > self.ttl_seconds
+
+    def get(self, key: str) -> Optional[pd.DataFrame]:
+        """读取缓存条目，未命中或已过期返回None"""
+        path = self._path(key)
+        try:
+            if not path.exists():
+                self.stats['misses'] += 1
+                return None
+            if self._is_expired(path):
+                path.unlink(missing_ok=True)
+                self.stats['misses'] += 1
+                return None
+
+            df = pd.read_parquet(path)
+            # atime记录最近访问时间，用于容量淘汰；mtime保持写入时间，用于TTL
+            os.utime(path, (time.time(), path.stat().st_mtime))
+            self.stats['hits'] += 1
+            return df
+        except Exception as e:
+            logger.warning(f"读取查询缓存失败 {path.name}: {e}")
+            self.stats['misses'] += 1
+            return None
+
+    def put(self, key: str, df: pd.DataFrame, evict: bool = True) -> bool:
+        """写入缓存条目（原子替换）
+
+        Args:
+            key: 缓存键
+            df: 查询结果
+            evict: 写入后是否立即按容量上限淘汰（批量写入时可在最后统一调用evict）
+        """
+        path = self._path(key)
+        tmp_path = self.cache_dir / f".{key}.{uuid.uuid4().hex}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+            self.stats['writes'] += 1
+        except Exception as e:
+            logger.warning(f"写入查询缓存失败 {path.name}: {e}")
+            tmp_path.unlink(missing_ok=True)
+            return False
+
+        if evict:
+            self.evict()
+        return True
+
+    def evict(self) -> int:
+        """删除过期条目，并按最近访问时间淘汰到容量上限以内
+
+        Returns:
+            删除的条目数
+        """
+        now = time.time()
+        entries = []
+        removed = 0
+
+        for path in self.cache_dir.glob("*.parquet"):
+            try:
+                stat = path.stat()
+            except FileNotFoundError:
+                continue
+            if self._is_expired(path, now):
+                path.unlink(missing_ok=True)
+                removed += 1
+                continue
+            entries.append((max(stat.st_atime, stat.st_mtime), stat.st_size, path))
+
+        total_size = sum(size for _, size, _ in entries)
+        if self.max_size_bytes and total_size > self.max_size_bytes:
+            for _, size, path in sorted(entries, key=lambda entry: entry[0]):
+                if total_size <= self.max_size_bytes:
+                    break
+                path.unlink(missing_ok=True)
+                total_size -= size
+                removed += 1
+
+        if removed:
+            self.stats['evictions'] += removed
+            logger.debug(f"查询缓存淘汰 {removed} 个条目")
+        return removed
+
+    def clear(self) -> int:
+        """清空缓存目录，返回删除的条目数"""
+        removed = 0
+        for path in self.cache_dir.glob("*.parquet"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -2,7 +2,8 @@
 
 基于spatial_join_production.py的优化策略：
 - 小规模（≤50个polygon）：批量查询（UNION ALL）- 最快
-- 大规模（>50个polygon）：分块批量查询 - 最稳定
+- 大规模（>50个polygon）：分块批量查询，分块并发执行 - 最稳定
+- 复杂polygon（顶点多/含内环）：服务端外包框过滤 + 客户端向量化精确过滤
 - 高效数据库写入和轨迹构建
 
 功能：
@@ -13,21 +14,43 @@
 """
 
 import argparse
+import concurrent.futures
+import itertools
 import json
 import logging
 import sys
+import threading
 import time
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Optional, Set, Tuple, Union
 from dataclasses import dataclass
 import warnings
 
 import geopandas as gpd
+import numpy as np
 import pandas as pd
-from shapely.geometry import shape, LineString, Point
+import shapely
+from shapely.geometry import shape, box, LineString, Point
 from sqlalchemy import text, create_engine
+from spdatalab.common.geo_writer import (
+    GeoParquetWriter,
+    StreamingGeoJSONWriter,
+    is_geoparquet_path,
+    properties_schema
+)
 from spdatalab.common.io_hive import hive_cursor
+from spdatalab.dataset.polygon_query_cache import (
+    DEFAULT_CACHE_DIR,
+    PolygonQueryCache,
+    polygon_cache_key
+)
+from spdatalab.dataset.trajectory_simplification import (
+    SimplificationConfig,
+    add_simplification_arguments,
+    simplification_from_args,
+    simplify_mask
+)
 
 # 抑制警告
 warnings.filterwarnings('ignore', category=UserWarning)
@@ -39,6 +62,70 @@ POINT_TABLE = "public.ddi_data_points"
 # 日志配置
 logger = logging.getLogger(__name__)
 
+# 轨迹点查询可选字段：字段名 -> SQL表达式（{p}为表别名前缀）
+POINT_FIELD_EXPRESSIONS = {
+    'dataset_name': '{p}dataset_name',
+    'timestamp': '{p}timestamp',
+    'point_lla': '{p}point_lla',
+    'twist_linear': '{p}twist_linear',
+    'yaw': '{p}yaw',
+    'pitch': '{p}pitch',
+    'roll': '{p}roll',
+    'avp_flag': '{p}avp_flag',
+    'workstage': '{p}workstage',
+    'longitude': 'ST_X({p}point_lla)',
+    'latitude': 'ST_Y({p}point_lla)',
+}
+
+# 轨迹构建必需的字段，投影时总是保留
+REQUIRED_POINT_FIELDS = ['dataset_name', 'timestamp', 'longitude', 'latitude']
+
+# 默认查询字段（原始几何point_lla仅用于提取经纬度，默认不回传）
+DEFAULT_POINT_FIELDS = [
+    'dataset_name', 'timestamp', 'twist_linear', 'yaw', 'pitch', 'roll',
+    'avp_flag', 'workstage', 'longitude', 'latitude'
+]
+
+def resolve_point_fields(fields: Optional[List[str]] = None,
+                         required: Optional[List[str]] = None) -> List[str]:
+    """解析轨迹点查询字段投影
+    
+    Args:
+        fields: 需要的字段列表，None表示默认字段
+        required: 必须保留的字段，None表示REQUIRED_POINT_FIELDS
+        
+    Returns:
+        去重后的字段列表（必需字段在前）
+        
+    Raises:
+        ValueError: 包含不支持的字段
+    """
+    requested = list(DEFAULT_POINT_FIELDS if fields is None else fields)
+    unknown = [f for f in requested if f not in POINT_FIELD_EXPRESSIONS]
+    if unknown:
+        raise ValueError(f"不支持的轨迹点字段: {unknown}，可选: {list(POINT_FIELD_EXPRESSIONS)}")
+    
+    required = REQUIRED_POINT_FIELDS if required is None else required
+    return list(dict.fromkeys(list(required) + requested))
+
+def build_point_select_clause(fields: List[str], table_alias: str = '') -> str:
+    """构建轨迹点查询的SELECT字段列表"""
+    prefix = f"{table_alias}." if table_alias else ''
+    return ",\n                    ".join(
+        f"{POINT_FIELD_EXPRESSIONS[field].format(p=prefix)} as {field}" for field in fields
+    )
+
+def build_time_window_filter(start_ts: Optional[int] = None, end_ts: Optional[int] = None,
+                             table_alias: str = '') -> str:
+    """构建时间窗口过滤条件（闭区间），便于按timestamp的分区/索引裁剪"""
+    prefix = f"{table_alias}." if table_alias else ''
+    conditions = []
+    if start_ts is not None:
+        conditions.append(f"AND {prefix}timestamp >= {int(start_ts)}")
+    if end_ts is not None:
+        conditions.append(f"AND {prefix}timestamp <= {int(end_ts)}")
+    return "\n                ".join(conditions)
+
 @dataclass
 class PolygonTrajectoryConfig:
     """Polygon轨迹查询配置"""
@@ -48,9 +135,23 @@ class PolygonTrajectoryConfig:
     # 批量查询优化配置
     batch_threshold: int = 50          # 批量查询vs分块查询的阈值
     chunk_size: int = 20               # 分块大小
+    max_concurrent_chunks: int = 4     # 分块并发查询数（即同时占用的Hive连接数上限）
+    chunk_max_retries: int = 2         # 分块失败后拆分重试的最大轮数
     limit_per_polygon: int = 10000     # 每个polygon的轨迹点限制
     batch_insert_size: int = 1000      # 批量插入大小
     
+    # 自适应切片配置（避免limit_per_polygon截断）
+    enable_adaptive_tiling: bool = False  # 启用自适应切片查询
+    tile_size_m: float = 2000.0        # 初始网格切片边长（米），小于该尺寸的polygon不切分
+    max_tile_depth: int = 4            # 命中点数上限的切片最多继续四分的层数
+    
+    # 客户端精确过滤配置（复杂polygon服务端只做外包框过滤）
+    client_refine_mode: str = 'auto'   # auto: 按复杂度选择; always: 全部; never: 全部服务端ST_Intersects
+    refine_vertex_threshold: int = 500 # auto模式下顶点数超过该值（或含内环）的polygon走客户端过滤
+    refine_max_limit_factor: float = 10.0  # 外包框查询点数上限相对limit_per_polygon的最大放大倍数
+    refine_chunk_rows: int = 200000    # 客户端过滤的并行分片行数
+    refine_workers: int = 4            # 客户端过滤并行线程数
+    
     # 查询优化配置
     enable_spatial_index: bool = True  # 启用空间索引优化
     query_timeout: int = 300           # 查询超时时间（秒）
@@ -62,6 +163,45 @@ class PolygonTrajectoryConfig:
     
     # 完整轨迹获取配置
     fetch_complete_trajectories: bool = True  # 是否获取完整轨迹（而非仅多边形内的片段）
+    
+    # 轨迹几何简化配置（只影响构建/保存的几何，统计基于全部点）
+    simplification: Optional[SimplificationConfig] = None
+    
+    # 查询下推配置
+    fields: Optional[List[str]] = None  # 查询字段投影，None为DEFAULT_POINT_FIELDS
+    start_ts: Optional[int] = None      # 时间窗口起点（含），与timestamp同单位
+    end_ts: Optional[int] = None        # 时间窗口终点（含）
+    
+    # 结果缓存配置（按polygon缓存相交查询结果）
+    enable_result_cache: bool = False
+    cache_dir: str = DEFAULT_CACHE_DIR
+    cache_ttl_hours: float = 168.0      # 缓存有效期（小时）
+    cache_max_size_mb: int = 2048       # 缓存目录容量上限（MB），超出按最近访问淘汰
+
+@dataclass
+class PointQueryOptions:
+    """单次轨迹点查询的字段投影和时间窗口"""
+    fields: List[str]
+    start_ts: Optional[int] = None
+    end_ts: Optional[int] = None
+    
+    @classmethod
+    def from_config(cls, config: 'PolygonTrajectoryConfig',
+                    fields: Optional[List[str]] = None,
+                    start_ts: Optional[int] = None,
+                    end_ts: Optional[int] = None) -> 'PointQueryOptions':
+        """以配置为默认值，调用参数优先"""
+        return cls(
+            fields=resolve_point_fields(fields if fields is not None else config.fields),
+            start_ts=start_ts if start_ts is not None else config.start_ts,
+            end_ts=end_ts if end_ts is not None else config.end_ts
+        )
+    
+    def select_clause(self, table_alias: str = '') -> str:
+        return build_point_select_clause(self.fields, table_alias)
+    
+    def time_filter(self, table_alias: str = '') -> str:
+        return build_time_window_filter(self.start_ts, self.end_ts, table_alias)
 
 def load_polygons_from_geojson(file_path: str) -> List[Dict]:
     """从GeoJSON文件加载polygon
@@ -110,6 +250,66 @@ def load_polygons_from_geojson(file_path: str) -> List[Dict]:
         logger.error(f"加载GeoJSON文件失败: {file_path}, 错误: {str(e)}")
         raise
 
+def _polygonal_part(geometry):
+    """提取几何中的面状部分，丢弃裁剪产生的线和点"""
+    if geometry.is_empty:
+        return None
+    if geometry.geom_type in ('Polygon', 'MultiPolygon'):
+        return geometry
+    parts = [part for part in shapely.get_parts(geometry) if part.geom_type == 'Polygon']
+    if not parts:
+        return None
+    return parts[0] if len(parts) == 1 else shapely.multipolygons(parts)
+
+def _clip_boxes_to_polygon(boxes: np.ndarray, geometry) -> List:
+    """将一组矩形裁剪到polygon内，返回非空的面状切片"""
+    candidates = boxes[shapely.intersects(boxes, geometry)]
+    tiles = []
+    for clipped in shapely.intersection(candidates, geometry):
+        tile = _polygonal_part(clipped)
+        if tile is not None and tile.area > 0:
+            tiles.append(tile)
+    return tiles
+
+def split_polygon_into_tiles(geometry, tile_size_m: float) -> List:
+    """按米制边长将polygon切分为裁剪到polygon内的网格切片
+    
+    Args:
+        geometry: polygon几何（WGS84）
+        tile_size_m: 切片边长（米）
+        
+    Returns:
+        切片几何列表；polygon本身不超过一个切片大小时返回[geometry]
+    """
+    minx, miny, maxx, maxy = geometry.bounds
+    center_lat = (miny + maxy) / 2
+    tile_lat = tile_size_m / 111320.0
+    tile_lon = tile_size_m / (111320.0 * max(np.cos(np.radians(center_lat)), 1e-6))
+    
+    nx = int(np.ceil((maxx - minx) / tile_lon))
+    ny = int(np.ceil((maxy - miny) / tile_lat))
+    if nx <= 1 and ny <= 1:
+        return [geometry]
+    
+    xs = minx + np.arange(nx) * tile_lon
+    ys = miny + np.arange(ny) * tile_lat
+    grid_x, grid_y = np.meshgrid(xs, ys)
+    boxes = shapely.box(grid_x.ravel(), grid_y.ravel(),
+                        grid_x.ravel() + tile_lon, grid_y.ravel() + tile_lat)
+    return _clip_boxes_to_polygon(boxes, geometry)
+
+def split_tile_into_quadrants(geometry) -> List:
+    """将切片按外包框中点四分，返回裁剪后的子切片"""
+    minx, miny, maxx, maxy = geometry.bounds
+    midx, midy = (minx + maxx) / 2, (miny + maxy) / 2
+    boxes = np.array([
+        box(minx, miny, midx, midy),
+        box(midx, miny, maxx, midy),
+        box(minx, midy, midx, maxy),
+        box(midx, midy, maxx, maxy),
+    ])
+    return _clip_boxes_to_polygon(boxes, geometry)
+
 class HighPerformancePolygonTrajectoryQuery:
     """高性能Polygon轨迹查询器"""
     
@@ -121,21 +321,40 @@ class HighPerformancePolygonTrajectoryQuery:
             connect_args={"client_encoding": "utf8"}
         )
         
+        self.result_cache = None
+        if self.config.enable_result_cache:
+            self.result_cache = PolygonQueryCache(
+                cache_dir=self.config.cache_dir,
+                ttl_seconds=self.config.cache_ttl_hours * 3600,
+                max_size_bytes=self.config.cache_max_size_mb * 1024 * 1024
+            )
+        
+        # 超时后仍在后台运行的分块查询（各占一个Hive连接），跨调用计入并发上限
+        self._abandoned_chunk_futures: Set[concurrent.futures.Future] = set()
+        self._abandoned_chunk_lock = threading.Lock()
+        
         # 调试信息：显示类的可用方法
         logger.debug(f"🔧 HighPerformancePolygonTrajectoryQuery 初始化完成")
         logger.debug(f"🔧 可用方法: {[method for method in dir(self) if not method.startswith('_')]}")
         logger.debug(f"🔧 process_complete_workflow 方法存在: {hasattr(self, 'process_complete_workflow')}")
     
-    def query_intersecting_trajectory_points(self, polygons: List[Dict]) -> Tuple[pd.DataFrame, Dict]:
+    def query_intersecting_trajectory_points(self, polygons: List[Dict],
+                                             fields: Optional[List[str]] = None,
+                                             start_ts: Optional[int] = None,
+                                             end_ts: Optional[int] = None) -> Tuple[pd.DataFrame, Dict]:
         """高效批量查询与polygon相交的轨迹点
         
         Args:
             polygons: polygon列表
+            fields: 查询字段投影（可选，默认使用配置；必需字段总是保留）
+            start_ts: 时间窗口起点（可选，含）
+            end_ts: 时间窗口终点（可选，含）
             
         Returns:
             (轨迹点DataFrame, 性能统计)
         """
         start_time = time.time()
+        options = PointQueryOptions.from_config(self.config, fields, start_ts, end_ts)
         
         # 性能统计
         stats = {
@@ -145,7 +364,10 @@ class HighPerformancePolygonTrajectoryQuery:
             'query_time': 0,
             'total_points': 0,
             'unique_datasets': 0,
-            'points_per_polygon': 0
+            'points_per_polygon': 0,
+            'fields': options.fields,
+            'start_ts': options.start_ts,
+            'end_ts': options.end_ts
         }
         
         if not polygons:
@@ -154,18 +376,62 @@ class HighPerformancePolygonTrajectoryQuery:
         
         logger.info(f"开始批量查询 {len(polygons)} 个polygon的轨迹点")
         
+        # 按polygon检查结果缓存，只查询未命中的polygon
+        cached_frames = []
+        cache_keys = {}
+        polygons_to_query = polygons
+        if self.result_cache is not None:
+            polygons_to_query = []
+            for polygon in polygons:
+                cache_key = self._result_cache_key(polygon['geometry'], options)
+                cached_df = self.result_cache.get(cache_key)
+                if cached_df is None:
+                    cache_keys[polygon['id']] = cache_key
+                    polygons_to_query.append(polygon)
+                elif not cached_df.empty:
+                    cached_df['polygon_id'] = polygon['id']
+                    cached_frames.append(cached_df)
+            
+            stats['cache_hits'] = len(polygons) - len(polygons_to_query)
+            stats['cache_misses'] = len(polygons_to_query)
+            logger.info(f"💾 结果缓存: 命中 {stats['cache_hits']} 个polygon, 需查询 {stats['cache_misses']} 个")
+        
         # 选择最优查询策略
-        if len(polygons) <= self.config.batch_threshold:
+        failed_polygon_ids = []
+        if not polygons_to_query:
+            stats['strategy'] = 'result_cache'
+            result_df = pd.DataFrame()
+        elif self.config.enable_adaptive_tiling:
+            stats['strategy'] = 'adaptive_tiling'
+            result_df, tiling_stats = self._adaptive_tiling_query_strategy(
+                polygons_to_query, options=options, failed_polygon_ids=failed_polygon_ids
+            )
+            stats.update(tiling_stats)
+        elif len(polygons_to_query) <= self.config.batch_threshold:
             stats['strategy'] = 'batch_query'
-            result_df = self._batch_query_strategy(polygons)
+            result_df = self._batch_query_strategy(
+                polygons_to_query, options=options, failed_polygon_ids=failed_polygon_ids
+            )
         else:
             stats['strategy'] = 'chunked_query'
             stats['chunk_size'] = self.config.chunk_size
-            result_df = self._chunked_query_strategy(polygons)
+            stats['max_concurrent_chunks'] = self.config.max_concurrent_chunks
+            result_df = self._chunked_query_strategy(
+                polygons_to_query, options=options, failed_polygon_ids=failed_polygon_ids
+            )
+        
+        if self.result_cache is not None:
+            self._store_query_results(result_df, polygons_to_query, cache_keys, failed_polygon_ids, options)
+            if cached_frames:
+                result_df = pd.concat(
+                    [df for df in cached_frames + [result_df] if not df.empty], ignore_index=True
+                )
+                result_df = result_df.sort_values(['dataset_name', 'timestamp'], kind='stable').reset_index(drop=True)
         
         # 计算统计信息
         stats['query_time'] = time.time() - start_time
         stats['total_points'] = len(result_df)
+        stats['failed_polygon_ids'] = failed_polygon_ids
         
         if not result_df.empty:
             stats['unique_datasets'] = result_df['dataset_name'].nunique()
@@ -174,7 +440,7 @@ class HighPerformancePolygonTrajectoryQuery:
             # 如果启用完整轨迹获取，则获取完整轨迹数据
             if self.config.fetch_complete_trajectories:
                 logger.info(f"🔄 获取完整轨迹数据...")
-                complete_result_df, complete_stats = self._fetch_complete_trajectories(result_df)
+                complete_result_df, complete_stats = self._fetch_complete_trajectories(result_df, options=options)
                 
                 if not complete_result_df.empty:
                     result_df = complete_result_df
@@ -195,16 +461,59 @@ class HighPerformancePolygonTrajectoryQuery:
         
         return result_df, stats
     
-    def _fetch_complete_trajectories(self, intersection_result_df: pd.DataFrame) -> Tuple[pd.DataFrame, Dict]:
+    def _result_cache_key(self, geometry, options: PointQueryOptions) -> str:
+        """polygon查询结果的缓存键：几何 + 影响结果的查询参数
+        
+        客户端精确过滤改变LIMIT的作用范围（先按外包框截取再过滤），
+        因此过滤模式和该polygon是否实际走客户端过滤都计入缓存键。
+        """
+        return polygon_cache_key(geometry, {
+            'point_table': self.config.point_table,
+            'limit_per_polygon': self.config.limit_per_polygon,
+            'enable_adaptive_tiling': self.config.enable_adaptive_tiling,
+            'client_refine_mode': self.config.client_refine_mode,
+            'client_refine': self._use_client_refinement(geometry),
+            'start_ts': options.start_ts,
+            'end_ts': options.end_ts,
+            'fields': sorted(options.fields)
+        })
+    
+    def _store_query_results(self, result_df: pd.DataFrame, polygons: List[Dict], cache_keys: Dict[str, str],
+                             failed_polygon_ids: List[str], options: PointQueryOptions):
+        """按polygon写入查询结果缓存（空结果同样缓存，查询失败的polygon不缓存）"""
+        if not cache_keys:
+            return
+        
+        failed = set(failed_polygon_ids)
+        groups = {}
+        if not result_df.empty:
+            groups = {pid: group for pid, group in result_df.groupby('polygon_id', sort=False)}
+        empty_df = pd.DataFrame(columns=options.fields + ['polygon_id'])
+        
+        stored = 0
+        for polygon in polygons:
+            polygon_id = polygon['id']
+            if polygon_id in failed or polygon_id not in cache_keys:
+                continue
+            if self.result_cache.put(cache_keys[polygon_id], groups.get(polygon_id, empty_df), evict=False):
+                stored += 1
+        
+        self.result_cache.evict()
+        logger.info(f"💾 写入结果缓存: {stored} 个polygon" + (f", 跳过失败 {len(failed)} 个" if failed else ""))
+    
+    def _fetch_complete_trajectories(self, intersection_result_df: pd.DataFrame,
+                                     options: Optional[PointQueryOptions] = None) -> Tuple[pd.DataFrame, Dict]:
         """获取完整轨迹数据（基于相交结果中的data_name）
         
         Args:
             intersection_result_df: 多边形相交结果DataFrame
+            options: 字段投影和时间窗口（可选，默认使用配置）
             
         Returns:
             (完整轨迹DataFrame, 统计信息)
         """
         start_time = time.time()
+        options = options or PointQueryOptions.from_config(self.config)
         
         # 统计信息
         complete_stats = {
@@ -232,21 +541,12 @@ class HighPerformancePolygonTrajectoryQuery:
             
             complete_trajectory_sql = f"""
                 SELECT 
-                    dataset_name,
-                    timestamp,
-                    point_lla,
-                    twist_linear,
-                    yaw,
-                    pitch,
-                    roll,
-                    avp_flag,
-                    workstage,
-                    ST_X(point_lla) as longitude,
-                    ST_Y(point_lla) as latitude
+                    {options.select_clause()}
                 FROM {self.config.point_table}
                 WHERE dataset_name IN %(data_names)s
                 AND point_lla IS NOT NULL
                 AND timestamp IS NOT NULL
+                {options.time_filter()}
                 ORDER BY dataset_name, timestamp
             """
             
@@ -403,17 +703,36 @@ class HighPerformancePolygonTrajectoryQuery:
             logger.error(f"备选查询失败: {str(e)}")
             return pd.DataFrame()
 
-    def _batch_query_strategy(self, polygons: List[Dict], is_chunk_mode: bool = False) -> pd.DataFrame:
+    def _batch_query_strategy(self, polygons: List[Dict], is_chunk_mode: bool = False,
+                              options: Optional[PointQueryOptions] = None,
+                              failed_polygon_ids: Optional[List[str]] = None) -> pd.DataFrame:
         """批量查询策略 - 使用hive_cursor连接（性能优化版）
         
         Args:
             polygons: polygon列表
             is_chunk_mode: 是否处于分块模式（避免无限递归）
+            options: 字段投影和时间窗口（可选，默认使用配置）
+            failed_polygon_ids: 查询失败的polygon_id收集列表（可选）
         """
         logger.info(f"🔍 使用批量查询策略处理 {len(polygons)} 个polygon")
         logger.info(f"⚡ 每polygon点数限制: {self.config.limit_per_polygon:,}")
         
         # 先测试数据库连接
+        if not self._test_hive_connection():
+            if failed_polygon_ids is not None:
+                failed_polygon_ids.extend(p['id'] for p in polygons)
+            return pd.DataFrame()
+        
+        # 性能优化：检查polygon数量（只有在非分块模式下才切换）
+        if not is_chunk_mode and len(polygons) > self.config.batch_threshold:
+            logger.info(f"⚠️ polygon数量较多({len(polygons)} > {self.config.batch_threshold})，切换到分块策略")
+            return self._chunked_query_strategy(polygons, connection_tested=True, options=options,
+                                                failed_polygon_ids=failed_polygon_ids)
+        
+        return self._execute_batch_query(polygons, options)
+    
+    def _test_hive_connection(self) -> bool:
+        """测试Hive数据库连接是否可用"""
         logger.info("🔗 测试数据库连接...")
         try:
             with hive_cursor("dataset_gy1") as cur:
@@ -421,57 +740,73 @@ class HighPerformancePolygonTrajectoryQuery:
                 result = cur.fetchone()
                 if result and result[0] == 1:
                     logger.info("✅ 数据库连接正常")
-                else:
-                    logger.error("❌ 数据库连接测试失败")
-                    return pd.DataFrame()
+                    return True
+                logger.error("❌ 数据库连接测试失败")
+                return False
         except Exception as e:
             logger.error(f"❌ 数据库连接失败: {e}")
-            return pd.DataFrame()
-        
-        # 性能优化：检查polygon数量（只有在非分块模式下才切换）
-        if not is_chunk_mode and len(polygons) > self.config.batch_threshold:
-            logger.info(f"⚠️ polygon数量较多({len(polygons)} > {self.config.batch_threshold})，切换到分块策略")
-            return self._chunked_query_strategy(polygons)
+            return False
+    
+    def _execute_batch_query(self, polygons: List[Dict],
+                             options: Optional[PointQueryOptions] = None) -> pd.DataFrame:
+        """执行一次UNION ALL批量查询（不做连接测试和策略切换）
         
+        Args:
+            polygons: polygon列表
+            options: 字段投影和时间窗口（可选，默认使用配置）
+            
+        Returns:
+            轨迹点DataFrame
+        """
+        options = options or PointQueryOptions.from_config(self.config)
+        select_clause = options.select_clause()
+        time_filter = options.time_filter()
+
         # 构建优化的查询
         subqueries = []
         total_estimated_points = len(polygons) * self.config.limit_per_polygon
         
         logger.info(f"📈 预估最大数据量: {total_estimated_points:,} 个点")
         
+        refine_polygons = {}
+        
         for i, polygon in enumerate(polygons, 1):
             polygon_id = polygon['id']
-            polygon_wkt = polygon['geometry'].wkt
+            geometry = polygon['geometry']
             
             logger.info(f"🔸 构建查询 {i}/{len(polygons)}: {polygon_id}")
             
+            if self._use_client_refinement(geometry):
+                # 复杂polygon：服务端只做索引友好的外包框过滤，取回后本地精确过滤
+                refine_polygons[polygon_id] = geometry
+                minx, miny, maxx, maxy = geometry.bounds
+                spatial_filter = f"point_lla && ST_MakeEnvelope({minx}, {miny}, {maxx}, {maxy}, 4326)"
+                polygon_limit = self._envelope_point_limit(geometry)
+            else:
+                spatial_filter = f"""ST_Intersects(
+                    point_lla,
+                    ST_SetSRID(ST_GeomFromText('{geometry.wkt}'), 4326)
+                )"""
+                polygon_limit = self.config.limit_per_polygon
+            
             # 去掉ORDER BY，简化子查询
             subquery = f"""
                 (SELECT 
-                    dataset_name,
-                    timestamp,
-                    point_lla,
-                    twist_linear,
-                    yaw,
-                    pitch,
-                    roll,
-                    avp_flag,
-                    workstage,
-                    ST_X(point_lla) as longitude,
-                    ST_Y(point_lla) as latitude,
+                    {select_clause},
                     '{polygon_id}' as polygon_id
                 FROM {self.config.point_table}
                 WHERE point_lla IS NOT NULL
                 AND timestamp IS NOT NULL
                 AND dataset_name IS NOT NULL
-                AND ST_Intersects(
-                    point_lla,
-                    ST_SetSRID(ST_GeomFromText('{polygon_wkt}'), 4326)
-                )
-                LIMIT {self.config.limit_per_polygon})
+                {time_filter}
+                AND {spatial_filter}
+                LIMIT {polygon_limit})
             """
             subqueries.append(subquery)
         
+        if refine_polygons:
+            logger.info(f"🧮 {len(refine_polygons)} 个复杂polygon使用外包框查询 + 客户端精确过滤")
+        
         # 构建完整的UNION查询
         union_query = " UNION ALL ".join(subqueries)
         batch_sql = f"""
@@ -506,11 +841,12 @@ class HighPerformancePolygonTrajectoryQuery:
                     return pd.DataFrame()
                 
                 # 构建DataFrame
-                columns = ['dataset_name', 'timestamp', 'point_lla', 'twist_linear', 
-                          'yaw', 'pitch', 'roll', 'avp_flag', 'workstage', 
-                          'longitude', 'latitude', 'polygon_id']
+                columns = options.fields + ['polygon_id']
                 result_df = pd.DataFrame(rows, columns=columns)
                 
+                if refine_polygons:
+                    result_df = self._refine_points_locally(result_df, refine_polygons)
+                
                 logger.info(f"📊 构建DataFrame完成: {len(result_df)} 行数据")
                 return result_df
                 
@@ -525,36 +861,451 @@ class HighPerformancePolygonTrajectoryQuery:
                 logger.error(f"   3. 使用分块查询策略")
             
             raise
+
+    def query_points_spatial_join(self, polygons: List[Dict],
+                                  fields: Optional[List[str]] = None,
+                                  start_ts: Optional[int] = None,
+                                  end_ts: Optional[int] = None) -> Tuple[pd.DataFrame, Dict]:
+        """单次集合式空间连接查询多个polygon的相交轨迹点
+
+        所有polygon作为VALUES表与点表做一次ST_Intersects连接（只扫描一次点表），
+        每个polygon的点数上限由ROW_NUMBER窗口实现，结果带polygon_id列，
+        按polygon_id, dataset_name, timestamp排序。适用于数量多、形状简单的polygon（如grid）。
+
+        Args:
+            polygons: polygon列表
+            fields: 查询字段投影（可选，默认使用配置）
+            start_ts: 时间窗口起点（可选，含）
+            end_ts: 时间窗口终点（可选，含）
+
+        Returns:
+            (轨迹点DataFrame, 性能统计)
+
+        Raises:
+            查询失败时抛出数据库异常
+        """
+        start_time = time.time()
+        options = PointQueryOptions.from_config(self.config, fields, start_ts, end_ts)
+        stats = {
+            'polygon_count': len(polygons),
+            'strategy': 'spatial_join',
+            'query_time': 0,
+            'total_points': 0
+        }
+        columns = options.fields + ['polygon_id']
+
+        if not polygons:
+            return pd.DataFrame(columns=columns), stats
+
+        polygon_values = ",\n                    ".join(
+            f"('{polygon['id']}', ST_SetSRID(ST_GeomFromText('{polygon['geometry'].wkt}'), 4326))"
+            for polygon in polygons
+        )
+        output_columns = ", ".join(columns)
+        join_sql = f"""
+            WITH query_polygons (polygon_id, geom) AS (
+                VALUES
+                    {polygon_values}
+            )
+            SELECT {output_columns} FROM (
+                SELECT
+                    {options.select_clause('p')},
+                    q.polygon_id,
+                    ROW_NUMBER() OVER (PARTITION BY q.polygon_id) AS polygon_rank
+                FROM {self.config.point_table} p
+                JOIN query_polygons q ON ST_Intersects(p.point_lla, q.geom)
+                WHERE p.point_lla IS NOT NULL
+                AND p.timestamp IS NOT NULL
+                AND p.dataset_name IS NOT NULL
+                {options.time_filter('p')}
+            ) AS joined
+            WHERE polygon_rank <= {self.config.limit_per_polygon}
+            ORDER BY polygon_id, dataset_name, timestamp
+        """
+
+        logger.info(f"🔗 空间连接查询 {len(polygons)} 个polygon的轨迹点...")
+        if logger.isEnabledFor(logging.DEBUG):
+            logger.debug("=== 执行空间连接查询SQL (dataset_gy1) ===")
+            logger.debug(join_sql)
+
+        with hive_cursor("dataset_gy1") as cur:
+            cur.execute(join_sql)
+            rows = cur.fetchall()
+
+        result_df = pd.DataFrame(rows, columns=columns)
+        stats['query_time'] = time.time() - start_time
+        stats['total_points'] = len(result_df)
+        logger.info(f"✅ 空间连接查询完成: {len(result_df):,} 个点, 用时: {stats['query_time']:.2f}s")
+        return result_df, stats
+
+    def _use_client_refinement(self, geometry) -> bool:
+        """判断polygon是否走外包框查询 + 客户端精确过滤"""
+        mode = self.config.client_refine_mode
+        if mode == 'never':
+            return False
+        if mode == 'always':
+            return True
+        
+        if shapely.get_num_coordinates(geometry) > self.config.refine_vertex_threshold:
+            return True
+        return bool(shapely.get_num_interior_rings(shapely.get_parts(geometry)).sum() > 0)
+    
+    def _envelope_point_limit(self, geometry) -> int:
+        """外包框查询的点数上限
         
-        return pd.DataFrame()
+        外包框内、polygon外的点也会占用LIMIT额度，按面积比放大上限，
+        精确过滤后再截回limit_per_polygon。
+        """
+        limit = self.config.limit_per_polygon
+        if geometry.area <= 0:
+            return limit
+        envelope_ratio = shapely.area(shapely.envelope(geometry)) / geometry.area
+        factor = min(max(envelope_ratio, 1.0), self.config.refine_max_limit_factor)
+        return int(np.ceil(limit * factor))
     
-    def _chunked_query_strategy(self, polygons: List[Dict]) -> pd.DataFrame:
-        """分块查询策略 - 适合大规模polygon"""
-        logger.info(f"使用分块查询策略，{len(polygons)} 个polygon分为 {len(polygons)//self.config.chunk_size + 1} 块")
+    def _refine_points_locally(self, points_df: pd.DataFrame, refine_polygons: Dict) -> pd.DataFrame:
+        """用预处理（prepared）polygon在本地对外包框查询结果做精确相交过滤
+        
+        按行分片并行执行向量化的shapely.intersects_xy（与服务端ST_Intersects语义一致，
+        含边界点），保持原有行顺序。
+        
+        Args:
+            points_df: 查询结果DataFrame
+            refine_polygons: {polygon_id: geometry}，需要本地过滤的polygon
+            
+        Returns:
+            过滤后的DataFrame
+        """
+        if points_df.empty:
+            return points_df
+        
+        start_time = time.time()
+        for geometry in refine_polygons.values():
+            shapely.prepare(geometry)
+        
+        def refine_chunk(chunk: pd.DataFrame) -> pd.DataFrame:
+            polygon_ids = chunk['polygon_id'].to_numpy()
+            longitudes = chunk['longitude'].to_numpy(dtype=np.float64)
+            latitudes = chunk['latitude'].to_numpy(dtype=np.float64)
+            keep = np.ones(len(chunk), dtype=bool)
+            for polygon_id, geometry in refine_polygons.items():
+                selected = polygon_ids == polygon_id
+                if selected.any():
+                    keep[selected] = shapely.intersects_xy(geometry, longitudes[selected], latitudes[selected])
+            return chunk[keep]
+        
+        chunk_rows = max(1, self.config.refine_chunk_rows)
+        chunks = [points_df.iloc[i:i + chunk_rows] for i in range(0, len(points_df), chunk_rows)]
+        
+        # shapely向量化运算会释放GIL，线程池即可并行
+        with concurrent.futures.ThreadPoolExecutor(max_workers=max(1, self.config.refine_workers)) as executor:
+            refined_chunks = list(executor.map(refine_chunk, chunks))
+        
+        refined_df = pd.concat(refined_chunks, ignore_index=True)
+        
+        # 精确过滤后截回每polygon点数限制
+        is_refined = refined_df['polygon_id'].isin(list(refine_polygons))
+        if is_refined.any():
+            rank = refined_df.groupby('polygon_id').cumcount()
+            refined_df = refined_df[~is_refined | (rank < self.config.limit_per_polygon)].reset_index(drop=True)
+        
+        logger.info(f"🧮 客户端精确过滤: {len(points_df):,} → {len(refined_df):,} 个点, "
+                   f"用时: {time.time() - start_time:.2f}s")
+        return refined_df
+    
+    def _chunked_query_strategy(self, polygons: List[Dict], connection_tested: bool = False,
+                                options: Optional[PointQueryOptions] = None,
+                                failed_polygon_ids: Optional[List[str]] = None) -> pd.DataFrame:
+        """分块查询策略 - 适合大规模polygon
+        
+        各分块在有界线程池中并发执行（并发数即同时占用的Hive连接数），
+        结果按完成顺序合并。失败或开始执行后超过query_timeout仍未返回的分块
+        会被对半拆分后重新提交，已完成分块的结果不受影响。
+        超时分块的查询线程无法强制中断，会在后台运行至数据库返回，其结果被丢弃；
+        这些线程仍占用Hive连接，在实例上跟踪并计入后续调用的并发上限
+        （max_concurrent_chunks对同一实例的所有调用生效）。
+        
+        Args:
+            polygons: polygon列表
+            connection_tested: 调用方是否已完成连接测试
+            options: 字段投影和时间窗口（可选，默认使用配置）
+            failed_polygon_ids: 查询失败的polygon_id收集列表（可选）
+        """
+        chunk_size = max(1, self.config.chunk_size)
+        chunks = [polygons[i:i + chunk_size] for i in range(0, len(polygons), chunk_size)]
+        timeout = self.config.query_timeout if self.config.query_timeout and self.config.query_timeout > 0 else None
+        
+        if failed_polygon_ids is None:
+            failed_polygon_ids = []
+        
+        # 连接测试只做一次，不再每块重复
+        if not connection_tested and not self._test_hive_connection():
+            failed_polygon_ids.extend(p['id'] for p in polygons)
+            return pd.DataFrame()
+        
+        max_workers = self._available_chunk_workers(len(chunks))
+        logger.info(f"使用分块查询策略，{len(polygons)} 个polygon分为 {len(chunks)} 块，"
+                   f"并发数: {max_workers}")
         
         all_results = []
+        failed_before = len(failed_polygon_ids)
+        completed_chunks = 0
+        abandoned_futures = []
+        
+        # 分块开始执行的时间（排队等待线程的时间不计入超时）
+        started_at = {}
+        
+        def run_chunk(chunk_key: int, chunk: List[Dict]) -> pd.DataFrame:
+            started_at[chunk_key] = time.monotonic()
+            return self._execute_batch_query(chunk, options)
+        
+        executor = concurrent.futures.ThreadPoolExecutor(max_workers=max_workers)
+        chunk_keys = itertools.count()
+        future_to_chunk = {}
+        
+        def submit(chunk: List[Dict], attempt: int) -> None:
+            chunk_key = next(chunk_keys)
+            future = executor.submit(run_chunk, chunk_key, chunk)
+            future_to_chunk[future] = (chunk_key, chunk, attempt)
+        
+        def retry_or_fail(chunk: List[Dict], attempt: int, error: Exception) -> None:
+            if attempt >= self.config.chunk_max_retries:
+                logger.error(f"❌ 分块重试 {attempt} 次后仍失败，放弃 {len(chunk)} 个polygon: {error}")
+                failed_polygon_ids.extend(p['id'] for p in chunk)
+                return
+            
+            # 拆分失败的分块后重试，单个polygon则原样重试
+            if len(chunk) > 1:
+                mid = len(chunk) // 2
+                retry_chunks = [chunk[:mid], chunk[mid:]]
+            else:
+                retry_chunks = [chunk]
+            logger.warning(f"⚠️ 分块查询失败，拆分为 {len(retry_chunks)} 块重试 "
+                          f"(第 {attempt + 1} 次): {error}")
+            for retry_chunk in retry_chunks:
+                submit(retry_chunk, attempt + 1)
         
-        for i in range(0, len(polygons), self.config.chunk_size):
-            chunk = polygons[i:i+self.config.chunk_size]
-            chunk_num = i // self.config.chunk_size + 1
-            logger.info(f"处理第 {chunk_num} 块: {len(chunk)} 个polygon")
+        try:
+            for chunk in chunks:
+                submit(chunk, 0)
             
-            # 使用批量策略处理当前块，标记为分块模式避免无限递归
-            chunk_result = self._batch_query_strategy(chunk, is_chunk_mode=True)
-            if not chunk_result.empty:
-                all_results.append(chunk_result)
+            while future_to_chunk:
+                wait_timeout = None
+                if timeout is not None:
+                    running_starts = [started_at[key] for key, _, _ in future_to_chunk.values() if key in started_at]
+                    # 没有正在执行的分块时（线程均被超时分块占用）按一个超时周期再检查
+                    earliest = min(running_starts) if running_starts else time.monotonic()
+                    wait_timeout = max(0.0, earliest + timeout - time.monotonic())
+                
+                done, _ = concurrent.futures.wait(
+                    future_to_chunk, timeout=wait_timeout, return_when=concurrent.futures.FIRST_COMPLETED
+                )
+                
+                for future in done:
+                    _, chunk, attempt = future_to_chunk.pop(future)
+                    try:
+                        chunk_result = future.result()
+                        completed_chunks += 1
+                        if not chunk_result.empty:
+                            all_results.append(chunk_result)
+                        logger.info(f"分块完成: {len(chunk)} 个polygon, {len(chunk_result)} 个点 "
+                                   f"(已完成 {completed_chunks} 块, 剩余 {len(future_to_chunk)} 块)")
+                    except Exception as e:
+                        retry_or_fail(chunk, attempt, e)
+                
+                if timeout is None:
+                    continue
+                
+                now = time.monotonic()
+                for future, (chunk_key, chunk, attempt) in list(future_to_chunk.items()):
+                    start = started_at.get(chunk_key)
+                    if start is None or future.done() or now - start < timeout:
+                        continue
+                    # 超时分块不再等待，其结果即使稍后返回也丢弃
+                    future_to_chunk.pop(future)
+                    abandoned_futures.append(future)
+                    retry_or_fail(chunk, attempt, TimeoutError(f"分块查询超过 {timeout}s 未返回"))
+        finally:
+            # 有超时分块时不等待其线程结束，仍在运行的分块留待后续调用计入并发上限
+            executor.shutdown(wait=not abandoned_futures, cancel_futures=True)
+            if abandoned_futures:
+                with self._abandoned_chunk_lock:
+                    self._abandoned_chunk_futures.update(f for f in abandoned_futures if not f.done())
+        
+        if abandoned_futures:
+            logger.warning(f"⏰ {len(abandoned_futures)} 个分块查询超时（query_timeout={timeout}s），已拆分重试")
+        
+        if len(failed_polygon_ids) > failed_before:
+            newly_failed = failed_polygon_ids[failed_before:]
+            logger.warning(f"⚠️ {len(newly_failed)} 个polygon查询失败: {newly_failed[:10]}")
         
         return pd.concat(all_results, ignore_index=True) if all_results else pd.DataFrame()
 
+    def _available_chunk_workers(self, chunk_count: int) -> int:
+        """本次分块查询可用的并发数
+        
+        扣除此前超时、仍在后台运行的分块（各占一个Hive连接）；
+        它们占满max_concurrent_chunks时等待至少一个返回。
+        """
+        limit = max(1, self.config.max_concurrent_chunks)
+        with self._abandoned_chunk_lock:
+            self._abandoned_chunk_futures = {f for f in self._abandoned_chunk_futures if not f.done()}
+            running = set(self._abandoned_chunk_futures)
+        
+        while len(running) >= limit:
+            logger.warning(f"⏳ {len(running)} 个超时分块仍占用Hive连接，等待其返回后再查询...")
+            _, running = concurrent.futures.wait(running, return_when=concurrent.futures.FIRST_COMPLETED)
+        
+        return max(1, min(limit - len(running), chunk_count))
+    
+    def _adaptive_tiling_query_strategy(self, polygons: List[Dict],
+                                        options: Optional[PointQueryOptions] = None,
+                                        failed_polygon_ids: Optional[List[str]] = None) -> Tuple[pd.DataFrame, Dict]:
+        """自适应切片查询策略 - 避免limit_per_polygon截断
+        
+        大polygon先按tile_size_m切成裁剪到polygon内的网格切片，切片并发查询；
+        点数达到limit_per_polygon的切片继续四分后重查，直到不再命中上限
+        或达到max_tile_depth。结果按原始polygon_id去重合并。
+        
+        Args:
+            polygons: polygon列表
+            options: 字段投影和时间窗口（可选，默认使用配置）
+            failed_polygon_ids: 查询失败的原始polygon_id收集列表（可选）
+            
+        Returns:
+            (轨迹点DataFrame, 切片统计)
+        """
+        tiling_stats = {
+            'tile_count': 0,
+            'subdivided_tiles': 0,
+            'truncated_tiles': 0,
+            'tiling_rounds': 0
+        }
+        
+        if failed_polygon_ids is None:
+            failed_polygon_ids = []
+        
+        if not self._test_hive_connection():
+            failed_polygon_ids.extend(p['id'] for p in polygons)
+            return pd.DataFrame(), tiling_stats
+        
+        tile_to_polygon = {}
+        pending_tiles = []
+        for polygon in polygons:
+            for k, tile_geom in enumerate(split_polygon_into_tiles(polygon['geometry'], self.config.tile_size_m)):
+                tile_id = f"{polygon['id']}__t{k}"
+                tile_to_polygon[tile_id] = polygon['id']
+                pending_tiles.append({'id': tile_id, 'geometry': tile_geom, 'depth': 0})
+        
+        logger.info(f"🧩 自适应切片: {len(polygons)} 个polygon切分为 {len(pending_tiles)} 个切片 "
+                   f"(切片边长: {self.config.tile_size_m:.0f}m)")
+        
+        all_results = []
+        limit = self.config.limit_per_polygon
+        
+        while pending_tiles:
+            tiling_stats['tiling_rounds'] += 1
+            tiling_stats['tile_count'] += len(pending_tiles)
+            
+            failed_tile_ids = []
+            round_df = self._chunked_query_strategy(pending_tiles, connection_tested=True, options=options,
+                                                    failed_polygon_ids=failed_tile_ids)
+            failed_polygon_ids.extend(dict.fromkeys(tile_to_polygon[tile_id] for tile_id in failed_tile_ids))
+            if round_df.empty:
+                break
+            
+            tile_counts = round_df['polygon_id'].value_counts()
+            saturated_ids = set(tile_counts[tile_counts >= limit].index)
+            
+            next_tiles = []
+            for tile in pending_tiles:
+                if tile['id'] not in saturated_ids:
+                    continue
+                if tile['depth'] >= self.config.max_tile_depth:
+                    tiling_stats['truncated_tiles'] += 1
+                    logger.warning(f"⚠️ 切片 {tile['id']} 在最大切分深度仍命中点数上限 {limit:,}，结果可能被截断")
+                    saturated_ids.discard(tile['id'])
+                    continue
+                
+                tiling_stats['subdivided_tiles'] += 1
+                for k, sub_geom in enumerate(split_tile_into_quadrants(tile['geometry'])):
+                    sub_id = f"{tile['id']}.{k}"
+                    tile_to_polygon[sub_id] = tile_to_polygon[tile['id']]
+                    next_tiles.append({'id': sub_id, 'geometry': sub_geom, 'depth': tile['depth'] + 1})
+            
+            # 命中上限的切片结果丢弃，由其子切片重新查询
+            kept_df = round_df[~round_df['polygon_id'].isin(saturated_ids)]
+            if not kept_df.empty:
+                all_results.append(kept_df)
+            
+            if next_tiles:
+                logger.info(f"🔁 {len(saturated_ids)} 个切片命中点数上限，四分为 {len(next_tiles)} 个子切片重查")
+            pending_tiles = next_tiles
+        
+        if not all_results:
+            return pd.DataFrame(), tiling_stats
+        
+        result_df = pd.concat(all_results, ignore_index=True)
+        result_df['polygon_id'] = result_df['polygon_id'].map(tile_to_polygon)
+        
+        # 切片边界上的点会被相邻切片重复命中
+        before_dedup = len(result_df)
+        result_df = result_df.drop_duplicates(subset=['dataset_name', 'timestamp', 'polygon_id'])
+        result_df = result_df.sort_values(['dataset_name', 'timestamp']).reset_index(drop=True)
+        tiling_stats['duplicate_points_removed'] = before_dedup - len(result_df)
+        
+        logger.info(f"✅ 自适应切片查询完成: {tiling_stats['tile_count']} 个切片, "
+                   f"{tiling_stats['tiling_rounds']} 轮, {len(result_df):,} 个点 "
+                   f"(去重 {tiling_stats['duplicate_points_removed']:,} 个)")
+        
+        return result_df, tiling_stats
+
     def build_trajectories_from_points(self, points_df: pd.DataFrame) -> Tuple[List[Dict], Dict]:
         """智能构建轨迹线和统计信息
         
+        基于build_trajectories_columnar的向量化实现，返回逐条轨迹的字典列表
+        （保持向后兼容）。大数据量场景建议直接使用列式结果。
+        
         Args:
             points_df: 轨迹点DataFrame
             
         Returns:
             (轨迹列表, 构建统计)
         """
+        trajectories_gdf, build_stats = self.build_trajectories_columnar(points_df)
+        if trajectories_gdf.empty:
+            return [], build_stats
+        
+        optional_stats = {'avg_speed', 'max_speed', 'min_speed', 'std_speed', 'avp_ratio'}
+        trajectories = []
+        for record in trajectories_gdf.to_dict('records'):
+            trajectory = {}
+            for k, v in record.items():
+                # 无有效值的可选统计字段不输出，与逐组实现保持一致
+                if k in optional_stats and pd.isna(v):
+                    continue
+                # NumPy标量转为Python标量，便于JSON序列化等下游使用
+                if isinstance(v, np.generic):
+                    v = v.item()
+                elif isinstance(v, list):
+                    v = [item.item() if isinstance(item, np.generic) else item for item in v]
+                trajectory[k] = v
+            trajectories.append(trajectory)
+        
+        return trajectories, build_stats
+    
+    def build_trajectories_columnar(self, points_df: pd.DataFrame) -> Tuple[gpd.GeoDataFrame, Dict]:
+        """向量化构建轨迹线和统计信息，返回列式结果
+        
+        只做一次全局排序（dataset_name, timestamp），按偏移量切分各数据集，
+        统计量用NumPy分段归约（reduceat）计算，LineString由shapely一次批量构建。
+        
+        Args:
+            points_df: 轨迹点DataFrame
+            
+        Returns:
+            (每行一条轨迹的GeoDataFrame, 构建统计)
+        """
         start_time = time.time()
         
         build_stats = {
@@ -565,112 +1316,121 @@ class HighPerformancePolygonTrajectoryQuery:
             'build_time': 0
         }
         
+        empty_result = gpd.GeoDataFrame(geometry=[], crs=4326)
+        
         if points_df.empty:
             logger.warning("没有轨迹点数据")
-            return [], build_stats
-        
-        trajectories = []
+            return empty_result, build_stats
         
         try:
-            # 获取所有涉及的data_name，并查询对应的scene_id
-            unique_data_names = points_df['dataset_name'].unique()
-            logger.info(f"查询 {len(unique_data_names)} 个data_name对应的scene_id...")
+            # 单次排序：按dataset_name分组码、组内按时间
+            codes, dataset_names = pd.factorize(points_df['dataset_name'], sort=True)
+            timestamps = pd.to_numeric(points_df['timestamp'], errors='coerce').to_numpy(dtype=np.float64)
+            order = np.lexsort((timestamps, codes))
+            
+            codes = codes[order]
+            timestamps = timestamps[order]
+            longitudes = points_df['longitude'].to_numpy(dtype=np.float64)[order]
+            latitudes = points_df['latitude'].to_numpy(dtype=np.float64)[order]
+            
+            counts = np.bincount(codes, minlength=len(dataset_names))
+            offsets = np.concatenate(([0], np.cumsum(counts)[:-1]))
+            last = offsets + counts - 1
+            
+            build_stats['total_datasets'] = len(dataset_names)
+            logger.info(f"开始构建轨迹: {build_stats['total_datasets']} 个数据集, {build_stats['total_points']} 个点")
+            
+            valid = counts >= self.config.min_points_per_trajectory
+            build_stats['valid_trajectories'] = int(valid.sum())
+            build_stats['skipped_trajectories'] = int((~valid).sum())
+            
+            if not valid.any():
+                build_stats['build_time'] = time.time() - start_time
+                logger.warning("所有数据集点数量不足，未构建任何轨迹")
+                return empty_result, build_stats
+            
+            valid_names = dataset_names[valid]
             
-            # 查询scene_id映射
-            scene_id_mappings = self._fetch_scene_ids_from_data_names(unique_data_names.tolist())
+            # 获取所有涉及的data_name，并查询对应的scene_id
+            logger.info(f"查询 {len(dataset_names)} 个data_name对应的scene_id...")
+            scene_id_mappings = self._fetch_scene_ids_from_data_names(list(dataset_names))
             
-            # 创建data_name到各字段的映射字典
-            data_name_to_scene_id = {}
-            data_name_to_event_id = {}
-            data_name_to_event_name = {}
+            columns = {
+                'dataset_name': valid_names,
+                'scene_id': [''] * len(valid_names),
+                'event_id': [None] * len(valid_names),
+                'event_name': [''] * len(valid_names),
+            }
             
             if not scene_id_mappings.empty:
-                data_name_to_scene_id = dict(zip(scene_id_mappings['data_name'], scene_id_mappings['scene_id']))
+                mappings = scene_id_mappings.drop_duplicates('data_name').set_index('data_name')
+                columns['scene_id'] = mappings['scene_id'].reindex(valid_names).fillna('').tolist()
                 
-                # 处理event_id字段（可能为空）
-                if 'event_id' in scene_id_mappings.columns:
-                    # 确保event_id是整数类型，避免浮点数格式问题
-                    event_ids_cleaned = scene_id_mappings['event_id'].apply(
-                        lambda x: int(float(x)) if pd.notna(x) and x != '' else None
-                    )
-                    data_name_to_event_id = dict(zip(scene_id_mappings['data_name'], event_ids_cleaned))
+                # 处理event_id字段（可能为空），确保是整数类型，避免浮点数格式问题
+                if 'event_id' in mappings.columns:
+                    columns['event_id'] = [
+                        int(float(x)) if pd.notna(x) and x != '' else None
+                        for x in mappings['event_id'].reindex(valid_names)
+                    ]
                 
                 # 处理event_name字段（可能为空）
-                if 'event_name' in scene_id_mappings.columns:
-                    data_name_to_event_name = dict(zip(scene_id_mappings['data_name'], scene_id_mappings['event_name']))
+                if 'event_name' in mappings.columns:
+                    columns['event_name'] = mappings['event_name'].reindex(valid_names).fillna('').tolist()
                 
-                logger.info(f"成功查询到 {len(data_name_to_scene_id)} 个scene_id映射")
-                if data_name_to_event_id:
-                    logger.info(f"成功查询到 {len(data_name_to_event_id)} 个event_id映射")
-                if data_name_to_event_name:
-                    logger.info(f"成功查询到 {len(data_name_to_event_name)} 个event_name映射")
+                logger.info(f"成功查询到 {len(mappings)} 个scene_id映射")
             else:
                 logger.warning("未查询到任何scene_id映射，相关字段将为空")
             
-            # 按dataset_name分组处理
-            grouped = points_df.groupby('dataset_name')
-            build_stats['total_datasets'] = len(grouped)
+            first_ts = timestamps[offsets[valid]]
+            last_ts = timestamps[last[valid]]
+            columns['start_time'] = first_ts.astype(np.int64)
+            columns['end_time'] = last_ts.astype(np.int64)
+            columns['duration'] = (last_ts - first_ts).astype(np.int64)
+            columns['point_count'] = counts[valid]
             
-            logger.info(f"开始构建轨迹: {build_stats['total_datasets']} 个数据集, {build_stats['total_points']} 个点")
+            # polygon_ids：组内按时间首次出现的顺序去重
+            if 'polygon_id' in points_df.columns:
+                pairs = pd.DataFrame({
+                    'code': codes,
+                    'polygon_id': points_df['polygon_id'].to_numpy()[order]
+                }).drop_duplicates()
+                polygon_ids = pairs.groupby('code', sort=True)['polygon_id'].agg(lambda ids: ids.tolist())
+                columns['polygon_ids'] = polygon_ids.reindex(np.nonzero(valid)[0]).tolist()
+            else:
+                columns['polygon_ids'] = [[] for _ in range(len(valid_names))]
             
-            # 移除event_id_counter，改为使用数据库查询的值
+            # 速度统计（可配置）
+            if self.config.enable_speed_stats and 'twist_linear' in points_df.columns:
+                speed = pd.to_numeric(points_df['twist_linear'], errors='coerce').to_numpy(dtype=np.float64)[order]
+                columns.update(self._segment_speed_stats(speed, codes, offsets, counts, valid))
             
-            for dataset_name, group in grouped:
-                # 按时间排序
-                group = group.sort_values('timestamp')
-                
-                # 检查点数量
-                if len(group) < self.config.min_points_per_trajectory:
-                    build_stats['skipped_trajectories'] += 1
-                    logger.debug(f"数据集 {dataset_name} 点数量不足({len(group)})，跳过")
-                    continue
-                
-                # 提取坐标
-                coordinates = list(zip(group['longitude'], group['latitude']))
-                
-                # 构建LineString几何
-                trajectory_geom = LineString(coordinates)
-                
-                # 基础统计信息
-                stats = {
-                    'dataset_name': dataset_name,
-                    'scene_id': data_name_to_scene_id.get(dataset_name, ''),  # 从数据库查询获取scene_id
-                    'event_id': data_name_to_event_id.get(dataset_name, None),  # 从数据库查询获取event_id
-                    'event_name': data_name_to_event_name.get(dataset_name, ''),  # 从数据库查询获取event_name
-                    'start_time': int(group['timestamp'].min()),
-                    'end_time': int(group['timestamp'].max()),
-                    'duration': int(group['timestamp'].max() - group['timestamp'].min()),
-                    'point_count': len(group),
-                    'geometry': trajectory_geom,
-                    'polygon_ids': list(group['polygon_id'].unique())
-                }
-                
-                # 移除event_id_counter递增，因为现在使用数据库值
-                
-                # 速度统计（可配置）
-                if self.config.enable_speed_stats and 'twist_linear' in group.columns:
-                    speed_data = group['twist_linear'].dropna()
-                    if len(speed_data) > 0:
-                        stats.update({
-                            'avg_speed': round(float(speed_data.mean()), 2),
-                            'max_speed': round(float(speed_data.max()), 2),
-                            'min_speed': round(float(speed_data.min()), 2),
-                            'std_speed': round(float(speed_data.std()) if len(speed_data) > 1 else 0.0, 2)
-                        })
-                
-                # AVP统计（可配置）
-                if self.config.enable_avp_stats and 'avp_flag' in group.columns:
-                    avp_data = group['avp_flag'].dropna()
-                    if len(avp_data) > 0:
-                        stats.update({
-                            'avp_ratio': round(float((avp_data == 1).mean()), 3)
-                        })
-                
-                trajectories.append(stats)
-                build_stats['valid_trajectories'] += 1
-                
-                logger.debug(f"构建轨迹: {dataset_name}, 点数: {stats['point_count']}, "
-                           f"时长: {stats['duration']}s, polygon数: {len(stats['polygon_ids'])}")
+            # AVP统计（可配置）
+            if self.config.enable_avp_stats and 'avp_flag' in points_df.columns:
+                avp = pd.to_numeric(points_df['avp_flag'], errors='coerce').to_numpy(dtype=np.float64)[order]
+                avp_valid = ~np.isnan(avp)
+                avp_count = np.add.reduceat(avp_valid.astype(np.int64), offsets)
+                avp_hits = np.add.reduceat((avp == 1).astype(np.int64), offsets)
+                with np.errstate(invalid='ignore', divide='ignore'):
+                    avp_ratio = np.where(avp_count > 0, np.round(avp_hits / avp_count, 3), np.nan)
+                columns['avp_ratio'] = avp_ratio[valid]
+            
+            # 一次性批量构建所有LineString（跳过的数据集不占索引，有效轨迹按0..k-1连续编号）
+            dense_codes = np.cumsum(valid) - 1
+            point_mask = valid[codes]
+            if self.config.simplification is not None:
+                point_mask &= simplify_mask(
+                    longitudes, latitudes, np.append(offsets, len(codes)),
+                    self.config.simplification, timestamp=timestamps
+                )
+                build_stats['geometry_points'] = int(point_mask.sum())
+            geometries = shapely.linestrings(
+                np.column_stack((longitudes[point_mask], latitudes[point_mask])),
+                indices=dense_codes[codes[point_mask]]
+            )
+            
+            # event_id保持object类型（整数或None），避免被转换为浮点数
+            columns['event_id'] = pd.Series(columns['event_id'], dtype=object)
+            trajectories_gdf = gpd.GeoDataFrame(columns, geometry=geometries, crs=4326)
             
             build_stats['build_time'] = time.time() - start_time
             
@@ -678,19 +1438,46 @@ class HighPerformancePolygonTrajectoryQuery:
                        f"{build_stats['skipped_trajectories']} 条跳过, "
                        f"用时: {build_stats['build_time']:.2f}s")
             
-            return trajectories, build_stats
+            return trajectories_gdf, build_stats
             
         except Exception as e:
             logger.error(f"构建轨迹失败: {str(e)}")
-            return [], build_stats
-
-
+            return empty_result, build_stats
+    
+    @staticmethod
+    def _segment_speed_stats(speed: np.ndarray, codes: np.ndarray, offsets: np.ndarray,
+                             counts: np.ndarray, valid: np.ndarray) -> Dict[str, np.ndarray]:
+        """按分段偏移量计算速度统计（忽略NaN），无有效速度的段为NaN"""
+        has_speed = ~np.isnan(speed)
+        speed_count = np.add.reduceat(has_speed.astype(np.int64), offsets)
+        speed_sum = np.add.reduceat(np.where(has_speed, speed, 0.0), offsets)
+        speed_max = np.fmax.reduceat(speed, offsets)
+        speed_min = np.fmin.reduceat(speed, offsets)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            speed_mean = speed_sum / speed_count
+            deviation = np.where(has_speed, speed - speed_mean[codes], 0.0)
+            squared = np.add.reduceat(deviation ** 2, offsets)
+            speed_std = np.where(speed_count > 1, np.sqrt(squared / (speed_count - 1)), 0.0)
+        
+        no_speed = speed_count == 0
+        stats = {
+            'avg_speed': speed_mean,
+            'max_speed': speed_max,
+            'min_speed': speed_min,
+            'std_speed': speed_std,
+        }
+        return {
+            name: np.where(no_speed, np.nan, np.round(values, 2))[valid]
+            for name, values in stats.items()
+        }
 
-    def save_trajectories_to_table(self, trajectories: List[Dict], table_name: str) -> Tuple[int, Dict]:
+    def save_trajectories_to_table(self, trajectories: Union[List[Dict], gpd.GeoDataFrame],
+                                   table_name: str) -> Tuple[int, Dict]:
         """高效批量保存轨迹数据到数据库表
         
         Args:
-            trajectories: 轨迹数据列表
+            trajectories: 轨迹数据列表，或build_trajectories_columnar返回的GeoDataFrame
             table_name: 目标表名
             
         Returns:
@@ -706,7 +1493,7 @@ class HighPerformancePolygonTrajectoryQuery:
             'batch_count': 0
         }
         
-        if not trajectories:
+        if len(trajectories) == 0:
             logger.warning("没有轨迹数据需要保存")
             return 0, save_stats
         
@@ -726,18 +1513,21 @@ class HighPerformancePolygonTrajectoryQuery:
                 
                 logger.info(f"保存第 {batch_num} 批: {len(batch)} 条轨迹")
                 
-                # 准备GeoDataFrame数据
-                gdf_data = []
-                geometries = []
-                
-                for traj in batch:
-                    # 分离几何和属性数据
-                    row = {k: v for k, v in traj.items() if k != 'geometry'}
-                    gdf_data.append(row)
-                    geometries.append(traj['geometry'])
-                
-                # 创建GeoDataFrame
-                gdf = gpd.GeoDataFrame(gdf_data, geometry=geometries, crs=4326)
+                if isinstance(batch, gpd.GeoDataFrame):
+                    gdf = batch.reset_index(drop=True)
+                else:
+                    # 准备GeoDataFrame数据
+                    gdf_data = []
+                    geometries = []
+                    
+                    for traj in batch:
+                        # 分离几何和属性数据
+                        row = {k: v for k, v in traj.items() if k != 'geometry'}
+                        gdf_data.append(row)
+                        geometries.append(traj['geometry'])
+                    
+                    # 创建GeoDataFrame
+                    gdf = gpd.GeoDataFrame(gdf_data, geometry=geometries, crs=4326)
                 
                 # 强制转换event_id为整数类型，避免浮点数格式问题
                 if 'event_id' in gdf.columns:
@@ -923,7 +1713,12 @@ class HighPerformancePolygonTrajectoryQuery:
             'config': {
                 'batch_threshold': self.config.batch_threshold,
                 'chunk_size': self.config.chunk_size,
+                'max_concurrent_chunks': self.config.max_concurrent_chunks,
                 'limit_per_polygon': self.config.limit_per_polygon,
+                'enable_adaptive_tiling': self.config.enable_adaptive_tiling,
+                'fields': self.config.fields,
+                'start_ts': self.config.start_ts,
+                'end_ts': self.config.end_ts,
                 'batch_insert_size': self.config.batch_insert_size
             }
         }
@@ -959,10 +1754,10 @@ class HighPerformancePolygonTrajectoryQuery:
             
             # 阶段3: 构建轨迹
             logger.info(f"🔧 阶段3: 构建轨迹线和统计信息")
-            trajectories, build_stats = self.build_trajectories_from_points(points_df)
+            trajectories, build_stats = self.build_trajectories_columnar(points_df)
             complete_stats['build_stats'] = build_stats
             
-            if not trajectories:
+            if trajectories.empty:
                 logger.warning("⚠️ 未构建到任何轨迹")
                 complete_stats['warning'] = "No trajectories built"
                 return complete_stats
@@ -1008,45 +1803,111 @@ class HighPerformancePolygonTrajectoryQuery:
             logger.error(f"❌ 工作流执行失败: {str(e)}")
             return complete_stats
 
-def export_trajectories_to_geojson(trajectories: List[Dict], output_file: str) -> bool:
+def _join_polygon_ids(polygon_ids) -> Optional[str]:
+    """polygon_ids列表转换为逗号分隔字符串"""
+    if polygon_ids is None:
+        return None
+    return ','.join(str(item) for item in polygon_ids)
+
+def iter_trajectory_features(trajectories: Union[List[Dict], gpd.GeoDataFrame]):
+    """逐条生成轨迹要素(properties, geometry)，polygon_ids转换为逗号分隔字符串
+    
+    Args:
+        trajectories: 轨迹数据列表，或build_trajectories_columnar返回的GeoDataFrame
+        
+    Yields:
+        (属性字典, 几何)元组
+    """
+    if isinstance(trajectories, gpd.GeoDataFrame):
+        geometry_column = trajectories.geometry.name
+        columns = [col for col in trajectories.columns if col != geometry_column]
+        geometries = trajectories.geometry.values
+        # 按列取值后逐行拼装，避免iterrows的逐行Series构造开销
+        values = [trajectories[col].tolist() for col in columns]
+        for i in range(len(trajectories)):
+            row = {col: values[j][i] for j, col in enumerate(columns)}
+            if 'polygon_ids' in row:
+                row['polygon_ids'] = _join_polygon_ids(row['polygon_ids'])
+            yield row, geometries[i]
+    else:
+        for traj in trajectories:
+            row = {k: v for k, v in traj.items() if k != 'geometry'}
+            if 'polygon_ids' in row:
+                row['polygon_ids'] = _join_polygon_ids(row['polygon_ids'])
+            yield row, traj['geometry']
+
+def trajectory_properties_schema(trajectories: Union[List[Dict], gpd.GeoDataFrame]):
+    """按全部轨迹推断GeoParquet导出的属性schema（与iter_trajectory_features的属性一致）
+    
+    列表输入中只有部分轨迹才有的字段（如速度统计）同样包含在内。
+    """
+    if isinstance(trajectories, gpd.GeoDataFrame):
+        geometry_column = trajectories.geometry.name
+        columns = {col: trajectories[col] for col in trajectories.columns if col != geometry_column}
+    else:
+        names = dict.fromkeys(key for traj in trajectories for key in traj if key != 'geometry')
+        columns = {name: [traj.get(name) for traj in trajectories] for name in names}
+    if 'polygon_ids' in columns:
+        columns['polygon_ids'] = [_join_polygon_ids(ids) for ids in columns['polygon_ids']]
+    return properties_schema(columns)
+
+def export_trajectories_to_geojson(trajectories: Union[List[Dict], gpd.GeoDataFrame], output_file: str) -> bool:
     """导出轨迹数据到GeoJSON文件
     
+    逐条流式写出要素，内存占用与轨迹数量无关。
+    输出路径以.parquet/.geoparquet结尾时改为导出GeoParquet。
+    
     Args:
-        trajectories: 轨迹数据列表
+        trajectories: 轨迹数据列表，或build_trajectories_columnar返回的GeoDataFrame
         output_file: 输出文件路径
         
     Returns:
         导出是否成功
     """
-    if not trajectories:
+    if len(trajectories) == 0:
         logger.warning("没有轨迹数据需要导出")
         return False
     
+    if is_geoparquet_path(output_file):
+        return export_trajectories_to_geoparquet(trajectories, output_file)
+    
     try:
-        # 准备GeoDataFrame数据
-        gdf_data = []
-        geometries = []
+        with StreamingGeoJSONWriter(output_file) as writer:
+            count = writer.write_features(iter_trajectory_features(trajectories))
         
-        for traj in trajectories:
-            # 分离几何和属性数据
-            row = {k: v for k, v in traj.items() if k != 'geometry'}
-            # 转换polygon_ids为字符串
-            if 'polygon_ids' in row:
-                row['polygon_ids'] = ','.join(row['polygon_ids'])
-            gdf_data.append(row)
-            geometries.append(traj['geometry'])
+        logger.info(f"成功导出 {count} 条轨迹到文件: {output_file}")
+        return True
         
-        # 创建GeoDataFrame
-        gdf = gpd.GeoDataFrame(gdf_data, geometry=geometries, crs=4326)
+    except Exception as e:
+        logger.error(f"导出轨迹数据失败: {str(e)}")
+        return False
+
+def export_trajectories_to_geoparquet(trajectories: Union[List[Dict], gpd.GeoDataFrame], 
+                                      output_file: str, row_group_size: int = 10000) -> bool:
+    """导出轨迹数据到GeoParquet文件（WKB几何，按行组写出）
+    
+    Args:
+        trajectories: 轨迹数据列表，或build_trajectories_columnar返回的GeoDataFrame
+        output_file: 输出文件路径
+        row_group_size: 行组大小
         
-        # 导出到GeoJSON
-        gdf.to_file(output_file, driver='GeoJSON', encoding='utf-8')
+    Returns:
+        导出是否成功
+    """
+    if len(trajectories) == 0:
+        logger.warning("没有轨迹数据需要导出")
+        return False
+    
+    try:
+        schema = trajectory_properties_schema(trajectories)
+        with GeoParquetWriter(output_file, row_group_size=row_group_size, schema=schema) as writer:
+            count = writer.write_features(iter_trajectory_features(trajectories))
         
-        logger.info(f"成功导出 {len(gdf)} 条轨迹到文件: {output_file}")
+        logger.info(f"成功导出 {count} 条轨迹到GeoParquet文件: {output_file}")
         return True
         
     except Exception as e:
-        logger.error(f"导出轨迹数据失败: {str(e)}")
+        logger.error(f"导出GeoParquet失败: {str(e)}")
         return False
 
 # 便捷函数（保持向后兼容）
@@ -1095,7 +1956,8 @@ def main():
         description='高性能Polygon轨迹查询模块 - 批量查找与polygon相交的轨迹数据',
         epilog="""
 高性能特性:
-  • 智能批量查询策略：≤50个polygon使用UNION ALL，>50个polygon使用分块查询
+  • 智能批量查询策略：≤50个polygon使用UNION ALL，>50个polygon使用分块并发查询
+  • 自适应切片：大polygon按网格切片，命中点数上限的切片继续四分，结果按polygon去重
   • 优化的数据库写入：批量插入，事务保护，多重索引
   • 详细的性能统计：查询时间、构建时间、处理速度等
 
@@ -1114,6 +1976,10 @@ def main():
   # 调整轨迹点限制和统计选项
   python -m spdatalab.dataset.polygon_trajectory_query --input polygons.geojson \\
     --table my_trajectories --limit 20000 --no-speed-stats --verbose
+  
+  # 大范围/高密度polygon：自适应切片，避免点数限制截断
+  python -m spdatalab.dataset.polygon_trajectory_query --input polygons.geojson \\
+    --table my_trajectories --adaptive-tiling --tile-size 1000
         """,
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
@@ -1121,13 +1987,15 @@ def main():
     # 基本参数
     parser.add_argument('--input', required=True, help='输入GeoJSON文件路径')
     parser.add_argument('--table', help='输出数据库表名（可选）')
-    parser.add_argument('--output', help='输出GeoJSON文件路径（可选）')
+    parser.add_argument('--output', help='输出GeoJSON文件路径（可选，.parquet/.geoparquet后缀导出GeoParquet）')
     
     # 性能优化参数
     parser.add_argument('--batch-threshold', type=int, default=50, 
                        help='批量查询vs分块查询的阈值 (默认: 50)')
     parser.add_argument('--chunk-size', type=int, default=20,
                        help='分块查询的块大小 (默认: 20)')
+    parser.add_argument('--max-concurrent-chunks', type=int, default=4,
+                       help='分块查询的并发数，即同时占用的Hive连接数 (默认: 4)')
     parser.add_argument('--limit', type=int, default=10000, 
                        help='每个polygon的轨迹点限制数量 (默认: 10000)')
     parser.add_argument('--batch-insert', type=int, default=1000,
@@ -1135,6 +2003,23 @@ def main():
     parser.add_argument('--timeout', type=int, default=300,
                        help='查询超时时间（秒）(默认: 300)')
     
+    parser.add_argument('--fields', nargs='+', choices=list(POINT_FIELD_EXPRESSIONS),
+                       help='查询字段投影 (默认: 除point_lla外的全部字段；dataset_name/timestamp/经纬度总是保留)')
+    parser.add_argument('--start-ts', type=int, help='时间窗口起点timestamp（含）')
+    parser.add_argument('--end-ts', type=int, help='时间窗口终点timestamp（含）')
+    parser.add_argument('--cache', action='store_true',
+                       help='启用按polygon的查询结果缓存（Parquet）')
+    parser.add_argument('--cache-dir', default=DEFAULT_CACHE_DIR,
+                       help=f'查询结果缓存目录 (默认: {DEFAULT_CACHE_DIR})')
+    parser.add_argument('--cache-ttl-hours', type=float, default=168.0,
+                       help='查询结果缓存有效期（小时）(默认: 168)')
+    parser.add_argument('--refine-mode', choices=['auto', 'always', 'never'], default='auto',
+                       help='复杂polygon的客户端精确过滤模式 (默认: auto，按顶点数/内环自动选择)')
+    parser.add_argument('--adaptive-tiling', action='store_true',
+                       help='启用自适应切片查询，避免每polygon点数限制导致的截断')
+    parser.add_argument('--tile-size', type=float, default=2000.0,
+                       help='自适应切片的初始边长（米）(默认: 2000)')
+    
     # 功能选项
     parser.add_argument('--min-points', type=int, default=2,
                        help='构建轨迹的最小点数 (默认: 2)')
@@ -1142,6 +2027,7 @@ def main():
                        help='禁用速度统计计算')
     parser.add_argument('--no-avp-stats', action='store_true',
                        help='禁用AVP统计计算')
+    add_simplification_arguments(parser)
     
     # 其他参数
     parser.add_argument('--verbose', '-v', action='store_true', help='详细日志')
@@ -1169,18 +2055,41 @@ def main():
         config = PolygonTrajectoryConfig(
             batch_threshold=args.batch_threshold,
             chunk_size=args.chunk_size,
+            max_concurrent_chunks=args.max_concurrent_chunks,
             limit_per_polygon=args.limit,
+            query_timeout=args.timeout,
+            fields=args.fields,
+            start_ts=args.start_ts,
+            end_ts=args.end_ts,
+            enable_result_cache=args.cache,
+            cache_dir=args.cache_dir,
+            cache_ttl_hours=args.cache_ttl_hours,
+            client_refine_mode=args.refine_mode,
+            enable_adaptive_tiling=args.adaptive_tiling,
+            tile_size_m=args.tile_size,
             batch_insert_size=args.batch_insert,
             min_points_per_trajectory=args.min_points,
             enable_speed_stats=not args.no_speed_stats,
-            enable_avp_stats=not args.no_avp_stats
+            enable_avp_stats=not args.no_avp_stats,
+            simplification=simplification_from_args(args.simplify_tolerance, args.max_points)
         )
         
         # 输出配置信息
         logger.info("🔧 配置参数:")
         logger.info(f"   • 批量查询阈值: {config.batch_threshold}")
         logger.info(f"   • 分块大小: {config.chunk_size}")
+        logger.info(f"   • 分块并发数: {config.max_concurrent_chunks}")
+        logger.info(f"   • 分块查询超时: {config.query_timeout}s")
         logger.info(f"   • 每polygon轨迹点限制: {config.limit_per_polygon:,}")
+        logger.info(f"   • 客户端精确过滤: {config.client_refine_mode}")
+        logger.info(f"   • 结果缓存: {'启用 (' + config.cache_dir + ')' if config.enable_result_cache else '禁用'}")
+        if config.fields:
+            logger.info(f"   • 查询字段: {resolve_point_fields(config.fields)}")
+        if config.start_ts is not None or config.end_ts is not None:
+            logger.info(f"   • 时间窗口: [{config.start_ts}, {config.end_ts}]")
+        if config.simplification is not None:
+            logger.info(f"   • 轨迹几何简化: 容差 {args.simplify_tolerance}m, 最多 {args.max_points} 点")
+        logger.info(f"   • 自适应切片: {'启用' if config.enable_adaptive_tiling else '禁用'}")
         logger.info(f"   • 批量插入大小: {config.batch_insert_size}")
         logger.info(f"   • 最小轨迹点数: {config.min_points_per_trajectory}")
         logger.info(f"   • 速度统计: {'启用' if config.enable_speed_stats else '禁用'}")
@@ -28,18 +28,25 @@ import time
 import ast
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional, Tuple, Union
+from typing import Iterable, Iterator, List, Dict, Optional, Set, Tuple, Union
 from dataclasses import dataclass
 import warnings
 import concurrent.futures
 from itertools import islice
 import gc
 
+import numpy as np
 import pandas as pd
 import geopandas as gpd
 from shapely.geometry import LineString, MultiLineString, Point
 from sqlalchemy import text, create_engine
+from spdatalab.common.geo_writer import is_geoparquet_path, write_features
 from spdatalab.common.io_hive import hive_cursor
+from spdatalab.dataset.polygon_trajectory_query import (
+    build_point_select_clause,
+    build_time_window_filter,
+    resolve_point_fields
+)
 
 # 抑制警告
 warnings.filterwarnings('ignore', category=UserWarning)
@@ -51,6 +58,20 @@ POINT_TABLE = "public.ddi_data_points"
 # 日志配置
 logger = logging.getLogger(__name__)
 
+# 轨迹导出属性及类型（与_iter_trajectory_features一致，GeoParquet导出使用）
+TRAJECTORY_EXPORT_FIELDS = [
+    ('task_name', 'string'),
+    ('annotator', 'string'),
+    ('scene_id', 'string'),
+    ('dataset_name', 'string'),
+    ('segment_count', 'int64'),
+    ('merged_results', 'string'),
+    ('total_duration', 'double'),
+    ('start_time', 'int64'),
+    ('end_time', 'int64'),
+    ('total_points', 'int64'),
+]
+
 @dataclass
 class QualityCheckRecord:
     """质检记录数据结构"""
@@ -83,7 +104,8 @@ class QualityCheckConfig:
     point_table: str = POINT_TABLE
     
     # Excel处理配置
-    excel_batch_size: int = 2000
+    excel_batch_size: Optional[int] = None  # 流式产出的记录块大小，默认等于large_data_threshold
+    excel_workers: int = 4  # Excel并行解析进程数（1为当前进程顺序解析）
     required_columns: List[str] = None
     filter_invalid_records: bool = True  # 过滤无result和other_scenario的记录
     
@@ -99,16 +121,19 @@ class QualityCheckConfig:
     
     # 批量处理配置
     scene_id_batch_size: int = 200  # 增大批量大小
-    trajectory_batch_size: int = 100  # 增大批量大小
+    trajectory_batch_size: int = 100  # 每条批量轨迹查询包含的数据集数量
     batch_insert_size: int = 2000  # 增大插入批量
     
     # 查询优化配置
     query_timeout: int = 300
     cache_scene_mappings: bool = True
+    point_fields: Optional[List[str]] = None  # 轨迹点查询字段投影，None为默认字段
+    start_ts: Optional[int] = None  # 轨迹点时间窗口起点（含）
+    end_ts: Optional[int] = None  # 轨迹点时间窗口终点（含）
     
     # 并行处理配置
     max_workers: int = 4  # 最大并行工作线程数
-    enable_parallel_trajectory_query: bool = True  # 启用并行轨迹查询
+    enable_parallel_trajectory_query: bool = True  # 启用并行轨迹查询（批量查询各批并发）
     enable_parallel_processing: bool = True  # 启用并行记录处理
     memory_optimization: bool = True  # 启用内存优化
     
@@ -123,9 +148,40 @@ class QualityCheckConfig:
                 'task_name', 'annotator', 'autoscene_id', 
                 'result', 'description', 'other_scenario'
             ]
+        if self.point_fields is None:
+            self.point_fields = ['twist_linear', 'avp_flag', 'workstage']
+        # 记录块不小于大数据阈值，整块记录才会进入大数据分块处理
+        if self.excel_batch_size is None:
+            self.excel_batch_size = self.large_data_threshold
+
+# 中文字符，包含中文的字符串无需编码修复
+_CJK_PATTERN = '[\u4e00-\u9fff]'
+
+# 仅由带引号字符串组成的列表字面量，如 ['a', "b"]
+_QUOTED_ITEM = r"'[^'\\]*'" + r'|"[^"\\]*"'
+_QUOTED_ITEM_GROUPS = r"'([^'\\]*)'" + r'|"([^"\\]*)"'
+_QUOTED_LIST_PATTERN = rf"\[\s*(?:(?:{_QUOTED_ITEM})\s*(?:,\s*(?:{_QUOTED_ITEM})\s*)*,?\s*)?\]"
+
+# 由数值对组成的嵌套列表，如 "[[1.5, 3], [10, 12.5]]"
+_NUMBER = r"[-+]?(?:\d+\.?\d*|\.\d+)(?:[eE][-+]?\d+)?"
+_NUMBER_PAIR = rf"\[\s*{_NUMBER}\s*,\s*{_NUMBER}\s*\]"
+_NUMBER_PAIR_GROUPS = rf"\[\s*({_NUMBER})\s*,\s*({_NUMBER})\s*\]"
+_NUMBER_PAIR_LIST_PATTERN = rf"\[\s*(?:{_NUMBER_PAIR}\s*(?:,\s*{_NUMBER_PAIR}\s*)*,?\s*)?\]"
+
+
+def _load_excel_file_worker(file_path: str, config: 'QualityCheckConfig') -> List['QualityCheckRecord']:
+    """子进程中解析单个Excel文件（ProcessPoolExecutor需要模块级函数）"""
+    return ExcelDataParser(config).load_excel_data(file_path)
+
 
 class ExcelDataParser:
-    """Excel数据解析器"""
+    """Excel数据解析器
+    
+    多个工作簿由进程池并行解析，记录按块流式产出（iter_record_chunks）；
+    单个工作簿内的清洗、过滤和字段解析按列向量化处理。
+    每个工作簿仍整表读取（只读必需列），分块只作用于解析后的记录和下游处理，
+    单个工作簿的峰值内存与其行数成正比。
+    """
     
     def __init__(self, config: QualityCheckConfig):
         self.config = config
@@ -137,29 +193,70 @@ class ExcelDataParser:
             file_paths: Excel文件路径列表
             
         Returns:
-            质检记录列表
+            质检记录列表（按文件解析完成顺序）
         """
         all_records = []
+        for chunk in self.iter_record_chunks(file_paths):
+            all_records.extend(chunk)
+        
+        logger.info(f"✅ 批量加载完成: 总计 {len(all_records)} 条有效记录")
+        return all_records
+    
+    def iter_record_chunks(self, 
+                           file_paths: List[str], 
+                           chunk_size: Optional[int] = None) -> Iterator[List[QualityCheckRecord]]:
+        """并行解析Excel文件并按块产出记录
+        
+        每个工作簿在独立进程中解析，先完成的文件先产出，下游处理无需等待全部文件解析完成。
+        工作簿本身整表读取并解析为记录后才切块，分块不降低单个工作簿的读取内存。
+        单个文件失败只记录日志并跳过。
+        
+        Args:
+            file_paths: Excel文件路径列表
+            chunk_size: 每块记录数，默认使用config.excel_batch_size
+            
+        Yields:
+            质检记录块
+        """
+        chunk_size = max(1, chunk_size or self.config.excel_batch_size)
         total_files = len(file_paths)
+        workers = min(max(1, self.config.excel_workers), total_files)
         
-        logger.info(f"📖 开始批量加载 {total_files} 个Excel文件")
+        logger.info(f"📖 开始批量加载 {total_files} 个Excel文件（{workers} 个解析进程）")
         
-        for i, file_path in enumerate(file_paths, 1):
-            try:
+        def split(records):
+            for start in range(0, len(records), chunk_size):
+                yield records[start:start + chunk_size]
+        
+        if workers <= 1:
+            for i, file_path in enumerate(file_paths, 1):
                 logger.info(f"📊 处理文件 {i}/{total_files}: {Path(file_path).name}")
-                records = self.load_excel_data(file_path)
-                all_records.extend(records)
+                try:
+                    records = self.load_excel_data(file_path)
+                except Exception as e:
+                    logger.error(f"❌ 文件处理失败 {file_path}: {str(e)}")
+                    continue
+                yield from split(records)
                 
                 # 内存优化：定期清理
                 if self.config.memory_optimization and i % 5 == 0:
                     gc.collect()
-                    
-            except Exception as e:
-                logger.error(f"❌ 文件处理失败 {file_path}: {str(e)}")
-                continue
+            return
         
-        logger.info(f"✅ 批量加载完成: 总计 {len(all_records)} 条有效记录")
-        return all_records
+        with concurrent.futures.ProcessPoolExecutor(max_workers=workers) as executor:
+            future_to_path = {
+                executor.submit(_load_excel_file_worker, file_path, self.config): file_path
+                for file_path in file_paths
+            }
+            for done, future in enumerate(concurrent.futures.as_completed(future_to_path), 1):
+                file_path = future_to_path[future]
+                try:
+                    records = future.result()
+                except Exception as e:
+                    logger.error(f"❌ 文件处理失败 {file_path}: {str(e)}")
+                    continue
+                logger.info(f"📊 文件解析完成 {done}/{total_files}: {Path(file_path).name}, {len(records)} 条记录")
+                yield from split(records)
     
     def load_excel_data(self, file_path: str) -> List[QualityCheckRecord]:
         """加载并解析Excel文件
@@ -173,8 +270,9 @@ class ExcelDataParser:
         try:
             logger.info(f"📖 加载Excel文件: {Path(file_path).name}")
             
-            # 读取Excel文件（指定编码）
-            df = pd.read_excel(file_path, engine='openpyxl')
+            # 只读取需要的列（openpyxl引擎以只读模式打开工作簿）
+            required = set(self.config.required_columns)
+            df = pd.read_excel(file_path, engine='openpyxl', usecols=lambda col: col in required)
             logger.info(f"📊 原始数据: {len(df)} 行, {len(df.columns)} 列")
             
             # 检查必需列
@@ -191,15 +289,7 @@ class ExcelDataParser:
                 logger.info(f"📋 过滤后有效数据: {len(df)} 行")
             
             # 转换为QualityCheckRecord列表
-            records = []
-            for index, row in df.iterrows():
-                try:
-                    record = self._parse_record(row)
-                    if record:
-                        records.append(record)
-                except Exception as e:
-                    logger.warning(f"解析第 {index+1} 行数据失败: {str(e)}")
-                    continue
+            records = self._parse_records(df)
             
             logger.info(f"✅ 解析完成: {len(records)} 条有效质检记录")
             return records
@@ -220,7 +310,7 @@ class ExcelDataParser:
                 # 确保字符串编码正确
                 df[col] = df[col].astype(str).str.strip()
                 # 处理编码问题：如果存在编码错误，尝试修复
-                df[col] = df[col].apply(self._fix_encoding)
+                df[col] = self._fix_encoding_series(df[col])
                 df[col] = df[col].replace(['nan', 'None', ''], None)
         
         # 处理description字段
@@ -230,6 +320,17 @@ class ExcelDataParser:
         
         return df
     
+    def _fix_encoding_series(self, series: pd.Series) -> pd.Series:
+        """按列修复编码：纯ASCII或含中文的值保持不变，只对其余值逐个调用_fix_encoding"""
+        text = series.astype(str)
+        needs_fix = series.notna() & ~text.str.isascii() & ~text.str.contains(_CJK_PATTERN, regex=True)
+        if not needs_fix.any():
+            return series
+        
+        series = series.copy()
+        series.loc[needs_fix] = series.loc[needs_fix].map(self._fix_encoding)
+        return series
+    
     def _filter_valid_records(self, df: pd.DataFrame) -> pd.DataFrame:
         """过滤有效记录：至少有result或other_scenario的数据，且排除result为'good'的记录"""
         # 检查result字段是否有效
@@ -281,8 +382,11 @@ class ExcelDataParser:
             
             return False
         
-        # 过滤掉result为good的记录
-        good_mask = df['result'].apply(is_good_result)
+        # 过滤掉result为good的记录（只对包含good的值做完整判断）
+        good_mask = pd.Series(False, index=df.index)
+        candidates = df['result'].astype(str).str.contains('good', case=False, regex=False) & df['result'].notna()
+        if candidates.any():
+            good_mask.loc[candidates] = df.loc[candidates, 'result'].map(is_good_result).astype(bool)
         
         # 最终过滤条件：有效记录 且 不是good结果
         final_mask = valid_mask & ~good_mask
@@ -334,6 +438,111 @@ class ExcelDataParser:
         except Exception as e:
             return str(text)
     
+    def _parse_records(self, df: pd.DataFrame) -> List[QualityCheckRecord]:
+        """按列解析DataFrame为质检记录列表（与逐行_parse_record结果一致）"""
+        if df.empty:
+            return []
+        
+        # 基础字段缺失的行与_parse_record一样跳过
+        base_cols = ['task_name', 'annotator', 'autoscene_id']
+        valid = df[base_cols].notna().all(axis=1)
+        for col in base_cols:
+            valid &= df[col].map(lambda value: isinstance(value, str))
+        df = df[valid]
+        autoscene_ids = df['autoscene_id'].str.strip()
+        df = df[autoscene_ids != '']
+        if df.empty:
+            return []
+        
+        task_names = df['task_name'].str.strip().tolist()
+        annotators = df['annotator'].str.strip().tolist()
+        autoscene_ids = df['autoscene_id'].str.strip().tolist()
+        results = self._parse_result_column(df['result'])
+        other_scenarios = self._parse_result_column(df['other_scenario'])
+        descriptions = self._parse_description_column(df['description'])
+        
+        return [
+            QualityCheckRecord(
+                task_name=task_name,
+                annotator=annotator,
+                autoscene_id=autoscene_id,
+                result=result,
+                description=description,
+                other_scenario=other_scenario
+            )
+            for task_name, annotator, autoscene_id, result, description, other_scenario in zip(
+                task_names, annotators, autoscene_ids, results, descriptions, other_scenarios
+            )
+        ]
+    
+    def _parse_result_column(self, series: pd.Series) -> List[List[str]]:
+        """按列解析result/other_scenario字段
+        
+        普通字符串和纯字符串列表字面量用正则整列处理，其余列表字面量回退到_parse_result_field。
+        """
+        parsed = [[] for _ in range(len(series))]
+        text = series.astype(str).str.strip()
+        empty = series.isna() | text.isin(['', 'nan', 'None'])
+        is_list = text.str.startswith('[') & text.str.endswith(']')
+        
+        # 单个字符串
+        scalar_mask = ~empty & ~is_list
+        if scalar_mask.any():
+            values = self._fix_encoding_series(text[scalar_mask].str.strip().str.strip("'\""))
+            positions = np.flatnonzero(scalar_mask.to_numpy())
+            for pos, value in zip(positions, values.tolist()):
+                parsed[pos] = [value]
+        
+        # 只含带引号字符串的列表：正则提取元素
+        simple_list = ~empty & is_list & text.str.fullmatch(_QUOTED_LIST_PATTERN)
+        if simple_list.any():
+            positions = np.flatnonzero(simple_list.to_numpy())
+            for pos, items in zip(positions, text[simple_list].str.findall(_QUOTED_ITEM_GROUPS).tolist()):
+                values = []
+                for single, double in items:
+                    item = (single or double).strip()
+                    if item:
+                        values.append(self._fix_encoding(item.strip("'\"")))
+                parsed[pos] = values
+        
+        # 其他列表字面量
+        other_list = ~empty & is_list & ~simple_list
+        if other_list.any():
+            positions = np.flatnonzero(other_list.to_numpy())
+            for pos, value in zip(positions, series[other_list].tolist()):
+                parsed[pos] = self._parse_result_field(value)
+        
+        return parsed
+    
+    def _parse_description_column(self, series: pd.Series) -> List[List[List[float]]]:
+        """按列解析description时间区间字段
+        
+        数值对嵌套列表用正则整列提取，其余格式回退到_parse_description_field。
+        """
+        parsed = [[] for _ in range(len(series))]
+        text = series.astype(str).str.strip()
+        empty = series.isna() | text.isin(['', 'nan', 'None'])
+        pair_list = ~empty & text.str.fullmatch(_NUMBER_PAIR_LIST_PATTERN)
+        
+        if pair_list.any():
+            pairs = text[pair_list].reset_index(drop=True).str.extractall(_NUMBER_PAIR_GROUPS)
+            if not pairs.empty:
+                starts = pairs[0].astype(float)
+                ends = pairs[1].astype(float)
+                keep = starts < ends  # 验证时间区间有效性
+                positions = np.flatnonzero(pair_list.to_numpy())
+                rows = pairs.index.get_level_values(0)[keep.to_numpy()]
+                for row, start_time, end_time in zip(rows, starts[keep].tolist(), ends[keep].tolist()):
+                    parsed[positions[row]].append([start_time, end_time])
+        
+        fallback = ~empty & ~pair_list
+        if fallback.any():
+            positions = np.flatnonzero(fallback.to_numpy())
+            for pos, value in zip(positions, series[fallback].tolist()):
+                parsed[pos] = self._parse_description_field(value)
+        
+        return parsed
+    
     def _parse_record(self, row: pd.Series) -> Optional[QualityCheckRecord]:
         """解析单条记录"""
         try:
@@ -632,18 +841,18 @@ class TrajectorySegmenter:
         logger.debug(f"🔍 开始查询轨迹数据: {dataset_name}")
         
         try:
+            # 分段只依赖时间和坐标，其余字段按配置投影
+            fields = resolve_point_fields(
+                self.config.point_fields, required=['timestamp', 'longitude', 'latitude']
+            )
             sql = f"""
                 SELECT 
-                    timestamp,
-                    ST_X(point_lla) as longitude,
-                    ST_Y(point_lla) as latitude,
-                    twist_linear,
-                    avp_flag,
-                    workstage
+                    {build_point_select_clause(fields)}
                 FROM {self.config.point_table}
                 WHERE dataset_name = %(dataset_name)s
                 AND point_lla IS NOT NULL
                 AND timestamp IS NOT NULL
+                {build_time_window_filter(self.config.start_ts, self.config.end_ts)}
                 ORDER BY timestamp
             """
             
@@ -685,11 +894,123 @@ class TrajectorySegmenter:
             logger.error(f"   表名: {self.config.point_table}")
             return pd.DataFrame()
     
+    def query_complete_trajectories(self, dataset_names: List[str]) -> Dict[str, pd.DataFrame]:
+        """批量查询多个数据集的完整轨迹（见fetch_trajectory_batches）
+        
+        Returns:
+            {dataset_name: 轨迹点DataFrame}，未查询到数据或所在批次查询失败的数据集不在结果中
+        """
+        trajectories, _ = self.fetch_trajectory_batches(dataset_names)
+        return trajectories
+    
+    def fetch_trajectory_batches(self, dataset_names: List[str]) -> Tuple[Dict[str, pd.DataFrame], Set[str]]:
+        """批量查询多个数据集的完整轨迹，并返回查询成功的数据集
+        
+        按trajectory_batch_size分批，每批一条 ``dataset_name IN (...)`` 查询；
+        启用enable_parallel_trajectory_query时各批并发执行（每批独立连接）。
+        
+        Args:
+            dataset_names: 数据集名称列表（自动去重）
+            
+        Returns:
+            ({dataset_name: 轨迹点DataFrame}, 所在批次查询成功的数据集集合)；
+            查询成功但不在结果中的数据集确实没有轨迹数据，失败批次的数据集不在集合中
+        """
+        unique_names = list(dict.fromkeys(name for name in dataset_names if name))
+        if not unique_names:
+            return {}, set()
+        
+        batch_size = max(1, self.config.trajectory_batch_size)
+        batches = [unique_names[i:i + batch_size] for i in range(0, len(unique_names), batch_size)]
+        logger.info(f"🔍 批量查询轨迹: {len(unique_names)} 个数据集，{len(batches)} 批")
+        
+        if self.config.enable_parallel_trajectory_query and len(batches) > 1:
+            max_workers = min(self.config.max_workers, len(batches))
+            with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+                batch_results = list(executor.map(self._query_trajectory_batch, batches))
+        else:
+            batch_results = [self._query_trajectory_batch(batch) for batch in batches]
+        
+        trajectories = {}
+        queried = set()
+        failed_batches = 0
+        for batch, batch_result in zip(batches, batch_results):
+            if batch_result is None:
+                failed_batches += 1
+                continue
+            trajectories.update(batch_result)
+            queried.update(batch)
+        
+        if failed_batches:
+            logger.warning(f"⚠️ {failed_batches} 批轨迹查询失败，涉及 {len(unique_names) - len(queried)} 个数据集")
+        missing = len(queried) - len(trajectories)
+        if missing:
+            logger.warning(f"⚠️ {missing} 个数据集未查询到轨迹数据")
+        return trajectories, queried
+    
+    def _query_trajectory_batch(self, dataset_names: List[str]) -> Optional[Dict[str, pd.DataFrame]]:
+        """单批多数据集轨迹查询，按dataset_name拆分结果，查询失败返回None"""
+        fields = resolve_point_fields(
+            self.config.point_fields, required=['dataset_name', 'timestamp', 'longitude', 'latitude']
+        )
+        params = {f"ds_{i}": name for i, name in enumerate(dataset_names)}
+        placeholders = ', '.join(f"%({key})s" for key in params)
+        sql = f"""
+            SELECT 
+                {build_point_select_clause(fields)}
+            FROM {self.config.point_table}
+            WHERE dataset_name IN ({placeholders})
+            AND point_lla IS NOT NULL
+            AND timestamp IS NOT NULL
+            {build_time_window_filter(self.config.start_ts, self.config.end_ts)}
+            ORDER BY dataset_name, timestamp
+        """
+        
+        try:
+            with hive_cursor("dataset_gy1") as cur:
+                cur.execute(sql, params)
+                cols = [d[0] for d in cur.description]
+                rows = cur.fetchall()
+        except Exception as e:
+            logger.error(f"❌ 批量查询轨迹失败 ({len(dataset_names)} 个数据集): {str(e)}")
+            return None
+        
+        if not rows:
+            return {}
+        
+        df = pd.DataFrame(rows, columns=cols)
+        logger.debug(f"📋 批量查询结果: {len(df)} 行, {df['dataset_name'].nunique()} 个数据集")
+        return {
+            name: group.reset_index(drop=True)
+            for name, group in df.groupby('dataset_name', sort=False)
+        }
+    
+    def _tolerance_steps(self, total_duration: float) -> np.ndarray:
+        """返回依次尝试的时间容差序列
+        
+        未启用自适应容差时只有基础容差；启用时按0.5s步长递增，最大不超过5秒或轨迹时长的10%。
+        基础容差总是作为第一步，保证短轨迹也至少按基础容差匹配一次。
+        """
+        tolerance = self.config.time_tolerance
+        tolerances = [tolerance]
+        if self.config.adaptive_tolerance:
+            max_tolerance = min(5.0, total_duration * 0.1)
+            tolerance_step = 0.5
+            # 与逐步累加保持一致的浮点取值
+            tolerance += tolerance_step
+            while tolerance <= max_tolerance:
+                tolerances.append(tolerance)
+                tolerance += tolerance_step
+        return np.asarray(tolerances, dtype=float)
+    
     def segment_trajectory_by_time_ranges(self, 
                                         trajectory_df: pd.DataFrame, 
                                         time_ranges: List[List[float]]) -> Tuple[MultiLineString, int]:
         """根据时间区间分段轨迹
         
+        在有序的相对时间数组上用np.searchsorted求每个区间（及每级容差）的切片边界，
+        分段几何直接由坐标数组切片构建，不对整表做布尔掩码。
+        
         Args:
             trajectory_df: 完整轨迹点DataFrame
             time_ranges: 时间区间列表 [[start, end], ...]
@@ -703,25 +1024,34 @@ class TrajectorySegmenter:
             logger.warning("⚠️ 轨迹DataFrame为空，无法进行分段")
             return MultiLineString([]), 0
         
+        timestamps = pd.to_numeric(trajectory_df['timestamp']).to_numpy()
+        longitudes = trajectory_df['longitude'].to_numpy(dtype=float)
+        latitudes = trajectory_df['latitude'].to_numpy(dtype=float)
+        
+        # 查询结果已按时间排序；否则稳定排序后再做二分查找
+        if len(timestamps) > 1 and not (timestamps[1:] >= timestamps[:-1]).all():
+            order = np.argsort(timestamps, kind='stable')
+            timestamps, longitudes, latitudes = timestamps[order], longitudes[order], latitudes[order]
+        
         # 计算相对时间（处理不同的时间戳单位）
-        start_timestamp = trajectory_df['timestamp'].min()
-        end_timestamp = trajectory_df['timestamp'].max()
+        start_timestamp = timestamps[0]
+        end_timestamp = timestamps[-1]
         raw_duration = end_timestamp - start_timestamp
         
         # 自动检测时间戳单位并转换为秒
         timestamp_unit, time_scale = self._detect_timestamp_unit(raw_duration)
         logger.debug(f"📊 检测到时间戳单位: {timestamp_unit} (缩放因子: {time_scale})")
         
-        # 转换为相对时间（秒）
-        trajectory_df = trajectory_df.copy()
-        trajectory_df['relative_time'] = (trajectory_df['timestamp'] - start_timestamp) / time_scale
-        
-        # 重新计算转换后的时长
-        total_duration = trajectory_df['relative_time'].max()
+        relative_time = (timestamps - start_timestamp) / time_scale
+        total_duration = relative_time[-1]
+        valid_coord_mask = ~(np.isnan(longitudes) | np.isnan(latitudes))
         
         logger.debug(f"📊 轨迹时间范围: {start_timestamp} - {end_timestamp}")
         logger.debug(f"📊 转换后时长: {total_duration:.1f}s (原始: {raw_duration} {timestamp_unit})")
         
+        tolerances = self._tolerance_steps(total_duration)
+        min_points = self.config.min_points_per_segment
+        
         segments = []
         valid_segments = 0
         skipped_segments = 0
@@ -741,61 +1071,40 @@ class TrajectorySegmenter:
                 skipped_segments += 1
                 continue
             
-            # 筛选时间区间内的点（支持自适应容差）
-            tolerance = self.config.time_tolerance
-            segment_points = None
+            # 一次二分查找得到所有容差级别下的切片边界
+            lo = np.searchsorted(relative_time, start_time - tolerances, side='left')
+            hi = np.searchsorted(relative_time, end_time + tolerances, side='right')
+            counts = hi - lo
+            sufficient = np.flatnonzero(counts >= min_points)
             
-            # 如果启用自适应容差，逐步增加容差直到找到足够的点
-            if self.config.adaptive_tolerance:
-                max_tolerance = min(5.0, total_duration * 0.1)  # 最大容差不超过5秒或轨迹时长的10%
-                tolerance_step = 0.5
-                
-                while tolerance <= max_tolerance:
-                    mask = (
-                        (trajectory_df['relative_time'] >= start_time - tolerance) &
-                        (trajectory_df['relative_time'] <= end_time + tolerance)
-                    )
-                    
-                    segment_points = trajectory_df[mask]
-                    logger.debug(f"📍 时间区间 [{start_time}, {end_time}]s 容差±{tolerance}s 筛选到 {len(segment_points)} 个点")
-                    
-                    if len(segment_points) >= self.config.min_points_per_segment:
-                        if tolerance > self.config.time_tolerance:
-                            logger.info(f"✅ 自适应容差成功: 使用±{tolerance}s容差找到{len(segment_points)}个点")
-                        break
-                    
-                    tolerance += tolerance_step
+            if len(sufficient) == 0:
+                if len(tolerances) > 1:
+                    logger.warning(f"⚠️ 自适应容差失败: 最大容差±{tolerances[-1]}s仍只有 {counts[-1]} < {min_points} 个点")
                 else:
-                    # 达到最大容差仍不足，记录并跳过
-                    logger.warning(f"⚠️ 自适应容差失败: 最大容差±{max_tolerance}s仍只有 {len(segment_points)} < {self.config.min_points_per_segment} 个点")
-                    skipped_segments += 1
-                    continue
-            else:
-                # 标准容差处理
-                mask = (
-                    (trajectory_df['relative_time'] >= start_time - tolerance) &
-                    (trajectory_df['relative_time'] <= end_time + tolerance)
-                )
-                
-                segment_points = trajectory_df[mask]
-                logger.debug(f"📍 时间区间 [{start_time}, {end_time}]s 筛选到 {len(segment_points)} 个点")
-                
-                if len(segment_points) < self.config.min_points_per_segment:
-                    logger.warning(f"⚠️ 分段点数不足: {len(segment_points)} < {self.config.min_points_per_segment}")
-                    skipped_segments += 1
-                    continue
+                    logger.warning(f"⚠️ 分段点数不足: {counts[-1]} < {min_points}")
+                skipped_segments += 1
+                continue
+            
+            level = sufficient[0]
+            start_idx, end_idx = lo[level], hi[level]
+            if level > 0:
+                logger.info(f"✅ 自适应容差成功: 使用±{tolerances[level]}s容差找到{counts[level]}个点")
+            logger.debug(f"📍 时间区间 [{start_time}, {end_time}]s 容差±{tolerances[level]}s 筛选到 {counts[level]} 个点")
             
             try:
-                coordinates = list(zip(segment_points['longitude'], segment_points['latitude']))
-                
                 # 检查坐标有效性
-                valid_coords = [(lon, lat) for lon, lat in coordinates if pd.notna(lon) and pd.notna(lat)]
-                if len(valid_coords) < self.config.min_points_per_segment:
-                    logger.warning(f"⚠️ 有效坐标不足: {len(valid_coords)} < {self.config.min_points_per_segment}")
+                valid = valid_coord_mask[start_idx:end_idx]
+                if valid.all():
+                    coords = np.column_stack((longitudes[start_idx:end_idx], latitudes[start_idx:end_idx]))
+                else:
+                    coords = np.column_stack((longitudes[start_idx:end_idx][valid], latitudes[start_idx:end_idx][valid]))
+                
+                if len(coords) < min_points:
+                    logger.warning(f"⚠️ 有效坐标不足: {len(coords)} < {min_points}")
                     skipped_segments += 1
                     continue
                 
-                segment_geom = LineString(valid_coords)
+                segment_geom = LineString(coords)
                 
                 # 可选的几何简化
                 if self.config.simplify_geometry:
@@ -806,7 +1115,7 @@ class TrajectorySegmenter:
                 
                 segments.append(segment_geom)
                 valid_segments += 1
-                logger.debug(f"✅ 成功创建分段 {valid_segments}: {start_time}-{end_time}s, {len(segment_points)} 个点")
+                logger.debug(f"✅ 成功创建分段 {valid_segments}: {start_time}-{end_time}s, {counts[level]} 个点")
                 
             except Exception as e:
                 logger.error(f"❌ 创建分段几何失败: {str(e)}")
@@ -959,35 +1268,38 @@ class QualityCheckTrajectoryQuery:
             logger.info("🚀 开始质检轨迹查询工作流（万级数据优化版）")
             logger.info("=" * 60)
             
-            # 阶段1: 解析Excel文件
-            logger.info(f"📖 阶段1: 解析 {len(file_paths)} 个Excel文件")
-            if len(file_paths) == 1:
-                records = self.excel_parser.load_excel_data(file_paths[0])
-            else:
-                records = self.excel_parser.load_multiple_excel_files(file_paths)
+            # 阶段1-3: 流式解析Excel文件，每个记录块解析完成后立即查询场景映射并处理轨迹
+            logger.info(f"📖 阶段1: 解析 {len(file_paths)} 个Excel文件（流式处理）")
+            trajectories = []
+            failed_count = 0
             
-            stats['total_records'] = len(records)
+            for chunk_idx, records in enumerate(self.excel_parser.iter_record_chunks(file_paths), 1):
+                stats['total_records'] += len(records)
+                
+                # 阶段2: 批量查询场景映射
+                logger.info(f"🔍 阶段2: 记录块 {chunk_idx} 查询场景映射信息（{len(records)} 条记录）")
+                autoscene_ids = [record.autoscene_id for record in records]
+                scene_mappings = self.scene_mapper.batch_query_scene_mappings(autoscene_ids)
+                
+                # 阶段3: 高效批量处理轨迹
+                logger.info(f"🔧 阶段3: 记录块 {chunk_idx} 处理 {len(records)} 条轨迹数据")
+                
+                if len(records) >= self.config.large_data_threshold:
+                    logger.info(f"📊 大数据模式：启用分块并行处理（阈值: {self.config.large_data_threshold}）")
+                    chunk_trajectories, chunk_failed = self._process_large_dataset(records, scene_mappings)
+                else:
+                    logger.info(f"📊 标准模式：顺序处理")
+                    chunk_trajectories, chunk_failed = self._process_standard_dataset(records, scene_mappings)
+                
+                trajectories.extend(chunk_trajectories)
+                failed_count += chunk_failed
+                logger.info(f"📊 累计进度: 已解析 {stats['total_records']} 条记录, 成功 {len(trajectories)} 条轨迹")
             
-            if not records:
+            if stats['total_records'] == 0:
                 logger.error("❌ 未解析到任何有效记录")
                 stats['error'] = "No valid records parsed"
                 return stats
             
-            # 阶段2: 批量查询场景映射
-            logger.info(f"🔍 阶段2: 查询场景映射信息")
-            autoscene_ids = [record.autoscene_id for record in records]
-            scene_mappings = self.scene_mapper.batch_query_scene_mappings(autoscene_ids)
-            
-            # 阶段3: 高效批量处理轨迹
-            logger.info(f"🔧 阶段3: 高效处理 {len(records)} 条轨迹数据")
-            
-            if len(records) >= self.config.large_data_threshold:
-                logger.info(f"📊 大数据模式：启用分块并行处理（阈值: {self.config.large_data_threshold}）")
-                trajectories, failed_count = self._process_large_dataset(records, scene_mappings)
-            else:
-                logger.info(f"📊 标准模式：顺序处理")
-                trajectories, failed_count = self._process_standard_dataset(records, scene_mappings)
-            
             stats['valid_trajectories'] = len(trajectories)
             stats['failed_records'] = failed_count
             
@@ -1096,10 +1408,12 @@ class QualityCheckTrajectoryQuery:
         trajectories = []
         failed_count = 0
         
+        trajectory_cache = self._prefetch_trajectories(chunk_records, scene_mappings)
+        
         def process_record_wrapper(record):
             """记录处理包装函数"""
             try:
-                return self._process_single_record(record, scene_mappings)
+                return self._process_single_record(record, scene_mappings, trajectory_cache)
             except Exception as e:
                 logger.debug(f"处理记录失败 {record.autoscene_id}: {str(e)}")
                 return None
@@ -1133,6 +1447,7 @@ class QualityCheckTrajectoryQuery:
         """顺序处理记录块"""
         trajectories = []
         failed_count = 0
+        trajectory_cache = self._prefetch_trajectories(chunk_records, scene_mappings)
         
         for i, record in enumerate(chunk_records, 1):
             try:
@@ -1140,7 +1455,7 @@ class QualityCheckTrajectoryQuery:
                 if i % self.config.progress_report_interval == 0:
                     logger.info(f"📊 块内进度: {i}/{len(chunk_records)} ({i/len(chunk_records)*100:.1f}%)")
                 
-                trajectory = self._process_single_record(record, scene_mappings)
+                trajectory = self._process_single_record(record, scene_mappings, trajectory_cache)
                 if trajectory:
                     trajectories.append(trajectory)
                 else:
@@ -1153,14 +1468,42 @@ class QualityCheckTrajectoryQuery:
         
         return trajectories, failed_count
     
+    def _prefetch_trajectories(self, 
+                              records: List[QualityCheckRecord], 
+                              scene_mappings: Dict[str, Dict]) -> Dict[str, pd.DataFrame]:
+        """按dataset_name分组批量预取记录块涉及的轨迹
+        
+        同一数据集的轨迹只查询一次，由块内所有记录共享（只读）。
+        """
+        dataset_names = []
+        for record in records:
+            scene_info = scene_mappings.get(record.autoscene_id)
+            if scene_info and scene_info.get('dataset_name'):
+                dataset_names.append(scene_info['dataset_name'])
+        
+        if not dataset_names:
+            return {}
+        
+        unique_count = len(set(dataset_names))
+        logger.info(f"📦 预取轨迹: {len(records)} 条记录对应 {unique_count} 个数据集")
+        
+        trajectory_cache, queried = self.trajectory_segmenter.fetch_trajectory_batches(dataset_names)
+        # 查询成功但无数据的数据集记为空结果，避免逐条记录重复查询；
+        # 失败批次的数据集不写入，由逐条记录单独查询
+        for name in queried - set(trajectory_cache):
+            trajectory_cache[name] = pd.DataFrame()
+        return trajectory_cache
+    
     def _process_single_record(self, 
                              record: QualityCheckRecord, 
-                             scene_mappings: Dict[str, Dict]) -> Optional[SegmentedTrajectory]:
+                             scene_mappings: Dict[str, Dict],
+                             trajectory_cache: Optional[Dict[str, pd.DataFrame]] = None) -> Optional[SegmentedTrajectory]:
         """处理单条质检记录
         
         Args:
             record: 质检记录
             scene_mappings: 场景映射字典
+            trajectory_cache: 预取的轨迹 {dataset_name: DataFrame}，未命中时单独查询
             
         Returns:
             分段轨迹对象或None
@@ -1188,8 +1531,11 @@ class QualityCheckTrajectoryQuery:
         logger.debug(f"✅ 获得场景映射: {record.autoscene_id} -> {dataset_name}")
         
         # 查询完整轨迹
-        logger.debug(f"🔍 查询轨迹数据: {dataset_name}")
-        trajectory_df = self.trajectory_segmenter.query_complete_trajectory(dataset_name)
+        if trajectory_cache is not None and dataset_name in trajectory_cache:
+            trajectory_df = trajectory_cache[dataset_name]
+        else:
+            logger.debug(f"🔍 查询轨迹数据: {dataset_name}")
+            trajectory_df = self.trajectory_segmenter.query_complete_trajectory(dataset_name)
         if trajectory_df.empty:
             logger.warning(f"❌ 未查询到轨迹数据: {dataset_name}")
             return None
@@ -1481,60 +1827,64 @@ class QualityCheckTrajectoryQuery:
             logger.error(f"创建质检轨迹表失败: {table_name}, 错误: {str(e)}")
             return False
     
+    @staticmethod
+    def _iter_trajectory_features(trajectories: Iterable[SegmentedTrajectory]):
+        """逐条生成轨迹要素(properties, geometry)"""
+        for traj in trajectories:
+            # 确保字符串字段编码正确
+            try:
+                merged_results_str = ','.join(
+                    result.encode('utf-8', errors='ignore').decode('utf-8') 
+                    if isinstance(result, str) else str(result)
+                    for result in traj.merged_results
+                )
+            except:
+                merged_results_str = ','.join(str(result) for result in traj.merged_results)
+            
+            row = {
+                'task_name': traj.task_name,
+                'annotator': traj.annotator,
+                'scene_id': traj.scene_id,
+                'dataset_name': traj.dataset_name,
+                'segment_count': traj.segment_count,
+                'merged_results': merged_results_str,
+                'total_duration': traj.total_duration,
+                'start_time': traj.start_time,
+                'end_time': traj.end_time,
+                'total_points': traj.total_points
+            }
+            yield row, traj.geometry
+    
     def _export_trajectories_to_geojson(self, 
-                                       trajectories: List[SegmentedTrajectory], 
+                                       trajectories: Iterable[SegmentedTrajectory], 
                                        output_file: str) -> bool:
         """导出轨迹数据到GeoJSON文件
         
+        逐条流式写出，可直接传入轨迹生成器；输出路径以.parquet/.geoparquet结尾时导出GeoParquet。
+        
         Args:
-            trajectories: 轨迹数据列表
+            trajectories: 轨迹数据列表或生成器
             output_file: 输出文件路径
             
         Returns:
             导出是否成功
         """
-        if not trajectories:
+        if isinstance(trajectories, list) and not trajectories:
             logger.warning("没有轨迹数据需要导出")
             return False
         
         try:
-            # 准备GeoDataFrame数据
-            gdf_data = []
-            geometries = []
+            schema = None
+            if is_geoparquet_path(output_file):
+                import pyarrow as pa
+                schema = pa.schema([(name, pa.type_for_alias(alias)) for name, alias in TRAJECTORY_EXPORT_FIELDS])
+            count = write_features(self._iter_trajectory_features(trajectories), output_file, schema=schema)
+            
+            if count == 0:
+                logger.warning("没有轨迹数据需要导出")
+                return False
             
-            for traj in trajectories:
-                # 确保字符串字段编码正确
-                try:
-                    merged_results_str = ','.join(
-                        result.encode('utf-8', errors='ignore').decode('utf-8') 
-                        if isinstance(result, str) else str(result)
-                        for result in traj.merged_results
-                    )
-                except:
-                    merged_results_str = ','.join(str(result) for result in traj.merged_results)
-                
-                row = {
-                    'task_name': traj.task_name,
-                    'annotator': traj.annotator,
-                    'scene_id': traj.scene_id,
-                    'dataset_name': traj.dataset_name,
-                    'segment_count': traj.segment_count,
-                    'merged_results': merged_results_str,
-                    'total_duration': traj.total_duration,
-                    'start_time': traj.start_time,
-                    'end_time': traj.end_time,
-                    'total_points': traj.total_points
-                }
-                gdf_data.append(row)
-                geometries.append(traj.geometry)
-            
-            # 创建GeoDataFrame
-            gdf = gpd.GeoDataFrame(gdf_data, geometry=geometries, crs=4326)
-            
-            # 导出到GeoJSON
-            gdf.to_file(output_file, driver='GeoJSON', encoding='utf-8')
-            
-            logger.info(f"成功导出 {len(gdf)} 条轨迹到文件: {output_file}")
+            logger.info(f"成功导出 {count} 条轨迹到文件: {output_file}")
             return True
             
         except Exception as e:
@@ -1603,7 +1953,7 @@ def main():
     # 基本参数
     parser.add_argument('--input', required=True, nargs='+', help='输入Excel文件路径（支持多个文件）')
     parser.add_argument('--table', help='输出数据库表名（可选）')
-    parser.add_argument('--output', help='输出GeoJSON文件路径（可选）')
+    parser.add_argument('--output', help='输出GeoJSON文件路径（可选，.parquet/.geoparquet后缀导出GeoParquet）')
     
     # 处理配置参数
     parser.add_argument('--batch-size', type=int, default=2000,
@@ -1622,12 +1972,18 @@ def main():
                        help='最大并行工作线程数 (默认: 4)')
     parser.add_argument('--disable-parallel', action='store_true',
                        help='禁用并行处理')
+    parser.add_argument('--excel-workers', type=int, default=4,
+                       help='Excel并行解析进程数 (默认: 4)')
     parser.add_argument('--large-data-threshold', type=int, default=5000,
-                       help='大数据处理阈值 (默认: 5000)')
+                       help='大数据处理阈值，同时作为Excel记录流式分块大小 (默认: 5000)')
     parser.add_argument('--chunk-size', type=int, default=1000,
                        help='分块处理大小 (默认: 1000)')
     parser.add_argument('--disable-filter', action='store_true',
                        help='禁用无效数据过滤')
+    parser.add_argument('--point-fields', nargs='*',
+                       help='轨迹点附加查询字段 (默认: twist_linear avp_flag workstage；时间和经纬度总是查询)')
+    parser.add_argument('--start-ts', type=int, help='轨迹点时间窗口起点timestamp（含）')
+    parser.add_argument('--end-ts', type=int, help='轨迹点时间窗口终点timestamp（含）')
     
     # 其他参数
     parser.add_argument('--verbose', '-v', action='store_true', help='详细日志')
@@ -1661,10 +2017,14 @@ def main():
             simplify_geometry=args.simplify,
             simplify_tolerance=args.simplify_tolerance,
             max_workers=args.max_workers,
+            excel_workers=args.excel_workers,
             enable_parallel_processing=not args.disable_parallel,
             large_data_threshold=args.large_data_threshold,
             chunk_processing_size=args.chunk_size,
-            filter_invalid_records=not args.disable_filter
+            filter_invalid_records=not args.disable_filter,
+            point_fields=args.point_fields,
+            start_ts=args.start_ts,
+            end_ts=args.end_ts
         )
         
         # 输出配置信息
@@ -7,45 +7,127 @@
 - 从数据库查询场景OBS路径
 - 读取parquet格式的图片数据
 - 支持帧过滤和批量加载
+- 批量加载时多场景并发读取，按全局字节预算限制在途图片数据，结果逐场景流式返回
+- 缓存OBS目录列表（带TTL，跨运行复用），批量加载前并发预取
 - 支持多相机类型（架构预留）
 
 作者：spdatalab
 """
 
 import logging
+import time
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, wait
 from dataclasses import dataclass
-from typing import List, Dict, Optional, Tuple
+from typing import List, Dict, Iterator, Optional, Tuple, Union
 from pathlib import Path
+import numpy as np
 import pandas as pd
+import pyarrow as pa
 import pyarrow.parquet as pq
 from PIL import Image
 import io
 
 from spdatalab.common.io_hive import hive_cursor
 from spdatalab.common.file_utils import open_file
+from spdatalab.dataset.obs_listing_cache import (
+    DEFAULT_LISTING_CACHE_DIR,
+    DEFAULT_LISTING_TTL_SECONDS,
+    ObsListingCache,
+    normalize_obs_dir
+)
 
 logger = logging.getLogger(__name__)
 
+DEFAULT_LOAD_WORKERS = 8                        # 批量加载的并发场景数
+DEFAULT_MAX_INFLIGHT_BYTES = 512 * 1024 * 1024  # 批量加载在途图片数据上限（字节）
+FRAME_BYTES_ESTIMATE = 1024 * 1024              # 尚无完成场景时的单帧字节数预估
+
+# 相机parquet的列名候选（适配不同命名方式）
+IMAGE_COLUMNS = ['image', 'img_data', 'image_data', 'data']
+TIMESTAMP_COLUMNS = ['timestamp', 'time', 'ts']
+FILENAME_COLUMNS = ['filename', 'name', 'file']
+
+# 图片格式魔数（只看文件头）
+IMAGE_SIGNATURES = [
+    (b'\x89PNG\r\n\x1a\n', 'png'),
+    (b'\xff\xd8', 'jpeg'),
+    (b'GIF87a', 'gif'),
+    (b'GIF89a', 'gif'),
+    (b'BM', 'bmp'),
+    (b'II*\x00', 'tiff'),
+    (b'MM\x00*', 'tiff'),
+]
+FORMAT_HEADER_BYTES = 1024  # 魔数未命中时交给PIL识别的文件头长度
+
 
 @dataclass
 class ImageFrame:
-    """图片帧数据结构"""
+    """图片帧数据结构
+    
+    image_data可以是bytes，也可以是指向Arrow缓冲区的memoryview（零拷贝），
+    需要bytes或PIL图片时再物化。
+    """
     scene_id: str
     frame_index: int
     timestamp: int
-    image_data: bytes  # PNG/JPEG二进制数据
+    image_data: Union[bytes, memoryview]  # PNG/JPEG二进制数据（或Arrow缓冲区视图）
     image_format: str  # 'png' 或 'jpeg'
     filename: Optional[str] = None  # 原始文件名（可选）
     
+    @property
+    def size_bytes(self) -> int:
+        """图片数据字节数"""
+        return len(self.image_data)
+    
+    def to_bytes(self) -> bytes:
+        """物化为bytes（已是bytes时不复制）"""
+        if isinstance(self.image_data, bytes):
+            return self.image_data
+        return bytes(self.image_data)
+    
     def to_pil_image(self) -> Image.Image:
         """转换为PIL Image对象"""
         return Image.open(io.BytesIO(self.image_data))
     
+    def __getstate__(self) -> Dict:
+        # memoryview无法pickle，跨进程传递时物化为bytes
+        state = self.__dict__.copy()
+        state['image_data'] = self.to_bytes()
+        return state
+    
     def __repr__(self) -> str:
-        size_kb = len(self.image_data) / 1024
+        size_kb = self.size_bytes / 1024
         return f"ImageFrame(scene={self.scene_id}, frame={self.frame_index}, size={size_kb:.1f}KB)"
 
 
+def _binary_views(array: Union[pa.Array, pa.ChunkedArray]) -> List[Optional[memoryview]]:
+    """Arrow二进制列 -> 每行一个指向数据缓冲区的memoryview（零拷贝），空值为None
+    
+    非二进制类型退回to_pylist()。
+    """
+    if isinstance(array, pa.ChunkedArray):
+        return [view for chunk in array.chunks for view in _binary_views(chunk)]
+    
+    if pa.types.is_binary(array.type):
+        offset_dtype = np.int32
+    elif pa.types.is_large_binary(array.type):
+        offset_dtype = np.int64
+    else:
+        return array.to_pylist()
+    
+    _, offsets_buffer, data_buffer = array.buffers()
+    if len(array) == 0:
+        return []
+    offsets = np.frombuffer(offsets_buffer, dtype=offset_dtype)[array.offset:array.offset + len(array) + 1]
+    data = memoryview(data_buffer).cast('B') if data_buffer is not None else memoryview(b'')
+    valid = array.is_valid().to_numpy(zero_copy_only=False) if array.null_count else None
+    
+    return [
+        data[start:end] if valid is None or valid[i] else None
+        for i, (start, end) in enumerate(zip(offsets[:-1].tolist(), offsets[1:].tolist()))
+    ]
+
+
 class SceneImageRetriever:
     """场景图片检索器
     
@@ -53,6 +135,8 @@ class SceneImageRetriever:
     
     Args:
         camera_type: 相机类型，默认 "CAM_FRONT_WIDE_ANGLE"
+        listing_cache_dir: OBS目录列表缓存目录，None表示只在内存中缓存
+        listing_ttl_seconds: 目录列表缓存有效期（秒）
         
     Example:
         >>> retriever = SceneImageRetriever()
@@ -60,8 +144,14 @@ class SceneImageRetriever:
         >>> print(f"加载了 {len(images)} 帧图片")
     """
     
-    def __init__(self, camera_type: str = "CAM_FRONT_WIDE_ANGLE"):
+    def __init__(
+        self,
+        camera_type: str = "CAM_FRONT_WIDE_ANGLE",
+        listing_cache_dir: Optional[str] = DEFAULT_LISTING_CACHE_DIR,
+        listing_ttl_seconds: float = DEFAULT_LISTING_TTL_SECONDS
+    ):
         self.camera_type = camera_type
+        self.listing_cache = ObsListingCache(listing_cache_dir, listing_ttl_seconds)
         logger.info(f"初始化SceneImageRetriever，相机类型: {camera_type}")
     
     def get_scene_obs_paths(self, scene_ids: List[str]) -> pd.DataFrame:
@@ -131,79 +221,201 @@ class SceneImageRetriever:
         
         return camera_dir
     
-    def _list_obs_directory(self, obs_dir: str) -> List[str]:
-        """列出OBS目录中的文件
+    def _list_obs_directory(self, obs_dir: str, persist: bool = True) -> List[str]:
+        """列出OBS目录中的parquet文件（优先使用目录列表缓存）
         
         Args:
             obs_dir: OBS目录路径
+            persist: 列目录结果是否立即保存到缓存文件
             
         Returns:
             文件路径列表
         """
-        try:
-            import moxing as mox
-            from spdatalab.common.io_obs import init_moxing
-            
-            init_moxing()
-            
-            # 列出目录
-            if not obs_dir.endswith('/'):
-                obs_dir += '/'
-            
-            files = mox.file.list_directory(obs_dir, recursive=False)
-            parquet_files = [f for f in files if f.endswith('.parquet')]
-            
-            return [obs_dir + f for f in parquet_files]
+        obs_dir = normalize_obs_dir(obs_dir)
+        files = self.listing_cache.get(obs_dir)
+        
+        if files is None:
+            try:
+                import moxing as mox
+                from spdatalab.common.io_obs import init_moxing
+                
+                init_moxing()
+                
+                # 列出目录
+                files = mox.file.list_directory(obs_dir, recursive=False)
+                self.listing_cache.put(obs_dir, files, persist=persist)
+                
+            except Exception as e:
+                logger.error(f"列出OBS目录失败 {obs_dir}: {e}")
+                return []
+        
+        parquet_files = [f for f in files if f.endswith('.parquet')]
+        return [obs_dir + f for f in parquet_files]
+    
+    def prefetch_listings(
+        self,
+        obs_dirs: List[str],
+        max_workers: int = DEFAULT_LOAD_WORKERS
+    ) -> Dict[str, List[str]]:
+        """并发列出多个OBS目录并写入缓存（已缓存的目录不再访问OBS）
+        
+        Args:
+            obs_dirs: OBS目录路径列表
+            max_workers: 并发数
             
-        except Exception as e:
-            logger.error(f"列出OBS目录失败 {obs_dir}: {e}")
-            return []
+        Returns:
+            字典，键为目录路径，值为parquet文件路径列表
+        """
+        obs_dirs = list(dict.fromkeys(normalize_obs_dir(d) for d in obs_dirs))
+        if not obs_dirs:
+            return {}
+        
+        start_time = time.time()
+        hits_before = self.listing_cache.stats['hits']
+        
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers)),
+                                thread_name_prefix='obs-lister') as executor:
+            listings = dict(zip(
+                obs_dirs,
+                executor.map(lambda obs_dir: self._list_obs_directory(obs_dir, persist=False), obs_dirs)
+            ))
+        self.listing_cache.save()
+        
+        hits = self.listing_cache.stats['hits'] - hits_before
+        logger.info(f"📂 预取 {len(obs_dirs)} 个OBS目录列表（缓存命中 {hits}），"
+                   f"用时 {time.time() - start_time:.2f}s")
+        return listings
+    
+    @staticmethod
+    def _detect_columns(columns: List[str]) -> Tuple[Optional[str], Optional[str], Optional[str]]:
+        """识别图片数据列、时间戳列和文件名列"""
+        def first_match(candidates):
+            return next((col for col in candidates if col in columns), None)
+        return first_match(IMAGE_COLUMNS), first_match(TIMESTAMP_COLUMNS), first_match(FILENAME_COLUMNS)
     
-    def _load_parquet_from_obs(self, obs_path: str) -> Optional[pd.DataFrame]:
-        """从OBS加载parquet文件
+    @staticmethod
+    def _select_positions(
+        n_rows: int,
+        frame_indices: Optional[List[int]] = None,
+        max_frames: Optional[int] = None
+    ) -> np.ndarray:
+        """按帧过滤条件选出（按时间排序后的）帧序号"""
+        if frame_indices is not None:
+            positions = np.asarray(frame_indices, dtype=np.int64).reshape(-1)
+            positions = np.where(positions < 0, positions + n_rows, positions)
+            valid = (positions >= 0) & (positions < n_rows)
+            if not valid.all():
+                logger.warning(f"忽略超出范围的帧索引: {np.asarray(frame_indices)[~valid].tolist()}（共 {n_rows} 帧）")
+            return positions[valid]
+        if max_frames is not None:
+            return np.arange(min(max(int(max_frames), 0), n_rows))
+        return np.arange(n_rows)
+    
+    def _load_parquet_from_obs(
+        self,
+        obs_path: str,
+        frame_indices: Optional[List[int]] = None,
+        max_frames: Optional[int] = None
+    ) -> Optional[pd.DataFrame]:
+        """从OBS加载parquet文件（帧过滤下推到读取）
+        
+        先只读取时间戳和文件名列，按时间排序后选出需要的帧，
+        再通过ParquetFile只读取这些帧所在row group的图片列，逐批解码，取够即停。
         
         Args:
             obs_path: parquet文件的OBS路径
+            frame_indices: 指定要提取的帧索引列表（按时间排序后的序号）
+            max_frames: 最大帧数限制（如果不指定frame_indices）
             
         Returns:
-            DataFrame或None（如果加载失败）
+            选中帧的DataFrame（按时间排序，index为帧序号），或None（如果加载失败）
         """
         try:
             logger.debug(f"读取parquet文件: {obs_path}")
             
-            # 使用open_file读取OBS文件
             with open_file(obs_path, 'rb') as f:
-                # 读取parquet
-                table = pq.read_table(f)
-                df = table.to_pandas()
+                parquet_file = pq.ParquetFile(f)
+                image_col, timestamp_col, filename_col = self._detect_columns(parquet_file.schema_arrow.names)
+                if image_col is None:
+                    logger.error(f"未找到图片数据列，可用列: {parquet_file.schema_arrow.names}")
+                    return None
                 
-            logger.debug(f"成功读取parquet，形状: {df.shape}")
+                # 1. 只读元数据列，确定帧顺序并选帧
+                meta_cols = [col for col in (timestamp_col, filename_col) if col]
+                n_rows = parquet_file.metadata.num_rows
+                meta = (parquet_file.read(columns=meta_cols).to_pandas() if meta_cols
+                        else pd.DataFrame(index=pd.RangeIndex(n_rows)))
+                if timestamp_col:
+                    order = np.argsort(meta[timestamp_col].to_numpy(), kind='stable')
+                else:
+                    order = np.arange(n_rows)
+                positions = self._select_positions(n_rows, frame_indices, max_frames)
+                rows = order[positions]
+                
+                # 2. 按row group读取选中行的图片列
+                images = self._read_rows(parquet_file, image_col, rows)
+            
+            df = meta.iloc[rows].copy() if meta_cols else pd.DataFrame(index=range(len(rows)))
+            df[image_col] = images
+            df.index = pd.Index(positions)
+            
+            image_bytes = sum(len(image) for image in images if image is not None)
+            logger.debug(f"成功读取parquet: {len(rows)}/{n_rows} 帧，图片数据 {image_bytes / 1024:.1f}KB")
             return df
             
         except Exception as e:
             logger.error(f"❌ 读取parquet文件失败 {obs_path}: {e}")
             return None
     
-    def _detect_image_format(self, image_data: bytes) -> str:
-        """检测图片格式
+    @staticmethod
+    def _read_rows(parquet_file: pq.ParquetFile, column: str, rows: np.ndarray) -> List[Optional[memoryview]]:
+        """读取指定行（文件内行号）的单列数据，只解码包含这些行的row group，取够即停"""
+        metadata = parquet_file.metadata
+        group_starts = np.zeros(metadata.num_row_groups + 1, dtype=np.int64)
+        np.cumsum([metadata.row_group(i).num_rows for i in range(metadata.num_row_groups)],
+                  out=group_starts[1:])
+        
+        values: Dict[int, Optional[bytes]] = {}
+        groups = np.searchsorted(group_starts, rows, side='right') - 1
+        for group in np.unique(groups):
+            wanted = np.sort(rows[groups == group]) - group_starts[group]
+            batch_start = 0
+            for batch in parquet_file.iter_batches(batch_size=256, row_groups=[int(group)], columns=[column]):
+                batch_end = batch_start + batch.num_rows
+                in_batch = wanted[(wanted >= batch_start) & (wanted < batch_end)]
+                if len(in_batch):
+                    # take只在Arrow内存中紧凑复制选中行，再按行取视图
+                    taken = _binary_views(batch.column(0).take(pa.array(in_batch - batch_start)))
+                    for local, value in zip(in_batch, taken):
+                        values[int(local + group_starts[group])] = value
+                batch_start = batch_end
+                if batch_start > wanted[-1]:
+                    break
+        
+        return [values.get(int(row)) for row in rows]
+    
+    def _detect_image_format(self, image_data: Union[bytes, memoryview]) -> str:
+        """检测图片格式（只读取文件头）
         
         Args:
-            image_data: 图片二进制数据
+            image_data: 图片二进制数据（bytes或memoryview）
             
         Returns:
-            'png', 'jpeg' 或 'unknown'
+            'png', 'jpeg' 等格式名或 'unknown'
         """
-        if image_data[:8] == b'\x89PNG\r\n\x1a\n':
-            return 'png'
-        elif image_data[:2] == b'\xff\xd8':
-            return 'jpeg'
-        else:
-            # 尝试用PIL检测
-            try:
-                img = Image.open(io.BytesIO(image_data))
-                return img.format.lower() if img.format else 'unknown'
-            except:
-                return 'unknown'
+        header = bytes(image_data[:FORMAT_HEADER_BYTES])
+        for signature, image_format in IMAGE_SIGNATURES:
+            if header.startswith(signature):
+                return image_format
+        if header[:4] == b'RIFF' and header[8:12] == b'WEBP':
+            return 'webp'
+        
+        # 尝试用PIL检测（Image.open只解析文件头）
+        try:
+            img = Image.open(io.BytesIO(header))
+            return img.format.lower() if img.format else 'unknown'
+        except Exception:
+            return 'unknown'
     
     def _parse_parquet_to_frames(
         self, 
@@ -226,32 +438,12 @@ class SceneImageRetriever:
         frames = []
         
         # 检测列名（适配不同命名方式）
-        image_col = None
-        timestamp_col = None
-        filename_col = None
-        
-        # 查找图片数据列
-        for col in ['image', 'img_data', 'image_data', 'data']:
-            if col in df.columns:
-                image_col = col
-                break
+        image_col, timestamp_col, filename_col = self._detect_columns(df.columns.tolist())
         
         if image_col is None:
             logger.error(f"未找到图片数据列，可用列: {df.columns.tolist()}")
             return frames
         
-        # 查找时间戳列
-        for col in ['timestamp', 'time', 'ts']:
-            if col in df.columns:
-                timestamp_col = col
-                break
-        
-        # 查找文件名列
-        for col in ['filename', 'name', 'file']:
-            if col in df.columns:
-                filename_col = col
-                break
-        
         # 按时间戳排序（如果有）
         if timestamp_col:
             df = df.sort_values(by=timestamp_col).reset_index(drop=True)
@@ -264,39 +456,53 @@ class SceneImageRetriever:
             # 限制最大帧数
             df = df.head(max_frames)
         
+        return self._rows_to_frames(df, scene_id, image_col, timestamp_col, filename_col)
+    
+    def _rows_to_frames(
+        self,
+        df: pd.DataFrame,
+        scene_id: str,
+        image_col: str,
+        timestamp_col: Optional[str],
+        filename_col: Optional[str]
+    ) -> List[ImageFrame]:
+        """将已选中的帧（index为帧序号）转换为ImageFrame列表
+        
+        按列取值，图片数据保持原对象（bytes或Arrow缓冲区视图），不逐行复制。
+        """
+        frames = []
+        
+        n_frames = len(df)
+        images = df[image_col].tolist()
+        timestamps = df[timestamp_col].tolist() if timestamp_col else [0] * n_frames
+        filenames = df[filename_col].tolist() if filename_col else [None] * n_frames
+        
         # 解析每一帧
-        for idx, row in df.iterrows():
+        for idx, image_data, timestamp, filename in zip(df.index.tolist(), images, timestamps, filenames):
             try:
-                image_data = row[image_col]
-                
                 # 处理不同的数据类型
                 if isinstance(image_data, bytes):
                     pass  # 已经是bytes
+                elif isinstance(image_data, memoryview):
+                    if image_data.format != 'B':
+                        image_data = image_data.cast('B')
                 elif hasattr(image_data, 'as_py'):
-                    # PyArrow binary类型
+                    # PyArrow binary标量
                     image_data = image_data.as_py()
                 else:
                     logger.warning(f"未知的图片数据类型: {type(image_data)}")
                     continue
                 
-                # 获取时间戳
-                timestamp = int(row[timestamp_col]) if timestamp_col else 0
-                
-                # 获取文件名
-                filename = row[filename_col] if filename_col else None
                 if filename and hasattr(filename, 'as_py'):
                     filename = filename.as_py()
                 
-                # 检测图片格式
-                image_format = self._detect_image_format(image_data)
-                
-                # 创建ImageFrame对象
+                # 创建ImageFrame对象（格式只看文件头）
                 frame = ImageFrame(
                     scene_id=scene_id,
                     frame_index=int(idx),
-                    timestamp=timestamp,
+                    timestamp=int(timestamp),
                     image_data=image_data,
-                    image_format=image_format,
+                    image_format=self._detect_image_format(image_data),
                     filename=filename
                 )
                 
@@ -341,7 +547,27 @@ class SceneImageRetriever:
             return []
         
         scene_obs_path = df_paths.iloc[0]['scene_obs_path']
-        if pd.isna(scene_obs_path) or not scene_obs_path:
+        return self._load_scene_frames(scene_id, scene_obs_path, frame_indices, max_frames)
+    
+    def _load_scene_frames(
+        self,
+        scene_id: str,
+        scene_obs_path: Optional[str],
+        frame_indices: Optional[List[int]] = None,
+        max_frames: Optional[int] = None
+    ) -> List[ImageFrame]:
+        """按已知的场景OBS路径加载图片（列目录、读取parquet、解析帧）
+        
+        Args:
+            scene_id: 场景ID
+            scene_obs_path: 场景OBS根路径
+            frame_indices: 指定要提取的帧索引列表
+            max_frames: 最大帧数限制
+            
+        Returns:
+            ImageFrame对象列表
+        """
+        if scene_obs_path is None or pd.isna(scene_obs_path) or not scene_obs_path:
             logger.error(f"场景 {scene_id} 的scene_obs_path为空")
             return []
         
@@ -358,66 +584,143 @@ class SceneImageRetriever:
         
         logger.info(f"找到 {len(parquet_files)} 个parquet文件")
         
-        # 4. 读取parquet文件（通常只有一个）
+        # 4. 读取parquet文件（通常只有一个），帧过滤在读取时完成
         all_frames = []
         for parquet_file in parquet_files:
-            df = self._load_parquet_from_obs(parquet_file)
+            df = self._load_parquet_from_obs(parquet_file, frame_indices, max_frames)
             if df is not None:
-                frames = self._parse_parquet_to_frames(
-                    df, scene_id, frame_indices, max_frames
-                )
+                image_col, timestamp_col, filename_col = self._detect_columns(df.columns.tolist())
+                frames = self._rows_to_frames(df, scene_id, image_col, timestamp_col, filename_col)
                 all_frames.extend(frames)
         
         logger.info(f"✅ 场景 {scene_id} 共加载 {len(all_frames)} 帧图片")
         return all_frames
     
+    def iter_load_images(
+        self,
+        scene_ids: List[str],
+        frames_per_scene: int = 5,
+        max_workers: int = DEFAULT_LOAD_WORKERS,
+        max_inflight_bytes: Optional[int] = DEFAULT_MAX_INFLIGHT_BYTES
+    ) -> Iterator[Tuple[str, List[ImageFrame]]]:
+        """并发加载多个场景的图片，每完成一个场景立即返回
+        
+        先一次批量查询全部场景的OBS路径并并发预取相机目录列表，
+        再用线程池并发执行读取parquet和解析帧。
+        在途数据按字节预算控制：加载中的场景按已完成场景的平均图片字节数预估占用
+        （尚无完成场景时按每帧1MB），预估总量超过max_inflight_bytes时暂停提交新场景
+        （至少保持一个场景在加载）。
+        
+        Args:
+            scene_ids: 场景ID列表
+            frames_per_scene: 每个场景加载的帧数
+            max_workers: 并发场景数
+            max_inflight_bytes: 在途图片数据上限（字节），None表示不限制
+            
+        Yields:
+            (scene_id, ImageFrame列表)，按完成顺序；未找到路径或加载失败的场景返回空列表
+        """
+        scene_ids = list(dict.fromkeys(scene_ids))
+        if not scene_ids:
+            return
+        
+        df_paths = self.get_scene_obs_paths(scene_ids)
+        obs_paths = dict(zip(df_paths['scene_id'], df_paths['scene_obs_path'])) if not df_paths.empty else {}
+        
+        max_workers = max(1, int(max_workers))
+        # 并发预取相机目录列表，之后各场景直接命中缓存
+        self.prefetch_listings(
+            [self._parse_camera_parquet_path(path) for path in obs_paths.values()
+             if isinstance(path, str) and path],
+            max_workers=max_workers
+        )
+        # 尚无完成场景时按单帧预估值估算每个场景的数据量
+        estimate = float(max(1, frames_per_scene or 1) * FRAME_BYTES_ESTIMATE)
+        completed_bytes = 0
+        completed_count = 0
+        
+        pending = list(reversed(scene_ids))
+        running = {}  # future -> (scene_id, 预估字节数)
+        inflight = 0.0
+        
+        with ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='scene-loader') as executor:
+            while pending or running:
+                while pending and len(running) < max_workers and (
+                    not running or not max_inflight_bytes or inflight + estimate <= max_inflight_bytes
+                ):
+                    scene_id = pending.pop()
+                    if scene_id not in obs_paths:
+                        yield scene_id, []
+                        continue
+                    future = executor.submit(
+                        self._load_scene_frames, scene_id, obs_paths[scene_id], None, frames_per_scene
+                    )
+                    running[future] = (scene_id, estimate)
+                    inflight += estimate
+                
+                if not running:
+                    continue
+                
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    scene_id, reserved = running.pop(future)
+                    inflight -= reserved
+                    try:
+                        frames = future.result()
+                    except Exception as e:
+                        logger.error(f"加载场景 {scene_id} 失败: {e}")
+                        frames = []
+                    
+                    if frames:
+                        completed_bytes += sum(frame.size_bytes for frame in frames)
+                        completed_count += 1
+                        estimate = completed_bytes / completed_count
+                    
+                    yield scene_id, frames
+    
     def batch_load_images(
         self,
         scene_ids: List[str],
-        frames_per_scene: int = 5
+        frames_per_scene: int = 5,
+        max_workers: int = DEFAULT_LOAD_WORKERS,
+        max_inflight_bytes: Optional[int] = DEFAULT_MAX_INFLIGHT_BYTES
     ) -> Dict[str, List[ImageFrame]]:
-        """批量加载多个场景的图片
+        """批量加载多个场景的图片（并发加载，见iter_load_images）
         
         Args:
             scene_ids: 场景ID列表
             frames_per_scene: 每个场景加载的帧数
+            max_workers: 并发场景数
+            max_inflight_bytes: 在途图片数据上限（字节），None表示不限制
             
         Returns:
-            字典，键为scene_id，值为ImageFrame列表
+            字典，键为scene_id（按输入顺序），值为ImageFrame列表
             
         Example:
             >>> scenes = ["scene_001", "scene_002", "scene_003"]
             >>> images = retriever.batch_load_images(scenes, frames_per_scene=3)
             >>> print(f"共加载 {len(images)} 个场景的图片")
         """
-        logger.info(f"批量加载 {len(scene_ids)} 个场景的图片，每场景 {frames_per_scene} 帧...")
+        logger.info(f"批量加载 {len(scene_ids)} 个场景的图片，每场景 {frames_per_scene} 帧，"
+                   f"并发 {max_workers}...")
+        start_time = time.time()
         
-        results = {}
-        success_count = 0
+        loaded = {}
         fail_count = 0
         
-        for i, scene_id in enumerate(scene_ids, 1):
-            logger.info(f"[{i}/{len(scene_ids)}] 处理场景: {scene_id}")
-            
-            try:
-                frames = self.load_images_from_scene(
-                    scene_id, 
-                    max_frames=frames_per_scene
-                )
-                
-                if frames:
-                    results[scene_id] = frames
-                    success_count += 1
-                else:
-                    fail_count += 1
-                    logger.warning(f"场景 {scene_id} 未加载到任何图片")
-                    
-            except Exception as e:
+        for i, (scene_id, frames) in enumerate(
+            self.iter_load_images(scene_ids, frames_per_scene, max_workers, max_inflight_bytes), 1
+        ):
+            if frames:
+                loaded[scene_id] = frames
+                logger.info(f"[{i}/{len(scene_ids)}] 场景 {scene_id}: {len(frames)} 帧")
+            else:
                 fail_count += 1
-                logger.error(f"加载场景 {scene_id} 失败: {e}")
-                continue
+                logger.warning(f"[{i}/{len(scene_ids)}] 场景 {scene_id} 未加载到任何图片")
         
-        logger.info(f"✅ 批量加载完成: 成功 {success_count} 个，失败 {fail_count} 个")
+        results = {scene_id: loaded[scene_id] for scene_id in dict.fromkeys(scene_ids) if scene_id in loaded}
+        logger.info(f"✅ 批量加载完成: 成功 {len(results)} 个，失败 {fail_count} 个，"
+                   f"用时 {time.time() - start_time:.1f}s")
         return results
 
 
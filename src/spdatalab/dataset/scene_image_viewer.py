@@ -1,10 +1,12 @@
 """
 场景图片HTML查看器模块
 
-生成独立的HTML报告用于快速浏览场景图片。
+生成HTML报告用于快速浏览场景图片。
 
 主要功能：
-- 将图片嵌入为base64格式（单文件可移植）
+- 将图片嵌入为base64格式（单文件可移植，适合少量图片）
+- 资源文件模式：缩略图和原图写入HTML旁的资源目录，缩略图并行生成并按内容哈希缓存，
+  HTML分页流式写出、图片懒加载（适合上万帧）
 - 响应式网格布局
 - 场景分组显示
 - 缩略图预览和全尺寸查看
@@ -12,256 +14,84 @@
 作者：spdatalab
 """
 
+import hashlib
 import logging
 import base64
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
 from datetime import datetime
 from pathlib import Path
-from typing import Dict, List
+from typing import Dict, List, Optional, TextIO, Tuple
 from io import BytesIO
+from urllib.parse import quote
 from PIL import Image
 
 from spdatalab.dataset.scene_image_retriever import ImageFrame
 
 logger = logging.getLogger(__name__)
 
+OUTPUT_MODES = ('embed', 'assets')
+DEFAULT_FRAMES_PER_PAGE = 500      # 资源文件模式每页帧数
+DEFAULT_THUMBNAIL_WORKERS = 8      # 缩略图并行生成线程数
+IMAGE_EXTENSIONS = {'jpeg': 'jpg'}
 
-class SceneImageHTMLViewer:
-    """场景图片HTML查看器
-    
-    生成包含base64编码图片的独立HTML文件，用于快速浏览。
-    
-    Example:
-        >>> viewer = SceneImageHTMLViewer()
-        >>> images = {"scene_001": [frame1, frame2], "scene_002": [frame3]}
-        >>> report_path = viewer.generate_html_report(images, "report.html")
-    """
-    
-    def __init__(self):
-        logger.info("初始化SceneImageHTMLViewer")
-    
-    def _encode_image_base64(self, image_data: bytes, image_format: str) -> str:
-        """将图片编码为base64字符串
-        
-        Args:
-            image_data: 图片二进制数据
-            image_format: 图片格式 ('png', 'jpeg')
-            
-        Returns:
-            base64编码的data URI字符串
-        """
-        b64_data = base64.b64encode(image_data).decode('utf-8')
-        
-        # 确定MIME类型
-        mime_type = f"image/{image_format}"
-        if image_format == 'jpeg':
-            mime_type = "image/jpeg"
-        elif image_format == 'png':
-            mime_type = "image/png"
-        
-        return f"data:{mime_type};base64,{b64_data}"
-    
-    def _create_thumbnail(self, image_data: bytes, max_size: int = 200) -> bytes:
-        """创建缩略图
-        
-        Args:
-            image_data: 原始图片数据
-            max_size: 缩略图最大尺寸（像素）
-            
-        Returns:
-            缩略图的二进制数据
-        """
-        try:
-            img = Image.open(BytesIO(image_data))
-            
-            # 计算缩略图尺寸（保持宽高比）
-            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
-            
-            # 保存为bytes
-            output = BytesIO()
-            img_format = img.format if img.format else 'JPEG'
-            img.save(output, format=img_format, quality=85)
-            
-            return output.getvalue()
-            
-        except Exception as e:
-            logger.warning(f"创建缩略图失败: {e}")
-            # 返回原图
-            return image_data
-    
-    def _format_timestamp(self, timestamp: int) -> str:
-        """格式化时间戳
-        
-        Args:
-            timestamp: 时间戳（毫秒或微秒）
-            
-        Returns:
-            格式化的时间字符串
-        """
-        try:
-            # 尝试毫秒时间戳
-            if timestamp > 1e12:
-                # 微秒
-                dt = datetime.fromtimestamp(timestamp / 1e6)
-            else:
-                # 毫秒
-                dt = datetime.fromtimestamp(timestamp / 1e3)
-            
-            return dt.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
-        except:
-            return str(timestamp)
-    
-    def _generate_html_template(
-        self,
-        images_dict: Dict[str, List[ImageFrame]],
-        title: str,
-        thumbnail_size: int
-    ) -> str:
-        """生成HTML模板
-        
-        Args:
-            images_dict: 场景ID到ImageFrame列表的映射
-            title: 报告标题
-            thumbnail_size: 缩略图大小
-            
-        Returns:
-            完整的HTML字符串
-        """
-        # 统计信息
-        total_scenes = len(images_dict)
-        total_frames = sum(len(frames) for frames in images_dict.values())
-        generation_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
-        # 生成场景HTML
-        scenes_html = []
-        
-        for scene_id, frames in images_dict.items():
-            if not frames:
-                continue
-            
-            # 场景标题
-            scene_html = f"""
-            <div class="scene-group">
-                <div class="scene-header" onclick="toggleScene('{scene_id}')">
-                    <h2>场景: {scene_id}</h2>
-                    <span class="frame-count">{len(frames)} 帧</span>
-                    <span class="toggle-icon">▼</span>
-                </div>
-                <div class="scene-content" id="scene-{scene_id}">
-                    <div class="image-grid">
-            """
-            
-            # 图片卡片
-            for frame in frames:
-                # 创建缩略图
-                thumbnail_data = self._create_thumbnail(frame.image_data, thumbnail_size)
-                thumbnail_b64 = self._encode_image_base64(thumbnail_data, frame.image_format)
-                
-                # 全尺寸图片
-                full_b64 = self._encode_image_base64(frame.image_data, frame.image_format)
-                
-                # 格式化时间戳
-                timestamp_str = self._format_timestamp(frame.timestamp)
-                
-                # 图片卡片HTML
-                card_html = f"""
-                    <div class="image-card">
-                        <div class="image-container">
-                            <img src="{thumbnail_b64}" 
-                                 alt="Frame {frame.frame_index}"
-                                 class="thumbnail"
-                                 onclick="showFullImage('{full_b64}', '{scene_id}', {frame.frame_index})">
-                        </div>
-                        <div class="image-meta">
-                            <div class="meta-item">
-                                <span class="meta-label">帧索引:</span>
-                                <span class="meta-value">{frame.frame_index}</span>
-                            </div>
-                            <div class="meta-item">
-                                <span class="meta-label">时间戳:</span>
-                                <span class="meta-value">{timestamp_str}</span>
-                            </div>
-                            <div class="meta-item">
-                                <span class="meta-label">格式:</span>
-                                <span class="meta-value">{frame.image_format.upper()}</span>
-                            </div>
-                        </div>
-                    </div>
-                """
-                
-                scene_html += card_html
-            
-            scene_html += """
-                    </div>
-                </div>
-            </div>
-            """
-            
-            scenes_html.append(scene_html)
-        
-        # 完整HTML文档
-        html = f"""
-<!DOCTYPE html>
-<html lang="zh-CN">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>{title}</title>
-    <style>
-        * {{
+REPORT_CSS = """
+        * {
             margin: 0;
             padding: 0;
             box-sizing: border-box;
-        }}
+        }
         
-        body {{
+        body {
             font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, 'Helvetica Neue', Arial, sans-serif;
             background: #f5f5f5;
             color: #333;
             line-height: 1.6;
-        }}
+        }
         
-        .header {{
+        .header {
             background: linear-gradient(135deg, #667eea 0%, #764ba2 100%);
             color: white;
             padding: 2rem;
             text-align: center;
             box-shadow: 0 2px 10px rgba(0,0,0,0.1);
-        }}
+        }
         
-        .header h1 {{
+        .header h1 {
             font-size: 2rem;
             margin-bottom: 0.5rem;
-        }}
+        }
         
-        .stats {{
+        .stats {
             display: flex;
             justify-content: center;
             gap: 2rem;
             margin-top: 1rem;
             font-size: 0.9rem;
-        }}
+        }
         
-        .stat-item {{
+        .stat-item {
             background: rgba(255,255,255,0.2);
             padding: 0.5rem 1rem;
             border-radius: 4px;
-        }}
+        }
         
-        .container {{
+        .container {
             max-width: 1400px;
             margin: 2rem auto;
             padding: 0 1rem;
-        }}
+        }
         
-        .scene-group {{
+        .scene-group {
             background: white;
             margin-bottom: 1.5rem;
             border-radius: 8px;
             box-shadow: 0 2px 8px rgba(0,0,0,0.1);
             overflow: hidden;
-        }}
+        }
         
-        .scene-header {{
+        .scene-header {
             background: #f8f9fa;
             padding: 1rem 1.5rem;
             cursor: pointer;
@@ -269,72 +99,72 @@ class SceneImageHTMLViewer:
             align-items: center;
             gap: 1rem;
             transition: background 0.2s;
-        }}
+        }
         
-        .scene-header:hover {{
+        .scene-header:hover {
             background: #e9ecef;
-        }}
+        }
         
-        .scene-header h2 {{
+        .scene-header h2 {
             flex: 1;
             font-size: 1.3rem;
             color: #495057;
-        }}
+        }
         
-        .frame-count {{
+        .frame-count {
             background: #667eea;
             color: white;
             padding: 0.25rem 0.75rem;
             border-radius: 12px;
             font-size: 0.9rem;
-        }}
+        }
         
-        .toggle-icon {{
+        .toggle-icon {
             font-size: 1.2rem;
             transition: transform 0.3s;
-        }}
+        }
         
-        .scene-header.collapsed .toggle-icon {{
+        .scene-header.collapsed .toggle-icon {
             transform: rotate(-90deg);
-        }}
+        }
         
-        .scene-content {{
+        .scene-content {
             padding: 1.5rem;
             transition: max-height 0.3s ease-out;
-        }}
+        }
         
-        .scene-content.hidden {{
+        .scene-content.hidden {
             display: none;
-        }}
+        }
         
-        .image-grid {{
+        .image-grid {
             display: grid;
             grid-template-columns: repeat(auto-fill, minmax(250px, 1fr));
             gap: 1.5rem;
-        }}
+        }
         
-        .image-card {{
+        .image-card {
             background: #fff;
             border: 1px solid #e0e0e0;
             border-radius: 8px;
             overflow: hidden;
             transition: transform 0.2s, box-shadow 0.2s;
-        }}
+        }
         
-        .image-card:hover {{
+        .image-card:hover {
             transform: translateY(-4px);
             box-shadow: 0 4px 12px rgba(0,0,0,0.15);
-        }}
+        }
         
-        .image-container {{
+        .image-container {
             position: relative;
             width: 100%;
             padding-top: 75%; /* 4:3 aspect ratio */
             background: #f8f9fa;
             overflow: hidden;
-        }}
+        }
         
-        .thumbnail {{
+        .thumbnail {
             position: absolute;
             top: 0;
             left: 0;
@@ -343,36 +173,36 @@ class SceneImageHTMLViewer:
             object-fit: cover;
             cursor: pointer;
             transition: opacity 0.2s;
-        }}
+        }
         
-        .thumbnail:hover {{
+        .thumbnail:hover {
             opacity: 0.8;
-        }}
+        }
         
-        .image-meta {{
+        .image-meta {
             padding: 0.75rem;
             background: #f8f9fa;
-        }}
+        }
         
-        .meta-item {{
+        .meta-item {
             display: flex;
             justify-content: space-between;
             font-size: 0.85rem;
             margin-bottom: 0.25rem;
-        }}
+        }
         
-        .meta-label {{
+        .meta-label {
             color: #6c757d;
             font-weight: 500;
-        }}
+        }
         
-        .meta-value {{
+        .meta-value {
             color: #495057;
             font-family: 'Courier New', monospace;
-        }}
+        }
         
         /* 模态框样式 */
-        .modal {{
+        .modal {
             display: none;
             position: fixed;
             top: 0;
@@ -382,27 +212,27 @@ class SceneImageHTMLViewer:
             background: rgba(0,0,0,0.9);
             z-index: 1000;
             cursor: pointer;
-        }}
+        }
         
-        .modal.active {{
+        .modal.active {
             display: flex;
             align-items: center;
             justify-content: center;
-        }}
+        }
         
-        .modal-content {{
+        .modal-content {
             max-width: 90%;
             max-height: 90%;
             position: relative;
-        }}
+        }
         
-        .modal-image {{
+        .modal-image {
             max-width: 100%;
             max-height: 90vh;
             object-fit: contain;
-        }}
+        }
         
-        .modal-info {{
+        .modal-info {
             position: absolute;
             top: 10px;
             left: 10px;
@@ -411,9 +241,9 @@ class SceneImageHTMLViewer:
             padding: 0.5rem 1rem;
             border-radius: 4px;
             font-size: 0.9rem;
-        }}
+        }
         
-        .close-button {{
+        .close-button {
             position: absolute;
             top: 20px;
             right: 30px;
@@ -422,107 +252,479 @@ class SceneImageHTMLViewer:
             font-weight: bold;
             cursor: pointer;
             z-index: 1001;
-        }}
+        }
         
-        .close-button:hover {{
+        .close-button:hover {
             color: #ccc;
-        }}
+        }
         
-        @media (max-width: 768px) {{
-            .header h1 {{
+        @media (max-width: 768px) {
+            .header h1 {
                 font-size: 1.5rem;
-            }}
+            }
             
-            .stats {{
+            .stats {
                 flex-direction: column;
                 gap: 0.5rem;
-            }}
+            }
             
-            .image-grid {{
+            .image-grid {
                 grid-template-columns: repeat(auto-fill, minmax(150px, 1fr));
                 gap: 1rem;
-            }}
+            }
             
-            .scene-header h2 {{
+            .scene-header h2 {
                 font-size: 1.1rem;
-            }}
-        }}
-    </style>
-</head>
-<body>
-    <div class="header">
-        <h1>{title}</h1>
-        <div class="stats">
-            <div class="stat-item">总场景数: {total_scenes}</div>
-            <div class="stat-item">总帧数: {total_frames}</div>
-            <div class="stat-item">生成时间: {generation_time}</div>
-        </div>
-    </div>
-    
-    <div class="container">
-        {''.join(scenes_html)}
-    </div>
-    
-    <!-- 全屏图片模态框 -->
-    <div id="imageModal" class="modal" onclick="closeModal()">
-        <span class="close-button">&times;</span>
-        <div class="modal-content" onclick="event.stopPropagation()">
-            <div class="modal-info" id="modalInfo"></div>
-            <img id="modalImage" class="modal-image" src="" alt="Full size image">
-        </div>
-    </div>
-    
-    <script>
+            }
+        }
+        
+        .pagination {
+            display: flex;
+            flex-wrap: wrap;
+            justify-content: center;
+            gap: 0.5rem;
+            margin: 1rem 0;
+        }
+        
+        .pagination a, .pagination span {
+            padding: 0.25rem 0.75rem;
+            border-radius: 4px;
+            background: white;
+            color: #667eea;
+            text-decoration: none;
+            box-shadow: 0 1px 4px rgba(0,0,0,0.1);
+        }
+        
+        .pagination .current {
+            background: #667eea;
+            color: white;
+        }
+"""
+
+REPORT_SCRIPT = """
         // 场景折叠/展开
-        function toggleScene(sceneId) {{
+        function toggleScene(sceneId) {
             const content = document.getElementById('scene-' + sceneId);
             const header = content.previousElementSibling;
             
-            if (content.classList.contains('hidden')) {{
+            if (content.classList.contains('hidden')) {
                 content.classList.remove('hidden');
                 header.classList.remove('collapsed');
-            }} else {{
+            } else {
                 content.classList.add('hidden');
                 header.classList.add('collapsed');
-            }}
-        }}
+            }
+        }
         
         // 显示全屏图片
-        function showFullImage(imageSrc, sceneId, frameIndex) {{
+        function showFullImage(imageSrc, sceneId, frameIndex) {
             const modal = document.getElementById('imageModal');
             const modalImg = document.getElementById('modalImage');
             const modalInfo = document.getElementById('modalInfo');
             
             modal.classList.add('active');
             modalImg.src = imageSrc;
-            modalInfo.textContent = `场景: ${{sceneId}} | 帧: ${{frameIndex}}`;
-        }}
+            modalInfo.textContent = `场景: ${sceneId} | 帧: ${frameIndex}`;
+        }
         
         // 关闭模态框
-        function closeModal() {{
+        function closeModal() {
             const modal = document.getElementById('imageModal');
             modal.classList.remove('active');
-        }}
+        }
         
         // ESC键关闭
-        document.addEventListener('keydown', function(event) {{
-            if (event.key === 'Escape') {{
+        document.addEventListener('keydown', function(event) {
+            if (event.key === 'Escape') {
                 closeModal();
-            }}
-        }});
-    </script>
+            }
+        });
+"""
+
+
+class SceneImageHTMLViewer:
+    """场景图片HTML查看器
+    
+    生成包含base64编码图片的独立HTML文件，或引用资源目录图片的分页HTML，用于快速浏览。
+    
+    Example:
+        >>> viewer = SceneImageHTMLViewer()
+        >>> images = {"scene_001": [frame1, frame2], "scene_002": [frame3]}
+        >>> report_path = viewer.generate_html_report(images, "report.html")
+        >>> # 大量图片使用资源文件模式
+        >>> report_path = viewer.generate_html_report(images, "report.html", output_mode='assets')
+    """
+    
+    def __init__(self):
+        logger.info("初始化SceneImageHTMLViewer")
+    
+    def _encode_image_base64(self, image_data: bytes, image_format: str) -> str:
+        """将图片编码为base64字符串
+        
+        Args:
+            image_data: 图片二进制数据
+            image_format: 图片格式 ('png', 'jpeg')
+            
+        Returns:
+            base64编码的data URI字符串
+        """
+        b64_data = base64.b64encode(image_data).decode('utf-8')
+        
+        # 确定MIME类型
+        mime_type = f"image/{image_format}"
+        if image_format == 'jpeg':
+            mime_type = "image/jpeg"
+        elif image_format == 'png':
+            mime_type = "image/png"
+        
+        return f"data:{mime_type};base64,{b64_data}"
+    
+    def _create_thumbnail(self, image_data: bytes, max_size: int = 200) -> bytes:
+        """创建缩略图
+        
+        Args:
+            image_data: 原始图片数据
+            max_size: 缩略图最大尺寸（像素）
+            
+        Returns:
+            缩略图的二进制数据
+        """
+        try:
+            img = Image.open(BytesIO(image_data))
+            
+            # 计算缩略图尺寸（保持宽高比）
+            img.thumbnail((max_size, max_size), Image.Resampling.LANCZOS)
+            
+            # 保存为bytes
+            output = BytesIO()
+            img_format = img.format if img.format else 'JPEG'
+            img.save(output, format=img_format, quality=85)
+            
+            return output.getvalue()
+            
+        except Exception as e:
+            logger.warning(f"创建缩略图失败: {e}")
+            # 返回原图
+            return image_data
+    
+    def _format_timestamp(self, timestamp: int) -> str:
+        """格式化时间戳
+        
+        Args:
+            timestamp: 时间戳（毫秒或微秒）
+            
+        Returns:
+            格式化的时间字符串
+        """
+        try:
+            # 尝试毫秒时间戳
+            if timestamp > 1e12:
+                # 微秒
+                dt = datetime.fromtimestamp(timestamp / 1e6)
+            else:
+                # 毫秒
+                dt = datetime.fromtimestamp(timestamp / 1e3)
+            
+            return dt.strftime("%Y-%m-%d %H:%M:%S.%f")[:-3]
+        except:
+            return str(timestamp)
+    
+    def _render_header(self, title: str, stats: List[str]) -> str:
+        """生成HTML文档开头（样式、标题栏、统计信息）"""
+        stats_html = ''.join(f'<div class="stat-item">{item}</div>' for item in stats)
+        return f"""
+<!DOCTYPE html>
+<html lang="zh-CN">
+<head>
+    <meta charset="UTF-8">
+    <meta name="viewport" content="width=device-width, initial-scale=1.0">
+    <title>{title}</title>
+    <style>{REPORT_CSS}    </style>
+</head>
+<body>
+    <div class="header">
+        <h1>{title}</h1>
+        <div class="stats">
+            {stats_html}
+        </div>
+    </div>
+    
+    <div class="container">
+        """
+    
+    def _render_footer(self) -> str:
+        """生成HTML文档结尾（模态框和脚本）"""
+        return f"""
+    </div>
+    
+    <!-- 全屏图片模态框 -->
+    <div id="imageModal" class="modal" onclick="closeModal()">
+        <span class="close-button">&times;</span>
+        <div class="modal-content" onclick="event.stopPropagation()">
+            <div class="modal-info" id="modalInfo"></div>
+            <img id="modalImage" class="modal-image" src="" alt="Full size image">
+        </div>
+    </div>
+    
+    <script>{REPORT_SCRIPT}    </script>
 </body>
 </html>
         """
+    
+    def _render_scene_open(self, scene_id: str, frame_count: str) -> str:
+        """生成场景分组开头"""
+        return f"""
+            <div class="scene-group">
+                <div class="scene-header" onclick="toggleScene('{scene_id}')">
+                    <h2>场景: {scene_id}</h2>
+                    <span class="frame-count">{frame_count}</span>
+                    <span class="toggle-icon">▼</span>
+                </div>
+                <div class="scene-content" id="scene-{scene_id}">
+                    <div class="image-grid">
+            """
+    
+    def _render_scene_close(self) -> str:
+        """生成场景分组结尾"""
+        return """
+                    </div>
+                </div>
+            </div>
+            """
+    
+    def _render_card(self, frame: ImageFrame, thumbnail_src: str, full_src: str) -> str:
+        """生成单帧图片卡片（缩略图懒加载，点击时才加载全尺寸图片）"""
+        return f"""
+                    <div class="image-card">
+                        <div class="image-container">
+                            <img src="{thumbnail_src}" 
+                                 alt="Frame {frame.frame_index}"
+                                 class="thumbnail"
+                                 loading="lazy"
+                                 data-full="{full_src}"
+                                 onclick="showFullImage(this.dataset.full, '{frame.scene_id}', {frame.frame_index})">
+                        </div>
+                        <div class="image-meta">
+                            <div class="meta-item">
+                                <span class="meta-label">帧索引:</span>
+                                <span class="meta-value">{frame.frame_index}</span>
+                            </div>
+                            <div class="meta-item">
+                                <span class="meta-label">时间戳:</span>
+                                <span class="meta-value">{self._format_timestamp(frame.timestamp)}</span>
+                            </div>
+                            <div class="meta-item">
+                                <span class="meta-label">格式:</span>
+                                <span class="meta-value">{frame.image_format.upper()}</span>
+                            </div>
+                        </div>
+                    </div>
+                """
+    
+    def _generate_html_template(
+        self,
+        images_dict: Dict[str, List[ImageFrame]],
+        title: str,
+        thumbnail_size: int
+    ) -> str:
+        """生成HTML模板（base64内嵌图片）
         
-        return html
+        Args:
+            images_dict: 场景ID到ImageFrame列表的映射
+            title: 报告标题
+            thumbnail_size: 缩略图大小
+            
+        Returns:
+            完整的HTML字符串
+        """
+        # 统计信息
+        total_scenes = len(images_dict)
+        total_frames = sum(len(frames) for frames in images_dict.values())
+        generation_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        
+        parts = [self._render_header(title, [
+            f"总场景数: {total_scenes}",
+            f"总帧数: {total_frames}",
+            f"生成时间: {generation_time}"
+        ])]
+        
+        for scene_id, frames in images_dict.items():
+            if not frames:
+                continue
+            
+            parts.append(self._render_scene_open(scene_id, f"{len(frames)} 帧"))
+            for frame in frames:
+                # 缩略图和全尺寸图片
+                thumbnail_data = self._create_thumbnail(frame.image_data, thumbnail_size)
+                thumbnail_b64 = self._encode_image_base64(thumbnail_data, frame.image_format)
+                full_b64 = self._encode_image_base64(frame.image_data, frame.image_format)
+                parts.append(self._render_card(frame, thumbnail_b64, full_b64))
+            parts.append(self._render_scene_close())
+        
+        parts.append(self._render_footer())
+        return ''.join(parts)
+    
+    @staticmethod
+    def _write_atomic(path: Path, data) -> None:
+        """原子写入文件（先写临时文件再替换）"""
+        tmp_path = path.with_name(f".{path.name}.{uuid.uuid4().hex}.tmp")
+        try:
+            with open(tmp_path, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+    
+    def _write_frame_assets(
+        self,
+        frame: ImageFrame,
+        assets_dir: Path,
+        thumbnail_size: int
+    ) -> Tuple[str, str, bool]:
+        """写入单帧的原图和缩略图（按内容哈希命名，已存在则跳过）
+        
+        Returns:
+            (缩略图相对路径, 原图相对路径, 缩略图是否命中缓存)
+        """
+        digest = hashlib.sha1(frame.image_data).hexdigest()
+        extension = IMAGE_EXTENSIONS.get(frame.image_format, frame.image_format)
+        
+        image_name = f"images/{digest}.{extension}"
+        image_path = assets_dir / image_name
+        if not image_path.exists():
+            self._write_atomic(image_path, frame.image_data)
+        
+        thumbnail_name = f"thumbs/{digest}_{thumbnail_size}.{extension}"
+        thumbnail_path = assets_dir / thumbnail_name
+        cached = thumbnail_path.exists()
+        if not cached:
+            self._write_atomic(thumbnail_path, self._create_thumbnail(frame.image_data, thumbnail_size))
+        
+        return thumbnail_name, image_name, cached
+    
+    @staticmethod
+    def _page_file(output_file: Path, page: int) -> Path:
+        """第page页（从1开始）的HTML文件路径，第1页即output_file"""
+        if page == 1:
+            return output_file
+        return output_file.with_name(f"{output_file.stem}_p{page}{output_file.suffix}")
+    
+    def _render_pagination(self, output_file: Path, page: int, n_pages: int) -> str:
+        """生成分页导航（首页、末页和当前页附近的页码）"""
+        if n_pages <= 1:
+            return ''
+        
+        def link(target: int, text: str) -> str:
+            return f'<a href="{quote(self._page_file(output_file, target).name)}">{text}</a>'
+        
+        items = []
+        if page > 1:
+            items.append(link(page - 1, '« 上一页'))
+        previous = 0
+        for target in range(1, n_pages + 1):
+            if target not in (1, n_pages) and abs(target - page) > 3:
+                continue
+            if target - previous > 1:
+                items.append('<span>…</span>')
+            items.append(f'<span class="current">{target}</span>' if target == page else link(target, str(target)))
+            previous = target
+        if page < n_pages:
+            items.append(link(page + 1, '下一页 »'))
+        
+        return f'<div class="pagination">{"".join(items)}</div>'
+    
+    def _write_paginated_report(
+        self,
+        images_dict: Dict[str, List[ImageFrame]],
+        output_file: Path,
+        title: str,
+        thumbnail_size: int,
+        frames_per_page: int,
+        max_workers: int
+    ) -> Dict[str, int]:
+        """资源文件模式：写出资源目录和分页HTML
+        
+        逐页处理：先并行写入本页帧的原图和缩略图，再流式写出本页HTML。
+        
+        Returns:
+            统计信息（页数、缩略图生成数、缩略图缓存命中数）
+        """
+        assets_dir = output_file.with_name(f"{output_file.stem}_assets")
+        (assets_dir / 'images').mkdir(parents=True, exist_ok=True)
+        (assets_dir / 'thumbs').mkdir(parents=True, exist_ok=True)
+        
+        frames = [frame for frame_list in images_dict.values() for frame in frame_list]
+        total_scenes = sum(1 for frame_list in images_dict.values() if frame_list)
+        frames_per_page = max(1, int(frames_per_page))
+        n_pages = max(1, -(-len(frames) // frames_per_page))
+        scene_counts = {scene_id: len(frame_list) for scene_id, frame_list in images_dict.items()}
+        generation_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        stats = {'pages': n_pages, 'thumbnails_generated': 0, 'thumbnails_cached': 0}
+        
+        with ThreadPoolExecutor(max_workers=max(1, int(max_workers)),
+                                thread_name_prefix='thumbnail') as executor:
+            for page in range(1, n_pages + 1):
+                page_frames = frames[(page - 1) * frames_per_page:page * frames_per_page]
+                assets = list(executor.map(
+                    lambda frame: self._write_frame_assets(frame, assets_dir, thumbnail_size), page_frames
+                ))
+                for _, _, cached in assets:
+                    stats['thumbnails_cached' if cached else 'thumbnails_generated'] += 1
+                
+                with open(self._page_file(output_file, page), 'w', encoding='utf-8') as f:
+                    self._write_page(f, output_file, assets_dir, page, n_pages, page_frames, assets,
+                                     title, [
+                                         f"总场景数: {total_scenes}",
+                                         f"总帧数: {len(frames)}",
+                                         f"第 {page}/{n_pages} 页",
+                                         f"生成时间: {generation_time}"
+                                     ], scene_counts)
+        
+        return stats
+    
+    def _write_page(
+        self,
+        f: TextIO,
+        output_file: Path,
+        assets_dir: Path,
+        page: int,
+        n_pages: int,
+        page_frames: List[ImageFrame],
+        assets: List[Tuple[str, str, bool]],
+        title: str,
+        stats: List[str],
+        scene_counts: Dict[str, int]
+    ) -> None:
+        """流式写出一页HTML（跨页的场景在下一页继续显示）"""
+        pagination = self._render_pagination(output_file, page, n_pages)
+        assets_url = quote(assets_dir.name)
+        
+        f.write(self._render_header(title, stats))
+        f.write(pagination)
+        
+        current_scene: Optional[str] = None
+        for frame, (thumbnail_name, image_name, _) in zip(page_frames, assets):
+            if frame.scene_id != current_scene:
+                if current_scene is not None:
+                    f.write(self._render_scene_close())
+                current_scene = frame.scene_id
+                f.write(self._render_scene_open(current_scene, f"{scene_counts.get(current_scene, 0)} 帧"))
+            f.write(self._render_card(frame, f"{assets_url}/{thumbnail_name}", f"{assets_url}/{image_name}"))
+        if current_scene is not None:
+            f.write(self._render_scene_close())
+        
+        f.write(pagination)
+        f.write(self._render_footer())
     
     def generate_html_report(
         self,
         images_dict: Dict[str, List[ImageFrame]],
         output_path: str,
         title: str = "场景图片查看器",
-        thumbnail_size: int = 200
+        thumbnail_size: int = 200,
+        output_mode: str = 'embed',
+        frames_per_page: int = DEFAULT_FRAMES_PER_PAGE,
+        max_workers: int = DEFAULT_THUMBNAIL_WORKERS
     ) -> str:
         """生成HTML报告
         
@@ -531,9 +733,13 @@ class SceneImageHTMLViewer:
             output_path: 输出HTML文件路径
             title: 报告标题
             thumbnail_size: 缩略图最大尺寸（像素）
+            output_mode: 'embed' 单文件内嵌base64图片；
+                'assets' 图片写入 {文件名}_assets/ 资源目录，HTML分页（后续页为 {文件名}_p2.html 等）
+            frames_per_page: 资源文件模式每页帧数
+            max_workers: 资源文件模式缩略图并行生成线程数
             
         Returns:
-            生成的HTML文件路径
+            生成的HTML文件路径（分页时为第1页）
             
         Example:
             >>> viewer = SceneImageHTMLViewer()
@@ -544,21 +750,33 @@ class SceneImageHTMLViewer:
             ...     title="聚类分析图片"
             ... )
         """
+        if output_mode not in OUTPUT_MODES:
+            raise ValueError(f"未知输出模式: {output_mode}，可选: {list(OUTPUT_MODES)}")
+        
         logger.info(f"生成HTML报告: {output_path}")
         logger.info(f"  场景数: {len(images_dict)}")
         
         total_frames = sum(len(frames) for frames in images_dict.values())
         logger.info(f"  总帧数: {total_frames}")
         
+        output_file = Path(output_path)
+        output_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        if output_mode == 'assets':
+            stats = self._write_paginated_report(
+                images_dict, output_file, title, thumbnail_size, frames_per_page, max_workers
+            )
+            logger.info(f"✅ HTML报告已生成: {output_file}")
+            logger.info(f"   页数: {stats['pages']}，缩略图生成 {stats['thumbnails_generated']}，"
+                       f"缓存命中 {stats['thumbnails_cached']}")
+            return str(output_file.resolve())
+        
         # 生成HTML内容
         html_content = self._generate_html_template(
             images_dict, title, thumbnail_size
         )
         
         # 写入文件
-        output_file = Path(output_path)
-        output_file.parent.mkdir(parents=True, exist_ok=True)
-        
         with open(output_file, 'w', encoding='utf-8') as f:
             f.write(html_content)
         
@@ -569,7 +787,8 @@ class SceneImageHTMLViewer:
         logger.info(f"   文件大小: {file_size_mb:.2f} MB")
         
         if file_size_mb > 100:
-            logger.warning(f"⚠️ HTML文件较大 ({file_size_mb:.1f}MB)，建议减少帧数或场景数")
+            logger.warning(f"⚠️ HTML文件较大 ({file_size_mb:.1f}MB)，建议减少帧数或场景数，"
+                          f"或使用 output_mode='assets'")
         
         return str(output_file.resolve())
 
@@ -0,0 +1,182 @@
+"""轨迹段特征库
+
+持久化Grid轨迹聚类的中间结果（有效轨迹段的元数据、10维特征、几何和轨迹点），
+调整聚类参数（eps、min_samples）重跑时无需重新查询轨迹点、切分和提取特征：
+
+- 键：切分/过滤/特征相关配置的哈希（聚类参数不参与），配置变化自动使用新目录
+- 存储：按城市/grid分区的Parquet文件
+  ``{root}/{config_hash}/city_id={city_id}/grid_id={grid_id}.parquet``
+- 读取：只读特征列即可聚类；需要写数据库时再读取轨迹点列
+"""
+
+import hashlib
+import json
+import logging
+import os
+import uuid
+from pathlib import Path
+from typing import Dict, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+import shapely
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_FEATURE_STORE_DIR = "~/.cache/spdatalab/segment_features"
+
+# 特征定义变化时递增，使旧特征库失效
+FEATURE_STORE_VERSION = 1
+
+# 影响轨迹段和特征的配置字段
+SEGMENTATION_CONFIG_FIELDS = (
+    'point_table', 'query_limit',
+    'min_distance', 'max_duration', 'min_points', 'time_gap_threshold',
+    'min_movement', 'max_jump', 'max_speed'
+)
+
+FEATURE_COLUMNS = [f'feature_{i}' for i in range(10)]
+POINT_COLUMNS = ['lon', 'lat', 'timestamp', 'twist_linear', 'yaw']
+SEGMENT_COLUMNS = [
+    'dataset_name', 'segment_index', 'start_time', 'end_time',
+    'duration', 'point_count', 'quality_flag', 'analysis_id', 'geometry'
+]
+
+
+def segmentation_config_hash(config) -> str:
+    """计算切分配置哈希（前16位十六进制）
+
+    Args:
+        config: ClusterConfig（或包含SEGMENTATION_CONFIG_FIELDS属性的对象）
+    """
+    params = {field: getattr(config, field) for field in SEGMENTATION_CONFIG_FIELDS}
+    params['version'] = FEATURE_STORE_VERSION
+    payload = json.dumps(params, sort_keys=True, default=str).encode('utf-8')
+    return hashlib.sha256(payload).hexdigest()[:16]
+
+
+class SegmentFeatureStore:
+    """按城市/grid分区的轨迹段特征库"""
+
+    def __init__(self, root_dir: str = DEFAULT_FEATURE_STORE_DIR, config=None,
+                 config_hash: Optional[str] = None):
+        """
+        Args:
+            root_dir: 特征库根目录
+            config: ClusterConfig，用于计算配置哈希
+            config_hash: 直接指定配置哈希（优先于config）
+        """
+        if config_hash is None:
+            if config is None:
+                raise ValueError("需要提供config或config_hash")
+            config_hash = segmentation_config_hash(config)
+
+        self.config_hash = config_hash
+        self.store_dir = Path(root_dir).expanduser() / config_hash
+        self.store_dir.mkdir(parents=True, exist_ok=True)
+
+        if config is not None:
+            config_file = self.store_dir / 'config.json'
+            if not config_file.exists():
+                params = {field: getattr(config, field) for field in SEGMENTATION_CONFIG_FIELDS}
+                params['version'] = FEATURE_STORE_VERSION
+                config_file.write_text(json.dumps(params, indent=2, default=str), encoding='utf-8')
+
+    def grid_path(self, city_id: str, grid_id: int) -> Path:
+        return self.store_dir / f"city_id={city_id}" / f"grid_id={grid_id}.parquet"
+
+    def has_grid(self, city_id: str, grid_id: int) -> bool:
+        return self.grid_path(city_id, grid_id).exists()
+
+    def list_grids(self, city_id: Optional[str] = None) -> pd.DataFrame:
+        """列出特征库中的grid
+
+        Returns:
+            包含city_id, grid_id列的DataFrame
+        """
+        pattern = f"city_id={city_id}/grid_id=*.parquet" if city_id else "city_id=*/grid_id=*.parquet"
+        rows = []
+        for path in sorted(self.store_dir.glob(pattern)):
+            rows.append({
+                'city_id': path.parent.name.split('=', 1)[1],
+                'grid_id': int(path.stem.split('=', 1)[1])
+            })
+        return pd.DataFrame(rows, columns=['city_id', 'grid_id'])
+
+    def save_grid(self, city_id: str, grid_id: int, analysis_id: str, segments: Sequence) -> Path:
+        """保存grid的有效轨迹段（原子替换）
+
+        Args:
+            segments: 已提取特征的TrajectorySegment列表
+        """
+        features = np.vstack([seg.features for seg in segments]) if segments else np.zeros((0, 10))
+        data = {
+            'dataset_name': [seg.dataset_name for seg in segments],
+            'segment_index': [int(seg.segment_index) for seg in segments],
+            'start_time': [int(seg.start_time) for seg in segments],
+            'end_time': [int(seg.end_time) for seg in segments],
+            'duration': [float(seg.duration) for seg in segments],
+            'point_count': [int(seg.point_count) for seg in segments],
+            'quality_flag': [seg.quality_flag for seg in segments],
+            'analysis_id': [analysis_id] * len(segments),
+            'geometry': shapely.to_wkb(np.array([seg.geometry for seg in segments], dtype=object)).tolist(),
+        }
+        for i, column in enumerate(FEATURE_COLUMNS):
+            data[column] = features[:, i]
+        for column in POINT_COLUMNS:
+            data[f'point_{column}'] = [
+                seg.points[column].to_numpy(dtype=float) if column in seg.points.columns else None
+                for seg in segments
+            ]
+        df = pd.DataFrame(data)
+
+        path = self.grid_path(city_id, grid_id)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.parent / f".{path.stem}.{uuid.uuid4().hex}.tmp"
+        try:
+            df.to_parquet(tmp_path, index=False)
+            os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        logger.debug(f"💾 特征库写入 Grid #{grid_id}: {len(df)} 个轨迹段")
+        return path
+
+    def load_grid(self, city_id: str, grid_id: int, with_points: bool = False) -> pd.DataFrame:
+        """读取grid的轨迹段表
+
+        Args:
+            with_points: 是否读取轨迹点列（point_*），只做聚类时不需要
+
+        Returns:
+            轨迹段DataFrame，不存在时返回None
+        """
+        path = self.grid_path(city_id, grid_id)
+        if not path.exists():
+            return None
+        columns = SEGMENT_COLUMNS + FEATURE_COLUMNS
+        if with_points:
+            columns = columns + [f'point_{column}' for column in POINT_COLUMNS]
+        return pd.read_parquet(path, columns=columns)
+
+    @staticmethod
+    def feature_matrix(segments_df: pd.DataFrame) -> np.ndarray:
+        """从轨迹段表取出特征矩阵 (n_segments, 10)"""
+        return segments_df[FEATURE_COLUMNS].to_numpy(dtype=float)
+
+    @staticmethod
+    def segment_points(row: Dict) -> pd.DataFrame:
+        """从轨迹段表的一行还原轨迹点DataFrame"""
+        return pd.DataFrame({
+            column: row[f'point_{column}']
+            for column in POINT_COLUMNS
+            if row.get(f'point_{column}') is not None
+        })
+
+    def clear(self) -> int:
+        """清空当前配置的特征库，返回删除的文件数"""
+        removed = 0
+        for path in self.store_dir.glob("city_id=*/grid_id=*.parquet"):
+            path.unlink(missing_ok=True)
+            removed += 1
+        return removed
@@ -15,6 +15,12 @@ import geopandas as gpd
 import pandas as pd
 from sqlalchemy import text, create_engine
 from spdatalab.common.io_hive import hive_cursor
+from spdatalab.dataset.trajectory_simplification import (
+    SimplificationConfig,
+    add_simplification_arguments,
+    simplification_from_args,
+    simplify_points_df
+)
 
 # 检查是否有parquet支持
 try:
@@ -249,13 +255,15 @@ def fetch_trajectory_points(data_name: str) -> pd.DataFrame:
         logger.error(f"查询轨迹点失败: {data_name}, 错误: {str(e)}")
         return pd.DataFrame()
 
-def build_trajectory(scene_id: str, data_name: str, points_df: pd.DataFrame) -> Dict:
+def build_trajectory(scene_id: str, data_name: str, points_df: pd.DataFrame,
+                     simplification: Optional[SimplificationConfig] = None) -> Dict:
     """从轨迹点构建轨迹线几何和统计信息。
     
     Args:
         scene_id: 场景ID
         data_name: 数据名称
         points_df: 轨迹点DataFrame
+        simplification: 轨迹几何简化配置（可选，只影响几何，统计基于全部点）
         
     Returns:
         包含轨迹信息的字典
@@ -268,7 +276,10 @@ def build_trajectory(scene_id: str, data_name: str, points_df: pd.DataFrame) ->
         points_df = points_df.sort_values('timestamp')
         
         # 提取坐标点
-        coordinates = list(zip(points_df['longitude'], points_df['latitude']))
+        geometry_points = points_df
+        if simplification is not None:
+            geometry_points = simplify_points_df(points_df, simplification, group_col=None)
+        coordinates = list(zip(geometry_points['longitude'], geometry_points['latitude']))
         
         if len(coordinates) < 2:
             logger.warning(f"轨迹点数量不足，无法构建轨迹线: {len(coordinates)}")
@@ -691,7 +702,8 @@ def insert_events_data(eng, table_name: str, scene_id: str, events_data: List[Di
 
 def process_scene_mappings(mappings_df: pd.DataFrame, table_name: str, 
                           batch_size: int = 100, detect_avp: bool = False, 
-                          detect_speed: bool = False, speed_threshold: float = 2.0) -> Dict:
+                          detect_speed: bool = False, speed_threshold: float = 2.0,
+                          simplification: Optional[SimplificationConfig] = None) -> Dict:
     """处理scene_id和data_name映射，生成轨迹数据。
     
     Args:
@@ -701,6 +713,7 @@ def process_scene_mappings(mappings_df: pd.DataFrame, table_name: str,
         detect_avp: 是否检测AVP变化点
         detect_speed: 是否检测速度突变点
         speed_threshold: 速度突变阈值（标准差倍数）
+        simplification: 轨迹几何简化配置（可选）
         
     Returns:
         处理统计信息
@@ -785,7 +798,7 @@ def process_scene_mappings(mappings_df: pd.DataFrame, table_name: str,
             continue
         
         # 构建轨迹
-        trajectory = build_trajectory(scene_id, data_name, points_df)
+        trajectory = build_trajectory(scene_id, data_name, points_df, simplification)
         
         if trajectory:
             trajectory_batch.append(trajectory)
@@ -854,6 +867,7 @@ def main():
     parser.add_argument('--detect-avp', action='store_true', help='检测AVP变化点')
     parser.add_argument('--detect-speed', action='store_true', help='检测速度突变点')
     parser.add_argument('--speed-threshold', type=float, default=2.0, help='速度突变阈值（标准差倍数）')
+    add_simplification_arguments(parser)
     parser.add_argument('--verbose', '-v', action='store_true', help='详细日志')
     
     args = parser.parse_args()
@@ -890,13 +904,19 @@ def main():
         logger.info(f"已有data_name: {pre_filled_data_names} 个")
         logger.info(f"需查询data_name: {total_mappings - pre_filled_data_names} 个")
         
+        # 轨迹几何简化（可选）
+        simplification = simplification_from_args(args.simplify_tolerance, args.max_points)
+        if simplification is not None:
+            logger.info(f"轨迹几何简化: 容差 {args.simplify_tolerance}m, 最多 {args.max_points} 点")
+        
         # 处理轨迹生成
         logger.info(f"开始处理 {total_mappings} 个场景")
         stats = process_scene_mappings(
             mappings_df, args.table, args.batch_size,
             detect_avp=args.detect_avp,
             detect_speed=args.detect_speed,
-            speed_threshold=args.speed_threshold
+            speed_threshold=args.speed_threshold,
+            simplification=simplification
         )
         
         # 输出统计信息
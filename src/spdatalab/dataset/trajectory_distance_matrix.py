@@ -0,0 +1,258 @@
+"""轨迹段两两距离计算引擎
+
+替代O(n²)双重循环 + 稠密float64矩阵的做法，支持数万轨迹段：
+
+- 剪枝：用廉价下界跳过必然超过半径的点对
+  （外包框间隙：Hausdorff/Fréchet均不小于它；起点/终点距离：Fréchet不小于它）
+- 存储：半径内的稀疏图（CSR，可直接作为DBSCAN的precomputed稀疏距离），
+  或float32压缩（condensed）上三角数组，可写入memmap文件
+- 并行：按行块分发到进程池，轨迹数据在worker初始化时传入一次
+
+使用示例：
+    graph = compute_distance_graph(coords_list, metric='frechet', radius=30.0, n_jobs=8)
+    labels = DBSCAN(eps=30.0, min_samples=5, metric='precomputed').fit_predict(graph)
+"""
+
+from __future__ import annotations
+
+import logging
+import time
+from concurrent.futures import ProcessPoolExecutor
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+from scipy import sparse
+
+logger = logging.getLogger(__name__)
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = EARTH_RADIUS_M * np.pi / 180
+# 下界按平面近似换算，留出余量避免误剪
+LOWER_BOUND_SLACK = 0.99
+
+# 可剪枝的度量及其下界
+PRUNABLE_METRICS = {'frechet', 'hausdorff'}
+# 支持threshold提前放弃的度量
+EARLY_ABANDON_METRICS = {'frechet'}
+
+_worker_state: Dict = {}
+
+
+def _resolve_metric(metric: Union[str, Callable]) -> Callable:
+    """度量名称 -> 距离函数"""
+    if callable(metric):
+        return metric
+
+    from spdatalab.dataset.improved_trajectory_clustering import (
+        frechet_distance,
+        hausdorff_distance_trajectory,
+        segment_distance
+    )
+    functions = {
+        'frechet': frechet_distance,
+        'hausdorff': hausdorff_distance_trajectory,
+        'segment': segment_distance
+    }
+    if metric not in functions:
+        raise ValueError(f"未知距离度量: {metric}，可选: {list(functions)}")
+    return functions[metric]
+
+
+def _haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    a = np.sin((lat2 - lat1) / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin((lon2 - lon1) / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(a))
+
+
+def _trajectory_summaries(trajectories: Sequence[np.ndarray]) -> Dict[str, np.ndarray]:
+    """每条轨迹的外包框和起终点"""
+    return {
+        'mins': np.array([traj.min(axis=0) for traj in trajectories]).reshape(-1, 2),
+        'maxs': np.array([traj.max(axis=0) for traj in trajectories]).reshape(-1, 2),
+        'starts': np.array([traj[0] for traj in trajectories]).reshape(-1, 2),
+        'ends': np.array([traj[-1] for traj in trajectories]).reshape(-1, 2),
+    }
+
+
+def pair_lower_bounds(summaries: Dict[str, np.ndarray], i: int, js: np.ndarray, metric: str) -> np.ndarray:
+    """轨迹i与轨迹js之间距离的下界（米）
+
+    外包框间隙对Hausdorff和Fréchet都成立；Fréchet还不小于起点距离和终点距离。
+    """
+    mins, maxs = summaries['mins'], summaries['maxs']
+    gap = np.maximum(0.0, np.maximum(mins[js] - maxs[i], mins[i] - maxs[js]))
+    max_abs_lat = np.maximum(
+        np.abs(mins[js, 1]), np.maximum(np.abs(maxs[js, 1]), max(abs(mins[i, 1]), abs(maxs[i, 1])))
+    )
+    gap_m = np.hypot(gap[:, 0] * np.cos(np.radians(np.minimum(max_abs_lat, 90.0))), gap[:, 1]) * METERS_PER_DEGREE
+    bound = gap_m * LOWER_BOUND_SLACK
+
+    if metric == 'frechet':
+        starts, ends = summaries['starts'], summaries['ends']
+        start_dist = _haversine(starts[i, 1], starts[i, 0], starts[js, 1], starts[js, 0])
+        end_dist = _haversine(ends[i, 1], ends[i, 0], ends[js, 1], ends[js, 0])
+        bound = np.maximum(bound, np.maximum(start_dist, end_dist))
+
+    return bound
+
+
+def _init_worker(trajectories: List[np.ndarray], metric: Union[str, Callable], radius: Optional[float]):
+    """worker进程初始化：保存轨迹数据和预计算的外包框"""
+    _worker_state['trajectories'] = trajectories
+    _worker_state['metric'] = metric
+    _worker_state['metric_name'] = metric if isinstance(metric, str) else None
+    _worker_state['distance'] = _resolve_metric(metric)
+    _worker_state['radius'] = radius
+    _worker_state['summaries'] = _trajectory_summaries(trajectories)
+
+
+def _compute_rows(rows: Sequence[int]) -> Tuple[np.ndarray, np.ndarray, np.ndarray, int]:
+    """计算若干行的上三角距离（j > i），返回(行号, 列号, 距离, 剪枝数)"""
+    trajectories = _worker_state['trajectories']
+    distance = _worker_state['distance']
+    metric_name = _worker_state['metric_name']
+    radius = _worker_state['radius']
+    summaries = _worker_state['summaries']
+    n = len(trajectories)
+
+    out_i, out_j, out_d = [], [], []
+    pruned = 0
+    for i in rows:
+        js = np.arange(i + 1, n)
+        if radius is not None and metric_name in PRUNABLE_METRICS and len(js):
+            keep = pair_lower_bounds(summaries, i, js, metric_name) <= radius
+            pruned += int(len(js) - keep.sum())
+            js = js[keep]
+
+        for j in js:
+            if radius is not None and metric_name in EARLY_ABANDON_METRICS:
+                d = distance(trajectories[i], trajectories[j], threshold=radius)
+            else:
+                d = distance(trajectories[i], trajectories[j])
+            out_i.append(i)
+            out_j.append(j)
+            out_d.append(d)
+
+    return (np.asarray(out_i, dtype=np.int64), np.asarray(out_j, dtype=np.int64),
+            np.asarray(out_d, dtype=float), pruned)
+
+
+def _row_blocks(n: int, block_rows: int) -> List[List[int]]:
+    """行分块：前面的行点对多，按块轮转分配使各块工作量接近"""
+    n_blocks = max(1, int(np.ceil(n / max(1, block_rows))))
+    return [list(range(b, n, n_blocks)) for b in range(n_blocks) if b < n]
+
+
+def _iter_pair_results(trajectories: List[np.ndarray], metric, radius: Optional[float],
+                       n_jobs: int, block_rows: int):
+    """逐块生成计算结果（串行或进程池）"""
+    blocks = _row_blocks(len(trajectories), block_rows)
+    if n_jobs <= 1 or len(blocks) <= 1:
+        _init_worker(trajectories, metric, radius)
+        try:
+            for block in blocks:
+                yield _compute_rows(block)
+        finally:
+            _worker_state.clear()
+        return
+
+    with ProcessPoolExecutor(max_workers=n_jobs, initializer=_init_worker,
+                             initargs=(trajectories, metric, radius)) as executor:
+        for result in executor.map(_compute_rows, blocks):
+            yield result
+
+
+def compute_distance_graph(
+    trajectories: Sequence[np.ndarray],
+    metric: Union[str, Callable] = 'frechet',
+    radius: float = 50.0,
+    n_jobs: int = 1,
+    block_rows: int = 64
+) -> sparse.csr_matrix:
+    """计算半径内的稀疏距离图
+
+    Args:
+        trajectories: 轨迹坐标数组列表，每个 (N, 2) [lon, lat]
+        metric: 'frechet' / 'hausdorff' / 'segment' 或距离函数
+        radius: 半径（米），只保留距离<=radius的点对
+        n_jobs: 进程数
+        block_rows: 每个任务的行数
+
+    Returns:
+        对称CSR矩阵，显式存储对角线和0距离，
+        可直接用于 DBSCAN(metric='precomputed', eps<=radius)
+    """
+    trajectories = [np.asarray(traj, dtype=float) for traj in trajectories]
+    n = len(trajectories)
+    start_time = time.time()
+
+    rows, cols, dists = [np.arange(n)], [np.arange(n)], [np.zeros(n)]
+    pruned = 0
+    for block_i, block_j, block_d, block_pruned in _iter_pair_results(trajectories, metric, radius, n_jobs, block_rows):
+        pruned += block_pruned
+        keep = block_d <= radius
+        rows.extend([block_i[keep], block_j[keep]])
+        cols.extend([block_j[keep], block_i[keep]])
+        dists.extend([block_d[keep], block_d[keep]])
+
+    graph = sparse.csr_matrix(
+        (np.concatenate(dists), (np.concatenate(rows), np.concatenate(cols))), shape=(n, n)
+    )
+    graph.sort_indices()
+
+    total_pairs = n * (n - 1) // 2
+    logger.info(f"📐 距离图计算完成: {n} 条轨迹, {total_pairs} 个点对, 剪枝 {pruned}, "
+               f"半径内 {(graph.nnz - n) // 2} 对, 用时 {time.time() - start_time:.2f}s")
+    return graph
+
+
+def condensed_index(n: int, i: np.ndarray, j: np.ndarray) -> np.ndarray:
+    """上三角点对(i < j)在压缩数组中的位置（与scipy.spatial.distance.squareform一致）"""
+    return n * i - i * (i + 1) // 2 + (j - i - 1)
+
+
+def compute_condensed_distances(
+    trajectories: Sequence[np.ndarray],
+    metric: Union[str, Callable] = 'frechet',
+    output_path: Optional[str] = None,
+    radius: Optional[float] = None,
+    n_jobs: int = 1,
+    block_rows: int = 64,
+    dtype=np.float32
+) -> np.ndarray:
+    """计算压缩（condensed）上三角距离数组
+
+    Args:
+        trajectories: 轨迹坐标数组列表
+        metric: 距离度量
+        output_path: memmap文件路径（可选），为None时在内存中
+        radius: 剪枝半径（可选），被剪枝或提前放弃的点对为inf
+        n_jobs: 进程数
+        block_rows: 每个任务的行数
+        dtype: 存储类型，默认float32
+
+    Returns:
+        长度 n*(n-1)/2 的数组（或memmap），可用scipy squareform还原为方阵
+    """
+    trajectories = [np.asarray(traj, dtype=float) for traj in trajectories]
+    n = len(trajectories)
+    size = n * (n - 1) // 2
+    start_time = time.time()
+
+    if output_path:
+        condensed = np.memmap(output_path, dtype=dtype, mode='w+', shape=(max(size, 1),))[:size]
+    else:
+        condensed = np.empty(size, dtype=dtype)
+    condensed[:] = np.inf
+
+    pruned = 0
+    for block_i, block_j, block_d, block_pruned in _iter_pair_results(trajectories, metric, radius, n_jobs, block_rows):
+        pruned += block_pruned
+        condensed[condensed_index(n, block_i, block_j)] = block_d
+
+    if isinstance(condensed, np.memmap):
+        condensed.flush()
+
+    logger.info(f"📐 压缩距离数组计算完成: {n} 条轨迹, {size} 个点对, 剪枝 {pruned}, "
+               f"用时 {time.time() - start_time:.2f}s")
+    return condensed
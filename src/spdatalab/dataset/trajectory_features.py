@@ -0,0 +1,346 @@
+"""轨迹段批量特征提取模块
+
+将一个grid内的全部轨迹段拼接为连续的逐点数组，用偏移数组(offsets)标记段边界，
+所有特征通过按段归约（np.add.reduceat等）一次计算得到特征矩阵：
+
+- extract_basic_features_batch：10维基础特征，与GridTrajectoryClusterer.extract_features一致
+- extract_enhanced_features_batch：17维增强特征，与improved_trajectory_clustering.extract_enhanced_features一致
+
+使用示例：
+    batch = SegmentBatch.from_segments(segments)
+    features = extract_basic_features_batch(batch)   # (n_segments, 10)
+"""
+
+from __future__ import annotations
+
+from dataclasses import dataclass
+from typing import Optional, Sequence
+
+import numpy as np
+
+EARTH_RADIUS_M = 6371000
+MIN_TIME_DIFF = 0.1           # 差分时间下限（秒），避免除零
+STOP_SPEED = 1.0              # 停车速度阈值（m/s）
+ACCEL_PEAK_THRESHOLD = 2.0    # 加速度峰值阈值
+DEGREE_TO_METER = 111000      # 包络面积的度-米粗略换算
+
+
+@dataclass
+class SegmentBatch:
+    """按段拼接的轨迹点数组
+
+    第j段的点为 ``[offsets[j], offsets[j+1])``。
+    """
+    offsets: np.ndarray
+    lon: np.ndarray
+    lat: np.ndarray
+    timestamp: np.ndarray
+    speed: np.ndarray
+    yaw: Optional[np.ndarray] = None
+
+    @property
+    def n_segments(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        return np.diff(self.offsets)
+
+    @classmethod
+    def from_lengths(cls, lengths: Sequence[int], lon, lat, timestamp, speed, yaw=None) -> 'SegmentBatch':
+        """由每段点数和拼接后的逐点数组构建"""
+        offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+        np.cumsum(lengths, out=offsets[1:])
+        return cls(
+            offsets=offsets,
+            lon=np.asarray(lon, dtype=float),
+            lat=np.asarray(lat, dtype=float),
+            timestamp=np.asarray(timestamp, dtype=float),
+            speed=np.asarray(speed, dtype=float),
+            yaw=None if yaw is None else np.asarray(yaw, dtype=float)
+        )
+
+    @classmethod
+    def from_segments(cls, segments: Sequence) -> 'SegmentBatch':
+        """由TrajectorySegment列表构建（使用points中的lon/lat/timestamp/twist_linear/yaw列）"""
+        points_list = [seg.points for seg in segments]
+        has_yaw = bool(points_list) and all('yaw' in points.columns for points in points_list)
+
+        def concat(column):
+            if not points_list:
+                return np.empty(0)
+            return np.concatenate([points[column].to_numpy(dtype=float) for points in points_list])
+
+        return cls.from_lengths(
+            [len(points) for points in points_list],
+            lon=concat('lon'),
+            lat=concat('lat'),
+            timestamp=concat('timestamp'),
+            speed=concat('twist_linear'),
+            yaw=concat('yaw') if has_yaw else None
+        )
+
+
+# ==================== 按段归约工具 ====================
+
+def _segment_sum(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """按段求和，空段为0"""
+    lengths = np.diff(offsets)
+    result = np.zeros(len(lengths))
+    nonempty = lengths > 0
+    if nonempty.any():
+        result[nonempty] = np.add.reduceat(values, offsets[:-1][nonempty])
+    return result
+
+
+def _segment_extreme(values: np.ndarray, offsets: np.ndarray, ufunc) -> np.ndarray:
+    """按段求最大/最小值，空段为0"""
+    lengths = np.diff(offsets)
+    result = np.zeros(len(lengths))
+    nonempty = lengths > 0
+    if nonempty.any():
+        result[nonempty] = ufunc.reduceat(values, offsets[:-1][nonempty])
+    return result
+
+
+def _segment_mean_std(values: np.ndarray, offsets: np.ndarray):
+    """按段求均值和总体标准差（两遍法），空段为0"""
+    lengths = np.diff(offsets)
+    safe_lengths = np.maximum(lengths, 1)
+    mean = _segment_sum(values, offsets) / safe_lengths
+    deviations = values - np.repeat(mean, lengths)
+    std = np.sqrt(_segment_sum(deviations * deviations, offsets) / safe_lengths)
+    return mean, std
+
+
+def _inner_offsets(offsets: np.ndarray, shrink: int) -> np.ndarray:
+    """段内长度减少shrink后（差分、三点窗口等）的偏移数组"""
+    inner_lengths = np.maximum(np.diff(offsets) - shrink, 0)
+    inner = np.zeros(len(offsets), dtype=np.int64)
+    np.cumsum(inner_lengths, out=inner[1:])
+    return inner
+
+
+def _window_mask(offsets: np.ndarray, total: int, shrink: int) -> np.ndarray:
+    """逐点数组上长度为shrink+1的滑动窗口中，不跨越段边界的窗口起点"""
+    n_windows = max(total - shrink, 0)
+    mask = np.ones(n_windows, dtype=bool)
+    lengths = np.diff(offsets)
+    segment_ids = np.repeat(np.arange(len(lengths)), lengths)
+    if n_windows:
+        mask &= segment_ids[:n_windows] == segment_ids[shrink:shrink + n_windows]
+    return mask
+
+
+def _segment_diff(values: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """段内一阶差分，按段顺序拼接（每段长度减1）"""
+    mask = _window_mask(offsets, len(values), 1)
+    return np.diff(values)[mask]
+
+
+def _haversine(lat1, lon1, lat2, lon2) -> np.ndarray:
+    """向量化Haversine距离（米）"""
+    lat1, lon1, lat2, lon2 = map(np.radians, [lat1, lon1, lat2, lon2])
+    dlat = lat2 - lat1
+    dlon = lon2 - lon1
+    a = np.sin(dlat / 2) ** 2 + np.cos(lat1) * np.cos(lat2) * np.sin(dlon / 2) ** 2
+    return EARTH_RADIUS_M * 2 * np.arcsin(np.sqrt(a))
+
+
+def _entropy_from_counts(counts: np.ndarray) -> np.ndarray:
+    """按行计算直方图计数的熵（log2）"""
+    totals = counts.sum(axis=1, keepdims=True)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        probs = counts / np.where(totals > 0, totals, 1)
+        terms = np.where(probs > 0, probs * np.log2(np.where(probs > 0, probs, 1)), 0.0)
+    return -terms.sum(axis=1)
+
+
+def _uniform_histogram_counts(values: np.ndarray, offsets: np.ndarray, n_bins: int) -> np.ndarray:
+    """按段计算与np.histogram(values, bins=n_bins)一致的等宽直方图计数"""
+    lengths = np.diff(offsets)
+    n_segments = len(lengths)
+    counts = np.zeros((n_segments, n_bins), dtype=np.int64)
+    if len(values) == 0:
+        return counts
+
+    first_edge = _segment_extreme(values, offsets, np.minimum)
+    last_edge = _segment_extreme(values, offsets, np.maximum)
+    flat = first_edge == last_edge
+    first_edge = np.where(flat, first_edge - 0.5, first_edge)
+    last_edge = np.where(flat, last_edge + 0.5, last_edge)
+
+    segment_ids = np.repeat(np.arange(n_segments), lengths)
+    first = first_edge[segment_ids]
+    last = last_edge[segment_ids]
+    norm = n_bins / (last - first)
+
+    # 与numpy等宽分箱相同：先按比例计算，再用精确边界修正
+    indices = ((values - first) * norm).astype(np.int64)
+    indices[indices == n_bins] -= 1
+    edges = np.linspace(first_edge, last_edge, n_bins + 1, axis=1)
+    decrement = values < edges[segment_ids, indices]
+    indices[decrement] -= 1
+    increment = (values >= edges[segment_ids, np.minimum(indices + 1, n_bins)]) & (indices != n_bins - 1)
+    indices[increment] += 1
+
+    np.add.at(counts, (segment_ids, indices), 1)
+    return counts
+
+
+# ==================== 基础特征（10维） ====================
+
+def _motion_features(batch: SegmentBatch) -> np.ndarray:
+    """速度、加速度、航向角和方向特征（10维）"""
+    offsets = batch.offsets
+    lengths = batch.lengths
+    n_segments = batch.n_segments
+    features = np.zeros((n_segments, 10))
+    if n_segments == 0:
+        return features
+
+    # 速度特征
+    features[:, 0], features[:, 1] = _segment_mean_std(batch.speed, offsets)
+    features[:, 2] = _segment_extreme(batch.speed, offsets, np.maximum)
+    features[:, 3] = _segment_extreme(batch.speed, offsets, np.minimum)
+
+    # 加速度特征（段内差分）
+    diff_offsets = _inner_offsets(offsets, 1)
+    time_diffs = np.maximum(_segment_diff(batch.timestamp, offsets), MIN_TIME_DIFF)
+    accelerations = _segment_diff(batch.speed, offsets) / time_diffs
+    multi_point = lengths > 1
+    accel_mean, accel_std = _segment_mean_std(accelerations, diff_offsets)
+    features[:, 4] = np.where(multi_point, accel_mean, 0.0)
+    features[:, 5] = np.where(multi_point, accel_std, 0.0)
+
+    # 航向角特征
+    if batch.yaw is not None:
+        yaw_changes = _segment_diff(batch.yaw, offsets) / time_diffs
+        yaw_rate = _segment_sum(np.abs(yaw_changes), diff_offsets) / np.maximum(lengths - 1, 1)
+        _, yaw_std = _segment_mean_std(batch.yaw, offsets)
+        features[:, 6] = np.where(multi_point, yaw_rate, 0.0)
+        features[:, 7] = np.where(multi_point, yaw_std, 0.0)
+
+    # 起终点方向
+    nonempty = lengths > 0
+    starts = offsets[:-1][nonempty]
+    ends = offsets[1:][nonempty] - 1
+    angle = np.arctan2(batch.lat[ends] - batch.lat[starts], batch.lon[ends] - batch.lon[starts])
+    features[nonempty, 8] = np.cos(angle)
+    features[nonempty, 9] = np.sin(angle)
+
+    return features
+
+
+def extract_basic_features_batch(batch: SegmentBatch) -> np.ndarray:
+    """批量提取10维基础特征
+
+    特征顺序与GridTrajectoryClusterer.extract_features一致：
+    avg/std/max/min速度、avg/std加速度、航向角变化率、航向角标准差、方向cos/sin。
+
+    Returns:
+        (n_segments, 10) 特征矩阵
+    """
+    return _motion_features(batch)
+
+
+# ==================== 增强特征（17维） ====================
+
+def extract_enhanced_features_batch(batch: SegmentBatch) -> np.ndarray:
+    """批量提取17维增强特征
+
+    前10维同extract_basic_features_batch，后7维依次为曲率、曲折度、方向熵、
+    速度熵、停车比例、加速度峰值数、包络面积，与extract_enhanced_features一致
+    （加速度和航向角变化由逐点速度、航向角和时间戳计算）。
+
+    Returns:
+        (n_segments, 17) 特征矩阵
+    """
+    offsets = batch.offsets
+    lengths = batch.lengths
+    n_segments = batch.n_segments
+    total = len(batch.lon)
+    features = np.zeros((n_segments, 17))
+    if n_segments == 0:
+        return features
+
+    features[:, :10] = _motion_features(batch)
+    lon, lat = batch.lon, batch.lat
+
+    # 曲率：三点外接圆半径倒数的均值
+    triple_mask = _window_mask(offsets, total, 2)
+    triple_offsets = _inner_offsets(offsets, 2)
+    if triple_mask.any():
+        p1 = np.column_stack((lon[:-2], lat[:-2]))[triple_mask]
+        p2 = np.column_stack((lon[1:-1], lat[1:-1]))[triple_mask]
+        p3 = np.column_stack((lon[2:], lat[2:]))[triple_mask]
+        a = np.linalg.norm(p2 - p1, axis=1)
+        b = np.linalg.norm(p3 - p2, axis=1)
+        c = np.linalg.norm(p3 - p1, axis=1)
+        s = (a + b + c) / 2
+        area_sq = s * (s - a) * (s - b) * (s - c)
+        abc = a * b * c
+        valid = (area_sq > 0) & (abc > 0)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            curvature = np.where(valid, 4 * np.sqrt(np.where(valid, area_sq, 0)) / np.where(valid, abc, 1), 0.0)
+        valid_count = _segment_sum(valid.astype(float), triple_offsets)
+        curvature_sum = _segment_sum(curvature, triple_offsets)
+        features[:, 10] = np.where(valid_count > 0, curvature_sum / np.maximum(valid_count, 1), 0.0)
+
+    # 曲折度：路径长度 / 直线距离
+    pair_mask = _window_mask(offsets, total, 1)
+    diff_offsets = _inner_offsets(offsets, 1)
+    step_lengths = _haversine(lat[:-1], lon[:-1], lat[1:], lon[1:])[pair_mask] if total > 1 else np.empty(0)
+    path_length = _segment_sum(step_lengths, diff_offsets)
+    tortuosity = np.ones(n_segments)
+    multi_point = lengths > 1
+    if multi_point.any():
+        starts = offsets[:-1][multi_point]
+        ends = offsets[1:][multi_point] - 1
+        straight = _haversine(lat[starts], lon[starts], lat[ends], lon[ends])
+        tortuosity[multi_point] = np.where(straight < 1.0, 1.0, path_length[multi_point] / np.maximum(straight, 1.0))
+    features[:, 11] = tortuosity
+
+    # 方向熵：相邻点方向的8方位直方图
+    if total > 1:
+        directions = np.arctan2(np.diff(lat), np.diff(lon))[pair_mask]
+        bins = np.linspace(-np.pi, np.pi, 9)
+        bin_index = np.searchsorted(bins, directions, side='right') - 1
+        bin_index[directions == bins[-1]] = 7
+        in_range = (bin_index >= 0) & (bin_index < 8)
+        diff_segment_ids = np.repeat(np.arange(n_segments), np.diff(diff_offsets))
+        direction_counts = np.zeros((n_segments, 8), dtype=np.int64)
+        np.add.at(direction_counts, (diff_segment_ids[in_range], bin_index[in_range]), 1)
+        features[:, 12] = np.where(multi_point, _entropy_from_counts(direction_counts), 0.0)
+
+    # 速度熵：10等宽分箱
+    speed_counts = _uniform_histogram_counts(batch.speed, offsets, 10)
+    features[:, 13] = np.where(multi_point, _entropy_from_counts(speed_counts), 0.0)
+
+    # 停车比例
+    stopped = _segment_sum((batch.speed < STOP_SPEED).astype(float), offsets)
+    features[:, 14] = stopped / np.maximum(lengths, 1)
+
+    # 加速度峰值数：段内加速度序列的显著局部极值
+    time_diffs = np.maximum(_segment_diff(batch.timestamp, offsets), MIN_TIME_DIFF)
+    accelerations = _segment_diff(batch.speed, offsets) / time_diffs
+    if len(accelerations) > 2:
+        inner_mask = _window_mask(diff_offsets, len(accelerations), 2)
+        prev_a, mid_a, next_a = accelerations[:-2], accelerations[1:-1], accelerations[2:]
+        is_peak = (np.abs(mid_a) > ACCEL_PEAK_THRESHOLD) & (
+            ((mid_a > prev_a) & (mid_a > next_a)) | ((mid_a < prev_a) & (mid_a < next_a))
+        )
+        features[:, 15] = _segment_sum(is_peak[inner_mask].astype(float), _inner_offsets(diff_offsets, 2))
+
+    # 包络面积：轨迹与起终点连线围成的多边形面积（鞋带公式，以段起点为原点）
+    ring = lengths >= 3
+    if ring.any():
+        segment_ids = np.repeat(np.arange(n_segments), lengths)
+        x = lon - lon[offsets[:-1]][segment_ids]
+        y = lat - lat[offsets[:-1]][segment_ids]
+        # 闭合边终点为段起点（平移后为原点），其叉积项为0
+        cross = x[:-1] * y[1:] - x[1:] * y[:-1] if total > 1 else np.empty(0)
+        area = np.abs(_segment_sum(cross[pair_mask], diff_offsets)) / 2
+        features[:, 16] = np.where(ring, area * DEGREE_TO_METER ** 2, 0.0)
+
+    return features
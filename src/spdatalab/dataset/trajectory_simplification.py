@@ -0,0 +1,319 @@
+"""轨迹简化与重采样模块
+
+与trajectory_features相同，多条轨迹拼接为逐点数组，用偏移数组(offsets)标记边界
+（第j条轨迹的点为 ``[offsets[j], offsets[j+1])``），所有方法一次处理整批轨迹，
+返回逐点的保留掩码：
+
+- douglas_peucker_mask：Douglas-Peucker简化，容差单位为米（局部投影坐标）
+- distance_resample_mask：按累计行驶距离等间隔取点
+- time_resample_mask：按时间等间隔取点
+- uniform_resample_mask：每隔固定点数取点
+- cap_points_mask：限制每条轨迹保留的最大点数
+
+各方法都保留每条轨迹的首尾点，且只选取原始点（不插值），时间戳、速度等属性可直接沿用。
+
+使用示例：
+    config = SimplificationConfig(strategy='douglas_peucker', tolerance_m=2.0, max_points=500)
+    simplified_df = simplify_points_df(points_df, config)
+"""
+
+from __future__ import annotations
+
+import argparse
+from dataclasses import dataclass
+from typing import List, Optional, Sequence
+
+import numpy as np
+import pandas as pd
+
+EARTH_RADIUS_M = 6371000
+METERS_PER_DEGREE = EARTH_RADIUS_M * np.pi / 180
+
+STRATEGIES = ('none', 'douglas_peucker', 'distance', 'time', 'uniform')
+
+
+@dataclass
+class SimplificationConfig:
+    """轨迹简化/重采样配置"""
+    strategy: str = 'douglas_peucker'   # 'none', 'douglas_peucker', 'distance', 'time', 'uniform'
+    tolerance_m: float = 2.0            # Douglas-Peucker容差（米）
+    distance_interval: float = 10.0     # 距离采样间隔（米）
+    time_interval: float = 5.0          # 时间采样间隔（与timestamp同单位）
+    uniform_step: int = 50              # 均匀采样步长（点数）
+    max_points: Optional[int] = None    # 每条轨迹最多保留点数（None不限制）
+
+    def __post_init__(self):
+        if self.strategy not in STRATEGIES:
+            raise ValueError(f"未知简化策略: {self.strategy}，可选: {list(STRATEGIES)}")
+
+
+def add_simplification_arguments(parser: argparse.ArgumentParser) -> None:
+    """为命令行添加轨迹几何简化参数（--simplify-tolerance / --max-points）"""
+    parser.add_argument('--simplify-tolerance', type=float,
+                        help='轨迹几何Douglas-Peucker简化容差（米），不设置则保留全部点')
+    parser.add_argument('--max-points', type=int, help='每条轨迹几何最多点数')
+
+
+def simplification_from_args(simplify_tolerance: Optional[float] = None,
+                             max_points: Optional[int] = None) -> Optional[SimplificationConfig]:
+    """命令行参数 -> 简化配置，两者都未设置时返回None"""
+    if simplify_tolerance is None and max_points is None:
+        return None
+    return SimplificationConfig(
+        strategy='douglas_peucker' if simplify_tolerance is not None else 'none',
+        tolerance_m=simplify_tolerance or 0.0,
+        max_points=max_points
+    )
+
+
+def offsets_from_lengths(lengths: Sequence[int]) -> np.ndarray:
+    """每条轨迹点数 -> 偏移数组"""
+    offsets = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=offsets[1:])
+    return offsets
+
+
+def _trajectory_ids(offsets: np.ndarray) -> np.ndarray:
+    """逐点所属轨迹序号"""
+    return np.repeat(np.arange(len(offsets) - 1), np.diff(offsets))
+
+
+def _endpoint_mask(offsets: np.ndarray, n_points: int) -> np.ndarray:
+    """每条轨迹的首尾点"""
+    mask = np.zeros(n_points, dtype=bool)
+    lengths = np.diff(offsets)
+    nonempty = lengths > 0
+    mask[offsets[:-1][nonempty]] = True
+    mask[offsets[1:][nonempty] - 1] = True
+    return mask
+
+
+def _project(lon: np.ndarray, lat: np.ndarray, offsets: np.ndarray):
+    """按各轨迹的平均纬度做等距圆柱投影（米）"""
+    lengths = np.diff(offsets)
+    ids = _trajectory_ids(offsets)
+    lat_sum = np.bincount(ids, weights=lat, minlength=len(lengths))
+    mean_lat = lat_sum / np.maximum(lengths, 1)
+    x = lon * np.cos(np.radians(mean_lat[ids])) * METERS_PER_DEGREE
+    y = lat * METERS_PER_DEGREE
+    return x, y
+
+
+def douglas_peucker_mask(lon, lat, offsets: np.ndarray, tolerance_m: float) -> np.ndarray:
+    """批量Douglas-Peucker简化
+
+    所有轨迹的待处理区间同时推进：每轮对全部区间的内部点一次计算到区间端点线段的距离，
+    距离最大且超过容差的点保留并把区间一分为二，直到没有区间需要拆分。
+
+    Args:
+        lon, lat: 逐点经纬度
+        offsets: 偏移数组
+        tolerance_m: 容差（米）
+
+    Returns:
+        逐点保留掩码
+    """
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    x, y = _project(lon, lat, offsets)
+    keep = _endpoint_mask(offsets, len(lon))
+
+    lengths = np.diff(offsets)
+    starts = offsets[:-1][lengths > 2]
+    ends = offsets[1:][lengths > 2] - 1
+
+    while len(starts):
+        interior = ends - starts - 1
+        # 区间内部点的全局下标
+        interval_ids = np.repeat(np.arange(len(starts)), interior)
+        positions = np.arange(len(interval_ids)) - np.repeat(np.cumsum(interior) - interior, interior)
+        idx = np.repeat(starts + 1, interior) + positions
+
+        # 点到区间端点线段的距离
+        x0, y0 = x[starts][interval_ids], y[starts][interval_ids]
+        dx = x[ends][interval_ids] - x0
+        dy = y[ends][interval_ids] - y0
+        seg_len2 = dx * dx + dy * dy
+        with np.errstate(invalid='ignore', divide='ignore'):
+            t = np.where(seg_len2 > 0, ((x[idx] - x0) * dx + (y[idx] - y0) * dy) / seg_len2, 0.0)
+        t = np.clip(t, 0.0, 1.0)
+        dist = np.hypot(x[idx] - (x0 + t * dx), y[idx] - (y0 + t * dy))
+
+        # 每个区间距离最大的点（并列取最靠前者）
+        order = np.lexsort((-dist, interval_ids))
+        first = np.cumsum(interior) - interior
+        farthest = order[first]
+        split = dist[farthest] > tolerance_m
+
+        split_idx = idx[farthest][split]
+        keep[split_idx] = True
+
+        new_starts = np.concatenate([starts[split], split_idx])
+        new_ends = np.concatenate([split_idx, ends[split]])
+        has_interior = new_ends - new_starts > 1
+        starts, ends = new_starts[has_interior], new_ends[has_interior]
+
+    return keep
+
+
+def _bucket_change_mask(values: np.ndarray, offsets: np.ndarray, interval: float) -> np.ndarray:
+    """values（轨迹内从0开始的累计量）每跨过一个interval取第一个点"""
+    if interval <= 0:
+        return np.ones(len(values), dtype=bool)
+    buckets = np.floor(values / interval)
+    keep = _endpoint_mask(offsets, len(values))
+    if len(values) > 1:
+        changed = np.empty(len(values), dtype=bool)
+        changed[0] = True
+        changed[1:] = buckets[1:] != buckets[:-1]
+        keep |= changed
+    return keep
+
+
+def _segment_cumsum(steps: np.ndarray, offsets: np.ndarray) -> np.ndarray:
+    """轨迹内累计和（steps[i]为第i点与前一点之间的增量，首点增量忽略）"""
+    lengths = np.diff(offsets)
+    steps = steps.copy()
+    steps[offsets[:-1][lengths > 0]] = 0.0
+    total = np.cumsum(steps)
+    base = np.repeat(total[offsets[:-1][lengths > 0]], lengths[lengths > 0])
+    return total - base
+
+
+def distance_resample_mask(lon, lat, offsets: np.ndarray, interval_m: float) -> np.ndarray:
+    """按累计行驶距离每interval_m米取一个点"""
+    lon = np.asarray(lon, dtype=float)
+    lat = np.asarray(lat, dtype=float)
+    if len(lon) == 0:
+        return np.zeros(0, dtype=bool)
+    x, y = _project(lon, lat, offsets)
+    steps = np.zeros(len(lon))
+    steps[1:] = np.hypot(np.diff(x), np.diff(y))
+    return _bucket_change_mask(_segment_cumsum(steps, offsets), offsets, interval_m)
+
+
+def time_resample_mask(timestamp, offsets: np.ndarray, interval: float) -> np.ndarray:
+    """按时间每interval取一个点（timestamp需在轨迹内递增）"""
+    timestamp = np.asarray(timestamp, dtype=float)
+    if len(timestamp) == 0:
+        return np.zeros(0, dtype=bool)
+    steps = np.zeros(len(timestamp))
+    steps[1:] = np.diff(timestamp)
+    return _bucket_change_mask(_segment_cumsum(steps, offsets), offsets, interval)
+
+
+def uniform_resample_mask(offsets: np.ndarray, step: int) -> np.ndarray:
+    """每条轨迹每隔step个点取一个点"""
+    n_points = int(offsets[-1]) if len(offsets) else 0
+    lengths = np.diff(offsets)
+    positions = np.arange(n_points) - np.repeat(offsets[:-1], lengths)
+    return (positions % max(1, int(step)) == 0) | _endpoint_mask(offsets, n_points)
+
+
+def cap_points_mask(mask: np.ndarray, offsets: np.ndarray, max_points: int) -> np.ndarray:
+    """在已保留的点中为每条轨迹均匀挑选至多max_points个点（含首尾）"""
+    mask = np.asarray(mask, dtype=bool)
+    if max_points is None or len(mask) == 0:
+        return mask
+    max_points = max(2, int(max_points))
+
+    ids = _trajectory_ids(offsets)
+    kept = np.nonzero(mask)[0]
+    kept_counts = np.bincount(ids[kept], minlength=len(offsets) - 1)
+    over = kept_counts > max_points
+    if not over.any():
+        return mask
+
+    # 已保留点在本轨迹内的序号r映射到槽位floor(r*(m-1)/(c-1))，每个槽位取第一个点，
+    # 恰好得到m个点且包含首尾
+    kept_ids = ids[kept]
+    kept_offsets = offsets_from_lengths(kept_counts)
+    rank = np.arange(len(kept)) - kept_offsets[kept_ids]
+    counts = kept_counts[kept_ids]
+    slot = (rank * (max_points - 1)) // np.maximum(counts - 1, 1)
+    first_in_slot = np.ones(len(kept), dtype=bool)
+    first_in_slot[1:] = (slot[1:] != slot[:-1]) | (kept_ids[1:] != kept_ids[:-1])
+
+    result = mask.copy()
+    drop = over[kept_ids] & ~first_in_slot
+    result[kept[drop]] = False
+    return result
+
+
+def simplify_mask(lon, lat, offsets: np.ndarray, config: SimplificationConfig,
+                  timestamp=None) -> np.ndarray:
+    """按配置计算逐点保留掩码"""
+    n_points = len(lon)
+    if config.strategy == 'douglas_peucker':
+        mask = douglas_peucker_mask(lon, lat, offsets, config.tolerance_m)
+    elif config.strategy == 'distance':
+        mask = distance_resample_mask(lon, lat, offsets, config.distance_interval)
+    elif config.strategy == 'time':
+        if timestamp is None:
+            raise ValueError("时间采样需要timestamp")
+        mask = time_resample_mask(timestamp, offsets, config.time_interval)
+    elif config.strategy == 'uniform':
+        mask = uniform_resample_mask(offsets, config.uniform_step)
+    else:
+        mask = np.ones(n_points, dtype=bool)
+
+    if config.max_points is not None:
+        mask = cap_points_mask(mask, offsets, config.max_points)
+    return mask
+
+
+def simplify_coords_batch(coords_list: Sequence[np.ndarray], config: SimplificationConfig) -> List[np.ndarray]:
+    """批量简化坐标数组列表（每个 (N, 2) [lon, lat]）"""
+    if not coords_list:
+        return []
+    arrays = [np.asarray(coords, dtype=float).reshape(-1, 2) for coords in coords_list]
+    offsets = offsets_from_lengths([len(arr) for arr in arrays])
+    stacked = np.vstack(arrays)
+    mask = simplify_mask(stacked[:, 0], stacked[:, 1], offsets, config)
+    return [arr[mask[offsets[j]:offsets[j + 1]]] for j, arr in enumerate(arrays)]
+
+
+def simplify_coords(coords: np.ndarray, config: SimplificationConfig) -> np.ndarray:
+    """简化单条轨迹坐标"""
+    return simplify_coords_batch([coords], config)[0]
+
+
+def simplify_points_df(
+    points_df: pd.DataFrame,
+    config: SimplificationConfig,
+    group_col: Optional[str] = 'dataset_name',
+    lon_col: str = 'longitude',
+    lat_col: str = 'latitude',
+    time_col: str = 'timestamp'
+) -> pd.DataFrame:
+    """简化轨迹点表（按group_col分轨迹、组内按时间排序）
+
+    Args:
+        points_df: 轨迹点DataFrame
+        config: 简化配置
+        group_col: 轨迹分组列，None表示整表为一条轨迹
+        lon_col, lat_col, time_col: 坐标和时间列名
+
+    Returns:
+        按(group_col, time_col)排序后保留的点
+    """
+    if points_df.empty or (config.strategy == 'none' and config.max_points is None):
+        return points_df
+
+    sort_cols = [col for col in (group_col, time_col) if col and col in points_df.columns]
+    ordered = points_df.sort_values(sort_cols, kind='stable') if sort_cols else points_df
+
+    if group_col and group_col in ordered.columns:
+        codes, _ = pd.factorize(ordered[group_col], sort=False, use_na_sentinel=False)
+        lengths = np.bincount(codes)
+    else:
+        lengths = [len(ordered)]
+    offsets = offsets_from_lengths(lengths)
+
+    timestamp = ordered[time_col].to_numpy(dtype=float) if time_col in ordered.columns else None
+    mask = simplify_mask(
+        ordered[lon_col].to_numpy(dtype=float),
+        ordered[lat_col].to_numpy(dtype=float),
+        offsets, config, timestamp=timestamp
+    )
+    return ordered[mask]
@@ -61,6 +61,7 @@ class TrajectoryLaneAnalysisConfig:
     road_analysis_lanes_table: str = "trajectory_road_lanes"
     
     # 采样策略配置
+    enable_sampling: bool = False  # 启用采样（作用于车道分析的轨迹几何）
     sampling_strategy: str = "distance"  # 'distance', 'time', 'uniform'
     distance_interval: float = 10.0  # 距离采样间隔(m)
     time_interval: float = 2.0  # 时间采样间隔(s)
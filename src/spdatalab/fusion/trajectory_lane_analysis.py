@@ -36,6 +36,16 @@ from functools import partial
 
 # 导入相关模块
 from spdatalab.common.io_hive import hive_cursor
+from spdatalab.dataset.polygon_trajectory_query import build_time_window_filter
+from spdatalab.dataset.trajectory_simplification import (
+    SimplificationConfig,
+    distance_resample_mask,
+    douglas_peucker_mask,
+    offsets_from_lengths,
+    simplify_mask,
+    time_resample_mask,
+    uniform_resample_mask
+)
 from spdatalab.dataset.trajectory import (
     load_scene_data_mappings,
     fetch_data_names_from_scene_ids,
@@ -53,11 +63,13 @@ DEFAULT_CONFIG = {
     'input_format': 'scene_id_list',
     'polyline_output': True,
     
-    # 采样配置
+    # 采样配置（enable_sampling开启后作用于输入轨迹分段和完整轨迹几何）
+    'enable_sampling': False,
     'sampling_strategy': 'distance',  # 'distance', 'time', 'uniform'
     'distance_interval': 10.0,        # 米
     'time_interval': 5.0,             # 秒
     'uniform_step': 50,               # 点数
+    'max_points_per_trajectory': None,  # 采样后每条轨迹最多点数
     
     # 滑窗配置
     'window_size': 20,                # 采样点数
@@ -70,6 +82,8 @@ DEFAULT_CONFIG = {
     'points_limit_per_lane': 1000,    # 每个lane最多查询的轨迹点数
     'enable_time_filter': True,       # 启用时间过滤
     'recent_days': 30,                # 只查询最近N天的数据
+    'start_ts': None,                 # 显式时间窗口起点（含），设置后优先于recent_days
+    'end_ts': None,                   # 显式时间窗口终点（含）
     
     # 方向匹配配置（新增）
     'enable_direction_matching': True,  # 启用方向匹配
@@ -81,7 +95,7 @@ DEFAULT_CONFIG = {
     'min_points_single_lane': 5,      # 单车道最少点数
     'enable_multi_lane_filter': True, # 启用多车道过滤
     
-    # 简化配置
+    # 简化配置（enable_sampling开启时在采样后执行Douglas-Peucker）
     'simplify_tolerance': 2.0,        # 米
     'enable_simplification': True,
     
@@ -282,6 +296,117 @@ class TrajectoryLaneAnalyzer:
             'end_time': None
         }
     
+    def _sample_coordinates(self, coords: np.ndarray, timestamps: Optional[np.ndarray] = None) -> np.ndarray:
+        """按sampling_strategy采样轨迹坐标，再按simplify_tolerance做Douglas-Peucker简化
+        
+        Args:
+            coords: 坐标数组 (N, 2) [lon, lat]，按时间排序
+            timestamps: 对应时间戳（'time'策略需要，缺失时退化为'distance'）
+            
+        Returns:
+            保留点的逻辑掩码 (N,)；未启用采样时全部保留
+        """
+        coords = np.asarray(coords, dtype=float).reshape(-1, 2)
+        if not self.config.get('enable_sampling', False) or len(coords) < 3:
+            return np.ones(len(coords), dtype=bool)
+        
+        strategy = self.config.get('sampling_strategy', 'distance')
+        if strategy == 'time' and timestamps is None:
+            logger.debug("输入轨迹无时间戳，时间采样退化为距离采样")
+            strategy = 'distance'
+        
+        sampling = SimplificationConfig(
+            strategy=strategy,
+            distance_interval=self.config.get('distance_interval', 10.0),
+            time_interval=self.config.get('time_interval', 5.0),
+            uniform_step=self.config.get('uniform_step', 50)
+        )
+        offsets = offsets_from_lengths([len(coords)])
+        mask = simplify_mask(coords[:, 0], coords[:, 1], offsets, sampling, timestamp=timestamps)
+        
+        if self.config.get('enable_simplification', True):
+            kept = np.nonzero(mask)[0]
+            simplification = SimplificationConfig(
+                strategy='douglas_peucker',
+                tolerance_m=self.config.get('simplify_tolerance', 2.0),
+                max_points=self.config.get('max_points_per_trajectory')
+            )
+            kept_mask = simplify_mask(
+                coords[kept, 0], coords[kept, 1], offsets_from_lengths([len(kept)]), simplification
+            )
+            mask[kept[~kept_mask]] = False
+        elif self.config.get('max_points_per_trajectory'):
+            mask = simplify_mask(
+                coords[:, 0], coords[:, 1], offsets,
+                SimplificationConfig(strategy='none', max_points=self.config['max_points_per_trajectory'])
+            ) & mask
+        
+        logger.debug(f"轨迹采样({strategy}): {len(coords)} → {int(mask.sum())} 个点")
+        return mask
+    
+    def _polyline_samples(self, polyline_data: Dict, mask: np.ndarray) -> List[Dict]:
+        """按保留掩码从polyline数据中取出采样点"""
+        polyline = polyline_data.get('polyline', [])
+        attributes = {
+            'timestamp': polyline_data.get('timestamps'),
+            'speed': polyline_data.get('speeds'),
+            'avp_flag': polyline_data.get('avp_flags'),
+            'workstage': polyline_data.get('workstages')
+        }
+        samples = []
+        for index in np.nonzero(mask)[0]:
+            sample = {'coordinate': tuple(polyline[index]), 'original_index': int(index)}
+            for key, values in attributes.items():
+                sample[key] = values[index] if values is not None and index < len(values) else None
+            samples.append(sample)
+        return samples
+    
+    def _distance_based_sampling(self, polyline_data: Dict) -> List[Dict]:
+        """按累计行驶距离每distance_interval米采样一个点（保留首尾点）"""
+        coords = np.asarray(polyline_data.get('polyline', []), dtype=float).reshape(-1, 2)
+        offsets = offsets_from_lengths([len(coords)])
+        mask = distance_resample_mask(coords[:, 0], coords[:, 1], offsets,
+                                      self.config.get('distance_interval', 10.0))
+        return self._polyline_samples(polyline_data, mask)
+    
+    def _time_based_sampling(self, polyline_data: Dict) -> List[Dict]:
+        """按时间每time_interval采样一个点（保留首尾点）"""
+        timestamps = np.asarray(polyline_data.get('timestamps', []), dtype=float)
+        offsets = offsets_from_lengths([len(timestamps)])
+        mask = time_resample_mask(timestamps, offsets, self.config.get('time_interval', 5.0))
+        return self._polyline_samples(polyline_data, mask)
+    
+    def _uniform_sampling(self, polyline_data: Dict) -> List[Dict]:
+        """每隔uniform_step个点采样一个点（保留首尾点）"""
+        offsets = offsets_from_lengths([len(polyline_data.get('polyline', []))])
+        mask = uniform_resample_mask(offsets, self.config.get('uniform_step', 50))
+        return self._polyline_samples(polyline_data, mask)
+    
+    def sample_trajectory(self, polyline_data: Dict) -> List[Dict]:
+        """按sampling_strategy采样polyline数据
+        
+        Args:
+            polyline_data: 包含polyline、timestamps、speeds、avp_flags、workstages的字典
+            
+        Returns:
+            采样点列表，每个包含coordinate、original_index及对应属性
+        """
+        strategy = self.config.get('sampling_strategy', 'distance')
+        if strategy == 'time':
+            return self._time_based_sampling(polyline_data)
+        if strategy == 'uniform':
+            return self._uniform_sampling(polyline_data)
+        return self._distance_based_sampling(polyline_data)
+    
+    def simplify_trajectory(self, trajectory: LineString) -> LineString:
+        """Douglas-Peucker简化轨迹几何（容差simplify_tolerance，单位米）"""
+        if not self.config.get('enable_simplification', True) or len(trajectory.coords) < 3:
+            return trajectory
+        coords = np.asarray(trajectory.coords)[:, :2]
+        mask = douglas_peucker_mask(coords[:, 0], coords[:, 1], offsets_from_lengths([len(coords)]),
+                                    self.config.get('simplify_tolerance', 2.0))
+        return LineString(coords[mask])
+    
     def _generate_dynamic_table_names(self, analysis_id: str) -> Dict[str, str]:
         """根据analysis_id生成动态表名
         
@@ -565,6 +690,10 @@ class TrajectoryLaneAnalyzer:
                 logger.error(f"轨迹坐标点不足: {len(coords)}")
                 return []
             
+            # 可选采样，限制分段时处理的点数
+            sample_mask = self._sample_coordinates(np.asarray(coords)[:, :2])
+            coords = [coord for coord, keep in zip(coords, sample_mask) if keep]
+            
             # 按距离分段（每段约50米）
             segment_distance = 50.0  # 米
             segment_distance_degrees = segment_distance / 111320.0  # 转换为度
@@ -823,6 +952,8 @@ class TrajectoryLaneAnalyzer:
         points_limit = self.config.get('points_limit_per_lane', 1000)
         enable_time_filter = self.config.get('enable_time_filter', True)
         recent_days = self.config.get('recent_days', 30)  # 只查询最近30天的数据
+        start_ts = self.config.get('start_ts')
+        end_ts = self.config.get('end_ts')
         
         logger.info(f"开始查询{len(nearby_lanes)}个lanes的buffer内轨迹点")
         logger.info(f"配置: buffer_radius={buffer_radius}m, points_limit={points_limit}, recent_days={recent_days}")
@@ -833,9 +964,11 @@ class TrajectoryLaneAnalyzer:
                 for i, lane in enumerate(nearby_lanes):
                     logger.info(f"查询lane [{i+1}/{len(nearby_lanes)}]: {lane['lane_id']} (type: {lane['lane_type']})")
                     
-                    # 构建时间过滤条件
+                    # 构建时间过滤条件：显式时间窗口优先，否则按最近N天
                     time_filter = ""
-                    if enable_time_filter:
+                    if start_ts is not None or end_ts is not None:
+                        time_filter = build_time_window_filter(start_ts, end_ts, table_alias='p')
+                    elif enable_time_filter:
                         # 最近N天的时间戳过滤（假设timestamp是Unix时间戳）
                         recent_timestamp = int(time.time()) - (recent_days * 24 * 3600)
                         time_filter = f"AND p.timestamp >= {recent_timestamp}"
@@ -1048,6 +1181,7 @@ LIMIT {points_limit};
                     FROM {POINT_TABLE}
                     WHERE dataset_name = '{data_name}'
                     AND point_lla IS NOT NULL
+                    {build_time_window_filter(self.config.get('start_ts'), self.config.get('end_ts'))}
                     ORDER BY timestamp ASC
                 """
                 
@@ -1105,12 +1239,14 @@ LIMIT {points_limit};
                     logger.warning(f"无法获取完整轨迹数据: {data_name}")
                     continue
                 
-                # 构建完整轨迹
+                # 构建完整轨迹（可选采样只作用于几何，统计仍基于全部点）
                 points_df = points_df.sort_values('timestamp')
-                coordinates = []
-                for _, row in points_df.iterrows():
-                    if pd.notna(row['longitude']) and pd.notna(row['latitude']):
-                        coordinates.append((float(row['longitude']), float(row['latitude'])))
+                valid_points = points_df[points_df['longitude'].notna() & points_df['latitude'].notna()]
+                coords_array = valid_points[['longitude', 'latitude']].to_numpy(dtype=float)
+                sample_mask = self._sample_coordinates(
+                    coords_array, valid_points['timestamp'].to_numpy(dtype=float)
+                )
+                coordinates = [tuple(coord) for coord in coords_array[sample_mask]]
                 
                 if len(coordinates) < 2:
                     logger.warning(f"轨迹坐标点不足: {data_name}")
@@ -1187,7 +1323,7 @@ LIMIT {points_limit};
                     'end_time': int(points_df['timestamp'].max()),
                     'duration': int(points_df['timestamp'].max() - points_df['timestamp'].min()),
                     'total_points': len(points_df),
-                    'valid_coordinates': len(coordinates),
+                    'valid_coordinates': len(coords_array),
                     'trajectory_length': trajectory_geom.length,
                     'trajectory_length_meters': trajectory_length_meters,
                     
@@ -2248,7 +2384,24 @@ def main():
     parser.add_argument('--heading-method', choices=['start_end', 'weighted_average'], default='start_end',
                        help='航向计算方法')
     
+    # 采样参数
+    parser.add_argument('--enable-sampling', action='store_true',
+                       help='对输入轨迹和完整轨迹几何做采样/简化')
+    parser.add_argument('--sampling-strategy', choices=['distance', 'time', 'uniform'], default='distance',
+                       help='采样策略')
+    parser.add_argument('--distance-interval', type=float, default=10.0,
+                       help='距离采样间隔（米）')
+    parser.add_argument('--time-interval', type=float, default=5.0,
+                       help='时间采样间隔（秒）')
+    parser.add_argument('--max-points-per-trajectory', type=int,
+                       help='采样后每条轨迹最多点数')
+    
     # 输出参数
+    parser.add_argument('--start-ts', type=int,
+                       help='轨迹点时间窗口起点timestamp（含），设置后替代最近N天过滤')
+    parser.add_argument('--end-ts', type=int,
+                       help='轨迹点时间窗口终点timestamp（含）')
+    
     parser.add_argument('--output-format', choices=['summary', 'detailed', 'geojson'], 
                        default='summary', help='输出格式')
     parser.add_argument('--output-file', help='输出文件路径（可选）')
@@ -2275,7 +2428,14 @@ def main():
             'enable_direction_matching': args.enable_direction_matching,
             'max_heading_difference': args.max_heading_difference,
             'min_segment_length': args.min_segment_length,
-            'heading_calculation_method': args.heading_method
+            'heading_calculation_method': args.heading_method,
+            'start_ts': args.start_ts,
+            'end_ts': args.end_ts,
+            'enable_sampling': args.enable_sampling,
+            'sampling_strategy': args.sampling_strategy,
+            'distance_interval': args.distance_interval,
+            'time_interval': args.time_interval,
+            'max_points_per_trajectory': args.max_points_per_trajectory
         }
         
         # 输出配置信息
@@ -0,0 +1,49 @@
+"""
+DBSCAN参数扫描单元测试
+"""
+
+import numpy as np
+import pytest
+from sklearn.cluster import DBSCAN
+from sklearn.datasets import make_blobs
+from sklearn.metrics import pairwise_distances
+from sklearn.preprocessing import StandardScaler
+
+from spdatalab.dataset.dbscan_sweep import build_radius_graph, dbscan_labels_from_graph, dbscan_sweep
+from spdatalab.dataset.improved_trajectory_clustering import ImprovedTrajectoryClusterer
+
+
+@pytest.fixture
+def features():
+    X, _ = make_blobs(n_samples=600, n_features=10, centers=5, cluster_std=2.0, random_state=0)
+    # 重复点（0距离）也要计入邻居
+    X = np.vstack([X, X[:10]])
+    return StandardScaler().fit_transform(X)
+
+
+def test_sweep_matches_dbscan(features):
+    summary = dbscan_sweep(features, eps_values=[0.4, 0.6, 0.9], min_samples_values=[3, 8])
+    assert len(summary) == 6
+    for row in summary.itertuples():
+        expected = DBSCAN(eps=row.eps, min_samples=row.min_samples).fit_predict(features)
+        np.testing.assert_array_equal(row.labels, expected)
+        assert row.n_clusters == len(set(expected)) - (1 if -1 in expected else 0)
+        assert row.noise_ratio == pytest.approx(np.mean(expected == -1))
+
+
+def test_precomputed_distances(features):
+    distances = pairwise_distances(features[:200])
+    graph = build_radius_graph(distances, 0.9, metric='precomputed')
+    for eps in [0.5, 0.9]:
+        expected = DBSCAN(eps=eps, min_samples=4, metric='precomputed').fit_predict(distances)
+        np.testing.assert_array_equal(dbscan_labels_from_graph(graph, eps, 4), expected)
+
+
+def test_improved_clusterer_sweep(features):
+    clusterer = ImprovedTrajectoryClusterer(clustering_method='dbscan')
+    segments = [{'features': row} for row in features]
+    summary = clusterer.sweep(segments, eps_values=[0.6], min_samples_values=[5])
+    np.testing.assert_array_equal(
+        summary['labels'].iloc[0],
+        clusterer.cluster(segments, eps=0.6, min_samples=5)
+    )
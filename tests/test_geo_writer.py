@@ -0,0 +1,178 @@
+"""
+流式GeoJSON/GeoParquet写出器单元测试
+"""
+
+import json
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import LineString
+
+from spdatalab.common.geo_writer import (
+    PARQUET_AVAILABLE,
+    GeoParquetWriter,
+    StreamingGeoJSONWriter,
+    properties_schema,
+    write_features
+)
+
+
+def _features(n):
+    for i in range(n):
+        props = {
+            'dataset_name': f'ds_{i}',
+            'point_count': np.int64(i + 2),
+            'avg_speed': np.nan if i % 2 else np.float64(i * 0.5),
+            'event_id': None if i < 3 else f'evt_{i}'
+        }
+        yield props, LineString([(116.0 + i * 0.001, 39.0), (116.0 + i * 0.001, 39.001)])
+
+
+class TestStreamingGeoJSONWriter:
+    """测试GeoJSON流式写出"""
+
+    def test_writes_valid_feature_collection(self, tmp_path):
+        output = tmp_path / 'out.geojson'
+        with StreamingGeoJSONWriter(output) as writer:
+            count = writer.write_features(_features(5))
+        assert count == 5
+
+        data = json.loads(output.read_text(encoding='utf-8'))
+        assert data['type'] == 'FeatureCollection'
+        assert len(data['features']) == 5
+        assert data['features'][1]['properties']['avg_speed'] is None
+        assert data['features'][1]['properties']['point_count'] == 3
+
+        gdf = gpd.read_file(output)
+        assert len(gdf) == 5
+
+    def test_empty_output_is_valid(self, tmp_path):
+        output = tmp_path / 'empty.geojson'
+        with StreamingGeoJSONWriter(output):
+            pass
+        assert json.loads(output.read_text())['features'] == []
+
+    def test_missing_values_are_null(self, tmp_path):
+        output = tmp_path / 'na.geojson'
+        props = {'a': pd.NA, 'b': pd.NaT, 'c': np.datetime64('NaT'), 'd': [1, pd.NA],
+                 'e': pd.Timestamp('2024-01-01')}
+        with StreamingGeoJSONWriter(output) as writer:
+            writer.write_feature(props, LineString([(0, 0), (1, 1)]))
+        properties = json.loads(output.read_text())['features'][0]['properties']
+        assert properties == {'a': None, 'b': None, 'c': None, 'd': [1, None], 'e': '2024-01-01 00:00:00'}
+
+    def test_error_keeps_previous_file(self, tmp_path):
+        output = tmp_path / 'out.geojson'
+        write_features(_features(2), output)
+        previous = output.read_text()
+
+        def failing_features():
+            yield from _features(3)
+            raise RuntimeError('source failed')
+
+        with pytest.raises(RuntimeError):
+            write_features(failing_features(), output)
+        assert output.read_text() == previous
+        assert [p.name for p in tmp_path.iterdir()] == ['out.geojson']
+
+        new_output = tmp_path / 'new.geojson'
+        with pytest.raises(RuntimeError):
+            write_features(failing_features(), new_output)
+        assert not new_output.exists()
+
+
+@pytest.mark.skipif(not PARQUET_AVAILABLE, reason="需要pyarrow")
+class TestGeoParquetWriter:
+    """测试GeoParquet行组写出"""
+
+    def test_row_groups_and_geo_metadata(self, tmp_path):
+        import pyarrow.parquet as pq
+
+        output = tmp_path / 'out.parquet'
+        with GeoParquetWriter(output, row_group_size=2) as writer:
+            writer.write_features(_features(5))
+
+        parquet_file = pq.ParquetFile(output)
+        assert parquet_file.num_row_groups == 3
+        geo = json.loads(parquet_file.schema_arrow.metadata[b'geo'])
+        assert geo['columns']['geometry']['encoding'] == 'WKB'
+
+        gdf = gpd.read_parquet(output)
+        assert len(gdf) == 5
+        assert gdf.geometry.iloc[4].equals(LineString([(116.004, 39.0), (116.004, 39.001)]))
+        # 第一个行组中全为空的event_id按字符串列保存
+        assert gdf['event_id'].tolist()[3:] == ['evt_3', 'evt_4']
+
+    def test_empty_output_is_written(self, tmp_path):
+        import pyarrow as pa
+
+        output = tmp_path / 'empty.parquet'
+        assert write_features(iter([]), output) == 0
+        gdf = gpd.read_parquet(output)
+        assert gdf.empty and list(gdf.columns) == ['geometry']
+
+        schema = pa.schema([('dataset_name', pa.string()), ('point_count', pa.int64())])
+        assert write_features(iter([]), output, schema=schema) == 0
+        gdf = gpd.read_parquet(output)
+        assert gdf.empty and list(gdf.columns) == ['dataset_name', 'point_count', 'geometry']
+        assert str(gdf['point_count'].dtype) == 'int64'
+        assert [p.name for p in tmp_path.iterdir()] == ['empty.parquet']
+
+    def test_write_features_selects_format_by_suffix(self, tmp_path):
+        output = tmp_path / 'out.geoparquet'
+        assert write_features(_features(3), output) == 3
+        assert len(gpd.read_parquet(output)) == 3
+
+    def test_error_keeps_previous_file(self, tmp_path):
+        output = tmp_path / 'out.parquet'
+        write_features(_features(2), output)
+        previous = output.read_bytes()
+
+        def failing_features():
+            yield from _features(5)
+            raise RuntimeError('source failed')
+
+        with pytest.raises(RuntimeError):
+            write_features(failing_features(), output, row_group_size=2)
+        assert output.read_bytes() == previous
+        assert [p.name for p in tmp_path.iterdir()] == ['out.parquet']
+
+    def test_new_column_in_later_row_group_fails(self, tmp_path):
+        output = tmp_path / 'out.parquet'
+        features = list(_features(4))
+        features[3][0]['late_column'] = 1.5
+        with pytest.raises(ValueError, match='late_column'):
+            write_features(features, output, row_group_size=2)
+        assert list(tmp_path.iterdir()) == []
+
+    def test_explicit_schema(self, tmp_path):
+        features = list(_features(4))
+        # 前两个要素没有avg_speed，后续行组才出现
+        for props, _ in features[:2]:
+            del props['avg_speed']
+        schema = properties_schema({
+            name: [props.get(name) for props, _ in features]
+            for name in ['dataset_name', 'point_count', 'avg_speed', 'event_id']
+        })
+        assert str(schema.field('avg_speed').type) == 'double'
+        assert str(schema.field('event_id').type) == 'string'
+
+        output = tmp_path / 'out.parquet'
+        assert write_features(features, output, row_group_size=2, schema=schema) == 4
+
+        gdf = gpd.read_parquet(output)
+        assert gdf['avg_speed'].dtype == np.float64
+        assert gdf['avg_speed'].tolist()[:3] == pytest.approx([np.nan, np.nan, 1.0], nan_ok=True)
+        assert gdf['point_count'].tolist() == [2, 3, 4, 5]
+        assert gdf.geometry.iloc[0].equals(features[0][1])
+
+    def test_properties_schema_uses_column_dtypes(self):
+        schema = properties_schema({
+            'count': np.array([1, 2], dtype=np.int32),
+            'name': pd.Series(['a', None]),
+            'empty': [None, None],
+            'ids': [None, 'x,y'],
+        })
+        assert [str(field.type) for field in schema] == ['int32', 'string', 'string', 'string']
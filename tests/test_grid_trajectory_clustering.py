@@ -0,0 +1,483 @@
+"""
+Grid轨迹聚类单元测试
+
+轨迹点查询用补丁替代，批量空间连接查询用解释SQL的假游标；结果表使用SQLite，只保留断点续跑相关的列。
+"""
+
+import multiprocessing
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from shapely.geometry import box
+from sqlalchemy import text
+
+from spdatalab.dataset import polygon_trajectory_query
+from spdatalab.dataset.grid_trajectory_clustering import ClusterConfig, GridTrajectoryClusterer
+
+RESULT_TABLES_SQL = [
+    """CREATE TABLE grid_trajectory_segments (
+        grid_id INTEGER NOT NULL, analysis_id TEXT NOT NULL, dataset_name TEXT NOT NULL, cluster_label INTEGER
+    )""",
+    """CREATE TABLE grid_clustering_summary (
+        grid_id INTEGER NOT NULL, analysis_id TEXT NOT NULL, cluster_label INTEGER NOT NULL,
+        segment_count INTEGER NOT NULL
+    )""",
+    """CREATE TABLE grid_clustering_progress (
+        grid_id INTEGER NOT NULL, city_id TEXT NOT NULL, analysis_id TEXT NOT NULL,
+        status TEXT NOT NULL, valid_segments INTEGER NOT NULL DEFAULT 0,
+        completed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        PRIMARY KEY (analysis_id, grid_id)
+    )""",
+]
+
+# grid_id -> 轨迹点类型
+GRID_KINDS = {1: 'moving', 2: 'moving', 3: 'empty', 4: 'speeding', 5: 'failing'}
+
+
+def _moving_points(grid_id, n_datasets=6, n_points=60, speed_mps=5.0):
+    """匀速直线行驶的轨迹点（每秒一个点）"""
+    frames = []
+    for k in range(n_datasets):
+        t = np.arange(n_points, dtype=float)
+        frames.append(pd.DataFrame({
+            'dataset_name': f'grid{grid_id}_ds{k}',
+            'timestamp': 1_700_000_000 + t,
+            'lon': 116.0 + grid_id * 0.01 + k * 1e-4 + np.zeros(n_points),
+            'lat': 39.0 + t * speed_mps / 111_000.0,
+            'twist_linear': speed_mps,
+            'yaw': 0.0,
+            'vehicle_id': None,
+        }))
+    return pd.concat(frames, ignore_index=True)
+
+
+def fake_query_trajectory_points(self, grid_geometry, grid_id=0, raise_on_error=False):
+    kind = GRID_KINDS[grid_id]
+    if kind == 'failing':
+        if raise_on_error:
+            raise RuntimeError('query failed')
+        return pd.DataFrame()
+    if kind == 'empty':
+        return pd.DataFrame()
+    points = _moving_points(grid_id)
+    if kind == 'speeding':
+        # 速度超过max_speed，所有轨迹段被质量过滤
+        points['twist_linear'] = 100.0
+    return points
+
+
+def fake_save_results(self, grid_id, city_id, analysis_id, segments, labels, cluster_info):
+    """只写入断点续跑相关列的save_results"""
+    with self.engine.connect() as conn:
+        conn.execute(text("""
+            INSERT INTO grid_trajectory_segments (grid_id, analysis_id, dataset_name, cluster_label)
+            VALUES (:grid_id, :analysis_id, :dataset_name, :cluster_label)
+        """), [{'grid_id': int(grid_id), 'analysis_id': analysis_id, 'dataset_name': segment.dataset_name,
+                'cluster_label': int(label)}
+               for segment, label in zip(segments, labels)])
+        conn.execute(text("""
+            INSERT INTO grid_clustering_summary (grid_id, analysis_id, cluster_label, segment_count)
+            VALUES (:grid_id, :analysis_id, :cluster_label, :segment_count)
+        """), [{'grid_id': int(grid_id), 'analysis_id': analysis_id, 'cluster_label': int(label),
+                'segment_count': info['segment_count']}
+               for label, info in cluster_info.items()])
+        conn.commit()
+
+
+def _grids(grid_ids, analysis_id='test'):
+    return pd.DataFrame({
+        'grid_id': grid_ids,
+        'city_id': 'A72',
+        'analysis_id': analysis_id,
+        'geometry': [box(116.0 + g * 0.01, 39.0, 116.002 + g * 0.01, 39.002) for g in grid_ids],
+    })
+
+
+@pytest.fixture
+def clusterer(tmp_path, monkeypatch):
+    monkeypatch.setattr(GridTrajectoryClusterer, 'query_trajectory_points', fake_query_trajectory_points)
+    monkeypatch.setattr(GridTrajectoryClusterer, 'save_results', fake_save_results)
+    monkeypatch.setattr(GridTrajectoryClusterer, 'load_hotspot_grids',
+                        lambda self, city_id=None, limit=None, grid_ids=None: _grids(grid_ids or list(GRID_KINDS)))
+
+    config = ClusterConfig(local_dsn=f"sqlite:///{tmp_path / 'results.db'}", save_to_database=True)
+    instance = GridTrajectoryClusterer(config)
+    with instance.engine.connect() as conn:
+        for sql in RESULT_TABLES_SQL:
+            conn.execute(text(sql))
+        conn.commit()
+    return instance
+
+
+def _table(clusterer, table):
+    with clusterer.engine.connect() as conn:
+        return pd.read_sql(text(f"SELECT * FROM {table}"), conn)
+
+
+class TestResume:
+    """测试完成标记与断点续跑"""
+
+    def test_completion_markers_include_empty_grids(self, clusterer):
+        stats = clusterer.process_all_grids().set_index('grid_id')
+
+        assert stats.loc[1, 'success'] and stats.loc[2, 'success']
+        assert stats.loc[3, 'error'] == 'no_points'
+        assert stats.loc[4, 'error'] == 'no_valid_segments'
+        assert stats.loc[5, 'error'] == 'query failed'
+
+        progress = _table(clusterer, 'grid_clustering_progress').set_index('grid_id')
+        # 查询失败的grid不写完成标记
+        assert sorted(progress.index) == [1, 2, 3, 4]
+        assert progress.loc[1, 'status'] == 'clustered'
+        assert progress.loc[1, 'valid_segments'] == stats.loc[1, 'valid_segments']
+        assert progress.loc[3, 'status'] == 'no_points'
+        assert progress.loc[4, 'status'] == 'no_valid_segments'
+        assert clusterer.load_completed_grid_ids([1, 2, 3, 4, 5, 6], 'test') == {1, 2, 3, 4}
+        assert clusterer.load_completed_grid_ids([1, 2, 3, 4], 'other') == set()
+
+    def test_resume_skips_completed_grids(self, clusterer, monkeypatch):
+        clusterer.process_all_grids()
+        segments_before = _table(clusterer, 'grid_trajectory_segments')
+
+        processed = []
+        original = GridTrajectoryClusterer.process_single_grid
+
+        def record(self, grid_row, points_df=None):
+            processed.append(grid_row['grid_id'])
+            return original(self, grid_row, points_df)
+        monkeypatch.setattr(GridTrajectoryClusterer, 'process_single_grid', record)
+
+        stats = clusterer.process_all_grids(resume=True)
+        assert processed == [5]
+        assert stats['grid_id'].tolist() == [5]
+        pd.testing.assert_frame_equal(_table(clusterer, 'grid_trajectory_segments'), segments_before)
+
+    def test_resume_clears_partial_results(self, clusterer, monkeypatch):
+        # 模拟上次运行在写入聚类统计前中断：grid 2只有轨迹段，没有聚类统计和完成标记
+        clusterer.process_all_grids(grid_ids=[1, 2])
+        with clusterer.engine.connect() as conn:
+            conn.execute(text("DELETE FROM grid_clustering_progress WHERE grid_id = 2"))
+            conn.execute(text("DELETE FROM grid_clustering_summary WHERE grid_id = 2"))
+            conn.commit()
+        segments = _table(clusterer, 'grid_trajectory_segments')
+        grid2_segments = (segments['grid_id'] == 2).sum()
+        assert grid2_segments > 0
+
+        stats = clusterer.process_all_grids(grid_ids=[1, 2], resume=True)
+
+        assert stats['grid_id'].tolist() == [2]
+        segments_after = _table(clusterer, 'grid_trajectory_segments')
+        # grid 2的残留结果被清理后重新写入，没有重复；grid 1不受影响
+        assert (segments_after['grid_id'] == 2).sum() == grid2_segments
+        assert (segments_after['grid_id'] == 1).sum() == (segments['grid_id'] == 1).sum()
+        summary = _table(clusterer, 'grid_clustering_summary')
+        assert summary.groupby('grid_id')['cluster_label'].apply(lambda s: s.is_unique).all()
+
+    def test_clear_partial_results(self, clusterer):
+        clusterer.process_all_grids(grid_ids=[1, 2])
+        clusterer.clear_partial_results([2], 'other')
+        assert set(_table(clusterer, 'grid_trajectory_segments')['grid_id']) == {1, 2}
+        clusterer.clear_partial_results([2], 'test')
+        assert set(_table(clusterer, 'grid_trajectory_segments')['grid_id']) == {1}
+        assert set(_table(clusterer, 'grid_clustering_summary')['grid_id']) == {1}
+        clusterer.clear_partial_results([], 'test')
+
+    def test_resume_keeps_results_saved_without_markers(self, clusterer):
+        # 完成标记表引入前保存的结果：有聚类统计但没有标记
+        clusterer.process_all_grids(grid_ids=[1, 2])
+        with clusterer.engine.connect() as conn:
+            conn.execute(text("DELETE FROM grid_clustering_progress"))
+            conn.commit()
+        segments_before = _table(clusterer, 'grid_trajectory_segments')
+
+        stats = clusterer.process_all_grids(grid_ids=[1, 2, 3], resume=True)
+
+        assert stats['grid_id'].tolist() == [3]
+        pd.testing.assert_frame_equal(_table(clusterer, 'grid_trajectory_segments'), segments_before)
+
+    def test_resume_aborts_when_marker_lookup_fails(self, clusterer):
+        clusterer.process_all_grids(grid_ids=[1, 2])
+        segments_before = _table(clusterer, 'grid_trajectory_segments')
+        with clusterer.engine.connect() as conn:
+            conn.execute(text("DROP TABLE grid_clustering_progress"))
+            conn.commit()
+
+        with pytest.raises(Exception, match='grid_clustering_progress'):
+            clusterer.process_all_grids(grid_ids=[1, 2], resume=True)
+
+        pd.testing.assert_frame_equal(_table(clusterer, 'grid_trajectory_segments'), segments_before)
+
+    def test_resume_is_scoped_to_analysis(self, clusterer, monkeypatch):
+        clusterer.process_all_grids(grid_ids=[1, 2])
+        segments_before = _table(clusterer, 'grid_trajectory_segments')
+        monkeypatch.setattr(GridTrajectoryClusterer, 'load_hotspot_grids',
+                            lambda self, city_id=None, limit=None, grid_ids=None: _grids(grid_ids, 'other'))
+
+        stats = clusterer.process_all_grids(grid_ids=[1, 2], resume=True)
+
+        # 另一个分析的完成标记不影响本次分析，也不会删除其结果
+        assert sorted(stats['grid_id']) == [1, 2]
+        segments = _table(clusterer, 'grid_trajectory_segments')
+        pd.testing.assert_frame_equal(
+            segments[segments['analysis_id'] == 'test'].reset_index(drop=True), segments_before)
+        assert (segments['analysis_id'] == 'other').sum() == len(segments_before)
+        progress = _table(clusterer, 'grid_clustering_progress')
+        assert sorted(zip(progress['analysis_id'], progress['grid_id'])) == \
+            [('other', 1), ('other', 2), ('test', 1), ('test', 2)]
+
+    @pytest.mark.skipif(multiprocessing.get_start_method() != 'fork',
+                        reason='worker进程需继承测试补丁（fork启动方式）')
+    def test_process_pool_matches_serial(self, clusterer, tmp_path):
+        serial = clusterer.process_all_grids().set_index('grid_id').sort_index()
+        serial_progress = _table(clusterer, 'grid_clustering_progress')
+
+        config = ClusterConfig(local_dsn=f"sqlite:///{tmp_path / 'parallel.db'}", save_to_database=True)
+        parallel_clusterer = GridTrajectoryClusterer(config)
+        with parallel_clusterer.engine.connect() as conn:
+            for sql in RESULT_TABLES_SQL:
+                conn.execute(text(sql))
+            conn.commit()
+
+        parallel = parallel_clusterer.process_all_grids(num_workers=2).set_index('grid_id').sort_index()
+
+        for column in ['success', 'error', 'valid_segments']:
+            assert parallel[column].fillna(-1).tolist() == serial[column].fillna(-1).tolist()
+        assert parallel.loc[1, 'cluster_labels'] == serial.loc[1, 'cluster_labels']
+        parallel_progress = _table(parallel_clusterer, 'grid_clustering_progress')
+        columns = ['grid_id', 'status', 'valid_segments']
+        pd.testing.assert_frame_equal(
+            parallel_progress[columns].sort_values('grid_id').reset_index(drop=True),
+            serial_progress[columns].sort_values('grid_id').reset_index(drop=True)
+        )
+        # 断点续跑只剩查询失败的grid
+        assert parallel_clusterer.process_all_grids(num_workers=2, resume=True)['grid_id'].tolist() == [5]
+
+
+def _reference_split_ranges(clusterer, points):
+    """逐点累加的切分（原实现），返回全部区间[start, end)"""
+    config = clusterer.config
+    timestamps = points['timestamp'].to_numpy(dtype=float)
+    lats = points['lat'].to_numpy(dtype=float)
+    lons = points['lon'].to_numpy(dtype=float)
+    ranges = []
+    start = 0
+    cumulative_distance = 0.0
+    for i in range(1, len(points)):
+        cumulative_distance += clusterer._haversine_distance(lats[i - 1], lons[i - 1], lats[i], lons[i])
+        duration = timestamps[i] - timestamps[start]
+        time_gap = timestamps[i] - timestamps[i - 1]
+        if (time_gap > config.time_gap_threshold
+                or cumulative_distance >= config.min_distance
+                or duration >= config.max_duration):
+            ranges.append((start, i))
+            start = i
+            cumulative_distance = 0.0
+    if len(points):
+        ranges.append((start, len(points)))
+    return ranges
+
+
+def _random_trajectory(seed, n=400):
+    """随机轨迹：静止、低速、高速交替，夹杂时间断开"""
+    rng = np.random.default_rng(seed)
+    dt = rng.choice([0.1, 0.5, 1.0, 1.5], n)
+    dt[rng.random(n) < 0.03] = rng.uniform(3.5, 20.0)
+    dt[0] = 0.0
+    speed = np.repeat(rng.choice([0.0, 2.0, 8.0, 25.0], n // 20 + 1), 20)[:n]
+    step = speed * dt / 111_000.0
+    return pd.DataFrame({
+        'timestamp': 1_700_000_000 + np.cumsum(dt),
+        'lat': 39.0 + np.cumsum(step * rng.uniform(0.5, 1.0, n)),
+        'lon': 116.0 + np.cumsum(step * rng.uniform(-0.5, 0.5, n)),
+        'twist_linear': speed,
+        'yaw': 0.0,
+    })
+
+
+class TestSplitTrajectoryRanges:
+    """测试向量化轨迹切分与逐点实现一致"""
+
+    @pytest.fixture
+    def segmenting_clusterer(self):
+        return GridTrajectoryClusterer(ClusterConfig(local_dsn='sqlite://'))
+
+    @pytest.mark.parametrize('seed', range(5))
+    def test_matches_per_point_loop(self, segmenting_clusterer, seed):
+        points = _random_trajectory(seed)
+        expected = _reference_split_ranges(segmenting_clusterer, points)
+        assert segmenting_clusterer._split_trajectory_ranges(points) == expected
+
+        # 三种切分条件都出现
+        config = segmenting_clusterer.config
+        timestamps = points['timestamp'].to_numpy()
+        starts = [start for start, _ in expected[1:]]
+        assert any(timestamps[i] - timestamps[i - 1] > config.time_gap_threshold for i in starts)
+        assert any(timestamps[i] - timestamps[s] >= config.max_duration for s, i in expected[:-1])
+        steps = segmenting_clusterer._step_distances(points)
+        assert any(steps[s:i].sum() >= config.min_distance
+                   and timestamps[i] - timestamps[s] < config.max_duration for s, i in expected[:-1])
+
+    def test_boundary_values(self, segmenting_clusterer):
+        config = segmenting_clusterer.config
+        # 静止点：时长恰好等于max_duration时切分；时间间隔恰好等于阈值时不断开
+        t = [0.0, 1.0, 2.0, 2.0 + config.time_gap_threshold] + [6.0 + k for k in range(14)]
+        points = pd.DataFrame({'timestamp': t, 'lat': 39.0, 'lon': 116.0})
+        ranges = segmenting_clusterer._split_trajectory_ranges(points)
+        assert ranges == _reference_split_ranges(segmenting_clusterer, points)
+        assert ranges[0] == (0, 13)  # t[13] - t[0] == 15.0，t[3]处的间隔不断开
+
+        # 两点间距恰好为min_distance（同一浮点运算）
+        step = segmenting_clusterer._haversine_distance(39.0, 116.0, 39.0 + 0.0005, 116.0)
+        points = pd.DataFrame({'timestamp': np.arange(12, dtype=float),
+                               'lat': 39.0 + 0.0005 * (np.arange(12) % 2), 'lon': 116.0})
+        config.min_distance = float(step) * 3
+        assert segmenting_clusterer._split_trajectory_ranges(points) == \
+            _reference_split_ranges(segmenting_clusterer, points)
+
+    def test_short_and_trailing_segments(self, segmenting_clusterer):
+        config = segmenting_clusterer.config
+        assert segmenting_clusterer._split_trajectory_ranges(pd.DataFrame(
+            {'timestamp': [], 'lat': [], 'lon': []})) == []
+        single = pd.DataFrame({'timestamp': [0.0], 'lat': [39.0], 'lon': [116.0]})
+        assert segmenting_clusterer._split_trajectory_ranges(single) == [(0, 1)]
+
+        # 末尾只剩少于min_points个点：区间保留，但不生成轨迹段
+        t = list(np.arange(10.0)) + [20.0, 21.0]
+        points = pd.DataFrame({'timestamp': t, 'lat': 39.0, 'lon': 116.0})
+        ranges = segmenting_clusterer._split_trajectory_ranges(points)
+        assert ranges == _reference_split_ranges(segmenting_clusterer, points) == [(0, 10), (10, 12)]
+
+        segments = segmenting_clusterer._segment_single_trajectory('ds', points)
+        assert [(s.segment_index, s.point_count) for s in segments] == [(0, 10)]
+        assert len(segments) == sum(end - start >= config.min_points for start, end in ranges)
+
+    @pytest.mark.parametrize('seed', range(3))
+    def test_segments_match_per_point_loop(self, segmenting_clusterer, seed):
+        points = _random_trajectory(seed)
+        expected = [(start, end) for start, end in _reference_split_ranges(segmenting_clusterer, points)
+                    if end - start >= segmenting_clusterer.config.min_points]
+
+        segments = segmenting_clusterer._segment_single_trajectory('ds', points)
+
+        assert [s.segment_index for s in segments] == list(range(len(expected)))
+        for segment, (start, end) in zip(segments, expected):
+            pd.testing.assert_frame_equal(segment.points, points.iloc[start:end])
+            assert segment.start_time == int(points['timestamp'].iloc[start])
+            assert segment.point_count == end - start
+            assert np.allclose(np.asarray(segment.geometry.coords),
+                               points[['lon', 'lat']].to_numpy()[start:end])
+
+
+class SpatialJoinCursor:
+    """假Hive游标：在内存点表上解释空间连接SQL（VALUES表 + ST_Intersects含边界 + polygon_rank上限）"""
+
+    def __init__(self, points_df, fail=False):
+        self.points_df = points_df
+        self.fail = fail
+        self.statements = []
+        self._rows = []
+
+    def __call__(self, *args, **kwargs):
+        return self
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc_info):
+        return False
+
+    def execute(self, sql, params=None):
+        self.statements.append(sql)
+        if self.fail:
+            raise RuntimeError('query failed')
+        output_columns = [c.strip() for c in re.search(r"SELECT (.+?) FROM \(", sql).group(1).split(',')]
+        limit = int(re.search(r"polygon_rank <= (\d+)", sql).group(1))
+        df = self.points_df
+        frames = []
+        for polygon_id, wkt_text in re.findall(
+                r"\('([^']+)', ST_SetSRID\(ST_GeomFromText\('([^']+)'\), 4326\)\)", sql):
+            mask = shapely.intersects_xy(shapely.from_wkt(wkt_text), df['longitude'].to_numpy(),
+                                         df['latitude'].to_numpy())
+            frames.append(df[mask].head(limit).assign(polygon_id=polygon_id))
+        result = pd.concat(frames, ignore_index=True)
+        result = result.sort_values(['polygon_id', 'dataset_name', 'timestamp'], kind='stable')
+        self._rows = list(result[output_columns].itertuples(index=False, name=None))
+
+    def fetchall(self):
+        return self._rows
+
+
+def _edge_points():
+    """2x2相邻grid（边长0.01）上的点：内部点、共享边上的点、四格共享角点和外部点"""
+    locations = {
+        'inner_10': (116.005, 39.005), 'inner_11': (116.015, 39.005),
+        'inner_12': (116.005, 39.015), 'inner_13': (116.015, 39.015),
+        'edge_10_11': (116.01, 39.003), 'edge_10_12': (116.007, 39.01),
+        'edge_11_13': (116.013, 39.01), 'corner': (116.01, 39.01),
+        'outer_edge_10': (116.0, 39.002), 'outside': (116.03, 39.005),
+    }
+    frames = [pd.DataFrame({
+        'dataset_name': name,
+        'timestamp': 1_700_000_000 + np.arange(3)[::-1],
+        'twist_linear': 5.0, 'yaw': 0.0, 'pitch': 0.0, 'roll': 0.0, 'avp_flag': 0, 'workstage': 1,
+        'longitude': lon, 'latitude': lat,
+    }) for name, (lon, lat) in locations.items()]
+    return pd.concat(frames, ignore_index=True)
+
+
+class TestBulkTrajectoryQuery:
+    """测试批量空间连接查询按grid拆分轨迹点"""
+
+    # grid 14远离所有点
+    GRID_BOUNDS = {10: (116.0, 39.0), 11: (116.01, 39.0), 12: (116.0, 39.01), 13: (116.01, 39.01),
+                   14: (116.1, 39.1)}
+
+    @pytest.fixture
+    def bulk_grids(self):
+        return pd.DataFrame({
+            'grid_id': list(self.GRID_BOUNDS),
+            'geometry': [box(x, y, x + 0.01, y + 0.01) for x, y in self.GRID_BOUNDS.values()],
+        })
+
+    def _query(self, monkeypatch, grids, cursor, **config):
+        monkeypatch.setattr(polygon_trajectory_query, 'hive_cursor', cursor)
+        clusterer = GridTrajectoryClusterer(ClusterConfig(local_dsn='sqlite://', **config))
+        return clusterer.query_trajectory_points_bulk(grids)
+
+    def test_points_assigned_to_intersecting_grids(self, monkeypatch, bulk_grids):
+        points = _edge_points()
+        cursor = SpatialJoinCursor(points)
+
+        result = self._query(monkeypatch, bulk_grids, cursor)
+
+        assert len(cursor.statements) == 1
+        assert list(result) == list(self.GRID_BOUNDS)
+        lon, lat = points['longitude'], points['latitude']
+        for grid_id, (x, y) in self.GRID_BOUNDS.items():
+            grid_df = result[grid_id]
+            assert {'lon', 'lat', 'vehicle_id', 'polygon_id'} <= set(grid_df.columns)
+            assert 'longitude' not in grid_df.columns
+            # 与闭区间外包框判断一致：边和角上的点属于所有相邻grid
+            inside = (lon >= x) & (lon <= x + 0.01) & (lat >= y) & (lat <= y + 0.01)
+            expected = points[inside].sort_values(['dataset_name', 'timestamp'])
+            assert list(zip(grid_df['dataset_name'], grid_df['timestamp'])) == \
+                list(zip(expected['dataset_name'], expected['timestamp']))
+            assert (grid_df['polygon_id'] == f'grid_{grid_id}').all()
+
+        names = {grid_id: set(df['dataset_name']) for grid_id, df in result.items()}
+        assert names[10] == {'inner_10', 'edge_10_11', 'edge_10_12', 'corner', 'outer_edge_10'}
+        assert names[11] == {'inner_11', 'edge_10_11', 'edge_11_13', 'corner'}
+        assert names[12] == {'inner_12', 'edge_10_12', 'corner'}
+        assert names[13] == {'inner_13', 'edge_11_13', 'corner'}
+        assert result[14].empty
+
+    def test_limit_applies_per_grid(self, monkeypatch, bulk_grids):
+        result = self._query(monkeypatch, bulk_grids, SpatialJoinCursor(_edge_points()), query_limit=4)
+
+        assert [len(result[grid_id]) for grid_id in self.GRID_BOUNDS] == [4, 4, 4, 4, 0]
+
+    def test_query_failure_returns_empty(self, monkeypatch, bulk_grids):
+        assert self._query(monkeypatch, bulk_grids, SpatialJoinCursor(_edge_points(), fail=True)) == {}
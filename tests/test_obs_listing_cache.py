@@ -0,0 +1,64 @@
+"""
+OBS目录列表缓存单元测试
+"""
+
+import json
+import time
+
+from spdatalab.dataset.obs_listing_cache import LISTING_CACHE_FILE, ObsListingCache
+
+
+class TestObsListingCache:
+    """测试目录列表缓存的读写、过期和持久化"""
+
+    def test_put_and_get(self, tmp_path):
+        cache = ObsListingCache(str(tmp_path))
+        assert cache.get('obs://bucket/scene_a') is None
+
+        cache.put('obs://bucket/scene_a', ['part-0.parquet', '_SUCCESS'])
+        # 目录路径规范化（有无结尾/等价）
+        assert cache.get('obs://bucket/scene_a/') == ['part-0.parquet', '_SUCCESS']
+        assert cache.stats == {'hits': 1, 'misses': 1, 'writes': 1}
+
+    def test_persisted_across_instances(self, tmp_path):
+        ObsListingCache(str(tmp_path)).put('obs://bucket/scene_a/', ['part-0.parquet'])
+        assert ObsListingCache(str(tmp_path)).get('obs://bucket/scene_a/') == ['part-0.parquet']
+
+    def test_empty_listing_not_cached(self, tmp_path):
+        cache = ObsListingCache(str(tmp_path))
+        cache.put('obs://bucket/scene_a/', [])
+        assert cache.get('obs://bucket/scene_a/') is None
+        assert not (tmp_path / LISTING_CACHE_FILE).exists()
+
+    def test_ttl_expiry(self, tmp_path):
+        cache = ObsListingCache(str(tmp_path), ttl_seconds=60)
+        cache.put('obs://bucket/scene_a/', ['part-0.parquet'])
+
+        # 把磁盘上的写入时间改到TTL之前
+        path = tmp_path / LISTING_CACHE_FILE
+        entries = json.loads(path.read_text())
+        entries['obs://bucket/scene_a/']['listed_at'] = time.time() - 120
+        path.write_text(json.dumps(entries))
+
+        assert ObsListingCache(str(tmp_path), ttl_seconds=60).get('obs://bucket/scene_a/') is None
+        assert ObsListingCache(str(tmp_path), ttl_seconds=0).get('obs://bucket/scene_a/') == ['part-0.parquet']
+
+    def test_save_merges_concurrent_writers(self, tmp_path):
+        """两个实例分别写入不同目录，保存后磁盘上两者都在"""
+        cache_a = ObsListingCache(str(tmp_path))
+        cache_b = ObsListingCache(str(tmp_path))
+        cache_a.put('obs://bucket/scene_a/', ['a.parquet'])
+        cache_b.put('obs://bucket/scene_b/', ['b.parquet'], persist=False)
+        assert cache_b.save()
+        assert not cache_b.save()
+
+        merged = ObsListingCache(str(tmp_path))
+        assert merged.get('obs://bucket/scene_a/') == ['a.parquet']
+        assert merged.get('obs://bucket/scene_b/') == ['b.parquet']
+
+    def test_memory_only(self, tmp_path):
+        cache = ObsListingCache(None)
+        cache.put('obs://bucket/scene_a/', ['part-0.parquet'])
+        assert cache.get('obs://bucket/scene_a/') == ['part-0.parquet']
+        assert not cache.save()
+        assert cache.clear() == 1
@@ -0,0 +1,91 @@
+"""
+Polygon查询结果缓存单元测试
+"""
+
+import os
+import time
+
+import pandas as pd
+import pytest
+from shapely.geometry import Polygon, box
+
+from spdatalab.dataset.polygon_query_cache import PolygonQueryCache, polygon_cache_key
+
+
+@pytest.fixture
+def points_df():
+    return pd.DataFrame({
+        'dataset_name': ['ds_a', 'ds_a', 'ds_b'],
+        'timestamp': [1, 2, 3],
+        'longitude': [116.1, 116.2, 116.3],
+        'latitude': [39.1, 39.2, 39.3],
+        'polygon_id': ['p1', 'p1', 'p1']
+    })
+
+
+class TestPolygonCacheKey:
+    """测试缓存键计算"""
+
+    def test_equivalent_polygons_share_key(self):
+        """环方向和起点不同的等价polygon得到相同的键"""
+        params = {'limit_per_polygon': 10000, 'fields': ['timestamp']}
+        ccw = box(0, 0, 1, 1)
+        cw = Polygon([(1, 1), (1, 0), (0, 0), (0, 1)])
+        assert polygon_cache_key(ccw, params) == polygon_cache_key(cw, params)
+
+    def test_params_change_key(self):
+        """查询参数变化时键不同"""
+        geometry = box(0, 0, 1, 1)
+        key_a = polygon_cache_key(geometry, {'limit_per_polygon': 10000})
+        key_b = polygon_cache_key(geometry, {'limit_per_polygon': 20000})
+        assert key_a != key_b
+
+
+class TestPolygonQueryCache:
+    """测试缓存读写、过期和淘汰"""
+
+    def test_put_and_get(self, tmp_path, points_df):
+        cache = PolygonQueryCache(str(tmp_path))
+        assert cache.get('k1') is None
+
+        assert cache.put('k1', points_df)
+        cached = cache.get('k1')
+        pd.testing.assert_frame_equal(cached, points_df)
+        assert cache.stats['hits'] == 1
+        assert cache.stats['misses'] == 1
+
+    def test_empty_result_is_cached(self, tmp_path):
+        """空结果同样缓存，避免重复查询无数据的polygon"""
+        cache = PolygonQueryCache(str(tmp_path))
+        cache.put('empty', pd.DataFrame(columns=['dataset_name', 'timestamp', 'polygon_id']))
+        cached = cache.get('empty')
+        assert cached is not None
+        assert cached.empty
+
+    def test_expired_entry_is_removed(self, tmp_path, points_df):
+        cache = PolygonQueryCache(str(tmp_path), ttl_seconds=60)
+        cache.put('old', points_df)
+        path = tmp_path / 'old.parquet'
+        stale = time.time() - 120
+        os.utime(path, (stale, stale))
+
+        assert cache.get('old') is None
+        assert not path.exists()
+
+    def test_size_bound_evicts_least_recently_used(self, tmp_path, points_df):
+        cache = PolygonQueryCache(str(tmp_path), max_size_bytes=10 ** 9)
+        for key in ['a', 'b', 'c']:
+            cache.put(key, points_df)
+
+        now = time.time()
+        for age, key in [(30, 'a'), (20, 'b'), (10, 'c')]:
+            os.utime(tmp_path / f'{key}.parquet', (now - age, now - age))
+        cache.get('a')  # 最近访问过，不应被淘汰
+
+        entry_size = (tmp_path / 'a.parquet').stat().st_size
+        cache.max_size_bytes = entry_size * 2
+        cache.evict()
+
+        assert (tmp_path / 'a.parquet').exists()
+        assert not (tmp_path / 'b.parquet').exists()
+        assert (tmp_path / 'c.parquet').exists()
@@ -0,0 +1,759 @@
+"""
+Polygon轨迹查询单元测试
+
+数据库访问均用假游标/补丁替代，只验证查询构建和本地处理逻辑。
+"""
+
+import json
+import re
+import sys
+import threading
+import time
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+import shapely
+from shapely.geometry import LineString, MultiPolygon, Point, Polygon, box
+
+from spdatalab.dataset import polygon_trajectory_query
+from spdatalab.dataset.polygon_trajectory_query import (
+    DEFAULT_POINT_FIELDS,
+    HighPerformancePolygonTrajectoryQuery,
+    PointQueryOptions,
+    PolygonTrajectoryConfig,
+    build_point_select_clause,
+    build_time_window_filter,
+    export_trajectories_to_geoparquet,
+    resolve_point_fields
+)
+from spdatalab.dataset.trajectory_simplification import SimplificationConfig
+
+
+def _points_df(seed=0):
+    """若干数据集的轨迹点（乱序），含点数不足的数据集、缺失速度和AVP"""
+    rng = np.random.default_rng(seed)
+    frames = []
+    # 'ds_a'只有1个点，排序后位于首位，之后的有效数据集编码不连续
+    for name, n in [('ds_a', 1), ('ds_b', 30), ('ds_c', 2), ('ds_d', 1), ('ds_e', 45), ('ds_f', 7)]:
+        timestamps = np.sort(rng.choice(np.arange(1_000_000, 1_100_000), n, replace=False))
+        frames.append(pd.DataFrame({
+            'dataset_name': name,
+            'timestamp': timestamps,
+            'longitude': 116.0 + np.cumsum(rng.normal(0, 1e-4, n)),
+            'latitude': 39.0 + np.cumsum(rng.normal(0, 1e-4, n)),
+            'twist_linear': np.where(rng.random(n) < 0.2, np.nan, rng.uniform(0, 20, n)),
+            'avp_flag': rng.choice([0, 1, np.nan], n),
+            'polygon_id': rng.choice(['p1', 'p2', 'p3'], n),
+        }))
+    return pd.concat(frames, ignore_index=True).sample(frac=1.0, random_state=seed)
+
+
+def _reference_trajectories(points_df, min_points):
+    """逐数据集构建轨迹（原实现）"""
+    trajectories = []
+    skipped = 0
+    for dataset_name, group in points_df.groupby('dataset_name'):
+        group = group.sort_values('timestamp')
+        if len(group) < min_points:
+            skipped += 1
+            continue
+        stats = {
+            'dataset_name': dataset_name,
+            'start_time': int(group['timestamp'].min()),
+            'end_time': int(group['timestamp'].max()),
+            'duration': int(group['timestamp'].max() - group['timestamp'].min()),
+            'point_count': len(group),
+            'geometry': LineString(list(zip(group['longitude'], group['latitude']))),
+            'polygon_ids': list(group['polygon_id'].unique()),
+        }
+        speed_data = group['twist_linear'].dropna()
+        if len(speed_data) > 0:
+            stats.update({
+                'avg_speed': round(float(speed_data.mean()), 2),
+                'max_speed': round(float(speed_data.max()), 2),
+                'min_speed': round(float(speed_data.min()), 2),
+                'std_speed': round(float(speed_data.std()) if len(speed_data) > 1 else 0.0, 2)
+            })
+        avp_data = group['avp_flag'].dropna()
+        if len(avp_data) > 0:
+            stats['avp_ratio'] = round(float((avp_data == 1).mean()), 3)
+        trajectories.append(stats)
+    return trajectories, skipped
+
+
+class FakeHive:
+    """假Hive：在内存点表上解释轨迹点查询SQL
+
+    支持三类语句：
+    - 批量查询（UNION ALL子查询）：每个子查询按polygon_id、空间条件（ST_Intersects含边界 /
+      外包框&&）、时间窗口和LIMIT过滤点表
+    - 空间连接查询（WITH query_polygons ... VALUES）：每个polygon按ST_Intersects和时间窗口过滤，
+      按polygon_rank上限截断，结果按polygon_id, dataset_name, timestamp排序
+    - 完整轨迹查询（dataset_name IN %(data_names)s）：按数据集和时间窗口过滤
+    SELECT字段按SQL中的别名返回。on_query(polygon_ids)在批量查询执行前调用，
+    可抛出异常或阻塞以模拟失败/超时。
+    """
+
+    def __init__(self, points_df, on_query=None):
+        self.points_df = points_df
+        self.on_query = on_query
+        self.lock = threading.Lock()
+        self.queries = []
+        self.statements = []
+        self.connection_tests = 0
+        self.active = 0
+        self.max_active = 0
+
+    @contextmanager
+    def cursor(self, *args, **kwargs):
+        yield FakeHiveCursor(self)
+
+    def run(self, sql):
+        subqueries = sql.split(' UNION ALL ')
+        polygon_ids = [re.search(r"'([^']+)' as polygon_id", sub).group(1) for sub in subqueries]
+        with self.lock:
+            self.queries.append(polygon_ids)
+            self.statements.append(sql)
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+        try:
+            if self.on_query is not None:
+                self.on_query(polygon_ids)
+            frames = [self._run_subquery(sub, polygon_id) for sub, polygon_id in zip(subqueries, polygon_ids)]
+        finally:
+            with self.lock:
+                self.active -= 1
+        result = pd.concat(frames, ignore_index=True)
+        return result.sort_values(['dataset_name', 'timestamp'], kind='stable')
+
+    def run_spatial_join(self, sql):
+        with self.lock:
+            self.statements.append(sql)
+        output_columns = [c.strip() for c in re.search(r"SELECT (.+?) FROM \(", sql).group(1).split(',')]
+        limit = int(re.search(r"polygon_rank <= (\d+)", sql).group(1))
+        df = self.points_df
+        frames = []
+        for polygon_id, wkt in re.findall(r"\('([^']+)', ST_SetSRID\(ST_GeomFromText\('([^']+)'\), 4326\)\)", sql):
+            mask = shapely.intersects_xy(shapely.from_wkt(wkt), df['longitude'].to_numpy(),
+                                         df['latitude'].to_numpy())
+            mask &= self._time_mask(sql)
+            selected = df.loc[mask].head(limit).copy()
+            selected['polygon_id'] = polygon_id
+            frames.append(selected)
+        result = pd.concat(frames, ignore_index=True)
+        result = result.sort_values(['polygon_id', 'dataset_name', 'timestamp'], kind='stable')
+        return result[output_columns]
+
+    def run_complete(self, sql, data_names):
+        with self.lock:
+            self.statements.append(sql)
+        df = self.points_df
+        mask = df['dataset_name'].isin(data_names).to_numpy() & self._time_mask(sql)
+        result = df.loc[mask, self._selected_fields(sql)]
+        return result.sort_values(['dataset_name', 'timestamp'], kind='stable')
+
+    def _time_mask(self, sql):
+        ts = self.points_df['timestamp'].to_numpy()
+        mask = np.ones(len(ts), dtype=bool)
+        for op, value in re.findall(r"AND (?:\w+\.)?timestamp (>=|<=) (\d+)", sql):
+            mask &= ts >= int(value) if op == '>=' else ts <= int(value)
+        return mask
+
+    @staticmethod
+    def _selected_fields(sql):
+        return [f for f in re.findall(r" as (\w+)", sql) if f != 'polygon_id']
+
+    def _run_subquery(self, sql, polygon_id):
+        df = self.points_df
+        lon = df['longitude'].to_numpy()
+        lat = df['latitude'].to_numpy()
+        wkt = re.search(r"ST_GeomFromText\('([^']+)'\)", sql)
+        if wkt:
+            mask = shapely.intersects_xy(shapely.from_wkt(wkt.group(1)), lon, lat)
+        else:
+            minx, miny, maxx, maxy = map(float, re.search(r"ST_MakeEnvelope\(([^)]+), 4326\)", sql)
+                                         .group(1).split(','))
+            mask = (lon >= minx) & (lon <= maxx) & (lat >= miny) & (lat <= maxy)
+        mask &= self._time_mask(sql)
+        limit = int(re.search(r"LIMIT (\d+)", sql).group(1))
+        selected = df.loc[mask, self._selected_fields(sql)].head(limit).copy()
+        selected['polygon_id'] = polygon_id
+        return selected
+
+
+class FakeHiveCursor:
+
+    def __init__(self, hive):
+        self.hive = hive
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        if 'test_connection' in sql:
+            with self.hive.lock:
+                self.hive.connection_tests += 1
+            self._rows = [(1,)]
+            return
+        if 'query_polygons' in sql:
+            result = self.hive.run_spatial_join(sql)
+        elif params and 'data_names' in params:
+            result = self.hive.run_complete(sql, params['data_names'])
+        else:
+            result = self.hive.run(sql)
+        self.description = [(c,) for c in result.columns]
+        self._rows = list(result.itertuples(index=False, name=None))
+
+    def fetchone(self):
+        return self._rows[0] if self._rows else None
+
+    def fetchall(self):
+        return self._rows
+
+
+def _grid_points(n=20, origin=(116.0, 39.0), step=0.001):
+    """规则网格上的轨迹点：每行一个数据集，点落在网格线交点上"""
+    ix, iy = np.meshgrid(np.arange(n), np.arange(n))
+    ix, iy = ix.ravel(), iy.ravel()
+    count = len(ix)
+    return pd.DataFrame({
+        'dataset_name': [f'ds_{j:03d}' for j in iy],
+        'timestamp': 1_000_000 + ix,
+        'twist_linear': np.linspace(0, 10, count),
+        'yaw': 0.0,
+        'pitch': 0.0,
+        'roll': 0.0,
+        'avp_flag': 0,
+        'workstage': 1,
+        'longitude': origin[0] + ix * step,
+        'latitude': origin[1] + iy * step,
+    })
+
+
+def _square(polygon_id, i, j, size=0.0035, origin=(116.0, 39.0)):
+    x0, y0 = origin[0] + i * size, origin[1] + j * size
+    return {'id': polygon_id, 'geometry': box(x0, y0, x0 + size, y0 + size), 'properties': {}}
+
+
+@pytest.fixture
+def fake_hive():
+    def make(points_df=None, on_query=None):
+        hive = FakeHive(_grid_points() if points_df is None else points_df, on_query)
+        patcher = patch.object(polygon_trajectory_query, 'hive_cursor', hive.cursor)
+        patcher.start()
+        patchers.append(patcher)
+        return hive
+    patchers = []
+    yield make
+    for patcher in patchers:
+        patcher.stop()
+
+
+@pytest.fixture
+def query():
+    def make(**config):
+        return HighPerformancePolygonTrajectoryQuery(PolygonTrajectoryConfig(**config))
+    with patch.object(HighPerformancePolygonTrajectoryQuery, '_fetch_scene_ids_from_data_names',
+                      return_value=pd.DataFrame()):
+        yield make
+
+
+class TestBuildTrajectoriesColumnar:
+    """测试向量化轨迹构建"""
+
+    @pytest.mark.parametrize('min_points', [2, 3, 10])
+    def test_matches_per_group_loop(self, query, min_points):
+        points_df = _points_df()
+        expected, skipped = _reference_trajectories(points_df, min_points)
+
+        gdf, stats = query(min_points_per_trajectory=min_points).build_trajectories_columnar(points_df)
+
+        assert stats['total_datasets'] == 6
+        assert stats['valid_trajectories'] == len(expected) == len(gdf)
+        assert stats['skipped_trajectories'] == skipped
+        assert gdf['dataset_name'].tolist() == [t['dataset_name'] for t in expected]
+        for row, ref in zip(gdf.to_dict('records'), expected):
+            assert row['geometry'].equals_exact(ref['geometry'], 0)
+            for key in ['start_time', 'end_time', 'duration', 'point_count', 'polygon_ids']:
+                assert row[key] == ref[key]
+            for key in ['avg_speed', 'max_speed', 'min_speed', 'std_speed', 'avp_ratio']:
+                if key in ref:
+                    assert row[key] == pytest.approx(ref[key], abs=1e-9)
+                else:
+                    assert np.isnan(row[key])
+
+    def test_records_hold_python_scalars(self, query):
+        points_df = _points_df()
+        # 整数polygon_id（如grid编号）
+        points_df['polygon_id'] = points_df['polygon_id'].factorize()[0].astype(np.int64) + 100
+        original_to_dict = gpd.GeoDataFrame.to_dict
+
+        def numpy_to_dict(self, orient='dict'):
+            # 部分pandas版本to_dict不会把数值拆箱为Python标量
+            records = original_to_dict(self, orient)
+            return [{k: np.float64(v) if isinstance(v, float) else np.int64(v) if isinstance(v, int) else v
+                     for k, v in record.items()} for record in records]
+
+        q = query()
+        gdf, _ = q.build_trajectories_columnar(points_df)
+        assert all(isinstance(p, int) for ids in gdf['polygon_ids'] for p in ids)
+        with patch.object(gpd.GeoDataFrame, 'to_dict', numpy_to_dict):
+            trajectories, _ = q.build_trajectories_from_points(points_df)
+
+        assert trajectories
+        for trajectory in trajectories:
+            values = [v for k, v in trajectory.items() if k != 'geometry']
+            values += [item for v in values if isinstance(v, list) for item in v]
+            assert not any(isinstance(v, np.generic) for v in values)
+            assert isinstance(trajectory['point_count'], int) and isinstance(trajectory['avg_speed'], float)
+            json.dumps({k: v for k, v in trajectory.items() if k != 'geometry'})
+
+    def test_all_short_datasets(self, query):
+        points_df = _points_df()
+        points_df = points_df[points_df['dataset_name'].isin(['ds_a', 'ds_d'])]
+        gdf, stats = query().build_trajectories_columnar(points_df)
+        assert gdf.empty
+        assert stats['skipped_trajectories'] == 2
+
+
+class TestAdaptiveTiling:
+    """测试自适应切片：命中点数上限的polygon四分重查，切片边界上的点不重复、不丢失"""
+
+    def test_saturated_polygon_is_tiled_without_loss(self, query, fake_hive):
+        hive = fake_hive()
+        # big含17x17个网格点，四分的切分线落在网格线上；small不会命中上限
+        big = {'id': 'big', 'geometry': box(116.0, 39.0, 116.016, 39.016), 'properties': {}}
+        small = {'id': 'small', 'geometry': box(116.017, 39.017, 116.019, 39.019), 'properties': {}}
+        q = query(enable_adaptive_tiling=True, tile_size_m=5000.0, limit_per_polygon=30,
+                  max_tile_depth=4, chunk_size=3, fetch_complete_trajectories=False)
+
+        result, stats = q.query_intersecting_trajectory_points([big, small])
+
+        assert stats['strategy'] == 'adaptive_tiling'
+        assert stats['tiling_rounds'] == 3
+        assert stats['subdivided_tiles'] == 1 + 4
+        assert stats['truncated_tiles'] == 0
+        assert stats['failed_polygon_ids'] == []
+        for polygon in [big, small]:
+            expected = hive.points_df[shapely.intersects_xy(
+                polygon['geometry'], hive.points_df['longitude'], hive.points_df['latitude'])]
+            got = result[result['polygon_id'] == polygon['id']]
+            assert not got.duplicated(['dataset_name', 'timestamp']).any()
+            assert set(zip(got['dataset_name'], got['timestamp'])) == \
+                set(zip(expected['dataset_name'], expected['timestamp']))
+        assert (result['polygon_id'] == 'big').sum() == 17 * 17
+        # 切分线上的点被相邻切片重复命中，合并时去重
+        assert stats['duplicate_points_removed'] > 0
+        assert result[['dataset_name', 'timestamp']].apply(tuple, axis=1).is_monotonic_increasing
+
+    def test_truncated_tiles_are_kept_at_max_depth(self, query, fake_hive):
+        fake_hive()
+        big = {'id': 'big', 'geometry': box(116.0, 39.0, 116.016, 39.016), 'properties': {}}
+        q = query(enable_adaptive_tiling=True, tile_size_m=5000.0, limit_per_polygon=30,
+                  max_tile_depth=1, fetch_complete_trajectories=False)
+
+        result, stats = q.query_intersecting_trajectory_points([big])
+
+        assert stats['truncated_tiles'] == 4
+        assert stats['tiling_rounds'] == 2
+        # 达到最大深度的切片保留截断后的结果
+        assert 0 < len(result) <= 4 * 30
+        assert not result.duplicated(['dataset_name', 'timestamp']).any()
+
+
+class TestQueryPushdown:
+    """测试字段投影和时间窗口下推到生成的SQL"""
+
+    def test_resolve_point_fields(self):
+        defaults = resolve_point_fields()
+        assert defaults[:4] == ['dataset_name', 'timestamp', 'longitude', 'latitude']
+        assert sorted(defaults) == sorted(DEFAULT_POINT_FIELDS)
+        # 必需字段在前、去重，保留请求顺序
+        assert resolve_point_fields(['yaw', 'timestamp', 'twist_linear', 'yaw']) == \
+            ['dataset_name', 'timestamp', 'longitude', 'latitude', 'yaw', 'twist_linear']
+        assert resolve_point_fields([], required=['timestamp']) == ['timestamp']
+        with pytest.raises(ValueError, match='speed'):
+            resolve_point_fields(['yaw', 'speed'])
+
+    def test_select_clause_and_time_filter(self):
+        clause = build_point_select_clause(['dataset_name', 'longitude', 'yaw'], 'p')
+        assert [line.strip() for line in clause.split(',\n')] == [
+            'p.dataset_name as dataset_name', 'ST_X(p.point_lla) as longitude', 'p.yaw as yaw']
+        assert build_point_select_clause(['latitude']) == 'ST_Y(point_lla) as latitude'
+
+        assert build_time_window_filter() == ''
+        assert build_time_window_filter(start_ts=5) == 'AND timestamp >= 5'
+        assert build_time_window_filter(end_ts=9.7, table_alias='p') == 'AND p.timestamp <= 9'
+        assert [line.strip() for line in build_time_window_filter(5, 9).split('\n')] == \
+            ['AND timestamp >= 5', 'AND timestamp <= 9']
+
+    def test_batch_and_complete_queries_push_down(self, query, fake_hive):
+        hive = fake_hive()
+        # sq覆盖网格列/行4..7，时间窗口只保留列5、6
+        q = query(fields=['yaw'], start_ts=1_000_000, end_ts=1_000_100)
+
+        result, stats = q.query_intersecting_trajectory_points(
+            [_square('sq', 1, 1)], fields=['twist_linear'], start_ts=1_000_005, end_ts=1_000_006)
+
+        batch_sql, complete_sql = hive.statements
+        for sql in (batch_sql, complete_sql):
+            assert 'twist_linear as twist_linear' in sql
+            assert 'ST_X(point_lla) as longitude' in sql
+            assert 'yaw' not in sql and 'workstage' not in sql
+            assert 'AND timestamp >= 1000005' in sql and 'AND timestamp <= 1000006' in sql
+        assert 'dataset_name IN %(data_names)s' in complete_sql
+
+        assert stats['fields'] == ['dataset_name', 'timestamp', 'longitude', 'latitude', 'twist_linear']
+        assert (stats['start_ts'], stats['end_ts']) == (1_000_005, 1_000_006)
+        assert stats['complete_trajectories_fetched']
+        assert list(result.columns) == stats['fields'] + ['polygon_id']
+        assert sorted(result['dataset_name'].unique()) == [f'ds_{j:03d}' for j in range(4, 8)]
+        assert set(result['timestamp']) == {1_000_005, 1_000_006}
+
+    def test_config_defaults_apply_without_arguments(self, query, fake_hive):
+        hive = fake_hive()
+        q = query(fields=[], end_ts=1_000_001, fetch_complete_trajectories=False)
+
+        result, _ = q.query_intersecting_trajectory_points([_square('sq', 0, 0)])
+
+        (sql,) = hive.statements
+        assert 'AND timestamp <= 1000001' in sql and 'timestamp >=' not in sql
+        assert list(result.columns) == ['dataset_name', 'timestamp', 'longitude', 'latitude', 'polygon_id']
+        assert set(result['timestamp']) == {1_000_000, 1_000_001}
+
+    def test_spatial_join_pushes_down(self, query, fake_hive):
+        hive = fake_hive()
+        polygons = [_square('a', 0, 0), _square('b', 1, 0)]
+
+        result, _ = query().query_points_spatial_join(polygons, fields=['workstage'],
+                                                      start_ts=1_000_002, end_ts=1_000_004)
+
+        (sql,) = hive.statements
+        assert 'p.workstage as workstage' in sql and 'p.yaw' not in sql
+        assert 'AND p.timestamp >= 1000002' in sql and 'AND p.timestamp <= 1000004' in sql
+        assert list(result.columns) == ['dataset_name', 'timestamp', 'longitude', 'latitude',
+                                        'workstage', 'polygon_id']
+        assert set(result['timestamp']) == {1_000_002, 1_000_003, 1_000_004}
+        # 列3落在a内，列4落在b内（0.0035格宽），两者不重叠
+        assert set(result.loc[result['polygon_id'] == 'a', 'timestamp']) == {1_000_002, 1_000_003}
+        assert set(result.loc[result['polygon_id'] == 'b', 'timestamp']) == {1_000_004}
+
+
+def _holed_multipolygon(origin=(116.0, 39.0), step=0.001):
+    """两部分的MultiPolygon：第一部分带内环，顶点和环边与_grid_points的网格线重合"""
+    x0, y0 = origin
+
+    def pt(i, j):
+        return (x0 + i * step, y0 + j * step)
+    shell = [pt(1, 1), pt(9, 1), pt(9, 5), pt(5, 9), pt(1, 9)]
+    hole = [pt(3, 3), pt(6, 3), pt(6, 6), pt(3, 6)]
+    second = [pt(12, 2), pt(17, 2), pt(17, 7), pt(12, 7)]
+    return MultiPolygon([Polygon(shell, [hole]), Polygon(second)])
+
+
+class TestClientRefinement:
+    """测试外包框查询 + 客户端精确过滤"""
+
+    def _reference_mask(self, geometry, points_df):
+        """逐点ST_Intersects语义：含外环、内环边界上的点"""
+        return np.array([geometry.intersects(Point(x, y))
+                         for x, y in zip(points_df['longitude'], points_df['latitude'])])
+
+    def test_refine_matches_intersects_semantics(self, query):
+        geometry = _holed_multipolygon()
+        points_df = _grid_points()
+        # 加入非网格点：内环内部、两部分之间、斜边附近
+        extra = points_df.iloc[:3].copy()
+        extra[['longitude', 'latitude']] = [[116.0045, 39.0045], [116.0105, 39.004], [116.0071, 39.0071]]
+        points_df = pd.concat([points_df, extra], ignore_index=True)
+        points_df['polygon_id'] = 'mp'
+        other = points_df.copy()
+        other['polygon_id'] = 'other'
+        mixed = pd.concat([points_df, other], ignore_index=True).sample(frac=1.0, random_state=0)
+
+        q = query(refine_chunk_rows=97, refine_workers=3)
+        refined = q._refine_points_locally(mixed, {'mp': geometry})
+
+        expected_mp = mixed[(mixed['polygon_id'] == 'mp').to_numpy()
+                            & self._reference_mask(geometry, mixed)]
+        # 未登记的polygon不过滤，行顺序保持不变
+        expected = mixed[(mixed['polygon_id'] == 'other').to_numpy()
+                         | mixed.index.isin(expected_mp.index)]
+        pd.testing.assert_frame_equal(refined, expected.reset_index(drop=True))
+        # 边界和内环边界上的点保留，内环内部的点排除
+        refined_mp = refined[refined['polygon_id'] == 'mp']
+        refined_xy = set(zip(refined_mp['longitude'].round(6), refined_mp['latitude'].round(6)))
+        assert (116.001, 39.001) in refined_xy and (116.003, 39.004) in refined_xy
+        assert (116.0045, 39.0045) not in refined_xy and (116.0105, 39.004) not in refined_xy
+
+    def test_refine_truncates_to_limit(self, query):
+        geometry = _holed_multipolygon()
+        points_df = _grid_points().assign(polygon_id='mp')
+        refined = query(limit_per_polygon=10)._refine_points_locally(points_df, {'mp': geometry})
+        expected = points_df[self._reference_mask(geometry, points_df)].head(10)
+        pd.testing.assert_frame_equal(refined, expected.reset_index(drop=True))
+
+    def test_envelope_query_matches_server_intersects(self, query, fake_hive):
+        hive = fake_hive()
+        polygons = [{'id': 'mp', 'geometry': _holed_multipolygon(), 'properties': {}},
+                    _square('sq', 1, 1)]
+        server = query(client_refine_mode='never')._execute_batch_query(polygons)
+        client = query(client_refine_mode='always')._execute_batch_query(polygons)
+        auto = query(client_refine_mode='auto')._execute_batch_query(polygons)
+
+        never_sql, always_sql, auto_sql = hive.statements
+        assert 'ST_MakeEnvelope' not in never_sql
+        assert always_sql.count('ST_MakeEnvelope') == 2
+        # auto模式下只有带内环的polygon走外包框查询
+        assert auto_sql.count('ST_MakeEnvelope') == 1
+        key = ['polygon_id', 'dataset_name', 'timestamp']
+        for result in [client, auto]:
+            pd.testing.assert_frame_equal(result.sort_values(key).reset_index(drop=True),
+                                          server.sort_values(key).reset_index(drop=True))
+        expected = self._reference_mask(polygons[0]['geometry'], hive.points_df).sum()
+        assert (server['polygon_id'] == 'mp').sum() == expected
+
+    def test_cache_key_depends_on_refine_mode(self, query):
+        geometry = _holed_multipolygon()
+        simple = box(116.0, 39.0, 116.01, 39.01)
+        options = PointQueryOptions.from_config(PolygonTrajectoryConfig())
+        never, always, auto = (query(client_refine_mode=mode) for mode in ['never', 'always', 'auto'])
+
+        assert never._result_cache_key(geometry, options) != always._result_cache_key(geometry, options)
+        assert auto._result_cache_key(geometry, options) != never._result_cache_key(geometry, options)
+        assert auto._result_cache_key(simple, options) != always._result_cache_key(simple, options)
+        assert auto._result_cache_key(geometry, options) == query(client_refine_mode='auto')._result_cache_key(
+            geometry, options)
+
+
+class TestTrajectoryExport:
+    """测试轨迹导出"""
+
+    def test_geoparquet_schema_covers_all_trajectories(self, tmp_path):
+        trajectories, _ = _reference_trajectories(_points_df(), 2)
+        # 只有后面的轨迹有速度统计，第一个行组无法推断这些列
+        for traj in trajectories[:2]:
+            for key in ['avg_speed', 'max_speed', 'min_speed', 'std_speed']:
+                traj.pop(key, None)
+        output = tmp_path / 'trajectories.parquet'
+
+        assert export_trajectories_to_geoparquet(trajectories, str(output), row_group_size=2)
+
+        gdf = gpd.read_parquet(output)
+        assert gdf['dataset_name'].tolist() == [t['dataset_name'] for t in trajectories]
+        assert gdf['avg_speed'].dtype == np.float64
+        assert gdf['avg_speed'].isna().tolist()[:2] == [True, True]
+        assert gdf['avg_speed'].iloc[2] == pytest.approx(trajectories[2]['avg_speed'])
+        assert gdf['polygon_ids'].iloc[0] == ','.join(trajectories[0]['polygon_ids'])
+
+
+class TestGeometrySimplification:
+    """测试轨迹几何简化（统计仍基于全部点）"""
+
+    def test_simplified_geometry_keeps_full_stats(self, query):
+        points_df = _points_df()
+        full_gdf, _ = query().build_trajectories_columnar(points_df)
+        simplification = SimplificationConfig(strategy='douglas_peucker', tolerance_m=5.0, max_points=10)
+        gdf, stats = query(simplification=simplification).build_trajectories_columnar(points_df)
+
+        assert gdf['dataset_name'].tolist() == full_gdf['dataset_name'].tolist()
+        for column in ['point_count', 'start_time', 'end_time', 'duration']:
+            assert gdf[column].tolist() == full_gdf[column].tolist()
+
+        n_coords = np.array([len(geom.coords) for geom in gdf.geometry])
+        full_coords = np.array([len(geom.coords) for geom in full_gdf.geometry])
+        assert np.all(n_coords <= np.minimum(full_coords, 10))
+        assert n_coords.sum() < full_coords.sum()
+        assert stats['geometry_points'] == n_coords.sum()
+        for geom, full_geom in zip(gdf.geometry, full_gdf.geometry):
+            # 只保留原始点，且首尾点不变
+            assert set(geom.coords) <= set(full_geom.coords)
+            assert geom.coords[0] == full_geom.coords[0] and geom.coords[-1] == full_geom.coords[-1]
+
+    def test_cli_flags(self, tmp_path):
+        geojson = tmp_path / 'polygons.geojson'
+        geojson.write_text('{"type": "FeatureCollection", "features": []}')
+        captured = {}
+
+        def fake_process(geojson_file, output_table, output_geojson, config):
+            captured['config'] = config
+            return {'success': True}
+
+        argv = ['polygon_trajectory_query', '--input', str(geojson), '--output', str(tmp_path / 'out.geojson'),
+                '--simplify-tolerance', '3.5', '--max-points', '200']
+        timeout_argv = argv[:5] + ['--timeout', '45']
+        with patch.object(sys, 'argv', argv), \
+             patch('spdatalab.dataset.polygon_trajectory_query.process_polygon_trajectory_query',
+                   side_effect=fake_process):
+            polygon_trajectory_query.main()
+        assert captured['config'].simplification == SimplificationConfig(
+            strategy='douglas_peucker', tolerance_m=3.5, max_points=200)
+        assert captured['config'].query_timeout == 300
+
+        with patch.object(sys, 'argv', argv[:5]), \
+             patch('spdatalab.dataset.polygon_trajectory_query.process_polygon_trajectory_query',
+                   side_effect=fake_process):
+            polygon_trajectory_query.main()
+        assert captured['config'].simplification is None
+
+        with patch.object(sys, 'argv', timeout_argv), \
+             patch('spdatalab.dataset.polygon_trajectory_query.process_polygon_trajectory_query',
+                   side_effect=fake_process):
+            polygon_trajectory_query.main()
+        assert captured['config'].query_timeout == 45
+
+
+class TestChunkedQueryStrategy:
+    """测试分块并发查询、拆分重试和超时"""
+
+    def _polygons(self, n=10):
+        return [_square(f'p{k}', k % 5, k // 5) for k in range(n)]
+
+    @staticmethod
+    def _sorted(df):
+        return df.sort_values(['polygon_id', 'dataset_name', 'timestamp']).reset_index(drop=True)
+
+    def test_concurrent_chunks_merge_all_results(self, query, fake_hive):
+        def slow(polygon_ids):
+            time.sleep(0.05)
+        hive = fake_hive(on_query=slow)
+        q = query(chunk_size=3, max_concurrent_chunks=3)
+        polygons = self._polygons()
+        expected = self._sorted(q._execute_batch_query(polygons))
+        hive.queries.clear()
+        hive.max_active = 0
+
+        result = q._chunked_query_strategy(polygons, connection_tested=True)
+
+        pd.testing.assert_frame_equal(self._sorted(result), expected)
+        assert sorted(map(len, hive.queries)) == [1, 3, 3, 3]
+        assert hive.max_active > 1
+        # 调用方已测试连接时不再测试，各分块也不单独测试
+        assert hive.connection_tests == 0
+
+    def test_connection_tested_once(self, query, fake_hive):
+        hive = fake_hive()
+        q = query(chunk_size=2, batch_threshold=3)
+        failed = []
+        result = q._batch_query_strategy(self._polygons(), failed_polygon_ids=failed)
+        assert hive.connection_tests == 1
+        assert len(hive.queries) == 5
+        assert set(result['polygon_id']) == {f'p{k}' for k in range(10)}
+        assert failed == []
+
+    def test_failed_chunk_is_split_and_retried(self, query, fake_hive):
+        def fail_multi(polygon_ids):
+            # 含p4的多polygon分块失败，拆分到单个p4后成功；p7始终失败
+            if 'p7' in polygon_ids or ('p4' in polygon_ids and len(polygon_ids) > 1):
+                raise RuntimeError('query failed')
+        hive = fake_hive()
+        q = query(chunk_size=4, max_concurrent_chunks=2, chunk_max_retries=2)
+        polygons = self._polygons()
+        expected = self._sorted(q._execute_batch_query([p for p in polygons if p['id'] != 'p7']))
+        hive.queries.clear()
+        hive.on_query = fail_multi
+
+        failed = []
+        result = q._chunked_query_strategy(polygons, connection_tested=True, failed_polygon_ids=failed)
+
+        pd.testing.assert_frame_equal(self._sorted(result), expected)
+        assert failed == ['p7']
+        # 第一块p0-p3只查询一次，已完成分块的结果保留
+        assert hive.queries.count(['p0', 'p1', 'p2', 'p3']) == 1
+        assert ['p4'] in hive.queries and ['p4', 'p5'] in hive.queries
+        # p7所在分块 4 -> 2 -> 1 拆分重试 chunk_max_retries 次后放弃
+        assert hive.queries.count(['p6', 'p7']) == 1 and hive.queries.count(['p7']) == 1
+
+    def test_timed_out_chunk_is_split_and_retried(self, query, fake_hive):
+        release = threading.Event()
+
+        def block_first(polygon_ids):
+            # 第二块第一次查询卡住，拆分后的查询正常返回
+            if polygon_ids == ['p4', 'p5', 'p6', 'p7']:
+                release.wait(10)
+        hive = fake_hive(on_query=block_first)
+        q = query(chunk_size=4, max_concurrent_chunks=3, query_timeout=0.3)
+        polygons = self._polygons()
+        expected = self._sorted(q._execute_batch_query(polygons))
+        hive.queries.clear()
+
+        failed = []
+        start = time.monotonic()
+        try:
+            result = q._chunked_query_strategy(polygons, connection_tested=True, failed_polygon_ids=failed)
+        finally:
+            release.set()
+        elapsed = time.monotonic() - start
+
+        assert elapsed < 5
+        pd.testing.assert_frame_equal(self._sorted(result), expected)
+        assert failed == []
+        assert hive.queries.count(['p0', 'p1', 'p2', 'p3']) == 1
+        assert ['p4', 'p5'] in hive.queries and ['p6', 'p7'] in hive.queries
+
+    def test_timed_out_chunks_count_against_later_calls(self, query, fake_hive):
+        release = threading.Event()
+
+        def block_p0(polygon_ids):
+            if 'p0' in polygon_ids:
+                release.wait(10)
+        hive = fake_hive(on_query=block_p0)
+        q = query(chunk_size=1, max_concurrent_chunks=2, query_timeout=0.2, chunk_max_retries=0)
+
+        try:
+            failed = []
+            q._chunked_query_strategy(self._polygons(2), connection_tested=True, failed_polygon_ids=failed)
+            assert failed == ['p0']
+            # p0的查询线程仍占用一个连接，后续调用只剩一个并发
+            assert q._available_chunk_workers(4) == 1
+            hive.max_active = hive.active
+            result = q._chunked_query_strategy(self._polygons(6)[2:], connection_tested=True)
+            assert set(result['polygon_id']) == {'p2', 'p3', 'p4', 'p5'}
+            assert hive.max_active == 2
+        finally:
+            release.set()
+
+    def test_waits_for_timed_out_chunks_when_limit_reached(self, query, fake_hive):
+        release = threading.Event()
+
+        def block_p0(polygon_ids):
+            if 'p0' in polygon_ids:
+                release.wait(10)
+        fake_hive(on_query=block_p0)
+        q = query(chunk_size=1, max_concurrent_chunks=1, query_timeout=0.2, chunk_max_retries=0)
+
+        timer = threading.Timer(0.5, release.set)
+        try:
+            q._chunked_query_strategy(self._polygons(1), connection_tested=True)
+            timer.start()
+            start = time.monotonic()
+            result = q._chunked_query_strategy(self._polygons(3)[1:], connection_tested=True)
+            # 超时分块返回、释放连接后才开始新的查询
+            assert release.is_set() and time.monotonic() - start >= 0.2
+            assert set(result['polygon_id']) == {'p1', 'p2'}
+            assert q._available_chunk_workers(2) == 1
+        finally:
+            timer.cancel()
+            release.set()
+
+    def test_timeout_gives_up_after_retries(self, query, fake_hive):
+        release = threading.Event()
+
+        def block_p1(polygon_ids):
+            if 'p1' in polygon_ids:
+                release.wait(10)
+        hive = fake_hive(on_query=block_p1)
+        q = query(chunk_size=2, max_concurrent_chunks=4, query_timeout=0.2, chunk_max_retries=1)
+        polygons = self._polygons(4)
+
+        failed = []
+        try:
+            result = q._chunked_query_strategy(polygons, connection_tested=True, failed_polygon_ids=failed)
+        finally:
+            release.set()
+
+        assert failed == ['p1']
+        assert set(result['polygon_id']) == {'p0', 'p2', 'p3'}
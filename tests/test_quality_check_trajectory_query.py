@@ -0,0 +1,469 @@
+"""
+质检轨迹查询单元测试
+
+数据库访问用假游标替代，只验证查询构建和本地处理逻辑。
+"""
+
+import ast
+import re
+from contextlib import contextmanager
+from unittest.mock import patch
+
+import geopandas as gpd
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import LineString, MultiLineString
+
+from spdatalab.dataset.quality_check_trajectory_query import (
+    ExcelDataParser,
+    QualityCheckConfig,
+    QualityCheckRecord,
+    QualityCheckTrajectoryQuery,
+    SegmentedTrajectory
+)
+
+MODULE = 'spdatalab.dataset.quality_check_trajectory_query'
+
+
+class FakeCursor:
+    """按dataset_name返回轨迹点的假游标，可指定查询时失败的数据集"""
+
+    def __init__(self, points_df, fail_names=()):
+        self.points_df = points_df
+        self.fail_names = set(fail_names)
+        self.executed = []
+        self.description = None
+        self._rows = []
+
+    def execute(self, sql, params=None):
+        names = [value for key, value in (params or {}).items()
+                 if key == 'dataset_name' or key.startswith('ds_')]
+        self.executed.append((sql, names))
+        if self.fail_names & set(names):
+            raise RuntimeError('query failed')
+        df = self.points_df[self.points_df['dataset_name'].isin(names)]
+        df = df.sort_values(['dataset_name', 'timestamp'])
+        if 'dataset_name' not in params:
+            columns = list(df.columns)
+        else:
+            columns = [c for c in df.columns if c != 'dataset_name']
+        self.description = [(c,) for c in columns]
+        self._rows = list(df[columns].itertuples(index=False, name=None))
+
+    def fetchall(self):
+        return self._rows
+
+
+def _fake_hive_cursor(cursor):
+    @contextmanager
+    def fake(*args, **kwargs):
+        yield cursor
+    return fake
+
+
+def _trajectory_points(dataset_names, n=5):
+    frames = [pd.DataFrame({
+        'dataset_name': name,
+        'timestamp': [1_700_000_000 + i for i in range(n)],
+        'longitude': [116.0 + i * 1e-4 for i in range(n)],
+        'latitude': [39.0 + i * 1e-4 for i in range(n)],
+    }) for name in dataset_names]
+    return pd.concat(frames, ignore_index=True)
+
+
+def _record(scene_id):
+    return QualityCheckRecord(task_name='task', annotator='a', autoscene_id=scene_id,
+                              result=['ok'], description=[], other_scenario=[])
+
+
+class TestTrajectoryPrefetch:
+    """测试记录块的批量轨迹预取"""
+
+    def _run_chunk(self, parallel, fail_names):
+        names = [f'ds_{i}' for i in range(6)]
+        # ds_5在数据库中没有轨迹点
+        cursor = FakeCursor(_trajectory_points(names[:5]), fail_names=fail_names)
+        config = QualityCheckConfig(trajectory_batch_size=2, max_workers=2,
+                                    enable_parallel_trajectory_query=parallel,
+                                    enable_parallel_processing=parallel)
+        query = QualityCheckTrajectoryQuery(config)
+        records = [_record(f'scene_{i}') for i in range(6)]
+        scene_mappings = {f'scene_{i}': {'dataset_name': name} for i, name in enumerate(names)}
+
+        segmenter = query.trajectory_segmenter
+        with patch(f'{MODULE}.hive_cursor', _fake_hive_cursor(cursor)), \
+             patch.object(segmenter, 'query_complete_trajectory',
+                          wraps=segmenter.query_complete_trajectory) as single_query:
+            if parallel:
+                trajectories, failed = query._process_chunk_parallel(records, scene_mappings)
+            else:
+                trajectories, failed = query._process_chunk_sequential(records, scene_mappings)
+        single_names = sorted(call.args[0] for call in single_query.call_args_list)
+        return trajectories, failed, single_names
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_all_batches_succeed(self, parallel):
+        trajectories, failed, single_names = self._run_chunk(parallel, fail_names=())
+        assert sorted(t.dataset_name for t in trajectories) == [f'ds_{i}' for i in range(5)]
+        assert failed == 1
+        # 查询成功但无数据的数据集不再逐条查询
+        assert single_names == []
+
+    @pytest.mark.parametrize('parallel', [False, True])
+    def test_failed_batch_falls_back_to_single_query(self, parallel):
+        # 第二批（ds_2, ds_3）批量查询失败，逐条查询时只有ds_3仍失败
+        trajectories, failed, single_names = self._run_chunk(parallel, fail_names={'ds_3'})
+        assert single_names == ['ds_2', 'ds_3']
+        assert sorted(t.dataset_name for t in trajectories) == ['ds_0', 'ds_1', 'ds_2', 'ds_4']
+        assert failed == 2
+
+    def test_fetch_trajectory_batches_reports_queried_names(self):
+        names = ['ds_0', 'ds_1', 'ds_2', 'ds_3']
+        cursor = FakeCursor(_trajectory_points(names[:3]), fail_names={'ds_0'})
+        query = QualityCheckTrajectoryQuery(QualityCheckConfig(trajectory_batch_size=2,
+                                                               enable_parallel_trajectory_query=False))
+        with patch(f'{MODULE}.hive_cursor', _fake_hive_cursor(cursor)):
+            trajectories, queried = query.trajectory_segmenter.fetch_trajectory_batches(names + ['ds_2'])
+        assert [batch for _, batch in cursor.executed] == [['ds_0', 'ds_1'], ['ds_2', 'ds_3']]
+        assert queried == {'ds_2', 'ds_3'}
+        assert list(trajectories) == ['ds_2']
+        assert len(trajectories['ds_2']) == 5
+
+
+class TestQueryPushdown:
+    """测试点查询SQL的字段投影和时间窗口下推"""
+
+    def _run_queries(self, config):
+        cursor = FakeCursor(_trajectory_points(['ds_0', 'ds_1']))
+        segmenter = QualityCheckTrajectoryQuery(config).trajectory_segmenter
+        with patch(f'{MODULE}.hive_cursor', _fake_hive_cursor(cursor)):
+            single = segmenter.query_complete_trajectory('ds_0')
+            batch = segmenter._query_trajectory_batch(['ds_0', 'ds_1'])
+        (single_sql, _), (batch_sql, _) = cursor.executed
+        return single_sql, batch_sql, single, batch
+
+    @staticmethod
+    def _selected_fields(sql):
+        return re.findall(r" as (\w+)", sql)
+
+    def test_default_projection_without_time_window(self):
+        single_sql, batch_sql, single, batch = self._run_queries(QualityCheckConfig())
+
+        assert self._selected_fields(single_sql) == [
+            'timestamp', 'longitude', 'latitude', 'twist_linear', 'avp_flag', 'workstage']
+        assert self._selected_fields(batch_sql) == [
+            'dataset_name', 'timestamp', 'longitude', 'latitude', 'twist_linear', 'avp_flag', 'workstage']
+        assert 'ST_X(point_lla) as longitude' in single_sql
+        assert 'WHERE dataset_name = %(dataset_name)s' in single_sql
+        assert 'WHERE dataset_name IN (%(ds_0)s, %(ds_1)s)' in batch_sql
+        for sql in (single_sql, batch_sql):
+            assert 'yaw' not in sql
+            assert 'timestamp >=' not in sql and 'timestamp <=' not in sql
+        assert len(single) == 5
+        assert sorted(batch) == ['ds_0', 'ds_1']
+
+    def test_custom_projection_and_time_window(self):
+        config = QualityCheckConfig(point_fields=['yaw', 'timestamp'], start_ts=1_700_000_001,
+                                    end_ts=1_700_000_003)
+        single_sql, batch_sql, _, _ = self._run_queries(config)
+
+        assert self._selected_fields(single_sql) == ['timestamp', 'longitude', 'latitude', 'yaw']
+        assert self._selected_fields(batch_sql) == ['dataset_name', 'timestamp', 'longitude', 'latitude', 'yaw']
+        for sql in (single_sql, batch_sql):
+            assert 'twist_linear' not in sql
+            assert 'AND timestamp >= 1700000001' in sql
+            assert 'AND timestamp <= 1700000003' in sql
+
+    def test_unknown_point_field_is_rejected(self):
+        cursor = FakeCursor(_trajectory_points(['ds_0']))
+        segmenter = QualityCheckTrajectoryQuery(QualityCheckConfig(point_fields=['speed'])).trajectory_segmenter
+        with patch(f'{MODULE}.hive_cursor', _fake_hive_cursor(cursor)):
+            with pytest.raises(ValueError, match='speed'):
+                segmenter._query_trajectory_batch(['ds_0'])
+
+
+def _reference_segments(segmenter, trajectory_df, time_ranges):
+    """逐区间、逐级容差做布尔掩码的线性扫描分段（原实现），返回各分段坐标列表"""
+    config = segmenter.config
+    timestamps = trajectory_df['timestamp']
+    _, time_scale = segmenter._detect_timestamp_unit(timestamps.max() - timestamps.min())
+    relative_time = (timestamps - timestamps.min()) / time_scale
+    total_duration = relative_time.max()
+
+    segments = []
+    for start_time, end_time in time_ranges:
+        if start_time >= end_time or end_time < 0 or start_time > total_duration:
+            continue
+        tolerances = [config.time_tolerance]
+        if config.adaptive_tolerance:
+            tolerance, tolerances = config.time_tolerance, []
+            while tolerance <= min(5.0, total_duration * 0.1):
+                tolerances.append(tolerance)
+                tolerance += 0.5
+        for tolerance in tolerances:
+            mask = (relative_time >= start_time - tolerance) & (relative_time <= end_time + tolerance)
+            segment_points = trajectory_df[mask]
+            if len(segment_points) >= config.min_points_per_segment:
+                break
+        else:
+            continue
+        coords = [(lon, lat) for lon, lat in zip(segment_points['longitude'], segment_points['latitude'])
+                  if pd.notna(lon) and pd.notna(lat)]
+        if len(coords) >= config.min_points_per_segment:
+            segments.append(coords)
+    return segments
+
+
+def _random_trajectory(seed, n=400, time_scale=1000):
+    """不规则采样、含停顿间隙和空坐标的有序轨迹，时间戳单位由time_scale决定"""
+    rng = np.random.default_rng(seed)
+    steps = rng.exponential(0.15, n)
+    steps[rng.choice(n, 3, replace=False)] += rng.uniform(3, 8, 3)
+    relative = np.concatenate([[0.0], np.cumsum(steps[1:])])
+    longitudes = 116.0 + np.cumsum(rng.normal(0, 1e-5, n))
+    latitudes = 39.0 + np.cumsum(rng.normal(0, 1e-5, n))
+    longitudes[rng.choice(n, 10, replace=False)] = np.nan
+    return pd.DataFrame({
+        'timestamp': 1_700_000_000 * time_scale + np.round(relative * time_scale).astype(np.int64),
+        'longitude': longitudes,
+        'latitude': latitudes,
+    })
+
+
+class TestSegmentTrajectoryByTimeRanges:
+    """测试二分查找分段与原线性扫描结果一致"""
+
+    @staticmethod
+    def _segment(config, trajectory_df, time_ranges):
+        segmenter = QualityCheckTrajectoryQuery(config).trajectory_segmenter
+        geometry, count = segmenter.segment_trajectory_by_time_ranges(trajectory_df, time_ranges)
+        return [list(line.coords) for line in geometry.geoms], count, segmenter
+
+    @pytest.mark.parametrize('seed', range(4))
+    @pytest.mark.parametrize('time_scale', [1, 1000, 1_000_000])
+    @pytest.mark.parametrize('adaptive', [False, True])
+    def test_matches_linear_scan(self, seed, time_scale, adaptive):
+        trajectory_df = _random_trajectory(seed, time_scale=time_scale)
+        relative = (trajectory_df['timestamp'] - trajectory_df['timestamp'].iloc[0]).to_numpy() / time_scale
+        rng = np.random.default_rng(seed + 100)
+        starts = rng.uniform(-5, relative[-1] + 5, 30)
+        time_ranges = [[start, start + width] for start, width in zip(starts, rng.exponential(2.0, 30))]
+        # 边界恰好等于点的相对时间、落在停顿间隙内、起止颠倒、超出轨迹范围的区间
+        edges = relative[rng.choice(len(relative), 10, replace=False)]
+        time_ranges += [[a, b] for a, b in zip(np.sort(edges)[::2], np.sort(edges)[1::2])]
+        gap = int(np.argmax(np.diff(relative)))
+        time_ranges += [[relative[gap] + 0.6, relative[gap + 1] - 0.6],
+                        [relative[gap], relative[gap + 1]],
+                        [3.0, 3.0], [4.0, 2.0], [-10.0, -1.0], [relative[-1] + 1, relative[-1] + 2]]
+        config = QualityCheckConfig(adaptive_tolerance=adaptive, min_points_per_segment=3)
+
+        segments, count, segmenter = self._segment(config, trajectory_df, time_ranges)
+
+        expected = _reference_segments(segmenter, trajectory_df, time_ranges)
+        assert count == len(expected) == len(segments)
+        assert segments == expected
+
+    def test_boundary_points_are_inclusive(self):
+        trajectory_df = pd.DataFrame({'timestamp': np.arange(100, 111),
+                                      'longitude': 116.0 + np.arange(11) * 1e-4,
+                                      'latitude': 39.0})
+        config = QualityCheckConfig(time_tolerance=0.0, adaptive_tolerance=False)
+
+        segments, count, _ = self._segment(config, trajectory_df, [[2, 5], [5, 6], [5, 5.5], [9.5, 10]])
+
+        # [5, 5.5]和[9.5, 10]各只含一个点，不足min_points_per_segment
+        assert count == 2
+        assert [[lon for lon, _ in line] for line in segments] == [
+            [116.0 + k * 1e-4 for k in (2, 3, 4, 5)], [116.0 + k * 1e-4 for k in (5, 6)]]
+
+    def test_empty_inputs(self):
+        trajectory_df = _random_trajectory(0)
+        segmenter = QualityCheckTrajectoryQuery().trajectory_segmenter
+
+        geometry, count = segmenter.segment_trajectory_by_time_ranges(trajectory_df, [])
+        assert geometry.is_empty and count == 0
+        geometry, count = segmenter.segment_trajectory_by_time_ranges(trajectory_df.iloc[:0], [[0, 10]])
+        assert geometry.is_empty and count == 0
+
+    def test_short_trajectory_uses_base_tolerance(self):
+        # 时长不足10倍基础容差时不进入自适应，仍按基础容差分段
+        trajectory_df = pd.DataFrame({'timestamp': [0, 1, 2, 3], 'longitude': [116.0, 116.1, 116.2, 116.3],
+                                      'latitude': 39.0})
+
+        segments, count, _ = self._segment(QualityCheckConfig(), trajectory_df, [[1.2, 1.8]])
+
+        assert count == 1
+        assert segments == [[(116.1, 39.0), (116.2, 39.0)]]
+
+    def test_unsorted_input_is_sorted(self):
+        trajectory_df = _random_trajectory(1)
+        time_ranges = [[5.0, 12.0], [20.0, 21.0]]
+
+        expected, _, _ = self._segment(QualityCheckConfig(), trajectory_df, time_ranges)
+        shuffled = trajectory_df.sample(frac=1.0, random_state=0)
+        segments, count, _ = self._segment(QualityCheckConfig(), shuffled, time_ranges)
+
+        assert count == 2
+        assert segments == expected
+
+
+# 乱码：GBK编码的中文按latin1解码
+_MOJIBAKE = '变道'.encode('gbk').decode('latin1')
+
+# 工作簿行：空行、缺失字段、good结果、畸形列表/时间区间、乱码和中文
+_EXCEL_ROWS = [
+    ('t1', 'a', 'scene_0', "['变道', 'turn']", '[[1, 3], [5.5, 8]]', None),
+    (None, None, None, None, None, None),
+    ('t1', 'a', None, "['turn']", '[[1, 3]]', None),
+    ('t1', 'a', '   ', "['turn']", '[[1, 3]]', None),
+    ('t1', None, 'scene_4', 'turn', '[[1, 3]]', None),
+    ('t1', 'b', 'scene_5', 'good', '[[1, 3]]', None),
+    ('t1', 'b', 'scene_6', "['good']", None, None),
+    ('t1', 'b', 'scene_7', "['Good', 'turn']", '[[2, 1], [4, 6]]', None),
+    ('t2', 'b', ' scene_8 ', " ' lane change ' ", '[[1e1, 2E1], [-1, .5]]', "['stop']"),
+    ('t2', 'c', 'scene_9', "['a', 'b'", '[[1, 3], [4', None),
+    ('t2', 'c', 'scene_10', "[turn, stop]", "[[1, 'x'], [2, 4]]", None),
+    ('t2', 'c', 'scene_11', "[1, 'turn', '']", '[[1, 2, 3], (4, 5), [6, 7]]', None),
+    ('t2', 'c', 'scene_12', _MOJIBAKE, 12, "['变道']"),
+    ('t2', 'c', 'scene_13', None, None, None),
+    ('t2', 'c', 'scene_14', None, '[]', f"['{_MOJIBAKE}', \"x\"]"),
+    ('t2', 'c', 'scene_15', "[]", '[[3, 5],]', 'cut-in'),
+    ('t2', 'c', 'scene_16', 'nan', 'None', 'None'),
+]
+
+
+def _write_workbook(path, rows):
+    columns = ['task_name', 'annotator', 'autoscene_id', 'result', 'description', 'other_scenario']
+    df = pd.DataFrame(rows, columns=columns)
+    df['unused'] = range(len(df))
+    df.to_excel(path, index=False, engine='openpyxl')
+    return str(path)
+
+
+def _reference_records(parser, file_path):
+    """逐值修复编码、逐值判断good、逐行_parse_record的原解析流程"""
+    df = pd.read_excel(file_path, engine='openpyxl').dropna(subset=['autoscene_id'])
+    for col in ['task_name', 'annotator', 'autoscene_id', 'result', 'other_scenario', 'description']:
+        df[col] = df[col].astype(str).str.strip()
+        if col != 'description':
+            df[col] = df[col].map(parser._fix_encoding)
+        df[col] = df[col].replace(['nan', 'None', ''], None)
+
+    def is_good(value):
+        if pd.isna(value):
+            return False
+        value = parser._fix_encoding(value)
+        if value.lower().strip() == 'good':
+            return True
+        try:
+            items = ast.literal_eval(value) if value.startswith('[') and value.endswith(']') else None
+        except Exception:
+            return False
+        if not isinstance(items, list):
+            return False
+        cleaned = [parser._fix_encoding(str(item)).lower().strip() for item in items if str(item).strip()]
+        return cleaned == ['good']
+
+    records = []
+    for _, row in df.iterrows():
+        if (pd.isna(row['result']) and pd.isna(row['other_scenario'])) or is_good(row['result']):
+            continue
+        record = parser._parse_record(row)
+        if record:
+            records.append(record)
+    return records
+
+
+class TestExcelParsing:
+    """测试按列解析与逐行解析一致，以及并行解析的分块产出"""
+
+    def test_column_parsing_matches_row_parsing(self, tmp_path):
+        file_path = _write_workbook(tmp_path / 'qc.xlsx', _EXCEL_ROWS)
+        parser = ExcelDataParser(QualityCheckConfig())
+
+        records = parser.load_excel_data(file_path)
+
+        assert records == _reference_records(parser, file_path)
+        by_id = {record.autoscene_id: record for record in records}
+        assert sorted(by_id) == sorted(f'scene_{i}' for i in (0, 7, 8, 9, 10, 11, 12, 14, 15))
+        assert by_id['scene_0'].description == [[1.0, 3.0], [5.5, 8.0]]
+        assert by_id['scene_7'].description == [[4.0, 6.0]]
+        # 去掉外层引号后不再strip，与原逐行解析一致
+        assert by_id['scene_8'].result == [' lane change ']
+        assert by_id['scene_8'].description == [[10.0, 20.0], [-1.0, 0.5]]
+        assert by_id['scene_9'].description == []
+        assert by_id['scene_12'].result == ['变道']
+        assert by_id['scene_14'].other_scenario == ['变道', 'x']
+
+    def test_parallel_chunks_match_sequential(self, tmp_path):
+        rows = _EXCEL_ROWS * 3
+        file_paths = [_write_workbook(tmp_path / f'qc_{i}.xlsx', rows[i:]) for i in range(3)]
+        # 缺少必需列的文件只记录日志并跳过
+        broken = tmp_path / 'broken.xlsx'
+        pd.DataFrame({'task_name': ['t'], 'autoscene_id': ['scene_x']}).to_excel(broken, index=False)
+        file_paths.insert(1, str(broken))
+
+        def parse(workers):
+            parser = ExcelDataParser(QualityCheckConfig(excel_workers=workers, excel_batch_size=4))
+            return list(parser.iter_record_chunks(file_paths))
+
+        sequential, parallel = parse(1), parse(3)
+
+        reference = ExcelDataParser(QualityCheckConfig())
+        expected = [record for path in file_paths if path != str(broken)
+                    for record in _reference_records(reference, path)]
+        assert [record for chunk in sequential for record in chunk] == expected
+        for chunks in (sequential, parallel):
+            assert all(0 < len(chunk) <= 4 for chunk in chunks)
+
+        def key(record):
+            return (record.task_name, record.autoscene_id, str(record.result), str(record.description))
+        assert sorted((record for chunk in parallel for record in chunk), key=key) == sorted(expected, key=key)
+
+    def test_chunk_size_defaults_to_large_data_threshold(self):
+        assert QualityCheckConfig().excel_batch_size == QualityCheckConfig().large_data_threshold
+        assert QualityCheckConfig(large_data_threshold=10_000).excel_batch_size == 10_000
+        assert QualityCheckConfig(large_data_threshold=10_000, excel_batch_size=300).excel_batch_size == 300
+
+    def test_full_chunks_use_large_data_path(self, tmp_path):
+        file_path = _write_workbook(tmp_path / 'qc.xlsx', _EXCEL_ROWS)
+        query = QualityCheckTrajectoryQuery(QualityCheckConfig(large_data_threshold=4, excel_workers=1))
+        chunk_sizes = {'large': [], 'standard': []}
+
+        def record(mode):
+            def process(records, scene_mappings):
+                chunk_sizes[mode].append(len(records))
+                return [], len(records)
+            return process
+
+        with patch.object(query.scene_mapper, 'batch_query_scene_mappings', return_value={}), \
+             patch.object(query, '_process_large_dataset', side_effect=record('large')), \
+             patch.object(query, '_process_standard_dataset', side_effect=record('standard')):
+            stats = query.process_excel_files(file_path, output_geojson=str(tmp_path / 'out.geojson'))
+
+        # 9条有效记录按阈值分块：两个整块走大数据分块处理，剩余1条走标准处理
+        assert stats['total_records'] == 9
+        assert chunk_sizes == {'large': [4, 4], 'standard': [1]}
+
+
+class TestTrajectoryExport:
+    """测试轨迹导出"""
+
+    def test_geoparquet_uses_declared_schema(self, tmp_path):
+        trajectories = [SegmentedTrajectory(
+            task_name='task', annotator='a', scene_id=f'scene_{i}', dataset_name=f'ds_{i}',
+            segment_count=i, merged_results=['ok', 'turn'][:i + 1],
+            geometry=MultiLineString([LineString([(116.0, 39.0), (116.0 + i * 1e-3, 39.001)])]),
+            total_duration=float(i), start_time=100 + i, end_time=200 + i, total_points=10
+        ) for i in range(3)]
+        output = tmp_path / 'qc.parquet'
+
+        assert QualityCheckTrajectoryQuery()._export_trajectories_to_geojson(iter(trajectories), str(output))
+
+        gdf = gpd.read_parquet(output)
+        assert gdf['scene_id'].tolist() == ['scene_0', 'scene_1', 'scene_2']
+        assert gdf['merged_results'].tolist() == ['ok', 'ok,turn', 'ok,turn']
+        assert str(gdf['segment_count'].dtype) == 'int64'
+        assert str(gdf['total_duration'].dtype) == 'float64'
+        assert gdf.geometry.iloc[2].equals(trajectories[2].geometry)
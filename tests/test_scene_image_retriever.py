@@ -8,13 +8,23 @@
 
 import pytest
 import io
+import os
+import pickle
+import sys
+import threading
+import time
+import types
 from pathlib import Path
+from unittest.mock import patch
 from PIL import Image
 import pandas as pd
+import pyarrow as pa
+import pyarrow.parquet as pq
 
 from spdatalab.dataset.scene_image_retriever import (
     ImageFrame,
-    SceneImageRetriever
+    SceneImageRetriever,
+    _binary_views
 )
 from spdatalab.dataset.scene_image_viewer import SceneImageHTMLViewer
 
@@ -64,6 +74,27 @@ class TestImageFrame:
         pil_img = frame.to_pil_image()
         assert isinstance(pil_img, Image.Image)
         assert pil_img.size == (100, 100)
+    
+    def test_arrow_backed_frame(self):
+        """测试Arrow缓冲区视图支撑的ImageFrame"""
+        png_data = _png_bytes('blue', size=(40, 30))
+        array = pa.chunked_array([
+            pa.array([b'skip', png_data, None, b''], type=pa.binary()).slice(1),
+            pa.array([png_data], type=pa.binary())
+        ])
+        views = _binary_views(array)
+        assert views[1] is None
+        assert [bytes(v) for v in views if v is not None] == [png_data, b'', png_data]
+        assert [bytes(v) for v in _binary_views(pa.array([b'', png_data], type=pa.large_binary()))] == [b'', png_data]
+        
+        frame = ImageFrame("scene", 0, 0, views[0], 'png')
+        assert isinstance(frame.image_data, memoryview)
+        assert frame.size_bytes == len(png_data)
+        assert frame.to_bytes() == png_data
+        assert frame.to_pil_image().size == (40, 30)
+        # pickle时物化为bytes
+        restored = pickle.loads(pickle.dumps(frame))
+        assert isinstance(restored.image_data, bytes) and restored == frame
 
 
 class TestSceneImageRetriever:
@@ -103,6 +134,16 @@ class TestSceneImageRetriever:
         format_detected = retriever._detect_image_format(jpeg_data)
         assert format_detected == 'jpeg'
     
+    def test_detect_image_format_header_only(self):
+        """测试格式检测只依赖文件头"""
+        retriever = SceneImageRetriever()
+        buffer = io.BytesIO()
+        Image.new('RGB', (50, 50)).save(buffer, format='GIF')
+        
+        assert retriever._detect_image_format(memoryview(buffer.getvalue()[:16])) == 'gif'
+        assert retriever._detect_image_format(b'RIFF\x00\x00\x00\x00WEBPVP8 ') == 'webp'
+        assert retriever._detect_image_format(b'not an image') == 'unknown'
+    
     def test_parse_camera_parquet_path(self):
         """测试相机parquet路径解析"""
         retriever = SceneImageRetriever(camera_type="CAM_FRONT_WIDE_ANGLE")
@@ -179,6 +220,196 @@ class TestSceneImageRetriever:
         assert frames[2].frame_index == 4
 
 
+def _png_bytes(color, size=(32, 32)):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color=color).save(buffer, format='PNG')
+    return buffer.getvalue()
+
+
+class TestPrunedParquetRead:
+    """测试帧过滤下推到parquet读取"""
+    
+    @pytest.fixture
+    def parquet_path(self, tmp_path):
+        n_frames = 200
+        # 时间戳乱序写入，每帧约100KB不可压缩数据
+        timestamps = [(i * 7919) % n_frames for i in range(n_frames)]
+        table = pa.table({
+            'timestamp': timestamps,
+            'filename': [f'frame_{ts:04d}.jpg' for ts in timestamps],
+            'image': [b'\xff\xd8\xff' + bytes([ts % 256]) + os.urandom(100_000) for ts in timestamps]
+        })
+        path = tmp_path / 'camera.parquet'
+        pq.write_table(table, path, row_group_size=10)
+        return path
+    
+    @pytest.fixture
+    def read_bytes(self):
+        counter = {'bytes': 0}
+        
+        class CountingFile(io.FileIO):
+            def read(self, size=-1):
+                data = super().read(size)
+                counter['bytes'] += len(data)
+                return data
+            
+            def readinto(self, buffer):
+                n = super().readinto(buffer)
+                counter['bytes'] += n or 0
+                return n
+        
+        with patch('spdatalab.dataset.scene_image_retriever.open_file',
+                   side_effect=lambda path, mode: CountingFile(path, 'rb')):
+            yield counter
+    
+    @pytest.mark.parametrize('frame_indices,max_frames', [
+        (None, 5),
+        ([0, 57, 199, -1, 120], None),
+        (None, None),
+    ])
+    def test_matches_full_parse(self, parquet_path, read_bytes, frame_indices, max_frames):
+        retriever = SceneImageRetriever()
+        expected = retriever._parse_parquet_to_frames(
+            pd.read_parquet(parquet_path), 'scene_001', frame_indices, max_frames
+        )
+        df = retriever._load_parquet_from_obs(str(parquet_path), frame_indices, max_frames)
+        frames = retriever._rows_to_frames(df, 'scene_001', 'image', 'timestamp', 'filename')
+        
+        assert [(f.frame_index, f.timestamp, f.filename, f.image_data) for f in frames] == \
+               [(f.frame_index, f.timestamp, f.filename, f.image_data) for f in expected]
+        assert all(f.image_format == 'jpeg' for f in frames)
+        assert all(isinstance(f.image_data, memoryview) for f in frames)
+    
+    def test_reads_only_selected_row_groups(self, parquet_path, read_bytes):
+        retriever = SceneImageRetriever()
+        df = retriever._load_parquet_from_obs(str(parquet_path), max_frames=5)
+        
+        assert df['timestamp'].tolist() == [0, 1, 2, 3, 4]
+        # 5帧最多分布在5个row group（共20个），读取量远小于整个文件
+        assert read_bytes['bytes'] < parquet_path.stat().st_size * 0.3
+    
+    def test_out_of_range_indices_ignored(self, parquet_path, read_bytes):
+        retriever = SceneImageRetriever()
+        df = retriever._load_parquet_from_obs(str(parquet_path), frame_indices=[3, 500])
+        assert df.index.tolist() == [3]
+
+
+class TestObsListing:
+    """测试OBS目录列表缓存与预取"""
+    
+    @pytest.fixture
+    def fake_mox(self):
+        calls = {'list': [], 'init': 0}
+        
+        def list_directory(obs_dir, recursive=False):
+            calls['list'].append(obs_dir)
+            time.sleep(0.01)
+            return ['part-0.parquet', '_SUCCESS']
+        
+        def fake_init():
+            calls['init'] += 1
+        
+        moxing = types.SimpleNamespace(file=types.SimpleNamespace(list_directory=list_directory))
+        with patch.dict(sys.modules, {'moxing': moxing}), \
+             patch('spdatalab.common.io_obs._init_moxing', side_effect=fake_init), \
+             patch('spdatalab.common.io_obs._moxing_initialized', False):
+            yield calls
+    
+    def test_listing_cached_across_runs(self, tmp_path, fake_mox):
+        retriever = SceneImageRetriever(listing_cache_dir=str(tmp_path))
+        expected = ['obs://bucket/scene_001/samples/CAM_FRONT_WIDE_ANGLE/part-0.parquet']
+        camera_dir = 'obs://bucket/scene_001/samples/CAM_FRONT_WIDE_ANGLE'
+        
+        assert retriever._list_obs_directory(camera_dir) == expected
+        assert retriever._list_obs_directory(camera_dir + '/') == expected
+        # 新实例（下一次运行）直接读取持久化的缓存
+        assert SceneImageRetriever(listing_cache_dir=str(tmp_path))._list_obs_directory(camera_dir) == expected
+        assert fake_mox['list'] == [camera_dir + '/']
+        assert fake_mox['init'] == 1
+    
+    def test_prefetch_listings(self, tmp_path, fake_mox):
+        retriever = SceneImageRetriever(listing_cache_dir=str(tmp_path))
+        dirs = [f'obs://bucket/scene_{i:02d}/samples/CAM_FRONT_WIDE_ANGLE' for i in range(16)]
+        
+        listings = retriever.prefetch_listings(dirs + dirs[:3], max_workers=8)
+        assert list(listings) == [d + '/' for d in dirs]
+        assert all(files == [d + 'part-0.parquet'] for d, files in listings.items())
+        assert sorted(fake_mox['list']) == sorted(d + '/' for d in dirs)
+        assert fake_mox['init'] == 1
+        
+        # 再次预取全部命中缓存
+        retriever.prefetch_listings(dirs)
+        assert len(fake_mox['list']) == len(dirs)
+        assert retriever.listing_cache.stats['hits'] == len(dirs)
+
+
+class TestBatchLoadImages:
+    """测试并发批量加载"""
+    
+    @pytest.fixture
+    def retriever(self, tmp_path):
+        retriever = SceneImageRetriever(listing_cache_dir=None)
+        self.active = 0
+        self.max_active = 0
+        self.lock = threading.Lock()
+        load_parquet = retriever._load_parquet_from_obs
+        
+        def fake_paths(scene_ids):
+            self.path_calls.append(list(scene_ids))
+            known = [sid for sid in scene_ids if sid != 'scene_missing']
+            return pd.DataFrame({
+                'scene_id': known,
+                'data_name': known,
+                'scene_obs_path': [f'obs://bucket/{sid}' for sid in known],
+                'timestamp': 0
+            })
+        
+        def fake_load(path, frame_indices=None, max_frames=None):
+            with self.lock:
+                self.active += 1
+                self.max_active = max(self.max_active, self.active)
+            time.sleep(0.02)
+            with self.lock:
+                self.active -= 1
+            scene_id = path.split('/')[3]
+            local_path = tmp_path / f'{scene_id}.parquet'
+            if not local_path.exists():
+                pd.DataFrame({
+                    'image': [_png_bytes('red'), _png_bytes('blue'), _png_bytes('green')],
+                    'timestamp': [3, 1, 2],
+                    'filename': [f'{scene_id}_{i}.png' for i in range(3)]
+                }).to_parquet(local_path)
+            return load_parquet(str(local_path), frame_indices, max_frames)
+        
+        self.path_calls = []
+        with patch.object(retriever, 'get_scene_obs_paths', side_effect=fake_paths), \
+             patch.object(retriever, '_list_obs_directory',
+                          side_effect=lambda d, persist=True: [d.rstrip('/') + '/part-0.parquet']), \
+             patch.object(retriever, '_load_parquet_from_obs', side_effect=fake_load):
+            yield retriever
+    
+    def test_concurrent_results_match_sequential(self, retriever):
+        scene_ids = [f'scene_{i:02d}' for i in range(12)] + ['scene_missing']
+        results = retriever.batch_load_images(scene_ids, frames_per_scene=2, max_workers=4)
+        
+        assert self.path_calls == [scene_ids]
+        assert list(results) == scene_ids[:-1]
+        assert self.max_active > 1
+        for scene_id, frames in results.items():
+            expected = retriever._load_scene_frames(scene_id, f'obs://bucket/{scene_id}', None, 2)
+            assert [f.filename for f in frames] == [f.filename for f in expected]
+            assert [f.timestamp for f in frames] == [1, 2]
+    
+    def test_streaming_and_byte_budget(self, retriever):
+        scene_ids = [f'scene_{i:02d}' for i in range(8)]
+        # 预算不足一个场景的数据量时，只保持一个场景在加载
+        streamed = list(retriever.iter_load_images(scene_ids, frames_per_scene=2,
+                                                   max_workers=4, max_inflight_bytes=1))
+        assert sorted(scene_id for scene_id, _ in streamed) == scene_ids
+        assert all(len(frames) == 2 for _, frames in streamed)
+        assert self.max_active == 1
+
+
 class TestSceneImageHTMLViewer:
     """测试SceneImageHTMLViewer类"""
     
@@ -291,6 +522,51 @@ class TestSceneImageHTMLViewer:
         assert "data:image/jpeg;base64," in html_content
         assert "总场景数: 1" in html_content
         assert "总帧数: 2" in html_content
+    
+    def test_generate_html_report_assets(self, tmp_path):
+        """测试资源文件模式：资源目录、分页、懒加载和缩略图缓存"""
+        viewer = SceneImageHTMLViewer()
+        colors = ['red', 'green', 'blue', 'yellow', 'white']
+        images_dict = {
+            f"scene_{s:03d}": [
+                ImageFrame(f"scene_{s:03d}", i, 1697875200000 + i, _png_bytes(colors[i], size=(400, 300)), 'png')
+                for i in range(len(colors))
+            ]
+            for s in range(3)
+        }
+        output_path = tmp_path / "report.html"
+        
+        result_path = viewer.generate_html_report(
+            images_dict, str(output_path), title="资源模式", output_mode='assets', frames_per_page=4
+        )
+        
+        assert result_path == str(output_path.resolve())
+        pages = [output_path] + [tmp_path / f"report_p{p}.html" for p in range(2, 5)]
+        assert all(page.exists() for page in pages)
+        assert not (tmp_path / "report_p5.html").exists()
+        
+        html_content = pages[1].read_text(encoding='utf-8')
+        assert "data:image" not in html_content
+        assert 'loading="lazy"' in html_content
+        assert 'href="report_p3.html"' in html_content
+        assert "第 2/4 页" in html_content
+        
+        # 相同内容只写一份（3个场景共5种图片）
+        assets_dir = tmp_path / "report_assets"
+        assert len(list((assets_dir / "images").iterdir())) == 5
+        thumbnails = list((assets_dir / "thumbs").iterdir())
+        assert len(thumbnails) == 5
+        assert all(max(Image.open(path).size) <= 200 for path in thumbnails)
+        for src in ['report_assets/thumbs/', 'report_assets/images/']:
+            assert src in html_content
+        
+        # 再次生成时缩略图命中缓存
+        with patch.object(viewer, '_create_thumbnail', side_effect=AssertionError):
+            viewer.generate_html_report(images_dict, str(output_path), output_mode='assets')
+    
+    def test_invalid_output_mode(self, tmp_path):
+        with pytest.raises(ValueError):
+            SceneImageHTMLViewer().generate_html_report({}, str(tmp_path / "r.html"), output_mode='pdf')
 
 
 # 集成测试标记（需要数据库和OBS访问）
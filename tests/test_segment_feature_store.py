@@ -0,0 +1,87 @@
+"""
+轨迹段特征库单元测试
+"""
+
+from dataclasses import dataclass, replace
+from types import SimpleNamespace
+
+import numpy as np
+import pandas as pd
+import pytest
+from shapely.geometry import LineString
+
+from spdatalab.dataset.segment_feature_store import (
+    SegmentFeatureStore,
+    segmentation_config_hash
+)
+
+
+@dataclass
+class _Config:
+    point_table: str = "public.ddi_data_points"
+    query_limit: int = 50000
+    min_distance: float = 50.0
+    max_duration: float = 15.0
+    min_points: int = 5
+    time_gap_threshold: float = 3.0
+    min_movement: float = 10.0
+    max_jump: float = 100.0
+    max_speed: float = 30.0
+    eps: float = 0.8
+    min_samples: int = 5
+
+
+@pytest.fixture
+def segments():
+    result = []
+    for i in range(3):
+        points = pd.DataFrame({
+            'lon': [116.0 + i, 116.001 + i, 116.002 + i],
+            'lat': [39.0, 39.001, 39.002],
+            'timestamp': [100.0, 101.0, 102.0],
+            'twist_linear': [5.0, 6.0, 7.0],
+            'yaw': [0.1, 0.2, 0.3]
+        })
+        result.append(SimpleNamespace(
+            dataset_name=f'ds_{i}', segment_index=i, points=points,
+            start_time=100, end_time=102, duration=2.0, point_count=3,
+            features=np.arange(10, dtype=float) + i, quality_flag='moving',
+            geometry=LineString(points[['lon', 'lat']].to_numpy())
+        ))
+    return result
+
+
+def test_config_hash_ignores_clustering_params():
+    config = _Config()
+    assert segmentation_config_hash(config) == segmentation_config_hash(replace(config, eps=0.3, min_samples=10))
+    assert segmentation_config_hash(config) != segmentation_config_hash(replace(config, min_distance=30.0))
+
+
+def test_save_and_load_grid(tmp_path, segments):
+    store = SegmentFeatureStore(str(tmp_path), config=_Config())
+    assert not store.has_grid('A72', 7)
+
+    store.save_grid('A72', 7, 'analysis_1', segments)
+    assert store.has_grid('A72', 7)
+    assert store.list_grids().to_dict('records') == [{'city_id': 'A72', 'grid_id': 7}]
+
+    loaded = store.load_grid('A72', 7)
+    assert 'point_lon' not in loaded.columns
+    np.testing.assert_array_equal(
+        SegmentFeatureStore.feature_matrix(loaded),
+        np.vstack([seg.features for seg in segments])
+    )
+    assert loaded['dataset_name'].tolist() == ['ds_0', 'ds_1', 'ds_2']
+
+    with_points = store.load_grid('A72', 7, with_points=True)
+    points = SegmentFeatureStore.segment_points(with_points.to_dict('records')[1])
+    pd.testing.assert_frame_equal(points, segments[1].points)
+
+
+def test_empty_grid_is_stored(tmp_path):
+    """无有效轨迹段的grid同样写入，避免重复查询"""
+    store = SegmentFeatureStore(str(tmp_path), config=_Config())
+    store.save_grid('A72', 8, 'analysis_1', [])
+    loaded = store.load_grid('A72', 8)
+    assert loaded is not None and loaded.empty
+    assert store.load_grid('A72', 9) is None
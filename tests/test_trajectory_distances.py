@@ -0,0 +1,219 @@
+"""
+轨迹距离度量单元测试
+"""
+
+import numpy as np
+import pytest
+from scipy.spatial.distance import squareform
+from sklearn.cluster import DBSCAN
+
+from spdatalab.dataset.improved_trajectory_clustering import (
+    ImprovedTrajectoryClusterer,
+    _frechet_coupling_rows,
+    angle_difference,
+    frechet_distance,
+    haversine_distance,
+    hausdorff_distance_trajectory,
+    pairwise_haversine,
+    parallel_distance,
+    perpendicular_distance,
+    segment_distance,
+    segment_distance_matrix
+)
+from spdatalab.dataset.trajectory_distance_matrix import (
+    _trajectory_summaries,
+    compute_condensed_distances,
+    compute_distance_graph,
+    pair_lower_bounds
+)
+
+
+def _random_walk(rng, n):
+    return np.column_stack([
+        116.0 + np.cumsum(rng.normal(0, 1e-4, n)),
+        39.0 + np.cumsum(rng.normal(0, 1e-4, n))
+    ])
+
+
+def _frechet_reference(traj1, traj2):
+    """逐单元计算的离散Fréchet距离"""
+    n, m = len(traj1), len(traj2)
+    ca = np.zeros((n, m))
+    for i in range(n):
+        for j in range(m):
+            d = haversine_distance(traj1[i][1], traj1[i][0], traj2[j][1], traj2[j][0])
+            if i == 0 and j == 0:
+                ca[i, j] = d
+            elif j == 0:
+                ca[i, j] = max(ca[i - 1, 0], d)
+            elif i == 0:
+                ca[i, j] = max(ca[0, j - 1], d)
+            else:
+                ca[i, j] = max(min(ca[i - 1, j], ca[i - 1, j - 1], ca[i, j - 1]), d)
+    return ca[n - 1, m - 1]
+
+
+class TestFrechetDistance:
+    """测试迭代Fréchet距离"""
+
+    def test_matches_reference(self):
+        rng = np.random.default_rng(0)
+        for n, m in [(1, 1), (1, 5), (7, 1), (12, 30), (25, 9)]:
+            traj1, traj2 = _random_walk(rng, n), _random_walk(rng, m)
+            expected = _frechet_reference(traj1, traj2)
+            assert frechet_distance(traj1, traj2) == expected
+            assert _frechet_coupling_rows(pairwise_haversine(traj1, traj2), np.inf) == expected
+
+    def test_long_trajectories(self):
+        """长轨迹不受递归深度限制"""
+        rng = np.random.default_rng(1)
+        traj = _random_walk(rng, 3000)
+        assert frechet_distance(traj, traj) == 0.0
+
+    def test_early_abandoning(self):
+        rng = np.random.default_rng(2)
+        traj1, traj2 = _random_walk(rng, 40), _random_walk(rng, 35)
+        exact = frechet_distance(traj1, traj2)
+        assert frechet_distance(traj1, traj2, threshold=exact) == exact
+        assert frechet_distance(traj1, traj2, threshold=exact * 2) == exact
+        assert frechet_distance(traj1, traj2, threshold=exact * 0.9) == np.inf
+        assert frechet_distance(traj1, traj2, threshold=0.0) == np.inf
+
+
+def _segment_set(seed, n_groups=4, per_group=6, n_points=15):
+    """若干组相互靠近的轨迹段，组间相距较远"""
+    rng = np.random.default_rng(seed)
+    segments = []
+    for g in range(n_groups):
+        base = _random_walk(rng, n_points) + np.array([g * 0.01, 0.0])
+        for _ in range(per_group):
+            segments.append({'coords': base + rng.normal(0, 2e-5, base.shape)})
+    # 重复轨迹（0距离）
+    segments.append({'coords': segments[0]['coords'].copy()})
+    return segments
+
+
+class TestDistanceMatrixEngine:
+    """测试剪枝/稀疏/并行的距离矩阵引擎"""
+
+    @staticmethod
+    def _reference_matrix(segments, metric):
+        func = {'frechet': frechet_distance, 'hausdorff': hausdorff_distance_trajectory}[metric]
+        n = len(segments)
+        matrix = np.zeros((n, n))
+        for i in range(n):
+            for j in range(i + 1, n):
+                matrix[i, j] = matrix[j, i] = func(segments[i]['coords'], segments[j]['coords'])
+        return matrix
+
+    @pytest.mark.parametrize('metric', ['frechet', 'hausdorff'])
+    def test_dense_matches_reference(self, metric):
+        segments = _segment_set(3)
+        clusterer = ImprovedTrajectoryClusterer(distance_metric=metric)
+        expected = self._reference_matrix(segments, metric)
+        np.testing.assert_allclose(clusterer.compute_distance_matrix(segments), expected)
+
+    @pytest.mark.parametrize('metric', ['frechet', 'hausdorff'])
+    def test_lower_bounds_are_valid(self, metric):
+        segments = _segment_set(4)
+        coords = [seg['coords'] for seg in segments]
+        expected = self._reference_matrix(segments, metric)
+        summaries = _trajectory_summaries(coords)
+        for i in range(len(coords) - 1):
+            js = np.arange(i + 1, len(coords))
+            assert np.all(pair_lower_bounds(summaries, i, js, metric) <= expected[i, js] + 1e-6)
+
+    @pytest.mark.parametrize('n_jobs', [1, 2])
+    def test_sparse_graph_matches_dense(self, n_jobs):
+        segments = _segment_set(5)
+        coords = [seg['coords'] for seg in segments]
+        expected = self._reference_matrix(segments, 'frechet')
+        radius = float(np.percentile(expected[np.triu_indices(len(coords), 1)], 30))
+
+        graph = compute_distance_graph(coords, 'frechet', radius=radius, n_jobs=n_jobs, block_rows=4)
+        rows, cols = np.nonzero(expected <= radius)
+        np.testing.assert_allclose(np.asarray(graph[rows, cols]).ravel(), expected[rows, cols])
+        assert graph.nnz == len(rows)
+
+    def test_condensed_memmap(self, tmp_path):
+        segments = _segment_set(6)
+        coords = [seg['coords'] for seg in segments]
+        expected = self._reference_matrix(segments, 'hausdorff')
+        condensed = compute_condensed_distances(
+            coords, 'hausdorff', output_path=str(tmp_path / 'dist.dat'), n_jobs=2, block_rows=4
+        )
+        assert condensed.dtype == np.float32
+        np.testing.assert_allclose(condensed, squareform(expected, checks=False), rtol=1e-6)
+
+    def test_cluster_by_distance_matches_dense_dbscan(self):
+        segments = _segment_set(7)
+        clusterer = ImprovedTrajectoryClusterer(distance_metric='frechet')
+        expected = DBSCAN(eps=20.0, min_samples=3, metric='precomputed').fit_predict(
+            self._reference_matrix(segments, 'frechet')
+        )
+        np.testing.assert_array_equal(clusterer.cluster_by_distance(segments, eps=20.0, min_samples=3), expected)
+
+
+def _perp_para_reference(point, line_start, line_end):
+    """逐点计算的垂直/平行距离"""
+    line_vec = line_end - line_start
+    line_len = np.linalg.norm(line_vec)
+    if line_len < 1e-10:
+        return haversine_distance(point[1], point[0], line_start[1], line_start[0]), 0.0
+    proj_len = np.dot(point - line_start, line_vec / line_len)
+    if proj_len < 0:
+        closest, para = line_start, abs(proj_len)
+    elif proj_len > line_len:
+        closest, para = line_end, proj_len - line_len
+    else:
+        closest, para = line_start + proj_len * line_vec / line_len, 0.0
+    return haversine_distance(point[1], point[0], closest[1], closest[0]), para
+
+
+def _segment_reference(seg1, seg2):
+    if len(seg1) < 2 or len(seg2) < 2:
+        return np.inf
+    pairs = [_perp_para_reference(p, seg2[0], seg2[-1]) for p in seg1]
+    pairs += [_perp_para_reference(p, seg1[0], seg1[-1]) for p in seg2]
+    perp, para = np.array(pairs).T
+    return 0.6 * perp.mean() + 0.3 * para.mean() + 0.1 * angle_difference(seg1, seg2)
+
+
+class TestVectorizedDistances:
+    """测试向量化Hausdorff和段距离"""
+
+    def test_hausdorff_matches_reference(self):
+        rng = np.random.default_rng(10)
+        for n, m in [(1, 1), (3, 40), (60, 8), (120, 90)]:
+            traj1, traj2 = _random_walk(rng, n), _random_walk(rng, m)
+            expected = max(
+                max(min(haversine_distance(p[1], p[0], q[1], q[0]) for q in traj2) for p in traj1),
+                max(min(haversine_distance(q[1], q[0], p[1], p[0]) for p in traj1) for q in traj2)
+            )
+            assert hausdorff_distance_trajectory(traj1, traj2) == pytest.approx(expected, rel=1e-9)
+
+    def test_point_line_distances(self):
+        rng = np.random.default_rng(11)
+        points = _random_walk(rng, 20)
+        line_start, line_end = points[3], points[3] + [1e-3, 5e-4]
+        expected = np.array([_perp_para_reference(p, line_start, line_end) for p in points])
+        np.testing.assert_allclose(perpendicular_distance(points, line_start, line_end), expected[:, 0])
+        np.testing.assert_allclose(parallel_distance(points, line_start, line_end), expected[:, 1], atol=1e-15)
+        # 单点与退化线段
+        assert perpendicular_distance(points[0], line_start, line_start) == pytest.approx(
+            _perp_para_reference(points[0], line_start, line_start)[0])
+        assert parallel_distance(points[0], line_start, line_start) == 0.0
+
+    def test_segment_distance_matrix(self):
+        rng = np.random.default_rng(12)
+        segments = [_random_walk(rng, int(n)) for n in rng.integers(1, 25, 30)]
+        segments.append(np.array([[116.0, 39.0], [116.0, 39.0]]))
+        matrix = segment_distance_matrix(segments, chunk_points=40)
+        for i, seg_i in enumerate(segments):
+            for j, seg_j in enumerate(segments):
+                if i == j:
+                    assert matrix[i, j] == 0.0
+                    continue
+                expected = _segment_reference(seg_i, seg_j)
+                assert segment_distance(seg_i, seg_j) == pytest.approx(expected, rel=1e-9)
+                assert matrix[i, j] == pytest.approx(expected, rel=1e-9)
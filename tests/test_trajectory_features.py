@@ -0,0 +1,71 @@
+"""
+轨迹段批量特征提取单元测试
+"""
+
+import numpy as np
+import pytest
+
+from spdatalab.dataset.improved_trajectory_clustering import extract_enhanced_features
+from spdatalab.dataset.trajectory_features import (
+    SegmentBatch,
+    extract_basic_features_batch,
+    extract_enhanced_features_batch
+)
+
+
+@pytest.fixture
+def batch():
+    rng = np.random.default_rng(0)
+    # 包含单点、两点、三点段等边界情况
+    lengths = np.concatenate([[1, 2, 3, 4], rng.integers(1, 30, 200)])
+    total = int(lengths.sum())
+    lon = 116.0 + np.cumsum(rng.normal(0, 1e-4, total))
+    lat = 39.0 + np.cumsum(rng.normal(0, 1e-4, total))
+    lon[20:26] = lon[20]
+    lat[20:26] = lat[20]
+    timestamp = np.cumsum(rng.choice([0.0, 0.05, 0.5, 1.0], total))
+    speed = np.abs(rng.normal(5, 4, total))
+    speed[40:60] = 3.0
+    yaw = rng.uniform(-3, 3, total)
+    return SegmentBatch.from_lengths(lengths, lon, lat, timestamp, speed, yaw)
+
+
+def _reference(batch, j):
+    start, end = batch.offsets[j], batch.offsets[j + 1]
+    speeds = batch.speed[start:end]
+    yaws = batch.yaw[start:end]
+    if end - start > 1:
+        time_diffs = np.maximum(np.diff(batch.timestamp[start:end]), 0.1)
+        accelerations = np.diff(speeds) / time_diffs
+        yaw_changes = np.diff(yaws) / time_diffs
+    else:
+        accelerations = yaw_changes = np.array([])
+    coords = np.column_stack([batch.lon[start:end], batch.lat[start:end]])
+    attrs = {'speeds': speeds, 'accelerations': accelerations,
+             'yaw_changes': yaw_changes, 'yaws': yaws}
+    return extract_enhanced_features(coords, attrs)
+
+
+def test_enhanced_features_match_per_segment(batch):
+    features = extract_enhanced_features_batch(batch)
+    assert features.shape == (batch.n_segments, 17)
+    for j in range(batch.n_segments):
+        np.testing.assert_allclose(features[j], _reference(batch, j), rtol=1e-9, atol=1e-9)
+
+
+def test_basic_features_are_enhanced_prefix(batch):
+    basic = extract_basic_features_batch(batch)
+    assert basic.shape == (batch.n_segments, 10)
+    np.testing.assert_allclose(basic, extract_enhanced_features_batch(batch)[:, :10])
+    # 单点段没有加速度和航向角变化
+    assert np.all(basic[0, 4:8] == 0)
+
+
+def test_without_yaw_and_empty_batch():
+    batch = SegmentBatch.from_lengths([3], [0.0, 1.0, 2.0], [0.0, 0.0, 1.0], [0, 1, 2], [1.0, 2.0, 4.0])
+    features = extract_basic_features_batch(batch)
+    assert features[0, 6] == 0 and features[0, 7] == 0
+    np.testing.assert_allclose(features[0, 4], 1.5)
+
+    empty = SegmentBatch.from_lengths([], [], [], [], [])
+    assert extract_enhanced_features_batch(empty).shape == (0, 17)
@@ -0,0 +1,185 @@
+"""
+轨迹简化与重采样单元测试
+"""
+
+import sys
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from spdatalab.dataset import trajectory as trajectory_module
+from spdatalab.dataset.trajectory import build_trajectory
+from spdatalab.dataset.trajectory_simplification import (
+    SimplificationConfig,
+    cap_points_mask,
+    distance_resample_mask,
+    douglas_peucker_mask,
+    offsets_from_lengths,
+    simplification_from_args,
+    simplify_coords_batch,
+    simplify_points_df,
+    time_resample_mask,
+    uniform_resample_mask
+)
+
+METERS_PER_DEGREE = 6371000 * np.pi / 180
+
+
+@pytest.fixture
+def batch():
+    rng = np.random.default_rng(0)
+    lengths = [0, 1, 2, 150, 37, 300]
+    coords = [
+        np.column_stack([
+            116.0 + np.cumsum(rng.normal(0, 1e-5, n)),
+            39.0 + np.cumsum(rng.normal(0, 1e-5, n))
+        ])
+        for n in lengths
+    ]
+    return coords, offsets_from_lengths(lengths), np.vstack(coords)
+
+
+def _project(coords):
+    lat0 = coords[:, 1].mean()
+    return np.column_stack([
+        coords[:, 0] * np.cos(np.radians(lat0)) * METERS_PER_DEGREE,
+        coords[:, 1] * METERS_PER_DEGREE
+    ])
+
+
+def _douglas_peucker_reference(xy, tolerance):
+    """递归Douglas-Peucker（点到线段距离）"""
+    keep = np.zeros(len(xy), dtype=bool)
+    keep[[0, -1]] = True
+    stack = [(0, len(xy) - 1)]
+    while stack:
+        a, b = stack.pop()
+        if b - a < 2:
+            continue
+        start, direction = xy[a], xy[b] - xy[a]
+        length2 = direction @ direction
+        best, best_i = -1.0, None
+        for i in range(a + 1, b):
+            t = 0.0 if length2 == 0 else np.clip((xy[i] - start) @ direction / length2, 0, 1)
+            dist = np.hypot(*(xy[i] - (start + t * direction)))
+            if dist > best:
+                best, best_i = dist, i
+        if best > tolerance:
+            keep[best_i] = True
+            stack += [(a, best_i), (best_i, b)]
+    return keep
+
+
+def test_douglas_peucker_matches_reference(batch):
+    coords, offsets, stacked = batch
+    mask = douglas_peucker_mask(stacked[:, 0], stacked[:, 1], offsets, tolerance_m=1.5)
+    for j, traj in enumerate(coords):
+        part = mask[offsets[j]:offsets[j + 1]]
+        if len(traj) == 0:
+            continue
+        np.testing.assert_array_equal(part, _douglas_peucker_reference(_project(traj), 1.5))
+    assert mask.sum() < len(mask)
+
+
+def test_resampling_keeps_endpoints(batch):
+    coords, offsets, stacked = batch
+    timestamp = np.concatenate([np.arange(len(traj), dtype=float) for traj in coords])
+    masks = [
+        distance_resample_mask(stacked[:, 0], stacked[:, 1], offsets, 5.0),
+        time_resample_mask(timestamp, offsets, 10.0),
+        uniform_resample_mask(offsets, 7),
+    ]
+    for mask in masks:
+        for j, traj in enumerate(coords):
+            if len(traj):
+                assert mask[offsets[j]] and mask[offsets[j + 1] - 1]
+
+    # 整数时间戳每10秒一个点
+    part = masks[1][offsets[3]:offsets[4]]
+    np.testing.assert_array_equal(np.nonzero(part)[0], list(range(0, 150, 10)) + [149])
+    part = masks[2][offsets[4]:offsets[5]]
+    np.testing.assert_array_equal(np.nonzero(part)[0], [0, 7, 14, 21, 28, 35, 36])
+
+
+def test_distance_resample_spacing(batch):
+    coords, offsets, stacked = batch
+    mask = distance_resample_mask(stacked[:, 0], stacked[:, 1], offsets, 5.0)
+    traj = _project(coords[5])
+    cumulative = np.concatenate([[0], np.cumsum(np.hypot(*np.diff(traj, axis=0).T))])
+    kept = cumulative[mask[offsets[5]:offsets[6]]]
+    # 除末点外，相邻保留点落在不同的5米区间
+    assert np.all(np.diff(np.floor(kept[:-1] / 5.0)) >= 1)
+
+
+def test_cap_points(batch):
+    coords, offsets, stacked = batch
+    mask = cap_points_mask(np.ones(len(stacked), dtype=bool), offsets, 20)
+    for j, traj in enumerate(coords):
+        part = mask[offsets[j]:offsets[j + 1]]
+        assert part.sum() == min(len(traj), 20)
+        if len(traj):
+            assert part[0] and part[-1]
+
+
+def test_simplify_coords_batch_and_points_df(batch):
+    coords, offsets, stacked = batch
+    config = SimplificationConfig(strategy='douglas_peucker', tolerance_m=1.5, max_points=30)
+    simplified = simplify_coords_batch(coords, config)
+    assert [len(traj) for traj in simplified][:3] == [0, 1, 2]
+    assert all(len(traj) <= 30 for traj in simplified)
+
+    points_df = pd.DataFrame({
+        'dataset_name': np.repeat([f'ds_{j}' for j in range(len(coords))], np.diff(offsets)),
+        'longitude': stacked[:, 0],
+        'latitude': stacked[:, 1],
+        'timestamp': np.concatenate([np.arange(len(traj)) for traj in coords])
+    }).sample(frac=1.0, random_state=0)
+    result = simplify_points_df(points_df, config)
+    counts = result.groupby('dataset_name').size()
+    assert counts.to_dict() == {f'ds_{j}': len(traj) for j, traj in enumerate(simplified) if len(traj)}
+
+
+def test_invalid_strategy():
+    with pytest.raises(ValueError):
+        SimplificationConfig(strategy='spline')
+
+
+def test_simplification_from_args():
+    assert simplification_from_args(None, None) is None
+    assert simplification_from_args(2.5, None) == SimplificationConfig(strategy='douglas_peucker', tolerance_m=2.5)
+    assert simplification_from_args(None, 100) == SimplificationConfig(strategy='none', tolerance_m=0.0, max_points=100)
+
+
+def test_build_trajectory_simplification(batch):
+    coords, _, _ = batch
+    traj = coords[5]
+    points_df = pd.DataFrame({
+        'longitude': traj[:, 0],
+        'latitude': traj[:, 1],
+        'timestamp': np.arange(len(traj)) * 100,
+        'twist_linear': np.linspace(0, 10, len(traj))
+    }).sample(frac=1.0, random_state=1)
+
+    full = build_trajectory('scene_1', 'ds_1', points_df)
+    simplified = build_trajectory('scene_1', 'ds_1', points_df,
+                                  SimplificationConfig(tolerance_m=1.5, max_points=40))
+
+    assert len(simplified['geometry'].coords) <= 40 < len(full['geometry'].coords)
+    assert simplified['geometry'].coords[0] == full['geometry'].coords[0]
+    assert simplified['geometry'].coords[-1] == full['geometry'].coords[-1]
+    for key in ['start_time', 'end_time', 'duration', 'avg_speed', 'max_speed', 'std_speed']:
+        assert simplified[key] == full[key]
+
+
+def test_trajectory_cli_flags():
+    argv = ['trajectory', '--input', 'scenes.txt', '--table', 'traj', '--simplify-tolerance', '4', '--max-points', '300']
+    mappings = pd.DataFrame({'scene_id': ['scene_1'], 'data_name': ['ds_1']})
+    with patch.object(sys, 'argv', argv), \
+         patch('spdatalab.dataset.trajectory.load_scene_data_mappings', return_value=mappings), \
+         patch('spdatalab.dataset.trajectory.process_scene_mappings',
+               return_value={'successful_trajectories': 1}) as process:
+        trajectory_module.main()
+    assert process.call_args.kwargs['simplification'] == SimplificationConfig(
+        strategy='douglas_peucker', tolerance_m=4.0, max_points=300)